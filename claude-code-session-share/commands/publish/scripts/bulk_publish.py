@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Publish many Claude Code sessions at once, e.g. to archive a project's sessions.
+
+Sessions are chosen by project, by date range, by id, or any combination:
+
+    python3 bulk_publish.py --project ~/src/my-app --since 2026-01-05 --until 2026-01-16
+    python3 bulk_publish.py <session_id> <session_id> ...
+
+They are found in one pass over ~/.claude/projects. A session already
+published with the same options whose transcripts haven't changed since is
+skipped without being staged again; the others are staged exactly as
+publish_session.py stages them and uploaded, updating their existing gist
+where they have one. Uploads run --jobs sessions at a time, each worker on
+its own keep-alive connection to the GitHub API. A rate-limited response
+pauses every worker until the limit resets (or backs off exponentially, for
+GitHub's secondary limits). The run ends with a JSON report mapping each
+session to its gist and viewer URL.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from gist_api import GistClient, GitHubAPIError, get_gh_token
+from publish_session import (
+    add_staging_options,
+    find_subagent_transcripts,
+    publish_new_gist,
+    republish_changed_files,
+    stage_transcripts,
+    staging_options,
+    viewer_url_for,
+)
+from publish_state import diff_files, file_sha256, is_unchanged, load_published, save_published, source_fingerprint
+from session_index import get_projects_dir, project_dir_name_for_cwd
+from timing import PhaseTimer
+
+DEFAULT_JOBS = 4
+DEFAULT_REPORT = "bulk-publish-report.json"
+MAX_RATE_LIMIT_RETRIES = 6
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+@dataclass
+class SessionCandidate:
+    session_id: str
+    project: str
+    main_path: str
+    size: int
+    mtime: float
+
+
+def discover_sessions(projects_dir: str, projects: set[str] | None = None, session_ids: set[str] | None = None,
+                      since: float | None = None, until: float | None = None) -> list[SessionCandidate]:
+    """Find the main transcripts matching every given filter in one scandir pass, oldest first.
+
+    since and until are timestamps bounding the transcript's last modification.
+    """
+    found = []
+    try:
+        project_entries = list(os.scandir(projects_dir))
+    except OSError:
+        return []
+    for project_entry in project_entries:
+        if projects is not None and project_entry.name not in projects:
+            continue
+        if not project_entry.is_dir():
+            continue
+        try:
+            scanner = os.scandir(project_entry.path)
+        except OSError:
+            continue
+        with scanner:
+            for entry in scanner:
+                if not entry.name.endswith(".jsonl"):
+                    continue
+                session_id = entry.name[: -len(".jsonl")]
+                if session_ids is not None and session_id not in session_ids:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if (since is not None and stat.st_mtime < since) or (until is not None and stat.st_mtime >= until):
+                    continue
+                if stat.st_size == 0:
+                    continue
+                found.append(SessionCandidate(session_id, project_entry.name, entry.path, stat.st_size, stat.st_mtime))
+    return sorted(found, key=lambda c: c.mtime)
+
+
+class RateLimitGate:
+    """Shared by every client in a run, so that one rate-limited response pauses them all."""
+
+    def __init__(self):
+        self._until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+    def wait(self) -> None:
+        while (remaining := self._until - time.monotonic()) > 0:
+            time.sleep(remaining)
+
+
+def is_rate_limited(status: int, headers, body: bytes) -> bool:
+    if status == 429:
+        return True
+    return status == 403 and (headers.get("X-RateLimit-Remaining") == "0" or b"rate limit" in body.lower())
+
+
+def retry_delay(headers, attempt: int) -> float:
+    """How long to wait after a rate-limited response: what GitHub asks for, else exponential backoff."""
+    retry_after = headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    reset = headers.get("X-RateLimit-Reset")
+    if headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+        return max(0.0, int(reset) - time.time()) + 1
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class RateLimitedGistClient(GistClient):
+    """A GistClient that waits out rate limits, pausing every client sharing its gate.
+
+    clone() keeps the gate, so the parallel upload batches of a session share it too.
+    """
+
+    def __init__(self, token: str, gate: RateLimitGate, **kwargs):
+        super().__init__(token, **kwargs)
+        self.gate = gate
+
+    def request_json(self, method: str, path: str, body: dict | None = None) -> dict:
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self.gate.wait()
+            status, headers, data = self.request(method, path, body)
+            if 200 <= status < 300:
+                # Out of requests: don't let any worker send another until the limit resets
+                if headers.get("X-RateLimit-Remaining") == "0":
+                    self.gate.pause(retry_delay(headers, attempt))
+                return json.loads(data) if data else {}
+            if not is_rate_limited(status, headers, data) or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            delay = retry_delay(headers, attempt)
+            print(f"  Rate limited, pausing uploads for {delay:.1f}s...", file=sys.stderr)
+            self.gate.pause(delay)
+        raise GitHubAPIError(method, path, status, data)
+
+
+class ThreadOutput(io.TextIOBase):
+    """Stands in for sys.stdout so each worker's output can be captured separately from the others'."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    @contextmanager
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+
+def parse_time(value: str, end_of_day: bool = False) -> float:
+    """A timestamp from an ISO date or datetime (local time unless it has an offset).
+
+    With end_of_day, a bare date means the end of that day, so --until includes it.
+    """
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+
+def resolve_project(value: str, projects_dir: str) -> str:
+    """A project directory name, from the name itself, its path under projects_dir, or the project's working directory."""
+    path = os.path.abspath(os.path.expanduser(value))
+    if os.path.dirname(path) == os.path.abspath(projects_dir):
+        return os.path.basename(path)
+    if os.path.isdir(os.path.join(projects_dir, value)):
+        return value
+    return project_dir_name_for_cwd(path)
+
+
+def session_entry(candidate: SessionCandidate, status: str, gist_id: str | None = None, **fields) -> dict:
+    return {
+        "session_id": candidate.session_id,
+        "project": candidate.project,
+        "transcript": candidate.main_path,
+        "status": status,
+        "gist_id": gist_id,
+        "viewer_url": viewer_url_for(gist_id) if gist_id else None,
+        **fields,
+    }
+
+
+def publish_candidate(candidate: SessionCandidate, transcript_paths: list[str], sources: dict,
+                      previous: dict | None, args: argparse.Namespace, client: GistClient,
+                      output: ThreadOutput) -> dict:
+    """Stage and upload one session, updating its previous gist when there is one. Returns its report entry."""
+    timer = PhaseTimer(args.timings)
+    start = time.perf_counter()
+    with output.capture() as captured:
+        try:
+            with tempfile.TemporaryDirectory(prefix="session-share-") as staging_dir:
+                upload_paths = stage_transcripts(transcript_paths, args, staging_dir, timer)
+                file_hashes = {os.path.basename(p): file_sha256(p) for p in upload_paths}
+                changed, removed = diff_files(previous["files"], file_hashes) if previous else (list(file_hashes), [])
+                if previous and republish_changed_files(previous, upload_paths, file_hashes, client, timer):
+                    gist_id = previous["gist_id"]
+                    status = "updated" if changed or removed else "unchanged"
+                else:
+                    gist_id = publish_new_gist(upload_paths, client, timer)
+                    status = "published"
+                    changed = list(file_hashes)
+                uploaded_bytes = sum(os.path.getsize(p) for p in upload_paths if os.path.basename(p) in changed)
+            save_published(candidate.session_id, gist_id, file_hashes, sources, staging_options(args))
+            entry = session_entry(candidate, status, gist_id, files=len(file_hashes), uploaded_files=len(changed),
+                                  uploaded_bytes=uploaded_bytes)
+        except SystemExit:
+            # stage_transcripts exits when --secrets abort finds something
+            entry = session_entry(candidate, "secrets", previous["gist_id"] if previous else None)
+        except (GitHubAPIError, RuntimeError, OSError, ValueError) as e:
+            entry = session_entry(candidate, "failed", previous["gist_id"] if previous else None, error=str(e))
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    timings: dict[str, float] = {}
+    for name, seconds in timer.phases:
+        timings[name] = round(timings.get(name, 0) + seconds, 3)
+    entry["timings"] = timings
+    entry["output"] = captured.getvalue().splitlines()
+    return entry
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session_ids", nargs="*", metavar="SESSION_ID", help="sessions to publish")
+    parser.add_argument(
+        "--project",
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="publish this project's sessions: its working directory, or its directory (or name) under "
+             "~/.claude/projects (names start with '-', so pass them as --project=NAME). Repeatable",
+    )
+    parser.add_argument("--since", metavar="DATE", help="only sessions last modified on or after this date or time")
+    parser.add_argument("--until", metavar="DATE", help="only sessions last modified on or before this date or time")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"sessions uploaded at once (default: {DEFAULT_JOBS})")
+    parser.add_argument("--report", default=DEFAULT_REPORT, metavar="PATH",
+                        help=f"where to write the JSON report (default: {DEFAULT_REPORT})")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be published, and upload nothing")
+    parser.add_argument(
+        "--new-gist",
+        action="store_true",
+        help="always create new gists, even for sessions that were published before",
+    )
+    add_staging_options(parser)
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        default=bool(os.environ.get("SESSION_SHARE_TIMINGS")),
+        help="record per-phase latency for each session in the report (or set SESSION_SHARE_TIMINGS=1)",
+    )
+    args = parser.parse_args(argv)
+    if not (args.session_ids or args.project or args.since or args.until):
+        parser.error("choose sessions by id, --project, --since or --until")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    try:
+        args.since_time = parse_time(args.since) if args.since else None
+        args.until_time = parse_time(args.until, end_of_day=True) if args.until else None
+    except ValueError as e:
+        parser.error(f"invalid date: {e}")
+    return args
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    projects_dir = get_projects_dir()
+    projects = {resolve_project(p, projects_dir) for p in args.project} or None
+    session_ids = set(args.session_ids) or None
+
+    candidates = discover_sessions(projects_dir, projects, session_ids, args.since_time, args.until_time)
+    entries: list[dict] = []
+    if session_ids:
+        found = {c.session_id for c in candidates}
+        entries += [
+            {"session_id": session_id, "status": "not_found"} for session_id in sorted(session_ids - found)
+        ]
+
+    options = staging_options(args)
+    pending = []
+    for candidate in candidates:
+        session_dir = os.path.join(os.path.dirname(candidate.main_path), candidate.session_id)
+        transcript_paths = [candidate.main_path] + find_subagent_transcripts(session_dir)
+        try:
+            sources = source_fingerprint(transcript_paths)
+        except OSError:
+            entries.append(session_entry(candidate, "not_found"))
+            continue
+        previous = None if args.new_gist else load_published(candidate.session_id)
+        if not args.new_gist and is_unchanged(previous, sources, options):
+            entries.append(session_entry(candidate, "skipped", previous["gist_id"]))
+        else:
+            pending.append((candidate, transcript_paths, sources, previous))
+
+    print(f"Found {len(candidates)} session(s): {len(pending)} to publish, "
+          f"{sum(e['status'] == 'skipped' for e in entries)} unchanged since their last publish.")
+    if args.dry_run:
+        for candidate, transcript_paths, _, previous in pending:
+            action = f"update {previous['gist_id']}" if previous else "new gist"
+            print(f"  {candidate.session_id} ({candidate.project}, {len(transcript_paths)} file(s), "
+                  f"{candidate.size / 1024 / 1024:.1f} MB): {action}")
+        return
+
+    token = get_gh_token() if pending else None
+    if pending and not token:
+        print("Error: bulk publishing needs a GitHub token. Run 'gh auth login' or set GH_TOKEN.")
+        sys.exit(1)
+
+    gate = RateLimitGate()
+    clients: list[GistClient] = []
+    local = threading.local()
+    clients_lock = threading.Lock()
+
+    def worker_client() -> GistClient:
+        # Each worker keeps one keep-alive connection for all of its sessions
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = RateLimitedGistClient(token, gate)
+            with clients_lock:
+                clients.append(client)
+        return client
+
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            # Biggest first, so one large session doesn't hold up the end of the run
+            futures = [
+                executor.submit(lambda item: publish_candidate(*item, args, worker_client(), output), item)
+                for item in sorted(pending, key=lambda item: item[0].size, reverse=True)
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                entry = future.result()
+                entries.append(entry)
+                result = entry["viewer_url"] if entry["status"] != "failed" else entry["error"]
+                print(f"[{done}/{len(futures)}] {entry['session_id']} {entry['status']}: {result}", flush=True)
+    finally:
+        sys.stdout = output.stream
+        for client in clients:
+            client.close()
+
+    order = {c.session_id: i for i, c in enumerate(candidates)}
+    entries.sort(key=lambda e: order.get(e["session_id"], -1))
+    counts: dict[str, int] = {}
+    for entry in entries:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "projects_dir": projects_dir,
+        "options": options,
+        "counts": counts,
+        "sessions": entries,
+    }
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"{', '.join(f'{n} {status}' for status, n in sorted(counts.items()))}. Report: {args.report}")
+    if counts.get("failed") or counts.get("secrets"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
 #!/usr/bin/env python3
-"""Check if a newer version of the session-share plugin is available."""
+"""Check if a newer version of the session-share plugin is available.
+
+The latest version is cached on disk with the time it was checked and its
+ETag. Within VERSION_CHECK_TTL the cached version is used without touching
+the network, and after that the check is a conditional request that usually
+comes back as an empty 304.
+"""
 
 import json
+import os
+import time
 import urllib.request
 import urllib.error
 from pathlib import Path
 
+import tracing
+from plugin_cache import read_json_cache, write_json_cache
+
 GITHUB_RAW_URL = "https://raw.githubusercontent.com/moredip/session-share/main/claude-code-session-share/.claude-plugin/plugin.json"
+VERSION_URL = os.environ.get("SESSION_SHARE_VERSION_URL", GITHUB_RAW_URL)
+VERSION_CACHE_FILE = "version-check.json"
+VERSION_CHECK_TTL = 24 * 60 * 60
+# After a failed check (offline, say), try again sooner than the TTL
+VERSION_RETRY_TTL = 60 * 60
 
 
 class LocalVersionError(Exception):
@@ -49,8 +65,45 @@ def parse_version(version_str: str) -> tuple[int, ...]:
         raise VersionParseError(f"Invalid version format: {version_str}") from e
 
 
-def check_for_update() -> str | None:
-    """Check if a newer version is available. Returns message or None."""
+def is_fresh(cached: dict, now: float) -> bool:
+    """Whether a cached check is recent enough to skip the network."""
+    checked_at = cached.get("checked_at")
+    if not isinstance(checked_at, (int, float)):
+        return False
+    ttl = VERSION_CHECK_TTL if cached.get("ok") else VERSION_RETRY_TTL
+    return 0 <= now - checked_at < ttl
+
+
+def fetch_remote_version(cached: dict) -> dict:
+    """Fetch the latest plugin.json, revalidating the cached copy's ETag. Returns the new cache record."""
+    request = urllib.request.Request(VERSION_URL)
+    if cached.get("etag") and cached.get("version"):
+        request.add_header("If-None-Match", cached["etag"])
+    record = {"checked_at": time.time(), "ok": False, "version": cached.get("version"), "etag": cached.get("etag")}
+    tracing.count("http_requests")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            body = response.read()
+            tracing.count("http_bytes_received", len(body))
+            record["version"] = json.loads(body.decode()).get("version", None)
+            record["etag"] = response.headers.get("ETag")
+        record["ok"] = True
+    except urllib.error.HTTPError as e:
+        record["ok"] = e.code == 304
+    except (urllib.error.URLError, json.JSONDecodeError, OSError, TimeoutError):
+        pass
+    try:
+        write_json_cache(VERSION_CACHE_FILE, record)
+    except OSError:
+        pass
+    return record
+
+
+def check_for_update(use_network: bool = True) -> str | None:
+    """Check if a newer version is available. Returns message or None.
+
+    With use_network=False, only the cached version is consulted, however old it is.
+    """
     try:
         try:
             local_version = get_local_version()
@@ -62,14 +115,17 @@ def check_for_update() -> str | None:
         except VersionParseError:
             return f"Warning: Could not parse local plugin version (got: {local_version})"
 
-        with urllib.request.urlopen(GITHUB_RAW_URL, timeout=5) as response:
-            remote_version = json.loads(response.read().decode()).get("version", None)
+        cached = read_json_cache(VERSION_CACHE_FILE)
+        if use_network and not is_fresh(cached, time.time()):
+            cached = fetch_remote_version(cached)
+        remote_version = cached.get("version")
 
         if remote_version is None:
-            return "Warning: Could not determine remote plugin version"
+            # Only worth a warning if the remote answered without a version
+            return "Warning: Could not determine remote plugin version" if cached.get("ok") else None
 
         try:
-            remote_parsed = parse_version(remote_version)
+            remote_parsed = parse_version(str(remote_version))
         except VersionParseError:
             return f"Warning: Could not determine remote plugin version (got: {remote_version})"
 
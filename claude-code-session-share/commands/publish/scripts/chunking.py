@@ -0,0 +1,204 @@
+"""Split an oversized transcript into ordered part files plus a manifest.
+
+The gist API truncates file contents above roughly 1 MB, so a large main
+transcript is uploaded as `<session>.part-0001.jsonl`, `<session>.part-0002.jsonl`, ...
+split on JSONL line boundaries, with a `<session>.manifest.json` recording the
+part order, line counts and hashes. The viewer fetches the parts in parallel
+and reassembles them.
+
+Parts are packed greedily from the start of the file, so when a transcript
+grows by appending only its last part(s) change between publishes.
+
+A gist lists at most GIST_MAX_FILES files, and the viewer can't read a part
+the listing leaves out. plan_part_bytes makes the parts bigger when the
+default size would need more files than the gist has left. The viewer fetches
+each part from its raw_url, which serves files up to MAX_PART_BYTES.
+"""
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+
+DEFAULT_CHUNK_BYTES = 1_000_000
+MAX_PART_BYTES = 10_000_000
+GIST_MAX_FILES = 300
+MANIFEST_FORMAT = "session-share-chunked"
+MANIFEST_VERSION = 1
+
+
+class FileBudgetError(ValueError):
+    """Raised when a session needs more files than a gist lists, even with the largest parts."""
+    pass
+
+
+def manifest_filename(transcript_filename: str) -> str:
+    stem = transcript_filename.removesuffix(".jsonl")
+    return f"{stem}.manifest.json"
+
+
+def part_filename(transcript_filename: str, index: int) -> str:
+    stem = transcript_filename.removesuffix(".jsonl")
+    return f"{stem}.part-{index:04d}.jsonl"
+
+
+class _PartWriter:
+    def __init__(self, staging_dir: str, filename: str):
+        self.filename = filename
+        self.path = os.path.join(staging_dir, filename)
+        self.file = open(self.path, "wb")
+        self.digest = hashlib.sha256()
+        self.bytes = 0
+        self.lines = 0
+
+    def write(self, line: bytes) -> None:
+        self.file.write(line)
+        self.digest.update(line)
+        self.bytes += len(line)
+        self.lines += 1
+
+    def record(self) -> dict:
+        """The part's manifest entry so far; the part can still be written to."""
+        self.file.flush()
+        return {"filename": self.filename, "lines": self.lines, "bytes": self.bytes, "sha256": self.digest.hexdigest()}
+
+    def close(self) -> dict:
+        record = self.record()
+        self.file.close()
+        return record
+
+
+def _write_manifest(staging_dir: str, transcript_filename: str, parts: list[dict]) -> str:
+    manifest_path = os.path.join(staging_dir, manifest_filename(transcript_filename))
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "transcript": transcript_filename,
+            "parts": parts,
+        }, f, indent=2)
+    return manifest_path
+
+
+class TranscriptSplitter:
+    """Packs a transcript's lines into parts as they are fed in.
+
+    A transcript that is only ever appended to can be fed just the new lines
+    each time (publish_session.py --watch): the closed parts stay as they are,
+    and only the last part is written to.
+    """
+
+    def __init__(self, staging_dir: str, transcript_filename: str, max_part_bytes: int):
+        self.staging_dir = staging_dir
+        self.transcript_filename = transcript_filename
+        self.max_part_bytes = max_part_bytes
+        self.size = 0
+        self.parts: list[dict] = []
+        self.part_paths: list[str] = []
+        self._writer: _PartWriter | None = None
+
+    def feed(self, lines: Iterable[bytes]) -> None:
+        if self.max_part_bytes <= 0:
+            return
+        for line in lines:
+            if not line.endswith(b"\n"):
+                line += b"\n"
+            self.size += len(line)
+            if self._writer is not None and self._writer.bytes + len(line) > self.max_part_bytes:
+                self.parts.append(self._writer.close())
+                self._writer = None
+            if self._writer is None:
+                self._writer = _PartWriter(self.staging_dir,
+                                           part_filename(self.transcript_filename, len(self.parts) + 1))
+                self.part_paths.append(self._writer.path)
+            self._writer.write(line)
+
+    def split(self, path: str, close: bool = False) -> list[str]:
+        """What split_transcript returns for path, which holds the lines fed so far.
+
+        Writes the manifest. Unless close is set, more lines can be fed afterwards.
+        """
+        if self.max_part_bytes <= 0 or self.size <= self.max_part_bytes:
+            return [path]
+        record = self._writer.close() if close else self._writer.record()
+        return self.part_paths + [_write_manifest(self.staging_dir, self.transcript_filename, self.parts + [record])]
+
+
+def split_transcript(path: str, staging_dir: str, max_part_bytes: int = DEFAULT_CHUNK_BYTES) -> list[str]:
+    """Split a transcript into parts of at most max_part_bytes each (a single longer line gets a part to itself).
+
+    Returns the part paths followed by the manifest path, or [path] unchanged if it is small enough.
+    """
+    if max_part_bytes <= 0 or os.path.getsize(path) <= max_part_bytes:
+        return [path]
+
+    transcript_filename = os.path.basename(path)
+    splitter = TranscriptSplitter(staging_dir, transcript_filename, max_part_bytes)
+    with open(path, "rb") as f:
+        splitter.feed(f)
+    return splitter.split(path, close=True)
+
+
+def _line_lengths(path: str) -> list[int]:
+    """The length of each line as split_transcript writes it (a missing final newline is added)."""
+    with open(path, "rb") as f:
+        return [len(line) if line.endswith(b"\n") else len(line) + 1 for line in f]
+
+
+def _part_count(line_lengths: list[int], max_part_bytes: int) -> int:
+    """How many parts split_transcript packs these lines into."""
+    parts = part_bytes = 0
+    for length in line_lengths:
+        if parts and part_bytes + length <= max_part_bytes:
+            part_bytes += length
+        else:
+            parts += 1
+            part_bytes = length
+    return parts
+
+
+def plan_part_bytes(paths: list[str], max_files: int, chunk_size: int = DEFAULT_CHUNK_BYTES) -> int:
+    """The part size to split paths with so they take at most max_files gist files between them.
+
+    That is chunk_size if it fits, else the smallest size up to MAX_PART_BYTES that does.
+    Raises FileBudgetError if none does.
+    """
+    # However big the parts, each transcript takes at least one file
+    if len(paths) > max_files:
+        raise FileBudgetError(f"{len(paths)} transcript files don't fit in the {max_files} gist files left")
+    if chunk_size <= 0:
+        return chunk_size
+    sizes = [os.path.getsize(p) for p in paths]
+    lengths: dict[str, list[int]] = {}
+
+    def file_count(max_part_bytes: int) -> int:
+        count = 0
+        for path, size in zip(paths, sizes):
+            if size <= max_part_bytes:
+                count += 1
+                continue
+            if path not in lengths:
+                lengths[path] = _line_lengths(path)
+            # The parts plus the manifest
+            count += _part_count(lengths[path], max_part_bytes) + 1
+        return count
+
+    # Any two neighbouring parts hold more than a part's worth of bytes, which bounds the part
+    # count without reading a line: most sessions are settled here
+    upper_bound = sum(1 if size <= chunk_size else -(-2 * size // chunk_size) + 1 for size in sizes)
+    if upper_bound <= max_files or file_count(chunk_size) <= max_files:
+        return chunk_size
+    # Below total / max_files bytes even perfectly packed parts can't fit
+    low, high = max(chunk_size, -(-sum(sizes) // max_files)), max(chunk_size, MAX_PART_BYTES)
+    if file_count(high) > max_files:
+        raise FileBudgetError(
+            f"the transcripts ({sum(sizes) / 1_000_000:.0f} MB) need more than the {max_files} gist files left "
+            f"even in {high / 1_000_000:g} MB parts; try --compact"
+        )
+    # Fewer, bigger parts as the size grows: find the smallest size that fits
+    while low < high:
+        middle = (low + high) // 2
+        if file_count(middle) <= max_files:
+            high = middle
+        else:
+            low = middle + 1
+    return high
@@ -0,0 +1,144 @@
+"""Optional, lossy compaction of transcripts before upload.
+
+Transcripts are streamed line by line, so memory use is bounded by the largest
+single entry rather than the transcript size. Compaction:
+
+- drops entry types the conversation view never renders,
+- truncates oversized tool results, leaving a marker with the number of
+  characters removed.
+
+Lines that aren't touched are copied byte for byte. Images are moved out of
+transcripts by the (lossless) image extraction stage, compacted or not.
+"""
+import json
+import os
+from dataclasses import dataclass
+
+from transcript_lines import entry_line
+
+DROPPED_ENTRY_TYPES = frozenset({"queue-operation", "file-history-snapshot", "progress"})
+TOOL_RESULT_CHAR_LIMIT = 20_000
+
+
+@dataclass
+class CompactionStats:
+    bytes_before: int = 0
+    bytes_after: int = 0
+    entries_dropped: int = 0
+    tool_results_truncated: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Compacted transcripts: {self.bytes_before / 1024:.1f} KB -> {self.bytes_after / 1024:.1f} KB "
+            f"({self.entries_dropped} entries dropped, {self.tool_results_truncated} tool result(s) truncated)"
+        )
+
+
+def _truncate(text: str, stats: CompactionStats) -> str:
+    removed = len(text) - TOOL_RESULT_CHAR_LIMIT
+    stats.tool_results_truncated += 1
+    return f"{text[:TOOL_RESULT_CHAR_LIMIT]}\n\n[... {removed} characters truncated by session-share compaction]"
+
+
+def _compact_tool_result(block: dict, stats: CompactionStats) -> bool:
+    content = block.get("content")
+    if isinstance(content, str):
+        if len(content) > TOOL_RESULT_CHAR_LIMIT:
+            block["content"] = _truncate(content, stats)
+            return True
+        return False
+    changed = False
+    if isinstance(content, list):
+        for inner in content:
+            if not isinstance(inner, dict):
+                continue
+            if inner.get("type") == "text" and len(inner.get("text") or "") > TOOL_RESULT_CHAR_LIMIT:
+                inner["text"] = _truncate(inner["text"], stats)
+                changed = True
+    return changed
+
+
+def _truncate_long_strings(value, stats: CompactionStats):
+    """Truncate oversized strings anywhere inside a toolUseResult. Returns (value, changed)."""
+    if isinstance(value, str):
+        if len(value) > TOOL_RESULT_CHAR_LIMIT:
+            return _truncate(value, stats), True
+        return value, False
+    changed = False
+    if isinstance(value, dict):
+        for key, item in value.items():
+            value[key], item_changed = _truncate_long_strings(item, stats)
+            changed |= item_changed
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            value[i], item_changed = _truncate_long_strings(item, stats)
+            changed |= item_changed
+    return value, changed
+
+
+def compact_entry(entry: dict, stats: CompactionStats) -> bool:
+    """Compact one transcript entry in place. Returns True if anything changed."""
+    changed = False
+    message = entry.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    if isinstance(content, list):
+        for block in content:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "tool_result":
+                changed |= _compact_tool_result(block, stats)
+
+    if "toolUseResult" in entry:
+        entry["toolUseResult"], result_changed = _truncate_long_strings(entry["toolUseResult"], stats)
+        changed |= result_changed
+    return changed
+
+
+def compact_line(line: bytes, stats: CompactionStats) -> bytes | None:
+    """Compact one transcript line. Returns None if it is dropped."""
+    stats.bytes_before += len(line)
+    stripped = line.strip()
+    if not stripped:
+        return None
+    try:
+        entry = json.loads(stripped)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        entry = None
+
+    if isinstance(entry, dict):
+        if entry.get("type") in DROPPED_ENTRY_TYPES:
+            stats.entries_dropped += 1
+            return None
+        if compact_entry(entry, stats):
+            line = entry_line(entry)
+
+    if not line.endswith(b"\n"):
+        line += b"\n"
+    stats.bytes_after += len(line)
+    return line
+
+
+def compact_transcript(src_path: str, dest_path: str, stats: CompactionStats) -> None:
+    """Stream one JSONL transcript from src_path to dest_path, compacting as it goes."""
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        for line in src:
+            line = compact_line(line, stats)
+            if line is not None:
+                dest.write(line)
+
+
+def compact_transcripts(transcript_paths: list[str], staging_dir: str) -> tuple[list[str], CompactionStats]:
+    """Compact every transcript into staging_dir. Returns the staged paths."""
+    stats = CompactionStats()
+    staged = []
+    for path in transcript_paths:
+        if not path.endswith(".jsonl"):
+            staged.append(path)
+            continue
+        dest_path = os.path.join(staging_dir, os.path.basename(path))
+        # path may already be staged (redacted by the secret scan), so write beside it first
+        tmp_path = dest_path + ".tmp"
+        compact_transcript(path, tmp_path, stats)
+        os.replace(tmp_path, dest_path)
+        staged.append(dest_path)
+    return staged, stats
@@ -0,0 +1,85 @@
+"""Opt-in gzip+base64 encoding of transcripts before upload.
+
+JSONL transcripts repeat the same cwd, sessionId and gitBranch on every line,
+so they compress very well. Gists only hold text, so each `<name>.jsonl` is
+uploaded as `<name>.jsonl.gz.b64`, alongside a small format marker file. The
+viewer decodes these files by their suffix.
+"""
+import base64
+import json
+import os
+import zlib
+
+from subagent_bundles import BUNDLE_MANIFEST_FILENAME
+
+COMPRESSED_SUFFIX = ".gz.b64"
+FORMAT_MARKER_FILENAME = "session-share-format.json"
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def compress_file(src_path: str, dest_path: str) -> None:
+    """Stream src_path through gzip and base64 into dest_path."""
+    # wbits=31 writes a gzip header; zlib leaves its mtime at 0 so output is deterministic
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = b""
+    with open(src_path, "rb") as src, open(dest_path, "w", encoding="ascii") as dest:
+        while chunk := src.read(READ_CHUNK_SIZE):
+            pending += compressor.compress(chunk)
+            # base64 encodes 3-byte groups, so only emit whole groups until the end
+            usable = len(pending) - len(pending) % 3
+            dest.write(base64.b64encode(pending[:usable]).decode("ascii"))
+            pending = pending[usable:]
+        pending += compressor.flush()
+        dest.write(base64.b64encode(pending).decode("ascii"))
+
+
+def decompress_file(src_path: str, dest_path: str) -> None:
+    """Reverse compress_file."""
+    decompressor = zlib.decompressobj(31)
+    with open(src_path, encoding="ascii") as src, open(dest_path, "wb") as dest:
+        while chunk := src.read(READ_CHUNK_SIZE * 4):
+            dest.write(decompressor.decompress(base64.b64decode(chunk)))
+        dest.write(decompressor.flush())
+
+
+def compress_transcripts(upload_paths: list[str], staging_dir: str,
+                         unchanged: frozenset[str] = frozenset()) -> list[str]:
+    """Encode every .jsonl upload, point chunk and bundle manifests at the encoded files and add the format marker.
+
+    unchanged are uploads that were encoded into staging_dir before and haven't been written to since.
+    """
+    compressed = []
+    for path in upload_paths:
+        if not path.endswith(".jsonl"):
+            compressed.append(path)
+            continue
+        dest_path = os.path.join(staging_dir, os.path.basename(path) + COMPRESSED_SUFFIX)
+        if path not in unchanged:
+            compress_file(path, dest_path)
+        compressed.append(dest_path)
+
+    for i, path in enumerate(compressed):
+        is_bundle_manifest = os.path.basename(path) == BUNDLE_MANIFEST_FILENAME
+        if (not path.endswith(".manifest.json") and not is_bundle_manifest) or path in unchanged:
+            continue
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Part hashes and agent byte ranges still describe the decoded content, which is what the viewer reads
+        if is_bundle_manifest:
+            for bundle in manifest["bundles"]:
+                bundle["filename"] += COMPRESSED_SUFFIX
+            for agent in manifest["agents"].values():
+                agent["bundle"] += COMPRESSED_SUFFIX
+        else:
+            for part in manifest["parts"]:
+                part["filename"] += COMPRESSED_SUFFIX
+        dest_path = os.path.join(staging_dir, os.path.basename(path))
+        with open(dest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        compressed[i] = dest_path
+
+    marker_path = os.path.join(staging_dir, FORMAT_MARKER_FILENAME)
+    with open(marker_path, "w", encoding="utf-8") as f:
+        json.dump({"format": "session-share", "version": 1, "encoding": "gzip+base64"}, f, indent=2)
+    compressed.append(marker_path)
+    return compressed
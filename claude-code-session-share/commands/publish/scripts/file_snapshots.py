@@ -0,0 +1,365 @@
+"""Opt-in lossless dedupe of the file contents repeated in tool results.
+
+Sessions read the same files over and over. Every Read result carries the
+file twice: as `toolUseResult.file.content`, and line-numbered in the
+tool_result the model saw. Every Edit, MultiEdit and Write result carries the
+whole file as it was before (`toolUseResult.originalFile`), and a Write
+carries the new file too. Together these are often most of a transcript.
+
+This stage uploads each distinct file snapshot once, in
+`file-snapshots.jsonl`, and replaces the copies in every transcript with
+references. A reference takes the place of the JSON string it stands for:
+
+    {"$snapshot":"<sha256>"}
+    {"$snapshot":"<sha256>","numbered":1,"separator":"→","suffix":"..."}
+
+The second form is the snapshot's lines numbered from 1 the way the Read tool
+shows them, followed by suffix (the reminder Claude Code appends). The sha256
+is of the snapshot's UTF-8 text.
+
+The first line of `file-snapshots.jsonl` is a format header. Then there is one
+line per snapshot, either its text or, when the same file was seen before, a
+line diff against that file's previous snapshot:
+
+    {"sha256":"...","text":"..."}
+    {"sha256":"...","base":"<sha256>","diff":[12,-1,"new line\\n",40]}
+
+A positive number copies that many lines of the base, a negative number skips
+that many, and a string is a line to insert. Diff chains are at most
+MAX_DIFF_CHAIN long, so resolving a snapshot never walks far.
+
+The encoding is lossless. The viewer swaps each reference for JSON.stringify
+of the string it stands for, which gives back the original line byte for byte.
+Each rewritten line is expanded again here and kept only if it comes back
+identical. Lines are rewritten one for one, so transcripts keep their line
+count and the normalized outline and page index still line up. Strings
+shorter than MIN_SNAPSHOT_CHARS are left inline.
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+
+SNAPSHOTS_FILENAME = "file-snapshots.jsonl"
+SNAPSHOTS_FORMAT = "session-share-snapshots"
+SNAPSHOTS_VERSION = 1
+REF_KEY = "$snapshot"
+REF_PREFIX = b'{"$snapshot":'
+MIN_SNAPSHOT_CHARS = 512
+MAX_DIFF_CHAIN = 16
+# Above this many lines a diff costs more time than it saves bytes: store the text
+MAX_DIFF_LINES = 20_000
+# Claude Code numbers Read output with an arrow; older versions used a tab
+NUMBER_SEPARATORS = ("→", "\t")
+
+_JSON_STRING = r'"(?:[^"\\]|\\.)*"'
+REF_PATTERN = re.compile(
+    r'\{"\$snapshot":"([0-9a-f]{64})"'
+    rf'(?:,"numbered":(\d+),"separator":({_JSON_STRING}),"suffix":({_JSON_STRING}))?\}}'
+)
+
+
+@dataclass
+class SnapshotStats:
+    copies_replaced: int = 0
+    distinct_snapshots: int = 0
+    stored_as_diffs: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Deduplicated file contents: {self.copies_replaced} copies of {self.distinct_snapshots} "
+            f"file snapshot(s), {self.stored_as_diffs} stored as diffs, "
+            f"{self.bytes_before / 1024:.1f} KB -> {self.bytes_after / 1024:.1f} KB"
+        )
+
+
+def split_lines(text: str) -> list[str]:
+    """Split text into lines that keep their newline, so joining them gives text back."""
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+
+def line_diff(base: str, text: str) -> list[int | str] | None:
+    """Diff text against base in the store's format, or None if it isn't worth it."""
+    base_lines, lines = split_lines(base), split_lines(text)
+    if len(base_lines) + len(lines) > MAX_DIFF_LINES:
+        return None
+    diff: list[int | str] = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            diff.append(i2 - i1)
+            continue
+        if i2 > i1:
+            diff.append(i1 - i2)
+        diff.extend(lines[j1:j2])
+    inserted = sum(len(op) for op in diff if isinstance(op, str))
+    # Most of a file changed (or was replaced): storing its text is about as small and simpler to read
+    if inserted > len(text) // 2:
+        return None
+    return diff
+
+
+def apply_line_diff(base: str, diff: list[int | str]) -> str:
+    base_lines = split_lines(base)
+    position = 0
+    out = []
+    for op in diff:
+        if isinstance(op, str):
+            out.append(op)
+        elif op >= 0:
+            out.extend(base_lines[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(out)
+
+
+def numbered_lines(text: str, start: int, separator: str) -> str:
+    """text the way the Read tool shows it: each line prefixed with its number, right-aligned in 6 columns."""
+    return "\n".join(f"{number:>6}{separator}{line}" for number, line in enumerate(text.split("\n"), start))
+
+
+def _js_string(value: str) -> str:
+    """The JSON encoding of value that JSON.stringify produces, and that Claude Code writes."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+class SnapshotStore:
+    """Writes each distinct snapshot to the store once, diffed against its file's previous snapshot."""
+
+    def __init__(self, path: str, stats: SnapshotStats):
+        self.path = path
+        self.stats = stats
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write(json.dumps({"format": SNAPSHOTS_FORMAT, "version": SNAPSHOTS_VERSION},
+                                   separators=(",", ":")) + "\n")
+        self.texts: dict[str, str] = {}
+        self.chain_lengths: dict[str, int] = {}
+        # file path -> sha256 of the snapshot last seen for it
+        self.latest: dict[str, str] = {}
+
+    def add(self, text: str, file_path: str | None) -> str:
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        if digest not in self.texts:
+            record: dict = {"sha256": digest, "text": text}
+            chain_length = 0
+            base = self.latest.get(file_path) if file_path else None
+            if base is not None and self.chain_lengths[base] < MAX_DIFF_CHAIN:
+                diff = line_diff(self.texts[base], text)
+                if diff is not None:
+                    record = {"sha256": digest, "base": base, "diff": diff}
+                    chain_length = self.chain_lengths[base] + 1
+                    self.stats.stored_as_diffs += 1
+            self.file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.texts[digest] = text
+            self.chain_lengths[digest] = chain_length
+            self.stats.distinct_snapshots += 1
+        if file_path:
+            self.latest[file_path] = digest
+        return digest
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def expand_refs(line: str, texts: dict[str, str]) -> str:
+    """Replace every reference in a line with the JSON string it stands for, as the viewer does."""
+    def expand(match: re.Match) -> str:
+        text = texts[match.group(1)]
+        if match.group(2) is None:
+            return _js_string(text)
+        separator, suffix = json.loads(match.group(3)), json.loads(match.group(4))
+        return _js_string(numbered_lines(text, int(match.group(2)), separator) + suffix)
+    return REF_PATTERN.sub(expand, line)
+
+
+def read_snapshot_texts(path: str) -> dict[str, str]:
+    """The text of every snapshot in a store, by sha256, with its diffs applied."""
+    texts: dict[str, str] = {}
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != SNAPSHOTS_FORMAT:
+            raise ValueError(f"{path} is not a file snapshot store")
+        for line in f:
+            record = json.loads(line)
+            if "text" in record:
+                texts[record["sha256"]] = record["text"]
+            else:
+                # A diff's base is always stored before it
+                texts[record["sha256"]] = apply_line_diff(texts[record["base"]], record["diff"])
+    return texts
+
+
+def _is_snapshot_text(value) -> bool:
+    if not isinstance(value, str) or len(value) < MIN_SNAPSHOT_CHARS:
+        return False
+    try:
+        # Lone surrogates can't be hashed as UTF-8, and the viewer would hash them differently
+        value.encode()
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _file_snapshots(entry: dict) -> list[tuple[str, str | None, int | None]]:
+    """The file contents in an entry's toolUseResult: (text, file path, first line number for a Read)."""
+    result = entry.get("toolUseResult")
+    if not isinstance(result, dict):
+        return []
+    file_path = result.get("filePath") if isinstance(result.get("filePath"), str) else None
+    snapshots = []
+    read_file = result.get("file")
+    if isinstance(read_file, dict) and _is_snapshot_text(read_file.get("content")):
+        read_path = read_file.get("filePath") if isinstance(read_file.get("filePath"), str) else None
+        start = read_file.get("startLine")
+        start = start if isinstance(start, int) and not isinstance(start, bool) and start >= 0 else None
+        snapshots.append((read_file["content"], read_path, start))
+    if _is_snapshot_text(result.get("originalFile")):
+        snapshots.append((result["originalFile"], file_path, None))
+    if result.get("type") in ("create", "update") and _is_snapshot_text(result.get("content")):
+        snapshots.append((result["content"], file_path, None))
+    return snapshots
+
+
+def _tool_result_texts(entry: dict) -> list[str]:
+    """The text of each tool_result in an entry, where a Read's numbered file contents would be."""
+    message = entry.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    if not isinstance(content, list):
+        return []
+    texts = []
+    for block in content:
+        if not isinstance(block, dict) or block.get("type") != "tool_result":
+            continue
+        inner = block.get("content")
+        if isinstance(inner, str):
+            texts.append(inner)
+        elif isinstance(inner, list):
+            texts.extend(item["text"] for item in inner
+                         if isinstance(item, dict) and item.get("type") == "text" and isinstance(item.get("text"), str))
+    return texts
+
+
+def _numbered_ref(digest: str, text: str, start: int, shown: str) -> dict | None:
+    """A reference standing for shown, if it is text numbered from start plus a suffix."""
+    for separator in NUMBER_SEPARATORS:
+        numbered = numbered_lines(text, start, separator)
+        if shown.startswith(numbered):
+            return {REF_KEY: digest, "numbered": start, "separator": separator, "suffix": shown[len(numbered):]}
+    return None
+
+
+def _replace_string(line: str, value: str, ref: dict) -> str:
+    encoded = _js_string(value)
+    position = line.find(encoded)
+    if position == -1:
+        return line
+    marker = json.dumps(ref, ensure_ascii=False, separators=(",", ":"))
+    return line[:position] + marker + line[position + len(encoded):]
+
+
+def encode_line(raw_line: bytes, store: SnapshotStore, stats: SnapshotStats) -> bytes:
+    """Replace the file contents in one transcript line with references, or return it unchanged."""
+    try:
+        entry = json.loads(raw_line)
+        line = raw_line.decode("utf-8")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return raw_line
+    if not isinstance(entry, dict):
+        return raw_line
+
+    snapshots = _file_snapshots(entry)
+    if not snapshots:
+        return raw_line
+    encoded = line
+    replaced = 0
+    for text, file_path, start in snapshots:
+        digest = store.add(text, file_path)
+        refs = [(text, {REF_KEY: digest})]
+        if start is not None:
+            refs += [(shown, ref) for shown in _tool_result_texts(entry)
+                     if (ref := _numbered_ref(digest, text, start, shown)) is not None]
+        for value, ref in refs:
+            updated = _replace_string(encoded, value, ref)
+            if updated != encoded:
+                replaced += 1
+                encoded = updated
+
+    if not replaced or expand_refs(encoded, store.texts) != line:
+        return raw_line
+    try:
+        json.loads(encoded)
+    except json.JSONDecodeError:
+        return raw_line
+    stats.copies_replaced += replaced
+    return encoded.encode()
+
+
+def encode_transcript_line(line: bytes, store: SnapshotStore, stats: SnapshotStats) -> bytes:
+    """encode_line for a line read from a transcript, with its newline if it has one."""
+    # Most lines carry no tool result worth deduping: don't parse them
+    if b'"toolUseResult"' not in line:
+        return line
+    newline = line.endswith(b"\n")
+    return encode_line(line.rstrip(b"\n"), store, stats) + (b"\n" if newline else b"")
+
+
+def encode_transcript(src_path: str, dest_path: str, store: SnapshotStore, stats: SnapshotStats) -> None:
+    """Stream one JSONL transcript from src_path to dest_path, replacing file contents with references."""
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        for line in src:
+            dest.write(encode_transcript_line(line, store, stats))
+
+
+def _has_refs(path: str) -> bool:
+    with open(path, "rb") as f:
+        return any(REF_PREFIX in line for line in f)
+
+
+def dedupe_file_snapshots(transcript_paths: list[str],
+                          staging_dir: str) -> tuple[list[str], str | None, SnapshotStats]:
+    """Replace repeated file contents in every transcript with references into a snapshot store.
+
+    Returns the staged paths, the store's path and stats. If that wouldn't make
+    the upload smaller, the transcripts are returned untouched with no store.
+    So are transcripts that already hold something that reads as a reference,
+    which the viewer couldn't tell apart from real ones.
+    """
+    stats = SnapshotStats()
+    transcripts = [p for p in transcript_paths if p.endswith(".jsonl")]
+    stats.bytes_before = stats.bytes_after = sum(os.path.getsize(p) for p in transcripts)
+    if any(_has_refs(p) for p in transcripts):
+        return transcript_paths, None, stats
+
+    store = SnapshotStore(os.path.join(staging_dir, SNAPSHOTS_FILENAME), stats)
+    # Encode next to the staged names first: earlier stages may have staged the transcripts there already
+    encoded: dict[str, str] = {}
+    try:
+        for path in transcripts:
+            tmp_path = os.path.join(staging_dir, os.path.basename(path) + ".tmp")
+            encode_transcript(path, tmp_path, store, stats)
+            encoded[path] = tmp_path
+    finally:
+        store.close()
+
+    bytes_after = sum(os.path.getsize(p) for p in encoded.values()) + os.path.getsize(store.path)
+    if not stats.copies_replaced or bytes_after >= stats.bytes_before:
+        for tmp_path in [*encoded.values(), store.path]:
+            os.remove(tmp_path)
+        return transcript_paths, None, stats
+
+    stats.bytes_after = bytes_after
+    staged = []
+    for path in transcript_paths:
+        if path in encoded:
+            dest_path = os.path.join(staging_dir, os.path.basename(path))
+            os.replace(encoded[path], dest_path)
+            path = dest_path
+        staged.append(path)
+    return staged, store.path, stats
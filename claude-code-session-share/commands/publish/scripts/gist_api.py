@@ -0,0 +1,210 @@
+"""Minimal GitHub Gist API client over a single keep-alive HTTPS connection.
+
+Talking to the API directly avoids spawning a `gh` process (Go startup plus
+auth lookup) for every request. The token still comes from `gh`, so users
+don't have to configure anything beyond `gh auth login`.
+
+GET requests can be revalidated against an on-disk HttpCache, so unchanged
+resources come back as cheap 304s instead of full downloads.
+"""
+import copy
+import hashlib
+import http.client
+import json
+import os
+import subprocess
+import threading
+from urllib.parse import urlsplit
+
+import tracing
+from http_cache import HttpCache
+
+GITHUB_API_URL = os.environ.get("SESSION_SHARE_GITHUB_API_URL", "https://api.github.com")
+USER_AGENT = "claude-code-session-share"
+# Methods that are safe to resend when the connection drops after the request went out
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+
+class GitHubAPIError(RuntimeError):
+    """Raised when the GitHub API returns a non-2xx response."""
+
+    def __init__(self, method: str, path: str, status: int, body: bytes):
+        self.status = status
+        self.body = body
+        super().__init__(f"{method} {path} failed with HTTP {status}: {body[:500].decode(errors='replace')}")
+
+
+def get_gh_token() -> str | None:
+    """Return a GitHub token from GH_TOKEN/GITHUB_TOKEN or `gh auth token`, or None if unavailable."""
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+    tracing.count("subprocesses")
+    try:
+        result = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+class GistClient:
+    """Gist API client that reuses one HTTP connection for all of its requests."""
+
+    def __init__(self, token: str, api_url: str = GITHUB_API_URL, timeout: float = 60,
+                 cache: HttpCache | None = None):
+        parts = urlsplit(api_url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": USER_AGENT,
+        }
+        self.cache = cache
+        # Responses differ per user, so cache keys are scoped to the token without storing it
+        self._cache_scope = hashlib.sha256(token.encode()).hexdigest()[:16]
+        self.round_trips = 0
+        self._conn: http.client.HTTPConnection | None = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = conn_class(self.host, timeout=self.timeout)
+        return self._conn
+
+    def clone(self) -> "GistClient":
+        """A client with the same credentials and cache on its own connection, for use from another thread."""
+        clone = copy.copy(self)
+        clone.round_trips = 0
+        clone._conn = None
+        clone._lock = threading.Lock()
+        return clone
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def request(self, method: str, path: str, body: dict | None = None,
+                headers: dict[str, str] | None = None) -> tuple[int, http.client.HTTPMessage, bytes]:
+        """Send a request and return (status, headers, body).
+
+        GETs are answered from the HTTP cache when the server confirms (304) the cached copy is current.
+        """
+        payload = json.dumps(body).encode() if body is not None else None
+        request_headers = dict(self.headers)
+        if payload is not None:
+            request_headers["Content-Type"] = "application/json"
+        if headers:
+            request_headers.update(headers)
+
+        cache_key = f"{self._cache_scope}:{self.host}{self.base_path}{path}"
+        cached = self.cache.get(cache_key) if self.cache is not None and method == "GET" else None
+        if cached is not None:
+            request_headers.update(cached.conditional_headers())
+
+        status, response_headers, data = self._send(method, path, payload, request_headers)
+
+        if self.cache is not None and method == "GET":
+            if status == 304 and cached is not None:
+                self.cache.record_hit(cache_key)
+                for name, value in cached.headers.items():
+                    if name not in response_headers:
+                        response_headers[name] = value
+                return 200, response_headers, cached.body
+            self.cache.record_miss()
+            if status == 200:
+                self.cache.put(cache_key, response_headers, data)
+        return status, response_headers, data
+
+    def _send(self, method: str, path: str, payload: bytes | None,
+              headers: dict[str, str]) -> tuple[int, http.client.HTTPMessage, bytes]:
+        """Send one request on the shared connection, retrying once on a dropped keep-alive.
+
+        A reused connection the server already closed fails as soon as it is used. Such a
+        failure is retried only if the request never fully went out, or the method is
+        idempotent: resending a POST the server did receive would create a second gist.
+        """
+        with self._lock:
+            for attempt in range(2):
+                reused = self._conn is not None
+                conn = self._connection()
+                tracing.count("http_requests")
+                tracing.count("http_bytes_sent", len(payload or b""))
+                sent = False
+                try:
+                    conn.request(method, self.base_path + path, body=payload, headers=headers)
+                    sent = True
+                    response = conn.getresponse()
+                    data = response.read()
+                    self.round_trips += 1
+                    tracing.count("http_bytes_received", len(data))
+                    return response.status, response.headers, data
+                except (OSError, http.client.HTTPException) as e:
+                    # The connection is in an unknown state (timeout, reset, partial read); never reuse it
+                    conn.close()
+                    self._conn = None
+                    dropped_keep_alive = reused and isinstance(
+                        e, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+                    )
+                    if attempt == 1 or not dropped_keep_alive or (sent and method not in IDEMPOTENT_METHODS):
+                        raise
+        raise AssertionError("unreachable")
+
+    def request_json(self, method: str, path: str, body: dict | None = None) -> dict:
+        status, _, data = self.request(method, path, body)
+        if not 200 <= status < 300:
+            raise GitHubAPIError(method, path, status, data)
+        return json.loads(data) if data else {}
+
+    def get_paginated(self, path: str) -> list:
+        """GET every page of a list endpoint, following the Link header's rel="next" URLs."""
+        items = []
+        next_path: str | None = path
+        while next_path:
+            status, headers, data = self.request("GET", next_path)
+            if status != 200:
+                raise GitHubAPIError("GET", next_path, status, data)
+            items.extend(json.loads(data))
+            next_path = self._next_page_path(headers.get("Link") or "")
+        return items
+
+    def _next_page_path(self, link_header: str) -> str | None:
+        for link in link_header.split(","):
+            url, _, params = link.partition(";")
+            if 'rel="next"' in params:
+                parts = urlsplit(url.strip().strip("<>"))
+                path = parts.path.removeprefix(self.base_path)
+                return f"{path}?{parts.query}" if parts.query else path
+        return None
+
+    def create_gist(self, files: dict[str, str], description: str, public: bool = False) -> dict:
+        files_body = {name: {"content": content} for name, content in files.items()}
+        return self.request_json("POST", "/gists", {
+            "description": description,
+            "public": public,
+            "files": files_body,
+        })
+
+    def update_gist(self, gist_id: str, files: dict[str, str | None] | None = None,
+                    description: str | None = None) -> dict:
+        """PATCH a gist. A file mapped to None is deleted from the gist."""
+        body: dict = {}
+        if description is not None:
+            body["description"] = description
+        if files is not None:
+            body["files"] = {
+                name: None if content is None else {"content": content}
+                for name, content in files.items()
+            }
+        return self.request_json("PATCH", f"/gists/{gist_id}", body)
+
+    def get_gist(self, gist_id: str) -> dict:
+        return self.request_json("GET", f"/gists/{gist_id}")
@@ -0,0 +1,175 @@
+"""On-disk HTTP cache for conditional GitHub API requests.
+
+Responses are stored with their ETag / Last-Modified validators. Later requests
+for the same URL send If-None-Match / If-Modified-Since, and a 304 is answered
+from disk (GitHub doesn't count 304s against the rate limit). The cache is
+bounded in size and evicts least recently used entries first, using file
+mtimes as the recency record so it survives across runs.
+
+Each entry is two files named by a hash of the cache key:
+
+    <key-hash>.meta.json  {"key": ..., "headers": {"ETag": ..., ...}}
+    <key-hash>.body       raw response body
+"""
+import hashlib
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+
+import tracing
+from plugin_cache import get_cache_dir
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+# Response headers kept alongside the body. Link matters because a 304 for a
+# paginated list doesn't repeat it.
+STORED_HEADERS = ("ETag", "Last-Modified", "Link", "Content-Type")
+
+
+@dataclass
+class CachedResponse:
+    headers: dict[str, str]
+    body: bytes
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+
+class HttpCache:
+    """Size-bounded LRU cache of HTTP response bodies plus their validators. Thread safe."""
+
+    def __init__(self, cache_dir: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(), "http-cache")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._sizes = self._scan_sizes()
+
+    def _scan_sizes(self) -> dict[str, int]:
+        sizes: dict[str, int] = {}
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                name, _, suffix = entry.name.partition(".")
+                if suffix in ("body", "meta.json"):
+                    sizes[name] = sizes.get(name, 0) + entry.stat().st_size
+        return sizes
+
+    def _paths(self, key: str) -> tuple[str, str, str]:
+        name = hashlib.sha256(key.encode()).hexdigest()
+        base = os.path.join(self.cache_dir, name)
+        return name, f"{base}.meta.json", f"{base}.body"
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Return the stored response for key, if any. Doesn't count as a hit until record_hit()."""
+        _, meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, json.JSONDecodeError):
+            return None
+        if meta.get("key") != key:
+            return None
+        return CachedResponse(meta.get("headers") or {}, body)
+
+    def record_hit(self, key: str) -> None:
+        """Count a 304 served from disk and mark the entry as recently used."""
+        _, meta_path, body_path = self._paths(key)
+        with self._lock:
+            self.hits += 1
+        for path in (meta_path, body_path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: str, headers, body: bytes) -> None:
+        """Store a response that carries at least one validator, then evict down to max_bytes."""
+        kept = {name: headers[name] for name in STORED_HEADERS if headers.get(name)}
+        if "ETag" not in kept and "Last-Modified" not in kept:
+            return
+        name, meta_path, body_path = self._paths(key)
+        meta = json.dumps({"key": key, "headers": kept}).encode()
+        if len(meta) + len(body) > self.max_bytes:
+            return
+        with self._lock:
+            # Write the body first: a meta file without its body just reads as a miss
+            for path, data in ((body_path, body), (meta_path, meta)):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._sizes[name] = len(meta) + len(body)
+            self._evict()
+
+    def _evict(self) -> None:
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = []
+        for name in self._sizes:
+            try:
+                mtime = os.stat(os.path.join(self.cache_dir, f"{name}.meta.json")).st_mtime
+            except OSError:
+                mtime = 0
+            by_age.append((mtime, name))
+        for _, name in sorted(by_age):
+            if total <= self.max_bytes:
+                break
+            for suffix in ("meta.json", "body"):
+                try:
+                    os.unlink(os.path.join(self.cache_dir, f"{name}.{suffix}"))
+                except OSError:
+                    pass
+            total -= self._sizes.pop(name)
+            self.evictions += 1
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = f" ({self.hits / total:.0%} hit rate)" if total else ""
+        return (
+            f"HTTP cache: {self.hits} hit(s), {self.misses} miss(es){rate}, "
+            f"{self.evictions} eviction(s), {sum(self._sizes.values()) / 1024 / 1024:.1f} MB on disk"
+        )
+
+
+def fetch_url(url: str, cache: HttpCache | None = None, headers: dict[str, str] | None = None,
+              timeout: float = 60) -> bytes:
+    """GET url with urllib, revalidating against cache (if given) instead of re-downloading."""
+    request = urllib.request.Request(url, headers=dict(headers or {}))
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None:
+        for name, value in cached.conditional_headers().items():
+            request.add_header(name, value)
+    tracing.count("http_requests")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            response_headers = response.headers
+            tracing.count("http_bytes_received", len(body))
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and cached is not None:
+            cache.record_hit(url)
+            return cached.body
+        raise
+    if cache is not None:
+        cache.record_miss()
+        cache.put(url, response_headers, body)
+    return body
@@ -0,0 +1,160 @@
+"""Move inline images out of transcripts into content-addressed gist files.
+
+Screenshots and pasted images are stored as base64 inside `image` blocks,
+both at the top level of a message and nested inside `tool_result` content.
+The same image often appears in the main transcript and in several subagent
+transcripts. This stage uploads each distinct image once, as
+`image-<sha256>.b64`. The sha256 is of the base64 data, and the file holds
+that data as text because gists can only hold text. Each block's source
+becomes {"type": "ref", "media_type": ..., "sha256": ...}. The viewer fetches an
+image's file only when the image scrolls into view, and only once however
+many blocks refer to it.
+
+Transcripts are streamed line by line, and lines without images are copied
+byte for byte. A gist lists at most 300 files, shared with the transcripts and
+the files derived from them, so the caller says how many image files there is
+room for; images past that stay inline.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+from transcript_lines import entry_line
+
+IMAGE_FILE_PREFIX = "image-"
+IMAGE_FILE_SUFFIX = ".b64"
+
+
+def image_filename(sha256: str) -> str:
+    return f"{IMAGE_FILE_PREFIX}{sha256}{IMAGE_FILE_SUFFIX}"
+
+
+@dataclass
+class ImageExtractionStats:
+    images_found: int = 0
+    images_extracted: int = 0
+    duplicate_images: int = 0
+    images_left_inline: int = 0
+    bytes_saved: int = 0
+
+    def summary(self) -> str:
+        summary = (
+            f"Extracted images: {self.images_extracted} file(s) for {self.images_found} image(s), "
+            f"{self.bytes_saved / 1024:.1f} KB of duplicates not uploaded"
+        )
+        if self.images_left_inline:
+            summary += f" ({self.images_left_inline} left inline: no gist files left for them)"
+        return summary
+
+
+class ImageFiles:
+    """Writes each distinct image to its own file in the staging directory exactly once."""
+
+    def __init__(self, staging_dir: str, stats: ImageExtractionStats, max_files: int):
+        self.staging_dir = staging_dir
+        self.stats = stats
+        self.max_files = max_files
+        self.paths: dict[str, str] = {}
+
+    def add(self, data: str) -> str | None:
+        """Store an image's base64 data and return its sha256, or None if it should stay inline."""
+        self.stats.images_found += 1
+        digest = hashlib.sha256(data.encode()).hexdigest()
+        if digest in self.paths:
+            self.stats.duplicate_images += 1
+            self.stats.bytes_saved += len(data)
+            return digest
+        if len(self.paths) >= self.max_files:
+            self.stats.images_left_inline += 1
+            return None
+        path = os.path.join(self.staging_dir, image_filename(digest))
+        with open(path, "w", encoding="ascii") as f:
+            f.write(data)
+        self.paths[digest] = path
+        self.stats.images_extracted += 1
+        return digest
+
+    def hashes(self) -> frozenset[str]:
+        return frozenset(self.paths)
+
+
+def _extract_image(block: dict, images: ImageFiles) -> bool:
+    source = block.get("source")
+    if not isinstance(source, dict) or source.get("type") != "base64":
+        return False
+    data = source.get("data")
+    media_type = source.get("media_type")
+    # Gists can't hold empty files, and the viewer needs the media type to display the image
+    if not isinstance(data, str) or not data or not data.isascii() or not isinstance(media_type, str):
+        return False
+    digest = images.add(data)
+    if digest is None:
+        return False
+    block["source"] = {"type": "ref", "media_type": media_type, "sha256": digest}
+    return True
+
+
+def extract_entry_images(entry: dict, images: ImageFiles) -> bool:
+    """Replace the images in one transcript entry with references. Returns True if anything changed."""
+    message = entry.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    if not isinstance(content, list):
+        return False
+    changed = False
+    for block in content:
+        if not isinstance(block, dict):
+            continue
+        if block.get("type") == "image":
+            changed |= _extract_image(block, images)
+        elif block.get("type") == "tool_result" and isinstance(block.get("content"), list):
+            for inner in block["content"]:
+                if isinstance(inner, dict) and inner.get("type") == "image":
+                    changed |= _extract_image(inner, images)
+    return changed
+
+
+def extract_line_images(line: bytes, images: ImageFiles) -> bytes:
+    """Replace the images in one transcript line with references, or return it unchanged."""
+    # Most lines have no images: don't parse them
+    if b'"base64"' not in line:
+        return line
+    try:
+        entry = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return line
+    if isinstance(entry, dict) and extract_entry_images(entry, images):
+        return entry_line(entry)
+    return line
+
+
+def extract_transcript_images(src_path: str, dest_path: str, images: ImageFiles) -> None:
+    """Stream one JSONL transcript from src_path to dest_path, extracting images as it goes."""
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        for line in src:
+            dest.write(extract_line_images(line, images))
+
+
+def extract_images(transcript_paths: list[str], staging_dir: str,
+                   max_files: int) -> tuple[list[str], frozenset[str], ImageExtractionStats]:
+    """Extract images from every transcript into staging_dir, as at most max_files image files.
+
+    Returns the staged paths followed by the image files, the hashes of the extracted images, and stats.
+    """
+    stats = ImageExtractionStats()
+    images = ImageFiles(staging_dir, stats, max_files)
+    staged = []
+    for path in transcript_paths:
+        if not path.endswith(".jsonl"):
+            staged.append(path)
+            continue
+        dest_path = os.path.join(staging_dir, os.path.basename(path))
+        if os.path.abspath(dest_path) == os.path.abspath(path):
+            # Already staged (by compaction): rewrite through a temporary file
+            tmp_path = dest_path + ".tmp"
+            extract_transcript_images(path, tmp_path, images)
+            os.replace(tmp_path, dest_path)
+        else:
+            extract_transcript_images(path, dest_path, images)
+        staged.append(dest_path)
+    return staged + list(images.paths.values()), images.hashes(), stats
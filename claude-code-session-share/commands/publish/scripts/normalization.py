@@ -0,0 +1,475 @@
+"""Pre-normalize the main transcript for the viewer at publish time.
+
+On every page view the viewer validates each JSONL line against its schemas,
+works out which tool calls are Read/Edit calls, pairs every tool call with
+its result and validates Edit patches. Only then can it render anything.
+This stage does that work once and uploads the outcome as
+`<session>.normalized.jsonl`. The viewer builds its entries straight from the
+raw lines and this file, without re-validating.
+
+The file doesn't repeat the transcript. Its first line is a header carrying
+the session metadata (session id, branch, start and end time, message counts)
+and the entry count. Byte offsets into the transcript are the page index's job
+(transcript_index.py), which also records where each page's outline lines
+start in this file.
+
+Then there is one line per transcript entry, in order, with what
+validation decided:
+
+    {"kind": "meta"}
+    {"kind": "unsupported"}
+    {"kind": "user", "isToolResultOnly": false}
+    {"kind": "assistant", "toolCalls": [{"kind": "edit", "result": [12, 0], "rawToolUseResult": 12,
+                                         "toolUseResult": 12}]}
+    {"kind": "progress"}
+    {"kind": "system"}
+
+A tool call's `result` is [entry index, content block index] of the
+tool_result answering it. `rawToolUseResult` and `toolUseResult` are the
+entries whose toolUseResult the call gets, raw and as a validated Edit result.
+
+This ports parseEntries in session-viewer/src/lib/gistGateway.ts and
+extractSessionMetadata in src/domain/transcriptEntry.ts, and must stay in
+step with them. Bump NORMALIZED_VERSION here and in the viewer whenever they
+change. The viewer ignores other versions and parses the raw transcript
+itself. So does a transcript the viewer couldn't load anyway, which gets no
+file.
+"""
+import dataclasses
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+NORMALIZED_FORMAT = "session-share-normalized"
+NORMALIZED_VERSION = 3
+NORMALIZED_SUFFIX = ".normalized.jsonl"
+
+META_TYPES = ("file-history-snapshot", "queue-operation", "summary")
+# Characters String.prototype.trim() strips, which differ slightly from str.strip()'s
+JS_WHITESPACE = "\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a" \
+                "\u2028\u2029\u202f\u205f\u3000\ufeff"
+
+
+class NormalizeError(ValueError):
+    """Raised where the viewer's own parser would throw, or would diverge from this port."""
+    pass
+
+
+def normalized_filename(transcript_filename: str) -> str:
+    stem = transcript_filename.removesuffix(".jsonl")
+    return f"{stem}{NORMALIZED_SUFFIX}"
+
+
+# Validators mirroring the viewer's Zod schemas
+
+def _is_str(value) -> bool:
+    return isinstance(value, str)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_truthy(value) -> bool:
+    """JavaScript truthiness of a JSON value."""
+    if isinstance(value, (dict, list)):
+        return True
+    return bool(value)
+
+
+def _valid_text_block(block: dict) -> bool:
+    return _is_str(block.get("text"))
+
+
+def _valid_image_block(block: dict, image_hashes: frozenset[str]) -> bool:
+    source = block.get("source")
+    if not isinstance(source, dict):
+        return False
+    if source.get("type") == "ref":
+        # The viewer swaps refs to uploaded image files for url sources before validating
+        return (_is_str(source.get("sha256")) and source["sha256"] in image_hashes
+                and _is_str(source.get("media_type")))
+    if source.get("type") == "url":
+        return _is_str(source.get("media_type")) and _is_str(source.get("url"))
+    return source.get("type") == "base64" and _is_str(source.get("media_type")) and _is_str(source.get("data"))
+
+
+def _valid_tool_result_content(content, image_hashes: frozenset[str]) -> bool:
+    if _is_str(content):
+        return True
+    if not isinstance(content, list):
+        return False
+    for item in content:
+        if not isinstance(item, dict):
+            return False
+        if item.get("type") == "text":
+            if not _valid_text_block(item):
+                return False
+        elif item.get("type") != "image" or not _valid_image_block(item, image_hashes):
+            return False
+    return True
+
+
+def _valid_read_input(tool_input: dict) -> bool:
+    return _is_str(tool_input.get("file_path")) and all(
+        _is_number(tool_input[key]) for key in ("offset", "limit") if key in tool_input
+    )
+
+
+def _valid_edit_input(tool_input: dict) -> bool:
+    return all(_is_str(tool_input.get(k)) for k in ("file_path", "old_string", "new_string")) and isinstance(
+        tool_input.get("replace_all"), bool
+    )
+
+
+def _valid_edit_result(data) -> bool:
+    if not isinstance(data, dict):
+        return False
+    if not all(_is_str(data.get(k)) for k in ("filePath", "oldString", "newString", "originalFile")):
+        return False
+    if not all(isinstance(data.get(k), bool) for k in ("userModified", "replaceAll")):
+        return False
+    patch = data.get("structuredPatch")
+    if not isinstance(patch, list):
+        return False
+    for hunk in patch:
+        if not isinstance(hunk, dict):
+            return False
+        if not all(_is_number(hunk.get(k)) for k in ("oldStart", "oldLines", "newStart", "newLines")):
+            return False
+        lines = hunk.get("lines")
+        if not isinstance(lines, list) or not all(_is_str(line) for line in lines):
+            return False
+    return True
+
+
+def _tool_call_kind(block: dict) -> str:
+    if block["name"] == "Read" and _valid_read_input(block["input"]):
+        return "read"
+    if block["name"] == "Edit" and _valid_edit_input(block["input"]):
+        return "edit"
+    return "generic"
+
+
+def _valid_message_envelope(entry: dict, entry_type: str, session_id_required: bool) -> bool:
+    """Validate the fields user and assistant entries share."""
+    if not _is_str(entry.get("uuid")) or not _is_str(entry.get("timestamp")):
+        return False
+    if "parentUuid" not in entry or not (entry["parentUuid"] is None or _is_str(entry["parentUuid"])):
+        return False
+    if (session_id_required or "sessionId" in entry) and not _is_str(entry.get("sessionId")):
+        return False
+    message = entry.get("message")
+    return isinstance(message, dict) and message.get("role") == entry_type
+
+
+def _user_entry(entry: dict, image_hashes: frozenset[str]) -> tuple[dict, list[tuple[str, int]]] | None:
+    """Return the user entry's outline and its (tool_use_id, block index) results, or None if it doesn't validate."""
+    if not _valid_message_envelope(entry, "user", session_id_required=True):
+        return None
+    content = entry["message"].get("content")
+    if _is_str(content):
+        return {"kind": "user", "isToolResultOnly": False}, []
+    if not isinstance(content, list):
+        return None
+
+    results = []
+    has_text = False
+    for index, block in enumerate(content):
+        if not isinstance(block, dict):
+            return None
+        block_type = block.get("type")
+        if block_type == "text":
+            valid = _valid_text_block(block)
+            has_text = True
+        elif block_type == "image":
+            valid = _valid_image_block(block, image_hashes)
+        elif block_type == "tool_result":
+            valid = _is_str(block.get("tool_use_id")) and _valid_tool_result_content(block.get("content"), image_hashes)
+            results.append((block.get("tool_use_id"), index))
+        else:
+            valid = False
+        if not valid:
+            return None
+    return {"kind": "user", "isToolResultOnly": not has_text and bool(results)}, results
+
+
+def _assistant_entry(entry: dict) -> dict | None:
+    if not _valid_message_envelope(entry, "assistant", session_id_required=False):
+        return None
+    content = entry["message"].get("content")
+    if not isinstance(content, list):
+        return None
+    tool_calls = []
+    for block in content:
+        if not isinstance(block, dict):
+            return None
+        block_type = block.get("type")
+        if block_type == "text":
+            valid = _valid_text_block(block)
+        elif block_type == "thinking":
+            valid = _is_str(block.get("thinking"))
+        elif block_type == "tool_use":
+            valid = _is_str(block.get("id")) and _is_str(block.get("name")) and isinstance(block.get("input"), dict)
+            if valid:
+                tool_calls.append({"kind": _tool_call_kind(block), "id": block["id"]})
+        else:
+            valid = False
+        if not valid:
+            return None
+    outline = {"kind": "assistant"}
+    if tool_calls:
+        outline["toolCalls"] = tool_calls
+    return outline
+
+
+def _valid_progress_entry(entry: dict) -> bool:
+    data = entry.get("data")
+    return (
+        _is_str(entry.get("uuid")) and _is_str(entry.get("timestamp"))
+        and isinstance(data, dict) and _is_str(data.get("type"))
+        and all(_is_str(entry[key]) for key in ("toolUseID", "parentToolUseID") if key in entry)
+    )
+
+
+def _valid_system_entry(entry: dict) -> bool:
+    return all(_is_str(entry.get(k)) for k in ("uuid", "timestamp", "subtype")) and (
+        "durationMs" not in entry or _is_number(entry["durationMs"])
+    )
+
+
+def _reject_constant(name: str):
+    # JSON.parse rejects NaN and Infinity, so the viewer couldn't load this line
+    raise NormalizeError(f"non-standard JSON constant {name}")
+
+
+def _viewer_line(raw_line: bytes) -> tuple[int, str] | None:
+    """(byte length without the newline, decoded line) if the viewer parses this raw line, else None."""
+    content = raw_line[:-1] if raw_line.endswith(b"\n") else raw_line
+    # fetch().text() replaces invalid UTF-8 the same way
+    line = content.decode("utf-8", errors="replace")
+    stripped = line.strip(JS_WHITESPACE)
+    if not stripped or stripped.startswith("//"):
+        return None
+    return len(content), line
+
+
+class _MetadataScan:
+    """Incremental port of extractSessionMetadata, fed one entry at a time."""
+
+    def __init__(self):
+        self.session_id = self.git_branch = self.start_time = self.end_time = None
+        self.user_message_count = 0
+
+    def add(self, raw: dict, outline: dict) -> None:
+        timestamp = raw.get("timestamp")
+        if _is_truthy(timestamp):
+            if not _is_str(timestamp):
+                raise NormalizeError("non-string timestamp")
+            if self.start_time is None or timestamp < self.start_time:
+                self.start_time = timestamp
+            if self.end_time is None or timestamp > self.end_time:
+                self.end_time = timestamp
+
+        if outline["kind"] == "meta":
+            return
+        if not self.session_id and _is_str(raw.get("sessionId")):
+            self.session_id = raw["sessionId"]
+            self.git_branch = raw["gitBranch"] if _is_str(raw.get("gitBranch")) else None
+        if outline["kind"] == "user" and not outline["isToolResultOnly"]:
+            self.user_message_count += 1
+
+    def metadata(self) -> dict | None:
+        if not self.session_id or not self.start_time or not self.end_time:
+            return None
+        return {
+            "sessionId": self.session_id,
+            "gitBranch": self.git_branch,
+            "startTime": self.start_time,
+            "endTime": self.end_time,
+            "userMessageCount": self.user_message_count,
+        }
+
+
+def _message_counts(outlines: list[dict]) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for outline in outlines:
+        counts[outline["kind"]] = counts.get(outline["kind"], 0) + 1
+    return counts
+
+
+@dataclass
+class OutlinedTranscript:
+    """A transcript as the viewer's parser sees it, shared by the files derived from it.
+
+    Holds only what those files need, not the entries themselves: each entry's
+    outline, byte offset, line length and uuid, and the session metadata.
+    """
+    filename: str
+    size: int
+    outlines: list[dict]
+    offsets: list[int]
+    line_lengths: list[int]
+    uuids: list[str | None]
+    metadata: dict | None
+
+    def rebased(self, path: str) -> "OutlinedTranscript":
+        """The same entries at their offsets in path, a line-for-line rewrite of the transcript.
+
+        Used when a later stage rewrites lines without changing what they parse to (file_snapshots.py).
+        """
+        offsets, line_lengths = [], []
+        size = 0
+        with open(path, "rb") as f:
+            for raw_line in f:
+                viewer_line = _viewer_line(raw_line)
+                if viewer_line is not None:
+                    offsets.append(size)
+                    line_lengths.append(viewer_line[0])
+                size += len(raw_line)
+        if len(offsets) != len(self.offsets):
+            raise NormalizeError("rewritten transcript has a different number of entries")
+        return dataclasses.replace(self, size=size, offsets=offsets, line_lengths=line_lengths)
+
+
+class TranscriptOutliner:
+    """Parses transcript lines the way the viewer does, as they are fed in.
+
+    Keeps no parsed entries, only their outlines (with tool calls joined to
+    their results), so memory use grows with the entry count rather than the
+    transcript size. Raises NormalizeError (or ValueError) wherever the
+    viewer's parser would throw.
+    """
+
+    def __init__(self, filename: str, image_hashes: frozenset[str] = frozenset()):
+        self.filename = filename
+        self.image_hashes = image_hashes
+        self.size = 0
+        self.outlines: list[dict] = []
+        self.offsets: list[int] = []
+        self.line_lengths: list[int] = []
+        self.uuids: list[str | None] = []
+        self._tool_calls: dict[str, dict] = {}
+        self._metadata = _MetadataScan()
+
+    def feed(self, lines: Iterable[bytes]) -> None:
+        """Outline the next raw lines of the transcript, each ending in a newline but perhaps the last."""
+        for raw_line in lines:
+            viewer_line = _viewer_line(raw_line)
+            if viewer_line is not None:
+                self._add(self.size, *viewer_line)
+            self.size += len(raw_line)
+
+    def feed_rewritten(self, lines: Iterable[tuple[bytes, bytes]]) -> None:
+        """Like feed, for (raw line, rewrite) pairs where the rewrite is what gets uploaded.
+
+        Used when a later stage rewrites lines without changing what they parse to
+        (file_snapshots.py): entries are outlined from the raw lines and located in the rewrites.
+        """
+        for raw_line, rewritten_line in lines:
+            viewer_line = _viewer_line(raw_line)
+            if viewer_line is not None:
+                self._add(self.size, _viewer_line(rewritten_line)[0], viewer_line[1])
+            self.size += len(rewritten_line)
+
+    def _add(self, offset: int, length: int, line: str) -> None:
+        parsed = json.loads(line, parse_constant=_reject_constant)
+        if not isinstance(parsed, dict):
+            raise NormalizeError("transcript line is not a JSON object")
+        entry_type = parsed.get("type")
+        if entry_type is None:
+            entry_type = "unknown"
+        index = len(self.outlines)
+        tool_calls = self._tool_calls
+
+        outline = None
+        if entry_type in META_TYPES:
+            outline = {"kind": "meta"}
+        elif entry_type == "user":
+            result = _user_entry(parsed, self.image_hashes)
+            if result is not None:
+                outline, results = result
+                for tool_use_id, block_index in results:
+                    if tool_use_id in tool_calls:
+                        tool_calls[tool_use_id]["result"] = [index, block_index]
+                # Every result in the entry shares the entry-level toolUseResult
+                if _is_truthy(parsed.get("toolUseResult")):
+                    edit_result_valid = _valid_edit_result(parsed["toolUseResult"])
+                    for tool_use_id, _ in results:
+                        tool_call = tool_calls.get(tool_use_id)
+                        if tool_call is None:
+                            continue
+                        tool_call["rawToolUseResult"] = index
+                        if tool_call["kind"] == "edit" and edit_result_valid:
+                            tool_call["toolUseResult"] = index
+        elif entry_type == "assistant":
+            outline = _assistant_entry(parsed)
+            for tool_call in (outline or {}).get("toolCalls", []):
+                tool_calls[tool_call["id"]] = tool_call
+        elif entry_type == "progress" and _valid_progress_entry(parsed):
+            outline = {"kind": "progress"}
+        elif entry_type == "system" and _valid_system_entry(parsed):
+            outline = {"kind": "system"}
+
+        outline = outline or {"kind": "unsupported"}
+        self._metadata.add(parsed, outline)
+        uuid = parsed.get("uuid")
+        self.outlines.append(outline)
+        self.offsets.append(offset)
+        self.line_lengths.append(length)
+        self.uuids.append(uuid if isinstance(uuid, str) else None)
+
+    def transcript(self) -> OutlinedTranscript:
+        """The transcript as outlined so far. Later feeds may still join its tool calls to results."""
+        return OutlinedTranscript(self.filename, self.size, self.outlines, self.offsets, self.line_lengths,
+                                  self.uuids, self._metadata.metadata())
+
+
+def outline_transcript(path: str, image_hashes: frozenset[str] = frozenset()) -> OutlinedTranscript | None:
+    """Parse a transcript the way the viewer does, streaming it line by line.
+
+    image_hashes are the images uploaded alongside it, which its image refs can point at.
+    Returns None if the viewer couldn't load it (it then reports the error itself).
+    """
+    outliner = TranscriptOutliner(os.path.basename(path), image_hashes)
+    try:
+        with open(path, "rb") as f:
+            outliner.feed(f)
+    except (ValueError, RecursionError):
+        return None
+    return outliner.transcript()
+
+
+def write_normalized(transcript: OutlinedTranscript, staging_dir: str) -> str:
+    """Write the normalized companion file for an outlined transcript into staging_dir and return its path."""
+    header = {
+        "format": NORMALIZED_FORMAT,
+        "version": NORMALIZED_VERSION,
+        "transcript": transcript.filename,
+        "transcriptBytes": transcript.size,
+        "metadata": transcript.metadata,
+        "messageCounts": _message_counts(transcript.outlines),
+        "entryCount": len(transcript.outlines),
+    }
+    dest_path = os.path.join(staging_dir, normalized_filename(transcript.filename))
+    with open(dest_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for outline in transcript.outlines:
+            if "toolCalls" in outline:
+                # Ids were only needed for joining; the viewer matches tool calls to tool_use blocks by position
+                outline = {**outline, "toolCalls": [
+                    {key: value for key, value in tool_call.items() if key != "id"}
+                    for tool_call in outline["toolCalls"]
+                ]}
+            f.write(json.dumps(outline, separators=(",", ":")) + "\n")
+    return dest_path
+
+
+def normalize_transcript(path: str, staging_dir: str, image_hashes: frozenset[str] = frozenset()) -> str | None:
+    """Write the normalized companion file for a transcript into staging_dir.
+
+    Returns its path, or None if the viewer couldn't load the transcript.
+    """
+    transcript = outline_transcript(path, image_hashes)
+    return write_normalized(transcript, staging_dir) if transcript is not None else None
@@ -0,0 +1,46 @@
+"""Small on-disk JSON cache shared by the publish scripts."""
+import json
+import os
+import tempfile
+
+
+def get_cache_dir() -> str:
+    """Return the plugin's cache directory, creating it if needed.
+
+    Honours SESSION_SHARE_CACHE_DIR, then XDG_CACHE_HOME, then ~/.cache.
+    """
+    cache_dir = os.environ.get("SESSION_SHARE_CACHE_DIR")
+    if not cache_dir:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        cache_dir = os.path.join(xdg_cache, "claude-code-session-share")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def read_json_cache(name: str) -> dict:
+    """Load a JSON cache file by name (may include subdirectories). Missing or corrupt files read as empty."""
+    try:
+        with open(os.path.join(get_cache_dir(), name), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_json_cache(name: str, data: dict) -> None:
+    """Atomically replace a JSON cache file so concurrent readers never see a partial write."""
+    path = os.path.join(get_cache_dir(), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
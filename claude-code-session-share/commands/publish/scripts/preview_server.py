@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Preview local sessions in the viewer without uploading them.
+
+Serves the sessions under ~/.claude/projects from localhost, shaped like the
+GitHub gist API, so the viewer can load a session by its id as if it were a
+gist. Nothing is uploaded and nothing else on the network is contacted.
+
+    python3 preview_server.py [--port 8799]
+    cd session-viewer && VITE_GIST_API_URL=http://127.0.0.1:8799 npm run dev
+
+then open http://localhost:5173/g/<session_id>, or the server's own page,
+which lists the most recent sessions with links into the viewer.
+
+Endpoints:
+
+- `GET /gists/<session_id>`: the session's files (main transcript, subagent
+  transcripts and a page index), found the same way the publish script finds
+  them.
+- `GET /raw/<session_id>/<filename>`: one file, with Range requests for the
+  viewer's paged loading, and gzip for whole-file downloads.
+- `GET /sessions?limit=N`: the N most recently modified sessions, as JSON.
+- `GET /`: the same, as links into the viewer.
+
+The page index is what lets the viewer render the first page of a large
+transcript without downloading all of it. It is built on first request and
+kept in memory until the transcript's size or mtime changes. The indexes for
+the most recent sessions are built when the server starts.
+"""
+import argparse
+import heapq
+import html
+import io
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from normalization import outline_transcript
+from publish_session import find_transcript_paths
+from session_index import SessionIndex, get_projects_dir
+from transcript_index import build_index, index_filename
+
+DEFAULT_PORT = 8799
+DEFAULT_VIEWER_URL = "http://localhost:5173"
+DEFAULT_SESSION_LIMIT = 50
+DEFAULT_WARM_SESSIONS = 3
+MAX_CACHED_INDEXES = 32
+# Transcripts smaller than this are loaded whole by the viewer, so their index isn't worth warming
+WARM_MIN_BYTES = 1_000_000
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 1
+COPY_CHUNK_BYTES = 1024 * 1024
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_version(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def etag_for(version: tuple[int, int]) -> str:
+    return f'"{version[0]:x}-{version[1]:x}"'
+
+
+class IndexCache:
+    """Page indexes for main transcripts, rebuilt when a transcript's size or mtime changes. Thread-safe."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_INDEXES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[tuple[int, int], bytes | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: dict[str, threading.Lock] = {}
+
+    def get(self, path: str) -> tuple[tuple[int, int], bytes | None]:
+        """(transcript version, index JSON), with None for transcripts the viewer couldn't load."""
+        version = file_version(path)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(path)
+                return cached
+            build_lock = self._build_locks.setdefault(path, threading.Lock())
+
+        # One build per transcript at a time; a request that waited on it gets its result
+        with build_lock:
+            with self._lock:
+                cached = self._entries.get(path)
+            if cached is not None and cached[0] == version:
+                return cached
+            transcript = outline_transcript(path)
+            data = None
+            if transcript is not None:
+                data = json.dumps(build_index(transcript), separators=(",", ":")).encode()
+            # The transcript may have grown while it was read; key the index by what was read
+            entry = ((transcript.size, version[1]) if transcript is not None else version, data)
+            with self._lock:
+                self._entries[path] = entry
+                self._entries.move_to_end(path)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return entry
+
+
+class PreviewState:
+    """What the request handlers share: where sessions live and the index cache."""
+
+    def __init__(self, projects_dir: str, base_url: str, viewer_url: str):
+        self.projects_dir = projects_dir
+        self.base_url = base_url
+        self.viewer_url = viewer_url.rstrip("/")
+        self.indexes = IndexCache()
+        self._session_index_lock = threading.Lock()
+
+    def session_files(self, session_id: str) -> dict[str, str]:
+        """Gist filename -> local path for a session's files, or {} if there is no such session."""
+        transcript_paths = find_transcript_paths(session_id, self.projects_dir)
+        files = {os.path.basename(path): path for path in reversed(transcript_paths)}
+        if transcript_paths:
+            # Served from the index cache rather than from disk
+            files[index_filename(os.path.basename(transcript_paths[0]))] = transcript_paths[0]
+        return files
+
+    def gist(self, session_id: str) -> dict | None:
+        files = self.session_files(session_id)
+        if not files:
+            return None
+        gist_files = {}
+        updated = 0
+        for filename, path in files.items():
+            try:
+                size, mtime_ns = file_version(path)
+            except OSError:
+                continue
+            updated = max(updated, mtime_ns)
+            gist_files[filename] = {
+                "filename": filename,
+                "type": "application/json" if filename.endswith(".json") else "text/plain",
+                "raw_url": f"{self.base_url}/raw/{session_id}/{filename}",
+                "truncated": False,
+            }
+            if not filename.endswith(".index.json"):
+                gist_files[filename]["size"] = size
+        return {
+            "id": session_id,
+            "description": f"Local preview of session {session_id}",
+            "public": False,
+            "updated_at": datetime.fromtimestamp(updated / 1e9, timezone.utc).isoformat(timespec="seconds"),
+            "files": gist_files,
+        }
+
+    def recent_sessions(self, limit: int) -> list[dict]:
+        """The most recently modified sessions, newest first, from the session index."""
+        with self._session_index_lock:
+            index = SessionIndex(self.projects_dir)
+            projects = index.list_sessions()
+            try:
+                index.save()
+            except OSError:
+                pass
+
+        def sessions():
+            for project, session_ids in projects.items():
+                for session_id in session_ids:
+                    path = os.path.join(self.projects_dir, project, f"{session_id}.jsonl")
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime_ns, stat.st_size, project, session_id
+
+        return [
+            {
+                "session_id": session_id,
+                "project": project,
+                "bytes": size,
+                "modified_at": datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc).isoformat(timespec="seconds"),
+                "gist_url": f"{self.base_url}/gists/{session_id}",
+                "viewer_url": f"{self.viewer_url}/g/{session_id}",
+            }
+            for mtime_ns, size, project, session_id in heapq.nlargest(limit, sessions())
+        ]
+
+    def warm(self, count: int) -> None:
+        """Build the page indexes of the most recent large sessions ahead of their first preview."""
+        for session in self.recent_sessions(count):
+            if session["bytes"] >= WARM_MIN_BYTES:
+                path = os.path.join(self.projects_dir, session["project"], f"{session['session_id']}.jsonl")
+                try:
+                    self.indexes.get(path)
+                except OSError:
+                    continue
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """(start, end inclusive) for a single-range Range header, or None to send the whole file.
+
+    Raises ValueError if the range can't be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    if match.group(1) == "":
+        suffix = int(match.group(2))
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - suffix), size - 1
+    start = int(match.group(1))
+    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    if start >= size or end < start:
+        raise ValueError("range outside the file")
+    return start, end
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "SessionSharePreview"
+
+    @property
+    def state(self) -> PreviewState:
+        return self.server.state
+
+    def _allowed_host(self) -> bool:
+        # Refuse other host names pointed at this port (DNS rebinding)
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0].strip("[]")
+        return host in ("127.0.0.1", "localhost", "::1")
+
+    def _cors_headers(self) -> None:
+        # Only the viewer may read responses from other origins, so other web pages can't read transcripts
+        if self.headers.get("Origin") == self.state.viewer_url:
+            self.send_header("Access-Control-Allow-Origin", self.state.viewer_url)
+            self.send_header("Access-Control-Expose-Headers", "Content-Range, Content-Length, ETag")
+            self.send_header("Vary", "Origin")
+
+    def _send_json(self, status: int, body, head: bool = False) -> None:
+        data = json.dumps(body, indent=2).encode()
+        self._send_bytes(status, data, "application/json; charset=utf-8", head)
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str, head: bool = False) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-cache")
+        self._cors_headers()
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, head: bool = False) -> None:
+        self._send_json(status, {"message": message}, head)
+
+    def _copy(self, source, length: int) -> None:
+        while length > 0:
+            chunk = source.read(min(COPY_CHUNK_BYTES, length))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            length -= len(chunk)
+
+    def _send_gzipped(self, source) -> None:
+        """Stream source gzipped, with chunked transfer encoding since the compressed size isn't known."""
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+        def write_chunk(data: bytes) -> None:
+            if data:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        while chunk := source.read(COPY_CHUNK_BYTES):
+            write_chunk(compressor.compress(chunk))
+        write_chunk(compressor.flush())
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_file(self, source, size: int, version: tuple[int, int], content_type: str, head: bool) -> None:
+        """Send a whole file or the requested range of it, honouring If-None-Match."""
+        etag = etag_for(version)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self._cors_headers()
+            self.end_headers()
+            return
+
+        byte_range = None
+        if self.headers.get("Range"):
+            try:
+                byte_range = parse_range(self.headers["Range"], size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self._cors_headers()
+                self.end_headers()
+                return
+
+        gzip = (
+            byte_range is None
+            and size >= GZIP_MIN_BYTES
+            and "gzip" in (self.headers.get("Accept-Encoding") or "")
+        )
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if byte_range:
+            start, end = byte_range
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.send_header("Content-Length", str(end - start + 1))
+        elif gzip:
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(size))
+        self._cors_headers()
+        self.end_headers()
+        if head:
+            return
+
+        if byte_range:
+            start, end = byte_range
+            source.seek(start)
+            self._copy(source, end - start + 1)
+        elif gzip:
+            self._send_gzipped(source)
+        else:
+            self._copy(source, size)
+
+    def _serve_raw(self, session_id: str, filename: str, head: bool) -> None:
+        path = self.state.session_files(session_id).get(filename)
+        if path is None:
+            self._send_error(404, "Not Found", head)
+            return
+        content_type = "text/plain; charset=utf-8"
+        if filename.endswith(".index.json"):
+            version, data = self.state.indexes.get(path)
+            if data is None:
+                self._send_error(404, "The viewer couldn't load this transcript, so it has no page index", head)
+                return
+            self._send_file(io.BytesIO(data), len(data), version, "application/json; charset=utf-8", head)
+            return
+        with open(path, "rb") as f:
+            # Stop at the size seen now, even if the session is still appending
+            size = os.fstat(f.fileno()).st_size
+            self._send_file(f, size, (size, os.fstat(f.fileno()).st_mtime_ns), content_type, head)
+
+    def _serve_index_page(self, head: bool) -> None:
+        rows = "\n".join(
+            f'<li><a href="{html.escape(s["viewer_url"])}">{html.escape(s["session_id"])}</a> '
+            f'{html.escape(s["project"])}, {s["bytes"] / 1024 / 1024:.1f} MB, modified {html.escape(s["modified_at"])}'
+            f"</li>"
+            for s in self.state.recent_sessions(DEFAULT_SESSION_LIMIT)
+        )
+        page = (
+            "<!doctype html><meta charset=utf-8><title>Session preview</title>"
+            f"<h1>Recent sessions</h1><ul>\n{rows}\n</ul>"
+        )
+        self._send_bytes(200, page.encode(), "text/html; charset=utf-8", head)
+
+    def _route(self, head: bool) -> None:
+        if not self._allowed_host():
+            self._send_error(403, "Forbidden", head)
+            return
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            if not parts:
+                self._serve_index_page(head)
+            elif parts == ["sessions"]:
+                limit = int(parse_qs(url.query).get("limit", [DEFAULT_SESSION_LIMIT])[0])
+                self._send_json(200, self.state.recent_sessions(max(1, limit)), head)
+            elif len(parts) == 2 and parts[0] == "gists" and SESSION_ID_PATTERN.match(parts[1]):
+                gist = self.state.gist(parts[1])
+                if gist is None:
+                    self._send_error(404, "Not Found", head)
+                else:
+                    self._send_json(200, gist, head)
+            elif len(parts) == 3 and parts[0] == "raw" and SESSION_ID_PATTERN.match(parts[1]):
+                self._serve_raw(parts[1], parts[2], head)
+            else:
+                self._send_error(404, "Not Found", head)
+        except ValueError as e:
+            self._send_error(400, str(e), head)
+        except (BrokenPipeError, ConnectionResetError):
+            # The viewer gave up on the request (e.g. navigated away)
+            pass
+
+    def do_GET(self):
+        self._route(head=False)
+
+    def do_HEAD(self):
+        self._route(head=True)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors_headers()
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Range, If-None-Match")
+        self.send_header("Access-Control-Max-Age", "86400")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(port: int, viewer_url: str, projects_dir: str | None = None,
+                verbose: bool = False) -> ThreadingHTTPServer:
+    """A preview server bound to localhost (port 0 picks a free port). Call serve_forever() to run it."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), PreviewHandler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.state = PreviewState(projects_dir or get_projects_dir(), base_url, viewer_url)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port on 127.0.0.1 (default: {DEFAULT_PORT})")
+    parser.add_argument("--viewer-url", default=DEFAULT_VIEWER_URL,
+                        help=f"the viewer the links point to, and the only origin allowed to read responses "
+                             f"(default: {DEFAULT_VIEWER_URL})")
+    parser.add_argument("--warm", type=int, default=DEFAULT_WARM_SESSIONS, metavar="N",
+                        help=f"build page indexes for the N most recent sessions at startup "
+                             f"(default: {DEFAULT_WARM_SESSIONS})")
+    parser.add_argument("--verbose", action="store_true", help="log every request to stderr")
+    args = parser.parse_args()
+
+    try:
+        server = make_server(args.port, args.viewer_url, verbose=args.verbose)
+    except OSError as e:
+        print(f"Error: could not listen on port {args.port}: {e}")
+        sys.exit(1)
+    base_url = server.state.base_url
+    if args.warm > 0:
+        threading.Thread(target=server.state.warm, args=(args.warm,), daemon=True).start()
+    print(f"Previewing sessions from {server.state.projects_dir} at {base_url}")
+    print(f"Run the viewer with VITE_GIST_API_URL={base_url}, then open {base_url}/ for recent sessions.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
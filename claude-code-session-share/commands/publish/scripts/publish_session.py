@@ -1,36 +1,132 @@
 #!/usr/bin/env python3
-"""Publish current Claude Code session transcript to GitHub Gist using gh CLI."""
+"""Publish current Claude Code session transcript to GitHub Gist.
+
+Talks to the GitHub API directly with the token from `gh auth token`, falling
+back to gh CLI subprocesses when no token is available (or with --use-gh).
+"""
+import argparse
+import atexit
 import glob
+import json
 import os
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 
+import tracing
+from check_version import check_for_update
+from chunking import (DEFAULT_CHUNK_BYTES, GIST_MAX_FILES, FileBudgetError, TranscriptSplitter, plan_part_bytes,
+                      split_transcript)
+from compaction import CompactionStats, compact_line, compact_transcripts
+from compression import compress_transcripts
+from file_snapshots import (REF_PREFIX, SNAPSHOTS_FILENAME, SnapshotStats, SnapshotStore, dedupe_file_snapshots,
+                            encode_transcript_line)
+from gist_api import GistClient, GitHubAPIError, get_gh_token
+from http_cache import HttpCache
+from image_extraction import ImageExtractionStats, ImageFiles, extract_images, extract_line_images
+from normalization import TranscriptOutliner, outline_transcript, write_normalized
+from publish_state import diff_files, file_sha256, load_published, save_published, source_fingerprint
+from secret_scan import SecretScanStats, redact_line, scan_secrets, scan_transcript
+from session_index import SessionIndex, find_indexed_transcript, get_projects_dir
+from session_watch import PollingWatcher, ends_mid_line, make_watcher
+from subagent_bundles import MAX_SUBAGENT_FILES, bundle_subagents, subagent_file_count
+from timing import PhaseTimer
+from transcript_index import write_transcript_index
 
-def find_transcript_paths(session_id: str) -> list[str]:
-    """Find the main transcript and any subagent transcripts for a session ID."""
-    claude_dir = os.path.expanduser("~/.claude")
+DESCRIPTION_PREFIX = "Claude Code session transcript:"
+# Files per create/update request, which also bounds the gh command line
+UPLOAD_BATCH_FILES = 50
+UPLOAD_BATCH_BYTES = 20_000_000
+UPLOAD_WORKERS = 4
+UPLOAD_CONFLICT_RETRIES = 3
+# --watch pushes once the session has been quiet for WATCH_DEBOUNCE_SECONDS, or
+# WATCH_MAX_DELAY_SECONDS after the first change if it never goes quiet
+WATCH_DEBOUNCE_SECONDS = 2.0
+WATCH_MAX_DELAY_SECONDS = 10.0
+DEFAULT_WATCH_INTERVAL = 5.0
+# Staging a long session from scratch takes longer, so space pushes out to keep it under this share of the time
+WATCH_MAX_BUSY = 0.25
+# --watch stages transcripts up to their last complete line, and only resumes where it stopped
+# if the WATCH_TAIL_BYTES before that are unchanged
+WATCH_TAIL_BYTES = 256
+WATCH_READ_BLOCK = 64 * 1024
 
-    # Find main transcript
-    main_pattern = os.path.join(claude_dir, "projects", "*", f"{session_id}.jsonl")
-    main_matches = glob.glob(main_pattern)
 
+def find_main_transcript(session_id: str, projects_dir: str) -> str | None:
+    """Find a session's main transcript, using the session index before globbing."""
+    main_transcript = find_indexed_transcript(session_id, projects_dir)
+    if main_transcript:
+        return main_transcript
+
+    # Fall back to globbing every project, and remember what we find
+    main_pattern = os.path.join(projects_dir, "*", f"{session_id}.jsonl")
+    main_matches = glob.glob(main_pattern)
     if not main_matches:
+        return None
+
+    index = SessionIndex(projects_dir)
+    try:
+        index.record(main_matches[0])
+        index.save()
+    except OSError:
+        pass
+    return main_matches[0]
+
+
+def find_subagent_transcripts(session_dir: str) -> list[str]:
+    """List the subagent transcripts under a session's directory, in name order.
+
+    Only non-empty .jsonl files count: sessions also keep tool output and other
+    files there that aren't transcripts, and gists can't hold empty files.
+    """
+    found = []
+    pending = [session_dir]
+    while pending:
+        try:
+            scanner = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with scanner:
+            for entry in scanner:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.endswith(".jsonl") and entry.is_file() and entry.stat().st_size > 0:
+                    found.append(entry.path)
+    return sorted(found, key=os.path.basename)
+
+
+def find_transcript_paths(session_id: str, projects_dir: str | None = None) -> list[str]:
+    """Find the main transcript and any subagent transcripts for a session ID."""
+    main_transcript = find_main_transcript(session_id, projects_dir or get_projects_dir())
+    if not main_transcript:
         return []
 
-    main_transcript = main_matches[0]
-    transcripts = [main_transcript]
+    # Subagent transcripts live under a <session_id>/ directory beside the main transcript
+    session_dir = os.path.join(os.path.dirname(main_transcript), session_id)
+    return [main_transcript] + find_subagent_transcripts(session_dir)
+
 
-    # Find any additional files in <session_id>/ directory
-    sessions_dir = os.path.dirname(main_transcript)
-    session_dir = os.path.join(sessions_dir, session_id)
-    additional_files = glob.glob(os.path.join(session_dir, "**", "*"), recursive=True)
-    transcripts.extend(f for f in additional_files if os.path.isfile(f))
+def read_gist_files(filepaths: list[str]) -> dict[str, str]:
+    """Map gist filenames (basenames) to file contents."""
+    files = {}
+    for path in filepaths:
+        with open(path, encoding="utf-8") as f:
+            files[os.path.basename(path)] = f.read()
+    return files
 
-    return transcripts
 
+def create_gist(filepaths: list[str], description: str, client: GistClient | None = None) -> str:
+    """Create a GitHub Gist and return the gist ID. Uses gh CLI when no API client is given."""
+    if client is not None:
+        return client.create_gist(read_gist_files(filepaths), description)["id"]
 
-def create_gist(filepaths: list[str], description: str) -> str:
-    """Create a GitHub Gist using gh CLI and return the gist ID."""
+    tracing.count("subprocesses")
     result = subprocess.run(
         ["gh", "gist", "create", *filepaths, "--desc", description],
         capture_output=True,
@@ -48,11 +144,15 @@ def create_gist(filepaths: list[str], description: str) -> str:
     return gist_id
 
 
-def update_gist_description(gist_id: str, description: str) -> None:
+def update_gist_description(gist_id: str, description: str, client: GistClient | None = None) -> None:
+    if client is not None:
+        client.update_gist(gist_id, description=description)
+        return
 
     # Note: We update the description using 'gh api' instead of 'gh gist edit'
     # because the latter prompts interactively for file selection on multi-file
     # gists, which blocks subprocess execution.
+    tracing.count("subprocesses")
     result = subprocess.run(
         [
             "gh", "api",
@@ -67,23 +167,848 @@ def update_gist_description(gist_id: str, description: str) -> None:
         raise RuntimeError(f"Failed to update gist description: {result.stderr}")
 
 
+class GistNotFoundError(RuntimeError):
+    """Raised when updating a gist that no longer exists."""
+    pass
+
+
+class GistConflictError(RuntimeError):
+    """Raised when GitHub rejects an update because another one to the same gist was in flight."""
+    pass
+
+
+def update_gist_files(gist_id: str, filepaths: list[str], removed_filenames: list[str],
+                      client: GistClient | None = None) -> None:
+    """Replace the given files in an existing gist (and delete removed ones) in one PATCH."""
+    files: dict[str, str | None] = dict(read_gist_files(filepaths))
+    for filename in removed_filenames:
+        files[filename] = None
+
+    if client is not None:
+        try:
+            client.update_gist(gist_id, files=files)
+        except GitHubAPIError as e:
+            if e.status == 404:
+                raise GistNotFoundError(f"Gist {gist_id} no longer exists") from e
+            if e.status == 409:
+                raise GistConflictError(f"Gist {gist_id} was being updated concurrently") from e
+            raise
+        return
+
+    body = {"files": {name: None if content is None else {"content": content} for name, content in files.items()}}
+    tracing.count("subprocesses")
+    result = subprocess.run(
+        ["gh", "api", "-X", "PATCH", f"/gists/{gist_id}", "--input", "-"],
+        input=json.dumps(body),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        if "HTTP 404" in result.stderr:
+            raise GistNotFoundError(f"Gist {gist_id} no longer exists")
+        if "HTTP 409" in result.stderr:
+            raise GistConflictError(f"Gist {gist_id} was being updated concurrently")
+        raise RuntimeError(f"Failed to update gist files: {result.stderr}")
+
+
+def upload_batches(filepaths: list[str], max_files: int = UPLOAD_BATCH_FILES,
+                   max_bytes: int = UPLOAD_BATCH_BYTES) -> list[list[str]]:
+    """Split files, in order, into batches small enough for one API request (or gh command line)."""
+    batches: list[list[str]] = []
+    batch_bytes = 0
+    for path in filepaths:
+        size = os.path.getsize(path)
+        if not batches or len(batches[-1]) >= max_files or (batches[-1] and batch_bytes + size > max_bytes):
+            batches.append([])
+            batch_bytes = 0
+        batches[-1].append(path)
+        batch_bytes += size
+    return batches
+
+
+def update_gist_batch(gist_id: str, filepaths: list[str], removed_filenames: list[str],
+                      client: GistClient | None) -> None:
+    """update_gist_files, retried a few times if it collides with another batch's update."""
+    for attempt in range(UPLOAD_CONFLICT_RETRIES + 1):
+        try:
+            update_gist_files(gist_id, filepaths, removed_filenames, client)
+            return
+        except GistConflictError:
+            if attempt == UPLOAD_CONFLICT_RETRIES:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def upload_in_batches(gist_id: str, batches: list[list[str]], removed_filenames: list[str],
+                      client: GistClient | None) -> None:
+    """Add or replace files in a gist, PATCHing up to UPLOAD_WORKERS batches at once.
+
+    Removed files are deleted along with the first batch.
+    """
+    if len(batches) <= 1:
+        update_gist_files(gist_id, batches[0] if batches else [], removed_filenames, client)
+        return
+
+    def upload(batch: list[str], removed: list[str]) -> None:
+        # GistClient holds one connection, so each worker needs its own
+        worker_client = client.clone() if client is not None else None
+        try:
+            with tracing.span("upload_batch", files=len(batch)):
+                update_gist_batch(gist_id, batch, removed, worker_client)
+        finally:
+            if worker_client is not None:
+                worker_client.close()
+
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(batches))) as executor:
+        futures = [
+            executor.submit(upload, batch, removed_filenames if i == 0 else [])
+            for i, batch in enumerate(batches)
+        ]
+        for future in futures:
+            future.result()
+
+
+def viewer_url_for(gist_id: str) -> str:
+    return f"https://custardseed.com/g/{gist_id}"
+
+
+def publish_new_gist(transcript_paths: list[str], client: GistClient | None, timer: PhaseTimer) -> str:
+    # The viewer URL embeds the gist ID, which only exists once the gist does, so
+    # the description is completed with a follow-up PATCH (on the same connection
+    # when using the API client). The marker prefix is set up front so the gist is
+    # discoverable even if that PATCH fails.
+    # Large sessions can have more files than fit in one request: create the gist
+    # with the first batch, then add the rest in parallel
+    first_batch, *other_batches = upload_batches(transcript_paths)
+    with timer.phase("create"):
+        gist_id = create_gist(first_batch, DESCRIPTION_PREFIX, client)
+    if other_batches:
+        with timer.phase("upload"):
+            upload_in_batches(gist_id, other_batches, [], client)
+        print(f"Uploaded {len(transcript_paths)} files in {len(other_batches) + 1} batches.")
+    with timer.phase("describe"):
+        update_gist_description(gist_id, f"{DESCRIPTION_PREFIX} {viewer_url_for(gist_id)}", client)
+    return gist_id
+
+
+def republish_changed_files(previous: dict, transcript_paths: list[str], file_hashes: dict[str, str],
+                            client: GistClient | None, timer: PhaseTimer) -> bool:
+    """Update a previously published gist with only the changed files.
+
+    Returns False if the gist is gone and the session needs a new gist instead.
+    """
+    changed, removed = diff_files(previous["files"], file_hashes)
+    if not changed and not removed:
+        print("No changes since the last publish.")
+        return True
+
+    changed_paths = [p for p in transcript_paths if os.path.basename(p) in changed]
+    try:
+        with timer.phase("update"):
+            upload_in_batches(previous["gist_id"], upload_batches(changed_paths), removed, client)
+    except GistNotFoundError:
+        return False
+
+    uploaded_bytes = sum(os.path.getsize(p) for p in changed_paths)
+    print(
+        f"Updated {len(changed_paths)} of {len(transcript_paths)} file(s) "
+        f"({uploaded_bytes / 1024:.1f} KB uploaded)."
+    )
+    return True
+
+
+def image_file_budget(transcript_paths: list[str], args: argparse.Namespace) -> int:
+    """How many image files fit in the gist beside the files staged from these transcripts.
+
+    Counts the main transcript at its default part size. Images left inline make it
+    bigger, and plan_part_bytes makes the parts bigger if they then don't fit.
+    """
+    main_bytes = os.path.getsize(transcript_paths[0])
+    main_files = -(-main_bytes // args.chunk_size) + 1 if 0 < args.chunk_size < main_bytes else 1
+    subagent_paths = [p for p in transcript_paths[1:] if p.endswith(".jsonl")]
+    other_files = sum((args.normalize, args.index, args.dedupe_files, args.compress))
+    return max(0, GIST_MAX_FILES - main_files - subagent_file_count(subagent_paths) - other_files)
+
+
+def report_secrets(secret_stats: SecretScanStats, args: argparse.Namespace) -> None:
+    """Report what the secret scan found, and with --secrets abort exit without publishing."""
+    if args.timings:
+        print(secret_stats.throughput(), file=sys.stderr)
+    if secret_stats.findings:
+        print(secret_stats.report())
+        if args.secrets == "abort":
+            print("Error: not publishing a session that may contain secrets. Rerun with --secrets redact "
+                  "to publish it with them redacted, or --secrets off if they are false positives.")
+            sys.exit(1)
+        print(f"Redacted them in {secret_stats.redacted_files} transcript(s).")
+
+
+def stage_transcripts(transcript_paths: list[str], args: argparse.Namespace, staging_dir: str,
+                      timer: PhaseTimer) -> list[str]:
+    """Apply the optional pre-upload stages. Returns the paths of the files to upload.
+
+    Raises FileBudgetError if the session needs more files than a gist lists.
+    """
+    upload_paths = transcript_paths
+    if args.secrets != "off":
+        with timer.phase("secrets"):
+            upload_paths, secret_stats = scan_secrets(upload_paths, staging_dir, redact=args.secrets == "redact")
+        report_secrets(secret_stats, args)
+
+    if args.compact:
+        with timer.phase("compact"):
+            upload_paths, stats = compact_transcripts(upload_paths, staging_dir)
+        print(stats.summary())
+
+    image_hashes: frozenset[str] = frozenset()
+    if args.extract_images:
+        with timer.phase("images"):
+            upload_paths, image_hashes, image_stats = extract_images(
+                upload_paths, staging_dir, image_file_budget(upload_paths, args)
+            )
+        if image_stats.images_found:
+            print(image_stats.summary())
+
+    # The main transcript always comes first; subagent transcripts are separate files already
+    outlined = None
+    if args.normalize or args.index:
+        with timer.phase("normalize"):
+            outlined = outline_transcript(upload_paths[0], image_hashes)
+
+    snapshots_path = None
+    if args.dedupe_files:
+        with timer.phase("dedupe"):
+            upload_paths, snapshots_path, snapshot_stats = dedupe_file_snapshots(upload_paths, staging_dir)
+            # The outline describes the entries as the viewer sees them once expanded; offsets move
+            if outlined is not None and snapshots_path is not None:
+                outlined = outlined.rebased(upload_paths[0])
+        if snapshots_path is not None:
+            print(snapshot_stats.summary())
+
+    main_path, other_paths = upload_paths[0], upload_paths[1:]
+    normalized_path = index_path = None
+    if outlined is not None:
+        with timer.phase("normalize"):
+            if args.normalize:
+                normalized_path = write_normalized(outlined, staging_dir)
+            if args.index:
+                index_path = write_transcript_index(outlined, staging_dir, normalized_path)
+
+    subagent_paths = [p for p in other_paths if p.endswith(".jsonl")]
+    if len(subagent_paths) > MAX_SUBAGENT_FILES:
+        with timer.phase("bundle"):
+            bundle_paths = bundle_subagents(subagent_paths, staging_dir)
+        print(f"Bundled {len(subagent_paths)} subagent transcripts into {len(bundle_paths) - 1} file(s).")
+        bundled = set(subagent_paths)
+        other_paths = [p for p in other_paths if p not in bundled] + bundle_paths
+
+    # A gist lists at most GIST_MAX_FILES files: the split transcripts get what the other files leave
+    split_paths = [p for p in (main_path, normalized_path, snapshots_path) if p]
+    other_files = len(other_paths) + (1 if index_path else 0) + (1 if args.compress else 0)
+    with timer.phase("chunk"):
+        part_bytes = plan_part_bytes(split_paths, GIST_MAX_FILES - other_files, args.chunk_size)
+        main_paths = split_transcript(main_path, staging_dir, part_bytes)
+        normalized_paths = split_transcript(normalized_path, staging_dir, part_bytes) if normalized_path else []
+        snapshots_paths = split_transcript(snapshots_path, staging_dir, part_bytes) if snapshots_path else []
+    if len(main_paths) > 1:
+        print(f"Split main transcript into {len(main_paths) - 1} parts.")
+    if part_bytes != args.chunk_size:
+        print(f"Used {part_bytes / 1_000_000:.1f} MB parts to stay within a gist's {GIST_MAX_FILES} files.")
+    upload_paths = (main_paths + normalized_paths + ([index_path] if index_path else []) + snapshots_paths
+                    + other_paths)
+
+    if args.compress:
+        bytes_before = sum(os.path.getsize(p) for p in upload_paths)
+        with timer.phase("compress"):
+            upload_paths = compress_transcripts(upload_paths, staging_dir)
+        bytes_after = sum(os.path.getsize(p) for p in upload_paths)
+        print(f"Compressed uploads: {bytes_before / 1024:.1f} KB -> {bytes_after / 1024:.1f} KB")
+    return upload_paths
+
+
+@dataclass
+class _StagedTranscript:
+    """How much of a watched transcript WatchStager has staged, and where."""
+    staged_path: str
+    offset: int = 0
+    lines: int = 0
+    # The bytes just before offset, to tell an append from a rewrite
+    tail: bytes = b""
+
+
+class _DedupeNotApplicable(Exception):
+    """A transcript holds something that reads as a snapshot reference, so it can't be deduped."""
+    pass
+
+
+def complete_lines_end(path: str, start: int) -> int:
+    """Where the last complete line of a file ends, or start if none past start is complete yet."""
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        while position > start:
+            block_start = max(start, position - WATCH_READ_BLOCK)
+            f.seek(block_start)
+            newline = f.read(position - block_start).rfind(b"\n")
+            if newline >= 0:
+                return block_start + newline + 1
+            position = block_start
+    return start
+
+
+class WatchStager:
+    """Stages a watched session into the same files as stage_transcripts, a push at a time (--watch).
+
+    Claude Code only appends to transcripts. The stager keeps its staging
+    directory between pushes and remembers how far into each transcript it
+    has staged, so a push runs only the complete lines appended since through
+    the secret scan, compaction, image extraction and file snapshot dedupe,
+    and appends them to the staged copies. Only those lines are outlined;
+    the normalized outline and page index are written again from the outline
+    so far. Only the last part of a chunked file and the bundles whose agents
+    grew are written again, and only files written since the last push are
+    compressed and hashed.
+
+    The session is staged from scratch on the first push, and again when a
+    transcript shrank or was rewritten, when the session grew too big for the
+    image files already extracted, or when new lines hold something dedupe
+    would mistake for a snapshot reference. Whether deduping makes the upload
+    smaller is settled then too. The image file budget is worked out from
+    the transcripts before compaction, so with --compact a few more images
+    may stay inline than stage_transcripts would leave.
+    """
+
+    def __init__(self, args: argparse.Namespace, staging_dir: str):
+        self.args = args
+        self.staging_dir = staging_dir
+        self.main_source: str | None = None
+        self.secret_stats = SecretScanStats()
+        self.store: SnapshotStore | None = None
+
+    def _reset(self, transcript_paths: list[str], dedupe: bool) -> None:
+        if self.store is not None:
+            self.store.close()
+        for filename in os.listdir(self.staging_dir):
+            os.remove(os.path.join(self.staging_dir, filename))
+        args = self.args
+        self.main_source = transcript_paths[0]
+        self.sources: dict[str, _StagedTranscript] = {}
+        self.secret_stats = SecretScanStats()
+        self.compaction_stats = CompactionStats()
+        self.images = None
+        if args.extract_images:
+            budget = image_file_budget(transcript_paths, args)
+            self.images = ImageFiles(self.staging_dir, ImageExtractionStats(), budget)
+        self.snapshot_stats = SnapshotStats()
+        self.store = None
+        if dedupe:
+            self.store = SnapshotStore(os.path.join(self.staging_dir, SNAPSHOTS_FILENAME), self.snapshot_stats)
+        self.store_bytes = 0
+        self.outliner = None
+        if args.normalize or args.index:
+            self.outliner = TranscriptOutliner(os.path.basename(self.main_source))
+        self.normalized_path = self.index_path = None
+        self.bundled: list[str] = []
+        self.bundle_paths: list[str] = []
+        self.bundle_manifest: dict | None = None
+        self.splitters: dict[str, TranscriptSplitter] = {}
+        self.split_offsets: dict[str, int] = {}
+        self.split_paths: dict[str, list[str]] = {}
+        # Staged files written since they were last uploaded, and hashes of uploads by path
+        self.dirty: set[str] = set()
+        self.hashes: dict[str, str] = {}
+
+    def _can_resume(self, transcript_paths: list[str]) -> bool:
+        """Whether the transcripts staged so far have only had lines appended since, and the
+        images extracted from them still leave the rest of the session room in the gist."""
+        if self.main_source is None or transcript_paths[0] != self.main_source:
+            return False
+        if self.images is not None:
+            # The budget shrinks as the session grows; images past it stay inline from now on
+            self.images.max_files = image_file_budget(transcript_paths, self.args)
+            if len(self.images.paths) > self.images.max_files:
+                return False
+        for path, staged in self.sources.items():
+            if path not in transcript_paths:
+                return False
+            try:
+                with open(path, "rb") as f:
+                    f.seek(staged.offset - len(staged.tail))
+                    if f.read(len(staged.tail)) != staged.tail:
+                        return False
+            except OSError:
+                return False
+        return True
+
+    def _append(self, path: str) -> bool:
+        """Stage the complete lines appended to a transcript since the last push. Returns whether there were any."""
+        staged = self.sources.get(path)
+        if staged is None:
+            staged = self.sources[path] = _StagedTranscript(os.path.join(self.staging_dir, os.path.basename(path)))
+            open(staged.staged_path, "wb").close()
+            self.dirty.add(staged.staged_path)
+        end = complete_lines_end(path, staged.offset)
+        if end == staged.offset:
+            return False
+
+        redacted_lines: set[int] = set()
+        if self.args.secrets != "off":
+            started = time.perf_counter()
+            secret_lines = scan_transcript(path, self.secret_stats, start=staged.offset, end=end,
+                                           lines_before=staged.lines)
+            self.secret_stats.seconds += time.perf_counter() - started
+            if secret_lines and self.args.secrets == "redact":
+                redacted_lines = secret_lines
+                self.secret_stats.redacted_files += 1
+        outliner = self.outliner if path == self.main_source else None
+        image_count = len(self.images.paths) if self.images is not None else 0
+        with open(path, "rb") as src, open(staged.staged_path, "ab") as dest:
+            src.seek(staged.offset)
+            position = staged.offset
+            while position < end and (line := src.readline()):
+                position += len(line)
+                staged.lines += 1
+                if staged.lines in redacted_lines:
+                    line = redact_line(line, lambda kind, secret: None)
+                if self.args.compact:
+                    line = compact_line(line, self.compaction_stats)
+                    if line is None:
+                        continue
+                if self.images is not None:
+                    line = extract_line_images(line, self.images)
+                encoded = line
+                if self.store is not None:
+                    if REF_PREFIX in line:
+                        raise _DedupeNotApplicable
+                    self.snapshot_stats.bytes_before += len(line)
+                    encoded = encode_transcript_line(line, self.store, self.snapshot_stats)
+                if outliner is not None:
+                    outliner = self._outline(outliner, line, encoded)
+                dest.write(encoded)
+            src.seek(max(0, end - WATCH_TAIL_BYTES))
+            staged.tail = src.read(end - src.tell())
+        staged.offset = end
+        self.dirty.add(staged.staged_path)
+        if self.images is not None:
+            self.dirty.update(list(self.images.paths.values())[image_count:])
+        return True
+
+    def _outline(self, outliner: TranscriptOutliner, line: bytes, encoded: bytes) -> TranscriptOutliner | None:
+        if self.images is not None and len(outliner.image_hashes) != len(self.images.paths):
+            outliner.image_hashes = self.images.hashes()
+        try:
+            if encoded is line:
+                outliner.feed([line])
+            else:
+                outliner.feed_rewritten([(line, encoded)])
+        except (ValueError, RecursionError):
+            # The viewer can't load the transcript either, and reports that itself
+            self.outliner = None
+        return self.outliner
+
+    def _dedupe_pays(self) -> bool:
+        """Whether the snapshot store made the upload smaller, as dedupe_file_snapshots requires."""
+        self.store.file.flush()
+        bytes_after = (sum(os.path.getsize(staged.staged_path) for staged in self.sources.values())
+                       + os.path.getsize(self.store.path))
+        return self.snapshot_stats.copies_replaced > 0 and bytes_after < self.snapshot_stats.bytes_before
+
+    def _split(self, path: str, part_bytes: int) -> list[str]:
+        """split_transcript for a staged file that has only grown since it was last split."""
+        splitter = self.splitters.get(path)
+        if splitter is None or splitter.max_part_bytes != part_bytes:
+            splitter = self.splitters[path] = TranscriptSplitter(self.staging_dir, os.path.basename(path), part_bytes)
+            self.split_offsets[path] = 0
+            self.split_paths.pop(path, None)
+        part_count = len(splitter.part_paths)
+        with open(path, "rb") as f:
+            f.seek(self.split_offsets[path])
+            splitter.feed(f)
+            offset = f.tell()
+        if offset != self.split_offsets[path] or path not in self.split_paths:
+            self.split_offsets[path] = offset
+            self.split_paths[path] = splitter.split(path)
+            # Closed parts stay as they were; the manifest is written again
+            self.dirty.update(splitter.part_paths[max(part_count - 1, 0):])
+            self.dirty.add(self.split_paths[path][-1])
+        return self.split_paths[path]
+
+    def stage(self, transcript_paths: list[str]) -> tuple[list[str], dict[str, str]]:
+        """Stage what was appended to the session since the last push.
+
+        Returns the paths of the files to upload and their hashes by filename.
+        Raises FileBudgetError if the session needs more files than a gist lists.
+        """
+        args = self.args
+        self.secret_stats = SecretScanStats()
+        dedupe = args.dedupe_files
+        while True:
+            from_scratch = not self._can_resume(transcript_paths)
+            if from_scratch:
+                self._reset(transcript_paths, dedupe)
+            try:
+                appended = [path for path in transcript_paths if self._append(path)]
+            except _DedupeNotApplicable:
+                dedupe, self.main_source = False, None
+                continue
+            if from_scratch and self.store is not None and not self._dedupe_pays():
+                dedupe, self.main_source = False, None
+                continue
+            break
+
+        main_path = self.sources[self.main_source].staged_path
+        if self.main_source in appended or from_scratch:
+            self.normalized_path = self.index_path = None
+            if self.outliner is not None:
+                outlined = self.outliner.transcript()
+                if args.normalize:
+                    self.normalized_path = write_normalized(outlined, self.staging_dir)
+                    # Written afresh: earlier outline lines change as tool results come in
+                    self.splitters.pop(self.normalized_path, None)
+                    self.dirty.add(self.normalized_path)
+                if args.index:
+                    self.index_path = write_transcript_index(outlined, self.staging_dir, self.normalized_path)
+                    self.dirty.add(self.index_path)
+        snapshots_path = None
+        if self.store is not None:
+            self.store.file.flush()
+            snapshots_path = self.store.path
+            if self.store.file.tell() != self.store_bytes:
+                self.store_bytes = self.store.file.tell()
+                self.dirty.add(snapshots_path)
+
+        # A subagent that hasn't finished its first line has nothing to upload yet (gists can't hold empty files)
+        subagent_paths = [self.sources[path].staged_path for path in transcript_paths[1:]
+                          if self.sources[path].offset]
+        image_paths = list(self.images.paths.values()) if self.images is not None else []
+        other_paths = subagent_paths + image_paths
+        if len(subagent_paths) > MAX_SUBAGENT_FILES:
+            if subagent_paths != self.bundled or any(path != self.main_source for path in appended):
+                previous = self.bundle_manifest
+                self.bundled = subagent_paths
+                self.bundle_paths = bundle_subagents(subagent_paths, self.staging_dir, previous=previous)
+                with open(self.bundle_paths[-1], encoding="utf-8") as f:
+                    self.bundle_manifest = json.load(f)
+                previous_bundles = {bundle["filename"]: bundle for bundle in previous["bundles"]} if previous else {}
+                self.dirty.add(self.bundle_paths[-1])
+                self.dirty.update(os.path.join(self.staging_dir, bundle["filename"])
+                                  for bundle in self.bundle_manifest["bundles"]
+                                  if previous_bundles.get(bundle["filename"]) != bundle)
+            other_paths = image_paths + self.bundle_paths
+
+        split_paths = [p for p in (main_path, self.normalized_path, snapshots_path) if p]
+        other_files = len(other_paths) + (1 if self.index_path else 0) + (1 if args.compress else 0)
+        part_bytes = plan_part_bytes(split_paths, GIST_MAX_FILES - other_files, args.chunk_size)
+        main_paths = self._split(main_path, part_bytes)
+        normalized_paths = self._split(self.normalized_path, part_bytes) if self.normalized_path else []
+        snapshots_paths = self._split(snapshots_path, part_bytes) if snapshots_path else []
+        staged_paths = (main_paths + normalized_paths + ([self.index_path] if self.index_path else [])
+                        + snapshots_paths + other_paths)
+
+        upload_paths = staged_paths
+        if args.compress:
+            unchanged = frozenset(path for path in staged_paths if path not in self.dirty)
+            upload_paths = compress_transcripts(staged_paths, self.staging_dir, unchanged)
+        file_hashes = {}
+        for i, path in enumerate(upload_paths):
+            # Past the staged paths is the compression format marker, which is tiny
+            if path not in self.hashes or i >= len(staged_paths) or staged_paths[i] in self.dirty:
+                self.hashes[path] = file_sha256(path)
+            file_hashes[os.path.basename(path)] = self.hashes[path]
+        self.dirty.difference_update(staged_paths)
+        return upload_paths, file_hashes
+
+
+def wait_for_quiet(watcher, session_id: str) -> list[str]:
+    """After a change, wait out the debounce window, then return the session's transcript paths.
+
+    Also waits while a transcript ends in a half-written line, so no partial
+    entry is published.
+    """
+    first_change = time.monotonic()
+    while True:
+        quiet = not watcher.wait(WATCH_DEBOUNCE_SECONDS)
+        transcript_paths = find_transcript_paths(session_id)
+        if time.monotonic() - first_change >= WATCH_MAX_DELAY_SECONDS:
+            return transcript_paths
+        if quiet and not ends_mid_line(transcript_paths):
+            return transcript_paths
+
+
+def drain_until(watcher, deadline: float) -> None:
+    """Wait until deadline, swallowing changes: the next push picks them up anyway."""
+    while (remaining := deadline - time.monotonic()) > 0:
+        watcher.wait(remaining)
+
+
+def watch_session(session_id: str, gist_id: str, file_hashes: dict[str, str], args: argparse.Namespace,
+                  timer: PhaseTimer) -> None:
+    """Keep pushing the session's changes to its gist until interrupted (--watch).
+
+    Waits for the transcripts to change, debounces, stages what was appended
+    (WatchStager) and uploads only the files that changed. Chunked transcripts
+    only change in their last part, so each push stays small however long the
+    session runs. Pushes are at least --watch-interval seconds apart.
+    """
+    main_path = find_transcript_paths(session_id)[0]
+    session_dir = os.path.join(os.path.dirname(main_path), session_id)
+    watcher = make_watcher(main_path, session_dir, polling=args.watch_poll)
+    client = make_gist_client(args.use_gh, timer)
+    method = "polling" if isinstance(watcher, PollingWatcher) else "inotify"
+    print(f"Watching for changes ({method}); press Ctrl-C to stop.", flush=True)
+
+    updates = 0
+    next_push = time.monotonic() + args.watch_interval
+    staging = tempfile.TemporaryDirectory(prefix="session-share-")
+    stager = WatchStager(args, staging.name)
+    try:
+        while True:
+            while not watcher.wait(3600):
+                pass
+            drain_until(watcher, next_push)
+            transcript_paths = wait_for_quiet(watcher, session_id)
+            if not transcript_paths:
+                print(f"Error: Transcripts not found for session: {session_id}")
+                return
+            sources = source_fingerprint(transcript_paths)
+
+            start = time.monotonic()
+            with timer.phase("watch_update"):
+                try:
+                    upload_paths, current_hashes = stager.stage(transcript_paths)
+                except FileBudgetError as e:
+                    print(f"Error: the session outgrew what a gist can hold, so it is no longer updated: {e}")
+                    return
+                report_secrets(stager.secret_stats, args)
+                previous = {"gist_id": gist_id, "files": file_hashes}
+                if not republish_changed_files(previous, upload_paths, current_hashes, client, timer):
+                    gist_id = publish_new_gist(upload_paths, client, timer)
+                    print(f"The gist was deleted, so the session moved to a new one: {viewer_url_for(gist_id)}")
+            file_hashes = current_hashes
+            updates += 1
+            try:
+                save_published(session_id, gist_id, file_hashes, sources, staging_options(args))
+            except OSError as e:
+                print(f"Warning: could not record publish state: {e}", file=sys.stderr)
+            sys.stdout.flush()
+
+            busy = time.monotonic() - start
+            next_push = time.monotonic() + max(args.watch_interval, busy * (1 / WATCH_MAX_BUSY - 1))
+    except KeyboardInterrupt:
+        print(f"\nStopped watching after {updates} update(s).")
+    finally:
+        watcher.close()
+        if client is not None:
+            client.close()
+        if stager.store is not None:
+            stager.store.close()
+        staging.cleanup()
+
+
+def run_in_background(fn, *args) -> Future:
+    """Run fn on a daemon thread, so an early exit never waits for it."""
+    future: Future = Future()
+
+    def runner():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, daemon=True).start()
+    return future
+
+
+def run_version_check(timer: PhaseTimer) -> str | None:
+    with timer.phase("version_check"):
+        return check_for_update()
+
+
+def make_gist_client(use_gh: bool, timer: PhaseTimer) -> GistClient | None:
+    """Return an API client, or None to fall back to the gh CLI."""
+    if use_gh:
+        return None
+    with timer.phase("auth"):
+        token = get_gh_token()
+    if not token:
+        return None
+    try:
+        cache = HttpCache()
+    except OSError:
+        cache = None
+    return GistClient(token, cache=cache)
+
+
+def add_staging_options(parser: argparse.ArgumentParser) -> None:
+    """The options that decide what stage_transcripts uploads, shared with bulk_publish.py."""
+    parser.add_argument(
+        "--secrets",
+        choices=("redact", "abort", "off"),
+        default="redact",
+        help="what to do about API keys, tokens and passwords found in the transcripts (default: redact)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="drop entries the viewer never renders, dedupe images and truncate huge tool results",
+    )
+    parser.add_argument(
+        "--no-extract-images",
+        dest="extract_images",
+        action="store_false",
+        help="keep images inline instead of uploading each distinct image once as image-<sha256>.b64",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="upload transcripts gzip+base64 encoded (<name>.jsonl.gz.b64)",
+    )
+    parser.add_argument(
+        "--dedupe-files",
+        action="store_true",
+        help="upload each distinct file snapshot in Read/Edit/Write results once (file-snapshots.jsonl) "
+             "and refer to it from the transcripts",
+    )
+    parser.add_argument(
+        "--no-normalize",
+        dest="normalize",
+        action="store_false",
+        help="don't upload the pre-normalized entry outline the viewer loads instead of re-validating "
+             "(<name>.normalized.jsonl)",
+    )
+    parser.add_argument(
+        "--no-index",
+        dest="index",
+        action="store_false",
+        help="don't upload the page index the viewer uses to load a large transcript incrementally "
+             "(<name>.index.json)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_BYTES,
+        metavar="BYTES",
+        help="split a main transcript larger than this into ordered part files (0 disables)",
+    )
+
+
+def staging_options(args: argparse.Namespace) -> dict:
+    """The staging options a publish used, recorded so an unchanged session can be skipped without restaging."""
+    return {
+        "secrets": args.secrets,
+        "compact": args.compact,
+        "extract_images": args.extract_images,
+        "compress": args.compress,
+        "dedupe_files": args.dedupe_files,
+        "normalize": args.normalize,
+        "index": args.index,
+        "chunk_size": args.chunk_size,
+    }
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("session_id", nargs="?", default="")
+    parser.add_argument(
+        "--new-gist",
+        action="store_true",
+        help="always create a new gist, even if this session was published before",
+    )
+    parser.add_argument(
+        "--use-gh",
+        action="store_true",
+        help="publish through gh CLI subprocesses instead of the GitHub API",
+    )
+    add_staging_options(parser)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after publishing, keep the gist updated as the session grows, until interrupted",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=DEFAULT_WATCH_INTERVAL,
+        metavar="SECONDS",
+        help=f"with --watch, the minimum time between updates (default: {DEFAULT_WATCH_INTERVAL:g})",
+    )
+    parser.add_argument(
+        "--watch-poll",
+        action="store_true",
+        help="with --watch, poll the transcripts for changes instead of using inotify",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        default=bool(os.environ.get("SESSION_SHARE_TIMINGS")),
+        help="print per-phase latency to stderr (or set SESSION_SHARE_TIMINGS=1)",
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="write a Chrome trace of the publish to PATH (default: the cache's traces/ directory) "
+             "and print a summary (or set SESSION_SHARE_TRACE to a path or 1)",
+    )
+    return parser.parse_args(argv)
+
+
 def main():
-    if len(sys.argv) < 2 or not sys.argv[1]:
+    args = parse_args(sys.argv[1:])
+    if not args.session_id:
         print("Error: Session ID not provided.")
         sys.exit(1)
 
-    session_id = sys.argv[1]
+    session_id = args.session_id
+    trace_path = tracing.trace_path_from_env("publish") if args.trace is None else args.trace
+    if trace_path is not None:
+        tracing.start_tracing("publish")
+        # Also written when the publish fails, which is when it is most wanted
+        atexit.register(tracing.finish_tracing, trace_path or tracing.default_trace_path("publish"))
+    timer = PhaseTimer(args.timings)
 
-    transcript_paths = find_transcript_paths(session_id)
+    # The version check only needs the network, so overlap it with the publish. It
+    # is answered from its on-disk cache (no request at all) within its TTL.
+    version_future = run_in_background(run_version_check, timer)
+
+    with timer.phase("find"):
+        transcript_paths = find_transcript_paths(session_id)
 
     if not transcript_paths:
         print(f"Error: Transcripts not found for session: {session_id}")
         sys.exit(1)
+    sources = source_fingerprint(transcript_paths)
+
+    with tempfile.TemporaryDirectory(prefix="session-share-") as staging_dir:
+        try:
+            upload_paths = stage_transcripts(transcript_paths, args, staging_dir, timer)
+        except FileBudgetError as e:
+            print(f"Error: not publishing a session the viewer couldn't load: {e}")
+            sys.exit(1)
 
-    gist_id = create_gist(transcript_paths, "")
-    viewer_url = f"https://custardseed.com/g/{gist_id}"
-    update_gist_description(gist_id, f"Claude Code session transcript: {viewer_url}")
+        with timer.phase("hash"):
+            file_hashes = {os.path.basename(p): file_sha256(p) for p in upload_paths}
+        previous = None if args.new_gist else load_published(session_id)
 
+        client = make_gist_client(args.use_gh, timer)
+        try:
+            if previous and republish_changed_files(previous, upload_paths, file_hashes, client, timer):
+                gist_id = previous["gist_id"]
+            else:
+                gist_id = publish_new_gist(upload_paths, client, timer)
+        finally:
+            if client is not None:
+                client.close()
+                if args.timings and client.cache is not None and client.cache.hits + client.cache.misses:
+                    print(client.cache.summary(), file=sys.stderr)
+
+    try:
+        save_published(session_id, gist_id, file_hashes, sources, staging_options(args))
+    except OSError as e:
+        print(f"Warning: could not record publish state: {e}", file=sys.stderr)
+
+    viewer_url = viewer_url_for(gist_id)
     file_count = len(transcript_paths)
     subagent_count = file_count - 1
     if subagent_count > 0:
@@ -91,6 +1016,17 @@ def main():
     else:
         print(f"Session published: {viewer_url}")
 
+    # Never wait on a slow version check: fall back to the last cached answer. The
+    # check runs on a daemon thread, so exiting doesn't wait for it either.
+    update_message = version_future.result() if version_future.done() else check_for_update(use_network=False)
+    if update_message:
+        print(f"\n{update_message}")
+
+    timer.report()
+    if args.watch:
+        watch_session(session_id, gist_id, file_hashes, args, timer)
+        timer.report()
+
 
 if __name__ == "__main__":
     main()
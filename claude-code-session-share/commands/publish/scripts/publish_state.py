@@ -0,0 +1,71 @@
+"""Remember which gist each session was published to, and what was uploaded.
+
+Each published session gets a small record in the plugin cache dir:
+
+    published/<session_id>.json  {"gist_id": ..., "files": {gist filename: sha256},
+                                  "sources": {transcript path: [size, mtime_ns]},
+                                  "options": {staging option: value}}
+
+so a later publish of the same session can update that gist with only the
+files whose content changed. The sources and options let bulk publishing
+skip a session whose transcripts haven't changed without staging it again.
+"""
+import hashlib
+import os
+
+from plugin_cache import read_json_cache, write_json_cache
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _record_name(session_id: str) -> str:
+    return os.path.join("published", f"{session_id}.json")
+
+
+def load_published(session_id: str) -> dict | None:
+    """Return the previous publish record for a session, or None if it was never published."""
+    record = read_json_cache(_record_name(session_id))
+    if not record.get("gist_id"):
+        return None
+    record.setdefault("files", {})
+    return record
+
+
+def source_fingerprint(paths: list[str]) -> dict[str, list[int]]:
+    """The size and mtime of each transcript a publish read."""
+    fingerprint = {}
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint[path] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def save_published(session_id: str, gist_id: str, file_hashes: dict[str, str],
+                   sources: dict[str, list[int]] | None = None, options: dict | None = None) -> None:
+    record: dict = {"gist_id": gist_id, "files": file_hashes}
+    if sources is not None:
+        record["sources"] = sources
+    if options is not None:
+        record["options"] = options
+    write_json_cache(_record_name(session_id), record)
+
+
+def is_unchanged(previous: dict | None, sources: dict[str, list[int]], options: dict) -> bool:
+    """Whether a session's last publish read exactly these transcripts, unmodified, with these options."""
+    return previous is not None and previous.get("sources") == sources and previous.get("options") == options
+
+
+def diff_files(previous_hashes: dict[str, str], current_hashes: dict[str, str]) -> tuple[list[str], list[str]]:
+    """Return (changed or new filenames, filenames no longer present) between two publishes."""
+    changed = [name for name, digest in current_hashes.items() if previous_hashes.get(name) != digest]
+    removed = [name for name in previous_hashes if name not in current_hashes]
+    return changed, removed
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""Best-effort detection of secrets in transcripts before they are published.
+
+Sessions routinely print API keys, tokens and passwords: `env` output, a
+config file that was read, a curl command with a bearer token. Each transcript
+is streamed once, in large blocks. Every pattern has a probe, a cheap regex
+starting with a literal character, and the probes that start with the same
+character share one pass over the block, which re runs at close to memory
+speed. Base64 payloads of images and documents are left out of those passes.
+Lines no probe matches never reach the JSON parser or the full patterns.
+
+Lines that do match are parsed, and the patterns whose probes matched run
+over the entry's string leaves: message text, tool inputs and tool results,
+again skipping base64 payloads. Keyword assignments such as
+`password = "..."` only count when the value looks random enough
+(SECRET_ENTROPY_BITS), which leaves out placeholders. Transcripts of
+PARALLEL_SCAN_BYTES or more are scanned in line-aligned ranges on a process
+pool. Findings are then either redacted in a staged copy of the transcript or
+reported so the publish can be aborted.
+
+Run as a script to scan files and report findings and throughput without
+changing anything:
+
+    python3 secret_scan.py <transcript.jsonl>...
+"""
+import json
+import math
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import tracing
+from transcript_lines import entry_line
+
+# kind -> (probe, pattern). The probe is a cheap regex, starting with a literal character, that
+# any match of the pattern contains. Only strings and lines the probe matches are searched.
+SECRET_PATTERNS = {
+    "aws_access_key": (r"A(?:3T|KIA|SIA|BIA|CCA)",
+                       r"(?:A3T[A-Z0-9]|AKIA|ASIA|ABIA|ACCA)[A-Z0-9]{16}(?![A-Z0-9])"),
+    "github_token": (r"gh[pousr]_|github_pat_",
+                     r"gh[pousr]_[A-Za-z0-9]{36,}|github_pat_[A-Za-z0-9_]{22,}"),
+    "slack_token": (r"xox", r"xox[abposr]-[A-Za-z0-9-]{10,}"),
+    "private_key": (r"PRIVATE KEY-----",
+                    r"-----BEGIN [A-Z ]*PRIVATE KEY-----[\s\S]*?(?:-----END [A-Z ]*PRIVATE KEY-----|$)"),
+    "stripe_key": (r"k_live_", r"[rs]k_live_[0-9A-Za-z]{24,}"),
+    "google_api_key": (r"AIza", r"AIza[0-9A-Za-z_-]{35}"),
+    "anthropic_api_key": (r"-ant-", r"sk-ant-[A-Za-z0-9_-]{20,}"),
+    "openai_api_key": (r"T3BlbkFJ", r"sk-(?:proj-)?[A-Za-z0-9_-]{20,}T3BlbkFJ[A-Za-z0-9_-]{20,}"),
+    "jwt": (r"\.eyJ", r"eyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}"),
+}
+
+# `password = "..."` and the like: an assignment right after one of these, in any case.
+# Like the probes, each starts with a literal character.
+SECRET_KEYWORDS = (r"passw(?:or)?d", r"secret", r"api[_-]?key", r"access[_-]token", r"auth[_-]token")
+ASSIGNED_SECRET_PATTERN = r"[\w-]*[\"']?\s*[:=]\s*[\"']?(?P<value>[A-Za-z0-9_\-+/=.~!@#$%^&*]{12,})"
+SECRET_ENTROPY_BITS = 3.0
+
+# Image and document blocks carry "source":{"type":"base64","media_type":...,"data":"..."}
+SOURCE_KEY = b'"source":{'
+DATA_KEY = b'"data":"'
+BASE64_TYPE = b'"type":"base64"'
+SOURCE_WINDOW = 100
+
+REDACTED = "[REDACTED:{kind}]"
+BLOCK_SIZE = 4 * 1024 * 1024
+# Files at least this big are scanned in ranges of about RANGE_SIZE bytes on a process pool
+PARALLEL_SCAN_BYTES = 16 * 1024 * 1024
+RANGE_SIZE = 8 * 1024 * 1024
+MAX_REPORTED_FINDINGS = 20
+
+_DETECTORS = tuple(
+    (kind, re.compile(probe), re.compile(pattern)) for kind, (probe, pattern) in SECRET_PATTERNS.items()
+)
+# ASCII-only case folding, as the probes get from bytes.lower(). Matching on the text itself keeps the
+# offsets right: str.lower() changes the length of some strings ("İ" becomes two characters).
+_KEYWORDS = tuple(re.compile(keyword, re.IGNORECASE | re.ASCII) for keyword in SECRET_KEYWORDS)
+_ASSIGNED_SECRET = re.compile(ASSIGNED_SECRET_PATTERN)
+# A keyword only makes a line a candidate when something is assigned to it. Quotes in
+# strings are escaped in the raw JSON, hence the backslashes.
+_KEYWORD_ASSIGNMENT_PROBE = r"""[\w-]*[\\"']*\s*[:=]"""
+
+
+def _block_probes():
+    """Group the probes into the passes made over each block of a transcript.
+
+    Python's re finds a pattern quickly only when every branch starts with the same
+    character: it then searches for that character instead of trying every position. An
+    alternation of all the probes would run an order of magnitude slower than this pass per
+    first character. Returns (lowercase, probe, detectors, keywords) for each pass.
+    """
+    groups: dict[tuple[bool, str], tuple[list, list, list]] = {}
+    for detector, (probe, _) in zip(_DETECTORS, SECRET_PATTERNS.values()):
+        branches, detectors, _ = groups.setdefault((False, probe.lstrip("\\")[0]), ([], [], []))
+        branches.append(probe)
+        detectors.append(detector)
+    for keyword, pattern in zip(_KEYWORDS, SECRET_KEYWORDS):
+        branches, _, keywords = groups.setdefault((True, pattern[0]), ([], [], []))
+        branches.append(pattern)
+        keywords.append(keyword)
+    passes = []
+    for (lowercase, _), (branches, detectors, keywords) in groups.items():
+        probe = f"(?:{'|'.join(branches)})" + (_KEYWORD_ASSIGNMENT_PROBE if lowercase else "")
+        passes.append((lowercase, re.compile(probe.encode()), tuple(detectors), tuple(keywords)))
+    return tuple(passes)
+
+
+_BLOCK_PROBES = _block_probes()
+
+
+@dataclass
+class SecretFinding:
+    filename: str
+    line: int
+    kind: str
+    preview: str
+
+
+@dataclass
+class SecretScanStats:
+    bytes_scanned: int = 0
+    seconds: float = 0.0
+    findings: list[SecretFinding] = field(default_factory=list)
+    redacted_files: int = 0
+
+    def throughput(self) -> str:
+        rate = self.bytes_scanned / self.seconds / 1e6 if self.seconds else float("inf")
+        return (f"Scanned {self.bytes_scanned / 1e6:.1f} MB for secrets in {self.seconds * 1000:.0f} ms "
+                f"({rate:.0f} MB/s)")
+
+    def report(self) -> str:
+        kinds = Counter(finding.kind for finding in self.findings)
+        lines = [
+            f"Found {len(self.findings)} possible secret(s): "
+            + ", ".join(f"{count} {kind}" for kind, count in kinds.most_common())
+        ]
+        for finding in self.findings[:MAX_REPORTED_FINDINGS]:
+            lines.append(f"  {finding.filename}:{finding.line}: {finding.kind} {finding.preview}")
+        if len(self.findings) > MAX_REPORTED_FINDINGS:
+            lines.append(f"  ... and {len(self.findings) - MAX_REPORTED_FINDINGS} more")
+        return "\n".join(lines)
+
+
+def shannon_entropy(text: str) -> float:
+    """Bits of entropy per character of text."""
+    counts = Counter(text)
+    return -sum(n / len(text) * math.log2(n / len(text)) for n in counts.values())
+
+
+def _looks_random(value: str) -> bool:
+    # Leaves out placeholders like "your-api-key-here" and references like "os.environ"
+    has_digit = any(c.isdigit() for c in value)
+    has_letter = any(c.isalpha() for c in value)
+    return has_digit and has_letter and shannon_entropy(value) >= SECRET_ENTROPY_BITS
+
+
+def find_secrets(text: str, detectors=_DETECTORS, keywords=_KEYWORDS) -> list[tuple[str, int, int]]:
+    """Return (kind, start, end) for each secret in one string, in order and without overlaps.
+
+    detectors and keywords narrow the search to some of _DETECTORS and _KEYWORDS.
+    """
+    found = []
+    for kind, probe, pattern in detectors:
+        if not probe.search(text):
+            continue
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            # Part of a longer word isn't a token
+            if start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"):
+                continue
+            found.append((kind, start, end))
+
+    for keyword in keywords:
+        for keyword_match in keyword.finditer(text):
+            match = _ASSIGNED_SECRET.match(text, keyword_match.end())
+            if match and _looks_random(match["value"]):
+                found.append(("assigned_secret", *match.span("value")))
+
+    found.sort(key=lambda secret: (secret[1], -secret[2]))
+    result = []
+    for secret in found:
+        if not result or secret[1] >= result[-1][2]:
+            result.append(secret)
+    return result
+
+
+def _text_segments(data: bytes) -> list[tuple[int, int]]:
+    """The (start, end) ranges of data outside the base64 payloads of images and documents."""
+    segments = []
+    start = 0
+    source = data.find(SOURCE_KEY)
+    while source != -1:
+        payload = data.find(DATA_KEY, source, source + SOURCE_WINDOW)
+        end = data.find(b'"', payload + len(DATA_KEY)) if payload != -1 else -1
+        source_end = data.find(b"}", end, end + SOURCE_WINDOW) if end != -1 else -1
+        # The type can come before or after the data, but has to be base64 either way
+        if source_end != -1 and (BASE64_TYPE in data[source:payload] or BASE64_TYPE in data[end:source_end]):
+            segments.append((start, payload + len(DATA_KEY)))
+            start = source = end
+        source = data.find(SOURCE_KEY, source + 1)
+    segments.append((start, len(data)))
+    return segments
+
+
+def _candidate_lines(data: bytes) -> dict[int, tuple[list, list]]:
+    """Find the lines in data (whole lines only) that a probe matches outside base64 payloads.
+
+    Returns {line offset: (detectors, keywords)}, the ones whose probes matched that line.
+    """
+    segments = _text_segments(data)
+    lowered = data.lower()
+    lines: dict[int, tuple[list, list]] = {}
+    for lowercase, probe, detectors, keywords in _BLOCK_PROBES:
+        haystack = lowered if lowercase else data
+        line_end = -1
+        for segment_start, segment_end in segments:
+            match = probe.search(haystack, max(segment_start, line_end + 1), segment_end)
+            while match:
+                position = match.start()
+                line_start = data.rfind(b"\n", 0, position) + 1
+                line_detectors, line_keywords = lines.setdefault(line_start, ([], []))
+                line_detectors.extend(detectors)
+                line_keywords.extend(keywords)
+                # One hit is enough for a line: carry on from the next one
+                line_end = data.find(b"\n", position)
+                if line_end == -1:
+                    line_end = len(data)
+                match = probe.search(haystack, line_end + 1, segment_end)
+    return lines
+
+
+def _is_binary_payload(value: dict) -> bool:
+    # Image and document blocks carry {"type": "base64", "media_type": ..., "data": ...} sources
+    return value.get("type") == "base64" and isinstance(value.get("data"), str)
+
+
+def string_leaves(value):
+    """Yield every string in a parsed entry, except base64 payloads."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from string_leaves(item)
+    elif isinstance(value, dict) and not _is_binary_payload(value):
+        for item in value.values():
+            yield from string_leaves(item)
+
+
+def redact_strings(value, on_secret):
+    """Return value with every secret in its string leaves replaced, calling on_secret(kind, text) for each."""
+    if isinstance(value, str):
+        secrets = find_secrets(value)
+        if not secrets:
+            return value
+        pieces = []
+        last = 0
+        for kind, start, end in secrets:
+            on_secret(kind, value[start:end])
+            pieces.append(value[last:start])
+            pieces.append(REDACTED.format(kind=kind))
+            last = end
+        pieces.append(value[last:])
+        return "".join(pieces)
+    if isinstance(value, list):
+        return [redact_strings(item, on_secret) for item in value]
+    if isinstance(value, dict):
+        if _is_binary_payload(value):
+            return value
+        return {key: redact_strings(item, on_secret) for key, item in value.items()}
+    return value
+
+
+def _preview(secret: str) -> str:
+    return f"{secret[:4]}{'*' * min(len(secret) - 4, 8)}"
+
+
+def redact_line(line: bytes, on_secret) -> bytes:
+    """Redact the secrets in one JSONL line. Lines that aren't JSON are redacted as plain text."""
+    try:
+        entry = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        text = line.decode("utf-8", errors="surrogateescape")
+        return redact_strings(text, on_secret).encode("utf-8", errors="surrogateescape")
+    return entry_line(redact_strings(entry, on_secret))
+
+
+def _line_findings(line: bytes, detectors, keywords) -> list[tuple[str, str]]:
+    """(kind, preview) for each secret in the string leaves of one JSONL line."""
+    try:
+        leaves = string_leaves(json.loads(line))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        leaves = iter([line.decode("utf-8", errors="replace")])
+    return [(kind, _preview(leaf[start:end])) for leaf in leaves
+            for kind, start, end in find_secrets(leaf, detectors, keywords)]
+
+
+def _scan_range(path: str, start: int, end: int) -> tuple[int, list[tuple[int, str, str]]]:
+    """Scan bytes [start, end) of a transcript, where start is the start of a line.
+
+    Returns the number of lines in the range and a (line, kind, preview) finding for each
+    secret, with lines counted from 1 at start. Runs in worker processes for large files.
+    """
+    line_count = 0
+    findings = []
+    pending = b""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while True:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            remaining -= len(block)
+            data = pending + block
+            if block:
+                # Only look at whole lines; the remainder is carried into the next block
+                cut = data.rfind(b"\n") + 1
+                data, pending = data[:cut], data[cut:]
+            counted = 0
+            candidates = _candidate_lines(data)
+            for line_start in sorted(candidates):
+                line_count += data.count(b"\n", counted, line_start) + 1
+                counted = data.find(b"\n", line_start) + 1 or len(data)
+                line = data[line_start:counted]
+                findings.extend((line_count, kind, preview)
+                                for kind, preview in _line_findings(line, *candidates[line_start]))
+            line_count += data.count(b"\n", counted)
+            if not block:
+                if not data.endswith(b"\n") and counted < len(data):
+                    line_count += 1
+                return line_count, findings
+
+
+def _line_ranges(path: str, start: int, end: int) -> list[tuple[int, int]]:
+    """Split bytes [start, end) of a file into ranges of about RANGE_SIZE bytes that start and end on line
+    boundaries."""
+    bounds = [start]
+    with open(path, "rb") as f:
+        while bounds[-1] + RANGE_SIZE < end:
+            f.seek(bounds[-1] + RANGE_SIZE)
+            f.readline()
+            if f.tell() >= end:
+                break
+            bounds.append(f.tell())
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def scan_transcript(path: str, stats: SecretScanStats, executor: Executor | None = None,
+                    start: int = 0, end: int | None = None, lines_before: int = 0) -> set[int]:
+    """Record the secrets in one transcript in stats. Returns the numbers of the lines holding them.
+
+    Scans bytes [start, end) if given, where start begins the line after the first lines_before
+    (--watch scans only what was appended). Ranges of PARALLEL_SCAN_BYTES or more are scanned in
+    parts on executor, if given.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    stats.bytes_scanned += end - start
+    if executor is not None and end - start >= PARALLEL_SCAN_BYTES:
+        ranges = _line_ranges(path, start, end)
+        results = executor.map(_scan_range, [path] * len(ranges), *zip(*ranges))
+    else:
+        results = [_scan_range(path, start, end)]
+
+    filename = os.path.basename(path)
+    lines = set()
+    for line_count, findings in results:
+        for line_number, kind, preview in findings:
+            stats.findings.append(SecretFinding(filename, lines_before + line_number, kind, preview))
+            lines.add(lines_before + line_number)
+        lines_before += line_count
+    return lines
+
+
+def redact_transcript(src_path: str, dest_path: str, lines: set[int]) -> None:
+    """Copy a transcript, redacting the given lines (found by scan_transcript)."""
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        for line_number, line in enumerate(src, start=1):
+            if line_number in lines:
+                line = redact_line(line, lambda kind, secret: None)
+            dest.write(line)
+
+
+def scan_secrets(transcript_paths: list[str], staging_dir: str,
+                 redact: bool) -> tuple[list[str], SecretScanStats]:
+    """Scan every transcript for secrets, and with redact=True stage redacted copies of those that have any.
+
+    Returns the paths to upload (transcripts without secrets are left where they are) and stats.
+    """
+    stats = SecretScanStats()
+    start = time.perf_counter()
+    transcripts = [p for p in transcript_paths if p.endswith(".jsonl")]
+    executor = None
+    workers = os.cpu_count() or 1
+    if workers > 1 and any(os.path.getsize(p) >= PARALLEL_SCAN_BYTES for p in transcripts):
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        tracing.count("subprocesses", workers)
+    result = []
+    try:
+        for path in transcript_paths:
+            lines = scan_transcript(path, stats, executor) if path in transcripts else set()
+            if lines and redact:
+                dest_path = os.path.join(staging_dir, os.path.basename(path))
+                tmp_path = dest_path + ".tmp"
+                redact_transcript(path, tmp_path, lines)
+                os.replace(tmp_path, dest_path)
+                stats.redacted_files += 1
+                path = dest_path
+            result.append(path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    stats.seconds = time.perf_counter() - start
+    return result, stats
+
+
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        print(f"Usage: {os.path.basename(sys.argv[0])} <transcript.jsonl>...", file=sys.stderr)
+        sys.exit(2)
+    _, stats = scan_secrets(paths, "", redact=False)
+    if stats.findings:
+        print(stats.report())
+    print(stats.throughput())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Persistent session-id -> project directory index for ~/.claude/projects.
+
+Looking a session up with a glob touches every project directory. The index
+remembers which project each session lives in, plus each project directory's
+mtime, so a lookup reads one small shard file and a refresh only rescans the
+project directories that changed since the last one.
+
+Layout under the plugin cache dir, one directory per projects dir:
+
+    session-index/<projects-dir-hash>/projects.json   project -> mtime + session ids
+    session-index/<projects-dir-hash>/shard-<xx>.json session id -> project
+"""
+import hashlib
+import os
+import re
+
+from plugin_cache import read_json_cache, write_json_cache
+
+INDEX_VERSION = 1
+
+
+def get_projects_dir() -> str:
+    """Return Claude Code's projects directory (respects CLAUDE_CONFIG_DIR)."""
+    claude_dir = os.environ.get("CLAUDE_CONFIG_DIR") or os.path.expanduser("~/.claude")
+    return os.path.join(claude_dir, "projects")
+
+
+def project_dir_name_for_cwd(cwd: str) -> str:
+    """Return the project directory name Claude Code uses for a working directory."""
+    return re.sub(r"[^a-zA-Z0-9]", "-", cwd)
+
+
+def _scan_project_sessions(project_path: str) -> list[str]:
+    """Return the session ids of the top-level transcripts in one project directory."""
+    session_ids = []
+    try:
+        with os.scandir(project_path) as it:
+            for entry in it:
+                if entry.name.endswith(".jsonl") and entry.is_file():
+                    session_ids.append(entry.name[: -len(".jsonl")])
+    except OSError:
+        pass
+    return session_ids
+
+
+def _scan_projects(projects_dir: str) -> dict[str, list[str]]:
+    """Return project -> session ids by listing every project directory."""
+    projects = {}
+    try:
+        with os.scandir(projects_dir) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        projects[entry.name] = _scan_project_sessions(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return projects
+
+
+def _shard_key(session_id: str) -> str:
+    return hashlib.sha1(session_id.encode()).hexdigest()[:2]
+
+
+class SessionIndex:
+    """Session-id -> project directory index, persisted in the plugin cache dir."""
+
+    def __init__(self, projects_dir: str):
+        self.projects_dir = projects_dir
+        dir_hash = hashlib.sha1(os.path.abspath(projects_dir).encode()).hexdigest()[:12]
+        self.cache_prefix = os.path.join("session-index", dir_hash)
+        self._shards: dict[str, dict[str, str]] = {}
+        self._dirty_shards: set[str] = set()
+
+    def _load_shard(self, key: str) -> dict[str, str]:
+        if key not in self._shards:
+            data = read_json_cache(os.path.join(self.cache_prefix, f"shard-{key}.json"))
+            self._shards[key] = data.get("sessions", {}) if data.get("version") == INDEX_VERSION else {}
+        return self._shards[key]
+
+    def _set_session(self, session_id: str, project: str | None) -> None:
+        key = _shard_key(session_id)
+        shard = self._load_shard(key)
+        if project is None:
+            if shard.pop(session_id, None) is not None:
+                self._dirty_shards.add(key)
+        elif shard.get(session_id) != project:
+            shard[session_id] = project
+            self._dirty_shards.add(key)
+
+    def save(self) -> None:
+        for key in self._dirty_shards:
+            write_json_cache(
+                os.path.join(self.cache_prefix, f"shard-{key}.json"),
+                {"version": INDEX_VERSION, "sessions": self._shards[key]},
+            )
+        self._dirty_shards.clear()
+
+    def _transcript_path(self, project: str, session_id: str) -> str:
+        return os.path.join(self.projects_dir, project, f"{session_id}.jsonl")
+
+    def lookup(self, session_id: str) -> str | None:
+        """Return the indexed transcript path, or None if unknown or stale."""
+        project = self._load_shard(_shard_key(session_id)).get(session_id)
+        if project is None:
+            return None
+        path = self._transcript_path(project, session_id)
+        if os.path.isfile(path):
+            return path
+        self._set_session(session_id, None)
+        return None
+
+    def record(self, path: str) -> None:
+        """Remember a transcript path found by some other means (e.g. the glob fallback)."""
+        project = os.path.basename(os.path.dirname(path))
+        session_id = os.path.basename(path)[: -len(".jsonl")]
+        self._set_session(session_id, project)
+
+    def probe_project(self, project: str, session_id: str) -> str | None:
+        """Check a single likely project directory without a full refresh."""
+        path = self._transcript_path(project, session_id)
+        if os.path.isfile(path):
+            self.record(path)
+            return path
+        return None
+
+    def refresh(self) -> None:
+        """Rescan only the project directories whose mtime changed since the last refresh.
+
+        Adding or removing a transcript bumps its directory's mtime, so unchanged
+        directories can be skipped without listing their contents.
+        """
+        projects_cache = os.path.join(self.cache_prefix, "projects.json")
+        data = read_json_cache(projects_cache)
+        projects = data.get("projects", {}) if data.get("version") == INDEX_VERSION else {}
+
+        changed: dict[str, int] = {}
+        seen = set()
+        try:
+            with os.scandir(self.projects_dir) as it:
+                for entry in it:
+                    try:
+                        if not entry.is_dir():
+                            continue
+                        mtime_ns = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    seen.add(entry.name)
+                    if projects.get(entry.name, {}).get("mtime_ns") != mtime_ns:
+                        changed[entry.name] = mtime_ns
+        except OSError:
+            return
+
+        removed = projects.keys() - seen
+        if not changed and not removed:
+            return
+
+        for project in removed:
+            for session_id in projects.pop(project)["sessions"]:
+                self._set_session(session_id, None)
+
+        for project, mtime_ns in changed.items():
+            old_sessions = set(projects.get(project, {}).get("sessions", []))
+            new_sessions = _scan_project_sessions(os.path.join(self.projects_dir, project))
+            for session_id in old_sessions.difference(new_sessions):
+                self._set_session(session_id, None)
+            for session_id in new_sessions:
+                self._set_session(session_id, project)
+            projects[project] = {"mtime_ns": mtime_ns, "sessions": new_sessions}
+
+        write_json_cache(projects_cache, {"version": INDEX_VERSION, "projects": projects})
+
+    def list_sessions(self) -> dict[str, list[str]]:
+        """Refresh, then return project -> session ids for every project directory.
+
+        Lists the project directories directly when the cache dir is unusable.
+        """
+        try:
+            self.refresh()
+        except OSError:
+            return _scan_projects(self.projects_dir)
+        data = read_json_cache(os.path.join(self.cache_prefix, "projects.json"))
+        projects = data.get("projects", {}) if data.get("version") == INDEX_VERSION else {}
+        return {project: info["sessions"] for project, info in projects.items()}
+
+
+def find_indexed_transcript(session_id: str, projects_dir: str) -> str | None:
+    """Resolve a session's main transcript via the index, refreshing it on a miss.
+
+    Returns None when the index can't find the session or its cache dir is
+    unusable; callers fall back to a glob.
+    """
+    index = SessionIndex(projects_dir)
+    try:
+        path = index.lookup(session_id)
+        if path is None:
+            # The session being published almost always belongs to the current directory
+            path = index.probe_project(project_dir_name_for_cwd(os.getcwd()), session_id)
+        if path is None:
+            index.refresh()
+            path = index.lookup(session_id)
+    except OSError:
+        # The index is only a cache; a missing or unwritable cache dir must not stop a lookup
+        return None
+    try:
+        index.save()
+    except OSError:
+        pass
+    return path
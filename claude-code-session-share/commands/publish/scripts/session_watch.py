@@ -0,0 +1,177 @@
+"""Notice when a session's transcripts change, for `publish_session.py --watch`.
+
+A session is its main transcript, `<project>/<session_id>.jsonl`, plus
+anything under `<project>/<session_id>/`, where subagent transcripts appear
+as the session runs. On Linux the watcher uses inotify, through libc, so
+waiting for a change costs nothing. Elsewhere, or when inotify is unavailable
+(for example when the watch limit is used up), it polls file sizes and
+modification times instead.
+
+Both watchers only say that something changed, not what: the publish script
+stages whatever was appended to the transcripts and uploads whichever files
+came out different.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+POLL_INTERVAL = 1.0
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+class PollingWatcher:
+    """Compares the size and mtime of every file in the session once per poll interval."""
+
+    def __init__(self, main_path: str, session_dir: str, interval: float = POLL_INTERVAL):
+        self.main_path = main_path
+        self.session_dir = session_dir
+        self.interval = interval
+        self._last = self._snapshot()
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        paths = [self.main_path]
+        for dirpath, _, filenames in os.walk(self.session_dir):
+            paths.extend(os.path.join(dirpath, name) for name in filenames)
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the session changes or timeout seconds pass. Returns whether it changed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._snapshot()
+            if current != self._last:
+                self._last = current
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Watches the project directory for the main transcript, and the session directory tree."""
+
+    def __init__(self, main_path: str, session_dir: str):
+        self.main_name = os.fsencode(os.path.basename(main_path))
+        self.session_name = os.fsencode(os.path.basename(session_dir))
+        self.session_dir = session_dir
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch descriptor -> directory, for the project directory and every directory under the session's
+        self.dirs: dict[int, str] = {}
+        try:
+            self.project_wd = self._add_watch(os.path.dirname(main_path))
+            self._watch_tree(session_dir)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.dirs[wd] = path
+        return wd
+
+    def _watch_tree(self, root: str) -> None:
+        """Watch root and the directories below it, if it exists yet."""
+        for dirpath, _, _ in os.walk(root):
+            self._add_watch(dirpath)
+
+    def _relevant(self, wd: int, mask: int, name: bytes) -> bool:
+        if mask & IN_Q_OVERFLOW:
+            return True
+        if wd == self.project_wd:
+            if name == self.session_name and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(self.session_dir)
+                return True
+            return name == self.main_name
+        if wd in self.dirs:
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(os.path.join(self.dirs[wd], os.fsdecode(name)))
+            return True
+        return False
+
+    def _read_events(self) -> bool:
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                changed = self._relevant(wd, mask, name) or changed
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the session changes or timeout seconds pass. Returns whether it changed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if readable and self._read_events():
+                return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(main_path: str, session_dir: str, polling: bool = False) -> InotifyWatcher | PollingWatcher:
+    """An inotify watcher where possible, otherwise a polling one."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(main_path, session_dir)
+        except (OSError, AttributeError):
+            # No libc symbol, or inotify refused (e.g. the watch limit is reached)
+            pass
+    return PollingWatcher(main_path, session_dir)
+
+
+def ends_mid_line(paths: list[str]) -> bool:
+    """Whether any of the files doesn't end with a newline, i.e. a line is still being written."""
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    return True
+        except OSError:
+            # Empty or vanished files have no partial line
+            continue
+    return False
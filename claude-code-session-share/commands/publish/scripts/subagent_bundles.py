@@ -0,0 +1,134 @@
+"""Bundle the subagent transcripts of large multi-agent sessions into a few files.
+
+Each subagent writes its own `agent-<id>.jsonl`, so a session that fans out
+to hundreds of agents would need hundreds of gist files, past what a gist
+lists (300 files) and what fits in one API request. Above MAX_SUBAGENT_FILES
+transcripts, they are concatenated into at most MAX_BUNDLE_FILES
+`agent-bundle-NNNN.jsonl` files, alongside an `agent-bundles.json` manifest
+giving each agent's bundle, byte offset and length. The viewer reads the
+manifest and fetches one agent's byte range when that agent is opened.
+
+Agents are packed in the order they started, by the timestamp of their
+first entry, and never split across bundles. Bundles close at a fixed
+BUNDLE_TARGET_BYTES, so an agent that starts later only ever joins the last
+bundle or opens a new one: a republish leaves the closed bundles untouched
+unless one of their agents was still running. Past MAX_BUNDLE_FILES bundles,
+the rest go into the last one.
+"""
+import hashlib
+import json
+import os
+
+BUNDLE_MANIFEST_FILENAME = "agent-bundles.json"
+BUNDLE_FORMAT = "session-share-agent-bundles"
+BUNDLE_VERSION = 1
+SUBAGENT_PREFIX = "agent-"
+MAX_SUBAGENT_FILES = 32
+MAX_BUNDLE_FILES = 64
+BUNDLE_TARGET_BYTES = 1_000_000
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def bundle_filename(index: int) -> str:
+    return f"{SUBAGENT_PREFIX}bundle-{index:04d}.jsonl"
+
+
+def agent_id_of(path: str) -> str:
+    """The agent id a subagent transcript is named after (agent-<id>.jsonl)."""
+    return os.path.basename(path).removesuffix(".jsonl").removeprefix(SUBAGENT_PREFIX)
+
+
+def start_time(path: str) -> str | None:
+    """The timestamp of a transcript's first entry, or None if it has none."""
+    try:
+        with open(path, "rb") as f:
+            entry = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    timestamp = entry.get("timestamp") if isinstance(entry, dict) else None
+    return timestamp if isinstance(timestamp, str) else None
+
+
+def start_order(paths: list[str]) -> list[str]:
+    """Subagent transcripts in the order their agents started; ones without a start time go last."""
+    keyed = [(start_time(p), os.path.basename(p), p) for p in paths]
+    return [p for _, _, p in sorted(keyed, key=lambda k: (k[0] is None, k[0] or "", k[1]))]
+
+
+def plan_bundles(sizes: list[int], max_bundles: int = MAX_BUNDLE_FILES) -> list[list[int]]:
+    """Group transcript indices, in order, into runs of up to BUNDLE_TARGET_BYTES, at most max_bundles of them.
+
+    A bundle closes when the next transcript doesn't fit, so each bundle depends only on the
+    transcripts before it and appending transcripts never changes a closed bundle.
+    """
+    bundles: list[list[int]] = []
+    bundle_bytes = 0
+    for i, size in enumerate(sizes):
+        if not bundles or (bundle_bytes + size > BUNDLE_TARGET_BYTES and len(bundles) < max_bundles):
+            bundles.append([])
+            bundle_bytes = 0
+        bundles[-1].append(i)
+        bundle_bytes += size
+    return bundles
+
+
+def subagent_file_count(paths: list[str], max_files: int = MAX_SUBAGENT_FILES) -> int:
+    """How many gist files bundle_subagents turns these subagent transcripts into."""
+    if len(paths) <= max_files:
+        return len(paths)
+    return len(plan_bundles([os.path.getsize(p) for p in start_order(paths)])) + 1
+
+
+def bundle_subagents(paths: list[str], staging_dir: str, max_files: int = MAX_SUBAGENT_FILES,
+                     previous: dict | None = None) -> list[str]:
+    """Concatenate subagent transcripts into bundles once there are more than max_files of them.
+
+    Returns the bundle paths followed by the manifest path, or paths unchanged if there are few enough.
+    previous is the manifest of bundles already in staging_dir, written from the same transcripts
+    when they were shorter (publish_session.py --watch): bundles that would hold the same byte
+    ranges are left as they are.
+    """
+    if len(paths) <= max_files:
+        return paths
+
+    paths = start_order(paths)
+    sizes = [os.path.getsize(p) for p in paths]
+    previous_bundles = {bundle["filename"]: bundle for bundle in previous["bundles"]} if previous else {}
+    bundle_paths = []
+    bundles = []
+    agents = {}
+    for n, members in enumerate(plan_bundles(sizes), start=1):
+        filename = bundle_filename(n)
+        bundle_path = os.path.join(staging_dir, filename)
+        members_agents = {}
+        offset = 0
+        for i in members:
+            members_agents[agent_id_of(paths[i])] = {
+                "filename": os.path.basename(paths[i]),
+                "bundle": filename,
+                "offset": offset,
+                "length": sizes[i],
+            }
+            offset += sizes[i]
+        agents.update(members_agents)
+        bundle_paths.append(bundle_path)
+        if filename in previous_bundles and members_agents == {
+            agent_id: agent for agent_id, agent in previous["agents"].items() if agent["bundle"] == filename
+        }:
+            bundles.append(previous_bundles[filename])
+            continue
+
+        digest = hashlib.sha256()
+        with open(bundle_path, "wb") as out:
+            for i in members:
+                with open(paths[i], "rb") as src:
+                    while chunk := src.read(COPY_CHUNK_SIZE):
+                        out.write(chunk)
+                        digest.update(chunk)
+        bundles.append({"filename": filename, "bytes": offset, "sha256": digest.hexdigest()})
+
+    manifest_path = os.path.join(staging_dir, BUNDLE_MANIFEST_FILENAME)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "bundles": bundles, "agents": agents},
+                  f, indent=2)
+    return bundle_paths + [manifest_path]
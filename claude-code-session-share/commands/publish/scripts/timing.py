@@ -0,0 +1,38 @@
+"""Per-phase wall-clock timing for the publish script."""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import tracing
+
+
+class PhaseTimer:
+    """Collects (phase, seconds) pairs. Safe to use from worker threads.
+
+    Each phase is also a tracing span, recorded when tracing is on.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            with tracing.span(name):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases.append((name, elapsed))
+
+    def report(self, file=sys.stderr) -> None:
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.start
+        parts = [f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in self.phases]
+        print(f"Timings: {' '.join(parts)} total={total * 1000:.0f}ms", file=file)
@@ -0,0 +1,177 @@
+"""Opt-in tracing for the publish and sample-fetching scripts.
+
+With `--trace` (or SESSION_SHARE_TRACE set), every timed phase becomes a span,
+and the run is written out as Chrome trace-event JSON, which chrome://tracing
+and https://ui.perfetto.dev can open. A one-line summary is also printed. When
+tracing is off, span() and count() do nothing, so call sites can leave them in.
+
+Spans nest per thread, and each records its wall time plus these counters:
+
+- `http_requests`, `http_bytes_sent`, `http_bytes_received` and
+  `subprocesses`, added by the code that makes the request or spawns the
+  process. A count goes to every span open on the calling thread, so a span's
+  counts include its children's.
+- `read_bytes` and `write_bytes`: what the span's thread read and wrote
+  through system calls (files, pipes and sockets alike). These come from
+  /proc/thread-self/io, so they are only recorded on Linux.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from plugin_cache import get_cache_dir
+
+TRACE_ENV = "SESSION_SHARE_TRACE"
+TRACES_DIR = "traces"
+
+_tracer: "Tracer | None" = None
+
+
+def _io_counters(path: str) -> tuple[int, int] | None:
+    """(bytes read, bytes written) through system calls, from a /proc io file, or None if unavailable."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        fields = dict(line.split(b":", 1) for line in data.splitlines() if b":" in line)
+        # Count this read as already done, so it doesn't show up in the next reading
+        return int(fields[b"rchar"]) + len(data), int(fields[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class Tracer:
+    """Collects spans as Chrome trace "complete" events. Safe to use from worker threads."""
+
+    def __init__(self, process_name: str):
+        self.process_name = process_name
+        self.start = time.perf_counter()
+        self.events: list[dict] = []
+        self.totals: Counter = Counter()
+        self.thread_names: dict[int, str] = {}
+        self._io_start = _io_counters("/proc/self/io")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _open_spans(self) -> list[Counter]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _timestamp(self, at: float) -> float:
+        # Trace events are in microseconds
+        return round((at - self.start) * 1e6, 1)
+
+    @contextmanager
+    def span(self, name: str, **args):
+        counters: Counter = Counter()
+        stack = self._open_spans()
+        stack.append(counters)
+        io_before = _io_counters("/proc/thread-self/io")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            io_after = _io_counters("/proc/thread-self/io")
+            if io_before is not None and io_after is not None:
+                counters["read_bytes"] = io_after[0] - io_before[0]
+                counters["write_bytes"] = io_after[1] - io_before[1]
+            thread = threading.current_thread()
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": self._timestamp(start),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": {**args, **counters},
+            }
+            with self._lock:
+                self.events.append(event)
+                self.thread_names.setdefault(thread.ident, thread.name)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        for counters in self._open_spans():
+            counters[name] += amount
+        with self._lock:
+            self.totals[name] += amount
+
+    def trace_events(self) -> list[dict]:
+        pid = os.getpid()
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.process_name}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self.thread_names.items()
+        ]
+        return metadata + sorted(self.events, key=lambda event: event["ts"])
+
+    def write(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
+
+    def summary(self, path: str) -> str:
+        wall = time.perf_counter() - self.start
+        parts = [
+            f"{len(self.events)} span(s) in {wall * 1000:.0f}ms",
+            f"{self.totals['http_requests']} HTTP round-trip(s) "
+            f"({self.totals['http_bytes_sent'] / 1024:.1f} KB up, "
+            f"{self.totals['http_bytes_received'] / 1024:.1f} KB down)",
+            f"{self.totals['subprocesses']} subprocess(es)",
+        ]
+        io_end = _io_counters("/proc/self/io")
+        if self._io_start is not None and io_end is not None:
+            parts.append(f"{(io_end[0] - self._io_start[0]) / 1e6:.1f} MB read, "
+                         f"{(io_end[1] - self._io_start[1]) / 1e6:.1f} MB written")
+        return f"Trace: {', '.join(parts)} -> {path}"
+
+
+def default_trace_path(process_name: str) -> str:
+    """Where a trace goes when no path is given: the plugin's cache directory."""
+    filename = f"{process_name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.json"
+    return os.path.join(get_cache_dir(), TRACES_DIR, filename)
+
+
+def trace_path_from_env(process_name: str) -> str | None:
+    """The trace path SESSION_SHARE_TRACE asks for: a path, or 1 for the default one. None when unset."""
+    value = os.environ.get(TRACE_ENV, "")
+    if not value or value == "0":
+        return None
+    return default_trace_path(process_name) if value == "1" else value
+
+
+def start_tracing(process_name: str) -> Tracer:
+    global _tracer
+    _tracer = Tracer(process_name)
+    return _tracer
+
+
+def finish_tracing(path: str, file=sys.stderr) -> None:
+    """Write the trace to path and print its summary. Does nothing unless tracing was started."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return
+    try:
+        tracer.write(path)
+    except OSError as e:
+        print(f"Warning: could not write trace: {e}", file=file)
+        return
+    print(tracer.summary(path), file=file)
+
+
+def span(name: str, **args):
+    """A context manager recording a span, if tracing is on."""
+    return _tracer.span(name, **args) if _tracer is not None else nullcontext()
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to a counter of the spans open on this thread, if tracing is on."""
+    if _tracer is not None:
+        _tracer.count(name, amount)
@@ -0,0 +1,130 @@
+"""Index the main transcript so the viewer can load it a page at a time.
+
+Without an index the viewer has to download and parse the whole transcript
+before it can render the first message. `<session>.index.json` records byte
+ranges in the uploaded transcript:
+
+- pages: every PAGE_ENTRIES entries, or fewer once a page passes PAGE_BYTES.
+  Each page has its first entry's index, uuid and byte offset, its entry count,
+  and its length up to the next page. Pages tile the transcript, so the
+  viewer can fetch any one with an HTTP Range request, or from the chunk parts
+  that cover it, and parse it on its own.
+- anchors: one per user turn, with its uuid, entry index, byte offset and line
+  length, so a `#msg-<uuid>` link can load the page holding it first.
+- outline: when the normalized outline is uploaded too, its filename and size,
+  and for each page the byte range of its entries' outline lines, so the viewer
+  builds a page from its outline without validating it again. The outline's
+  header line is everything before the first page's range.
+
+It also carries the session metadata, which the viewer can't work out from
+the pages it has loaded. Offsets are into the files as uploaded (after
+compaction, before chunking and compression).
+"""
+import json
+import os
+
+from normalization import OutlinedTranscript
+
+INDEX_FORMAT = "session-share-index"
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".index.json"
+PAGE_ENTRIES = 200
+PAGE_BYTES = 256 * 1024
+
+
+def index_filename(transcript_filename: str) -> str:
+    stem = transcript_filename.removesuffix(".jsonl")
+    return f"{stem}{INDEX_SUFFIX}"
+
+
+def page_starts(offsets: list[int], page_entries: int = PAGE_ENTRIES, page_bytes: int = PAGE_BYTES) -> list[int]:
+    """Indices of the entries that start a page."""
+    starts: list[int] = []
+    for index, offset in enumerate(offsets):
+        if not starts or index - starts[-1] >= page_entries or offset - offsets[starts[-1]] >= page_bytes:
+            starts.append(index)
+    return starts
+
+
+def outline_line_offsets(normalized_path: str) -> list[int]:
+    """Byte offset of each entry line in a normalized outline, past its header line, then its size."""
+    offsets = []
+    with open(normalized_path, "rb") as f:
+        offset = len(f.readline())
+        for line in f:
+            offsets.append(offset)
+            offset += len(line)
+    offsets.append(offset)
+    return offsets
+
+
+def build_index(transcript: OutlinedTranscript, page_entries: int = PAGE_ENTRIES,
+                page_bytes: int = PAGE_BYTES, outline_filename: str | None = None,
+                outline_offsets: list[int] | None = None) -> dict:
+    """The page index for an outlined transcript.
+
+    outline_offsets, from outline_line_offsets, locate each page in the normalized
+    outline uploaded as outline_filename.
+    """
+    total_bytes = transcript.size
+    if outline_offsets is not None and len(outline_offsets) != len(transcript.offsets) + 1:
+        raise ValueError(f"{outline_filename} does not outline {transcript.filename}")
+    starts = page_starts(transcript.offsets, page_entries, page_bytes)
+    pages = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(transcript.offsets)
+        offset = transcript.offsets[start]
+        next_offset = transcript.offsets[end] if end < len(transcript.offsets) else total_bytes
+        page = {
+            "entry": start,
+            "entries": end - start,
+            "uuid": transcript.uuids[start],
+            "offset": offset,
+            "length": next_offset - offset,
+        }
+        if outline_offsets is not None:
+            page["outlineOffset"] = outline_offsets[start]
+            page["outlineLength"] = outline_offsets[end] - outline_offsets[start]
+        pages.append(page)
+
+    anchors = []
+    for index, (uuid, outline) in enumerate(zip(transcript.uuids, transcript.outlines)):
+        if outline["kind"] == "user" and not outline["isToolResultOnly"] and uuid:
+            anchors.append({
+                "uuid": uuid,
+                "entry": index,
+                "offset": transcript.offsets[index],
+                "length": transcript.line_lengths[index],
+            })
+
+    index = {
+        "format": INDEX_FORMAT,
+        "version": INDEX_VERSION,
+        "transcript": transcript.filename,
+        "transcriptBytes": total_bytes,
+        "entryCount": len(transcript.offsets),
+        "metadata": transcript.metadata,
+        "pages": pages,
+        "anchors": anchors,
+    }
+    if outline_offsets is not None:
+        index["outline"] = {"filename": outline_filename, "bytes": outline_offsets[-1]}
+    return index
+
+
+def write_transcript_index(transcript: OutlinedTranscript, staging_dir: str,
+                           normalized_path: str | None = None) -> str:
+    """Write the index for an outlined transcript into staging_dir and return its path.
+
+    normalized_path is its normalized outline, if that is uploaded too.
+    """
+    outline_filename = outline_offsets = None
+    if normalized_path is not None:
+        outline_filename = os.path.basename(normalized_path)
+        outline_offsets = outline_line_offsets(normalized_path)
+    dest_path = os.path.join(staging_dir, index_filename(transcript.filename))
+    index = build_index(transcript, outline_filename=outline_filename, outline_offsets=outline_offsets)
+    with open(dest_path, "w", encoding="utf-8") as f:
+        # json.dumps, unlike json.dump, encodes in C
+        f.write(json.dumps(index, separators=(",", ":")))
+    return dest_path
@@ -0,0 +1,11 @@
+"""Writing transcript entries back as JSONL lines, for the stages that rewrite them."""
+import json
+
+
+def entry_line(entry) -> bytes:
+    """A transcript entry as one compact JSONL line, non-ASCII text kept as UTF-8."""
+    try:
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+    except UnicodeEncodeError:
+        # Lone surrogates from \ud800-style escapes can't be written as UTF-8: keep them escaped
+        return json.dumps(entry, separators=(",", ":")).encode() + b"\n"
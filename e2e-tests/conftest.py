@@ -5,6 +5,9 @@ import os
 import re
 import shutil
 import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Callable
 from urllib.parse import urlparse, urlunparse
@@ -50,6 +53,123 @@ def copy_fixtures_to_temp(tmp_path: Path, *fixture_names: str) -> dict[str, Path
     return result
 
 
+class StubGistAPIHandler(BaseHTTPRequestHandler):
+    """Stands in for the GitHub gist API, and for the plugin.json the version check fetches.
+
+    Behaviour is configured and recorded on the server (see the stub_server fixture).
+    """
+
+    def _reply(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply_json(self, status: int, body: dict, headers: dict[str, str] | None = None) -> None:
+        self._reply(status, json.dumps(body).encode(), {"Content-Type": "application/json", **(headers or {})})
+
+    def _read_json(self) -> dict:
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+
+    def _rate_limited(self) -> bool:
+        with self.server.lock:
+            if self.server.limited <= 0:
+                return False
+            self.server.limited -= 1
+        self._reply_json(403, {"message": "API rate limit exceeded"},
+                         {"X-RateLimit-Remaining": "0", "Retry-After": "1"})
+        return True
+
+    def _store_files(self, gist_id: str, files: dict) -> None:
+        stored = self.server.gists.setdefault(gist_id, {})
+        for name, file in files.items():
+            if file is None:
+                stored.pop(name, None)
+            else:
+                stored[name] = file["content"]
+
+    def do_POST(self):
+        body = self._read_json()
+        if self._rate_limited():
+            return
+        with self.server.lock:
+            self.server.created += 1
+            gist_id = f"stubgist{self.server.created}"
+            self._store_files(gist_id, body.get("files", {}))
+        self._reply_json(201, {"id": gist_id})
+
+    def do_PATCH(self):
+        body = self._read_json()
+        if self._rate_limited():
+            return
+        if "files" in body:
+            with self.server.lock:
+                self.server.updates.append((self.path, body["files"]))
+                self._store_files(self.path.rsplit("/", 1)[-1], body["files"])
+        self._reply_json(200, {})
+
+    def do_GET(self):
+        gist_id = self.path.removeprefix("/gists/")
+        if gist_id in self.server.gists:
+            with self.server.lock:
+                files = {name: {"filename": name, "content": content, "truncated": False}
+                         for name, content in self.server.gists[gist_id].items()}
+            self._reply_json(200, {"id": gist_id, "files": files})
+            return
+        if self.path != "/plugin.json" or self.server.plugin_json is None:
+            self._reply_json(404, {})
+            return
+        with self.server.lock:
+            self.server.version_requests.append(dict(self.headers))
+        time.sleep(self.server.version_delay)
+        etag = self.server.plugin_etag
+        if etag and self.headers.get("If-None-Match") == etag:
+            self._reply(304, headers={"ETag": etag})
+            return
+        self._reply_json(200, self.server.plugin_json, {"ETag": etag} if etag else None)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """A local stub of the GitHub gist API on a free port; point SESSION_SHARE_GITHUB_API_URL at server.url.
+
+    Created gists are numbered stubgist1, stubgist2, ... Tests configure it through attributes:
+
+    - limited: answer this many of the next POSTs/PATCHes with a rate limit (Retry-After: 1)
+    - plugin_json, plugin_etag: serve GET /plugin.json (404 while plugin_json is None)
+    - version_delay: seconds to wait before answering GET /plugin.json
+
+    and read back what it received:
+
+    - created: the number of gists created
+    - updates: (path, files) for each PATCH that sent files
+    - version_requests: the headers of each GET /plugin.json
+    - gists: each gist's files, by gist ID then filename, also served at GET /gists/<id>
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGistAPIHandler)
+    server.daemon_threads = True
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.lock = threading.Lock()
+    server.limited = 0
+    server.created = 0
+    server.updates = []
+    server.plugin_json = None
+    server.plugin_etag = None
+    server.version_delay = 0
+    server.version_requests = []
+    server.gists = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
 def run_claude_session(prompt: str) -> str:
     """Run a Claude Code session with the plugin loaded and return the session ID."""
     result = subprocess.run(
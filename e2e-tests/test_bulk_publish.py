@@ -0,0 +1,82 @@
+"""End-to-end test of bulk_publish.py.
+
+Publishes two projects' sessions against a local stub of the GitHub API that
+rate-limits the first requests, then checks the report and that a second run
+skips the unchanged sessions.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).parent.parent
+BULK_SCRIPT = REPO_DIR / "claude-code-session-share" / "commands" / "publish" / "scripts" / "bulk_publish.py"
+SAMPLES_DIR = REPO_DIR / "samples" / "claude-code-projects"
+SAMPLE_SESSION_ID = "0ccf1a04-1b4c-43b6-8aa5-79e41db43a68"
+OTHER_SESSION_ID = "5f0b6c52-6d3e-4b7e-9a51-3c2f1f8f0a11"
+
+
+@pytest.fixture
+def projects_dir(tmp_path):
+    projects_dir = tmp_path / "claude" / "projects"
+    first = projects_dir / "-stub-project"
+    first.mkdir(parents=True)
+    shutil.copy(SAMPLES_DIR / f"{SAMPLE_SESSION_ID}.jsonl", first)
+    shutil.copytree(SAMPLES_DIR / SAMPLE_SESSION_ID, first / SAMPLE_SESSION_ID)
+    second = projects_dir / "-other-project"
+    second.mkdir()
+    shutil.copy(SAMPLES_DIR / f"{SAMPLE_SESSION_ID}.jsonl", second / f"{OTHER_SESSION_ID}.jsonl")
+    return projects_dir
+
+
+def run_bulk(tmp_path, stub_server, *args: str) -> dict:
+    env = {
+        **os.environ,
+        "CLAUDE_CONFIG_DIR": str(tmp_path / "claude"),
+        "SESSION_SHARE_CACHE_DIR": str(tmp_path / "cache"),
+        "SESSION_SHARE_GITHUB_API_URL": stub_server.url,
+        "GH_TOKEN": "stub-token",
+    }
+    report_path = tmp_path / "report.json"
+    result = subprocess.run(
+        [sys.executable, str(BULK_SCRIPT), *args, "--report", str(report_path)],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    return json.loads(report_path.read_text(encoding="utf-8"))
+
+
+def test_rate_limited_sessions_are_retried_and_reported(tmp_path, stub_server, projects_dir):
+    stub_server.limited = 2
+    start = time.monotonic()
+    report = run_bulk(tmp_path, stub_server, "--project=-stub-project", "--project=-other-project", "--jobs", "2")
+
+    assert time.monotonic() - start >= 1
+    assert stub_server.limited == 0
+    assert report["counts"] == {"published": 2}
+    sessions = {s["session_id"]: s for s in report["sessions"]}
+    assert set(sessions) == {SAMPLE_SESSION_ID, OTHER_SESSION_ID}
+    assert {s["gist_id"] for s in sessions.values()} == {"stubgist1", "stubgist2"}
+    assert sessions[OTHER_SESSION_ID]["project"] == "-other-project"
+
+
+def test_unchanged_sessions_are_skipped_on_the_next_run(tmp_path, stub_server, projects_dir):
+    run_bulk(tmp_path, stub_server, "--project=-stub-project", "--project=-other-project")
+    with open(projects_dir / "-other-project" / f"{OTHER_SESSION_ID}.jsonl", "a", encoding="utf-8") as f:
+        f.write((SAMPLES_DIR / f"{SAMPLE_SESSION_ID}.jsonl").read_text(encoding="utf-8").splitlines(keepends=True)[-1])
+
+    report = run_bulk(tmp_path, stub_server, "--project=-stub-project", "--project=-other-project")
+
+    sessions = {s["session_id"]: s for s in report["sessions"]}
+    assert sessions[SAMPLE_SESSION_ID]["status"] == "skipped"
+    assert sessions[OTHER_SESSION_ID]["status"] == "updated"
+    assert stub_server.created == 2
@@ -0,0 +1,153 @@
+"""Tests of the publish script's chunking stage (chunking.py).
+
+Splits small transcripts written to tmp_path with tiny part sizes, so every
+edge of the packing is reached without a large file.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "claude-code-session-share" / "commands" / "publish" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+from chunking import FileBudgetError, TranscriptSplitter, plan_part_bytes, split_transcript  # noqa: E402
+
+TRANSCRIPT_FILENAME = "session.jsonl"
+
+
+def jsonl_line(number: int, length: int) -> bytes:
+    """A JSONL line of exactly length bytes, newline included."""
+    prefix = f'{{"n":{number},"pad":"'.encode()
+    return prefix + b"x" * (length - len(prefix) - 3) + b'"}\n'
+
+
+def write_transcript(path: Path, lengths: list[int]) -> list[bytes]:
+    lines = [jsonl_line(number, length) for number, length in enumerate(lengths)]
+    path.write_bytes(b"".join(lines))
+    return lines
+
+
+def read_split(paths: list[str]) -> tuple[list[bytes], dict]:
+    """The parts' contents and the manifest, from what split_transcript returned."""
+    *part_paths, manifest_path = paths
+    return [Path(p).read_bytes() for p in part_paths], json.loads(Path(manifest_path).read_text())
+
+
+def test_parts_are_packed_in_order_and_listed_in_the_manifest(tmp_path):
+    transcript = tmp_path / TRANSCRIPT_FILENAME
+    lines = write_transcript(transcript, [40, 40, 40, 40, 40])
+    staging_dir = tmp_path / "staging"
+    staging_dir.mkdir()
+
+    parts, manifest = read_split(split_transcript(str(transcript), str(staging_dir), max_part_bytes=100))
+
+    assert parts == [lines[0] + lines[1], lines[2] + lines[3], lines[4]]
+    assert manifest["transcript"] == TRANSCRIPT_FILENAME
+    assert [part["filename"] for part in manifest["parts"]] == [
+        "session.part-0001.jsonl", "session.part-0002.jsonl", "session.part-0003.jsonl",
+    ]
+    assert [part["lines"] for part in manifest["parts"]] == [2, 2, 1]
+    assert [part["bytes"] for part in manifest["parts"]] == [80, 80, 40]
+
+
+def test_a_line_longer_than_a_part_gets_a_part_to_itself(tmp_path):
+    transcript = tmp_path / TRANSCRIPT_FILENAME
+    lines = write_transcript(transcript, [40, 250, 40])
+
+    parts, _ = read_split(split_transcript(str(transcript), str(tmp_path), max_part_bytes=100))
+
+    assert parts == [lines[0], lines[1], lines[2]]
+
+
+def test_a_small_transcript_is_left_whole(tmp_path):
+    transcript = tmp_path / TRANSCRIPT_FILENAME
+    write_transcript(transcript, [40, 60])
+
+    assert split_transcript(str(transcript), str(tmp_path), max_part_bytes=100) == [str(transcript)]
+
+
+def test_a_missing_final_newline_is_added_to_the_last_part(tmp_path):
+    transcript = tmp_path / TRANSCRIPT_FILENAME
+    lines = write_transcript(transcript, [60, 60])
+    transcript.write_bytes(transcript.read_bytes().rstrip(b"\n"))
+
+    parts, manifest = read_split(split_transcript(str(transcript), str(tmp_path), max_part_bytes=100))
+
+    assert parts == lines
+    assert manifest["parts"][-1]["bytes"] == 60
+
+
+def test_splitter_fed_appended_lines_matches_splitting_the_whole_transcript(tmp_path):
+    lengths = [40, 40, 30, 70, 250, 40, 40, 40]
+    lines = write_transcript(tmp_path / TRANSCRIPT_FILENAME, lengths)
+    whole_dir = tmp_path / "whole"
+    fed_dir = tmp_path / "fed"
+    whole_dir.mkdir()
+    fed_dir.mkdir()
+    expected = read_split(split_transcript(str(tmp_path / TRANSCRIPT_FILENAME), str(whole_dir), 100))
+
+    splitter = TranscriptSplitter(str(fed_dir), TRANSCRIPT_FILENAME, 100)
+    transcript = fed_dir / TRANSCRIPT_FILENAME
+    splitter.feed(lines[:2])
+    transcript.write_bytes(b"".join(lines[:2]))
+    assert splitter.split(str(transcript)) == [str(transcript)]
+    splitter.feed(lines[2:5])
+    first_parts, _ = read_split(splitter.split(str(transcript)))
+    splitter.feed(lines[5:])
+
+    parts, manifest = read_split(splitter.split(str(transcript), close=True))
+
+    assert (parts, manifest) == expected
+    # Appending only ever changed the part that was still open
+    assert parts[:len(first_parts) - 1] == first_parts[:-1]
+
+
+def test_splitting_is_off_without_a_part_size(tmp_path):
+    splitter = TranscriptSplitter(str(tmp_path), TRANSCRIPT_FILENAME, 0)
+    splitter.feed([jsonl_line(0, 500)])
+
+    assert splitter.split("session.jsonl") == ["session.jsonl"]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("max_files, expected", [
+    # Three 1000-byte parts plus the manifest: the budget is exactly hit
+    (4, 1000),
+    # Two parts plus the manifest: the smallest size that holds two of the lines
+    (3, 2000),
+    # Left whole
+    (2, 3000),
+])
+def test_parts_grow_just_enough_to_fit_the_file_budget(tmp_path, max_files, expected):
+    transcript = tmp_path / TRANSCRIPT_FILENAME
+    write_transcript(transcript, [1000, 1000, 1000])
+
+    part_bytes = plan_part_bytes([str(transcript)], max_files, chunk_size=1000)
+
+    assert part_bytes == expected
+    assert len(split_transcript(str(transcript), str(tmp_path), part_bytes)) <= max_files
+    if part_bytes > 1000:
+        # Grown no further than it had to
+        assert len(split_transcript(str(transcript), str(tmp_path), part_bytes - 1)) > max_files
+
+
+def test_a_line_longer_than_a_part_counts_as_one_file(tmp_path):
+    transcript = tmp_path / TRANSCRIPT_FILENAME
+    write_transcript(transcript, [5000, 100])
+
+    # The long line's part and the short line's, plus the manifest
+    assert plan_part_bytes([str(transcript)], 3, chunk_size=1000) == 1000
+
+
+def test_transcripts_that_cant_fit_the_file_budget_are_refused(tmp_path):
+    paths = []
+    for name in ("session.jsonl", "agent-a.jsonl"):
+        write_transcript(tmp_path / name, [100])
+        paths.append(str(tmp_path / name))
+
+    with pytest.raises(FileBudgetError):
+        plan_part_bytes(paths, 1)
+    with pytest.raises(FileBudgetError):
+        plan_part_bytes(paths[:1], 0)
@@ -0,0 +1,107 @@
+"""End-to-end test of samples/scripts/fetch_gist_samples.py against published gists.
+
+Publishes a session to a local stub of the GitHub API with --dedupe-files and a
+small --chunk-size, then fetches the gist back with process_gist and checks
+that the transcripts it analyzes are the session's own. The samples are
+downloaded into tmp_path, never into the committed gist-samples directory.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).parent.parent
+PUBLISH_SCRIPT = REPO_DIR / "claude-code-session-share" / "commands" / "publish" / "scripts" / "publish_session.py"
+SAMPLES_DIR = REPO_DIR / "samples" / "claude-code-projects"
+SAMPLE_SESSION_ID = "0ccf1a04-1b4c-43b6-8aa5-79e41db43a68"
+MAIN_FILENAME = f"{SAMPLE_SESSION_ID}.jsonl"
+
+sys.path.insert(0, str(REPO_DIR / "samples" / "scripts"))
+import fetch_gist_samples  # noqa: E402
+
+
+def read_result_line(file_path: str, text: str) -> str:
+    """A transcript line holding a Read of text, as Claude Code writes it."""
+    numbered = "\n".join(f"{number:>6}→{line}" for number, line in enumerate(text.split("\n"), 1))
+    entry = {
+        "type": "user",
+        "sessionId": SAMPLE_SESSION_ID,
+        "message": {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": "toolu_stub", "content": numbered},
+        ]},
+        "toolUseResult": {"type": "text", "file": {
+            "filePath": file_path, "content": text, "numLines": text.count("\n") + 1, "startLine": 1,
+        }},
+    }
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    """The sample session, with the same file read over and over as it is edited."""
+    project_dir = tmp_path / "claude" / "projects" / "-stub-project"
+    project_dir.mkdir(parents=True)
+    shutil.copy(SAMPLES_DIR / MAIN_FILENAME, project_dir)
+    shutil.copytree(SAMPLES_DIR / SAMPLE_SESSION_ID, project_dir / SAMPLE_SESSION_ID)
+    lines = [f"line {number}: a curry poem needs more cardamom" for number in range(200)]
+    with open(project_dir / MAIN_FILENAME, "a", encoding="utf-8") as f:
+        for version in range(6):
+            lines[version * 10] = f"line {version * 10}: edited in version {version} ✓"
+            f.write(read_result_line("/stub/poem.txt", "\n".join(lines)) * 3)
+    return project_dir
+
+
+class StubFetcher:
+    """Reads gists from the stub server, standing in for fetch_gist_samples.GistFetcher."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def get_json(self, path: str) -> dict:
+        with urllib.request.urlopen(self.url + path) as response:
+            return json.load(response)
+
+
+def test_gist_published_with_dedupe_is_fetched_with_snapshots_expanded(tmp_path, stub_server, project_dir,
+                                                                       monkeypatch):
+    env = {
+        **os.environ,
+        "CLAUDE_CONFIG_DIR": str(tmp_path / "claude"),
+        "SESSION_SHARE_CACHE_DIR": str(tmp_path / "cache"),
+        "SESSION_SHARE_GITHUB_API_URL": stub_server.url,
+        "GH_TOKEN": "stub-token",
+    }
+    result = subprocess.run(
+        [sys.executable, str(PUBLISH_SCRIPT), SAMPLE_SESSION_ID, "--new-gist", "--dedupe-files",
+         "--chunk-size", "20000", "--secrets", "off", "--no-extract-images"],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    published = stub_server.gists["stubgist1"]
+    assert "file-snapshots.jsonl" in published
+    assert f"{SAMPLE_SESSION_ID}.manifest.json" in published
+
+    monkeypatch.setattr(fetch_gist_samples, "GIST_SAMPLES_DIR", str(tmp_path / "gist-samples"))
+    analyzed = []
+
+    def analyze(paths):
+        analyzed.extend(paths)
+        return [{} for _ in paths]
+
+    entry = fetch_gist_samples.process_gist(StubFetcher(stub_server.url), "stubgist1", analyze=analyze)
+
+    assert entry["main_transcript"]["filename"] == MAIN_FILENAME
+    assert Path(analyzed[0]).read_bytes() == (project_dir / MAIN_FILENAME).read_bytes()
+    subagents_dir = project_dir / SAMPLE_SESSION_ID / "subagents"
+    for path in analyzed[1:]:
+        assert Path(path).read_bytes() == (subagents_dir / os.path.basename(path)).read_bytes()
+    assert len(analyzed) == 1 + len(list(subagents_dir.glob("agent-*.jsonl")))
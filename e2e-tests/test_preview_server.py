@@ -0,0 +1,120 @@
+"""End-to-end test of the local preview server.
+
+Runs preview_server.py over a projects directory holding a sample session
+and reads it back through the gist-shaped API the viewer uses.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).parent.parent
+PREVIEW_SCRIPT = REPO_DIR / "claude-code-session-share" / "commands" / "publish" / "scripts" / "preview_server.py"
+SAMPLES_DIR = REPO_DIR / "samples" / "claude-code-projects"
+SAMPLE_SESSION_ID = "0ccf1a04-1b4c-43b6-8aa5-79e41db43a68"
+MAIN_FILENAME = f"{SAMPLE_SESSION_ID}.jsonl"
+VIEWER_ORIGIN = "http://localhost:5173"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    project_dir = tmp_path / "claude" / "projects" / "-stub-project"
+    project_dir.mkdir(parents=True)
+    shutil.copy(SAMPLES_DIR / MAIN_FILENAME, project_dir)
+    shutil.copytree(SAMPLES_DIR / SAMPLE_SESSION_ID, project_dir / SAMPLE_SESSION_ID)
+    return project_dir
+
+
+@pytest.fixture
+def preview_url(tmp_path, project_dir):
+    port = free_port()
+    env = {
+        **os.environ,
+        "CLAUDE_CONFIG_DIR": str(tmp_path / "claude"),
+        "SESSION_SHARE_CACHE_DIR": str(tmp_path / "cache"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, str(PREVIEW_SCRIPT), "--port", str(port), "--viewer-url", VIEWER_ORIGIN],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                urllib.request.urlopen(f"{url}/sessions").close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    pytest.fail("preview server didn't start")
+                time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def get(url: str, headers: dict[str, str] | None = None):
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers or {}))
+
+
+def test_lists_recent_sessions(preview_url):
+    sessions = json.load(get(f"{preview_url}/sessions"))
+
+    assert [s["session_id"] for s in sessions] == [SAMPLE_SESSION_ID]
+    assert sessions[0]["viewer_url"] == f"{VIEWER_ORIGIN}/g/{SAMPLE_SESSION_ID}"
+
+
+def test_serves_the_session_as_a_gist(preview_url, project_dir):
+    gist = json.load(get(f"{preview_url}/gists/{SAMPLE_SESSION_ID}"))
+
+    subagents = sorted(p.name for p in (project_dir / SAMPLE_SESSION_ID).rglob("agent-*.jsonl"))
+    assert sorted(gist["files"]) == sorted([MAIN_FILENAME, f"{SAMPLE_SESSION_ID}.index.json", *subagents])
+    main = gist["files"][MAIN_FILENAME]
+    assert main["size"] == (project_dir / MAIN_FILENAME).stat().st_size
+    assert get(main["raw_url"]).read() == (project_dir / MAIN_FILENAME).read_bytes()
+
+
+def test_serves_pages_by_range_and_whole_files_gzipped(preview_url, project_dir):
+    gist = json.load(get(f"{preview_url}/gists/{SAMPLE_SESSION_ID}"))
+    index = json.load(get(gist["files"][f"{SAMPLE_SESSION_ID}.index.json"]["raw_url"]))
+    transcript = (project_dir / MAIN_FILENAME).read_bytes()
+    raw_url = gist["files"][MAIN_FILENAME]["raw_url"]
+
+    page = index["pages"][-1]
+    response = get(raw_url, {"Range": f"bytes={page['offset']}-{page['offset'] + page['length'] - 1}"})
+    assert response.status == 206
+    assert response.headers["Content-Range"] == f"bytes {page['offset']}-{len(transcript) - 1}/{len(transcript)}"
+    assert response.read() == transcript[page["offset"]:]
+
+    response = get(raw_url, {"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.read()) == transcript
+
+
+def test_only_the_viewer_may_read_across_origins(preview_url):
+    viewer = get(f"{preview_url}/sessions", {"Origin": VIEWER_ORIGIN})
+    other = get(f"{preview_url}/sessions", {"Origin": "https://example.com"})
+
+    assert viewer.headers["Access-Control-Allow-Origin"] == VIEWER_ORIGIN
+    assert other.headers["Access-Control-Allow-Origin"] is None
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(f"{preview_url}/sessions", {"Host": "attacker.example"})
+    assert error.value.code == 403
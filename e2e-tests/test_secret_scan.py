@@ -0,0 +1,105 @@
+"""Tests of the publish script's secret scanning stage (secret_scan.py)."""
+
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "claude-code-session-share" / "commands" / "publish" / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+import secret_scan  # noqa: E402
+from secret_scan import SecretScanStats, find_secrets, redact_line, scan_secrets, scan_transcript  # noqa: E402
+
+GITHUB_TOKEN = "ghp_" + "a1B2c3D4e5" * 4
+AWS_ACCESS_KEY = "AKIA" + "QWERTYUIOP123456"
+ASSIGNED_PASSWORD = "Zx9Qw8Er7Ty6Ui5O"
+
+
+def user_line(text: str) -> bytes:
+    entry = {"type": "user", "message": {"role": "user", "content": [{"type": "text", "text": text}]}}
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+def image_line(data: str) -> bytes:
+    source = {"type": "base64", "media_type": "image/png", "data": data}
+    entry = {"type": "user", "message": {"role": "user", "content": [{"type": "image", "source": source}]}}
+    return json.dumps(entry, separators=(",", ":")).encode() + b"\n"
+
+
+def redacted(line: bytes) -> str:
+    return json.loads(redact_line(line, lambda kind, secret: None))["message"]["content"][0]["text"]
+
+
+@pytest.mark.parametrize("prefix", ["", "İstanbul ", "İİİİ ", "ß→ ", "😀 "])
+def test_redaction_masks_exactly_the_secret(prefix):
+    text = f"{prefix}token {GITHUB_TOKEN} and PASSWORD = \"{ASSIGNED_PASSWORD}\" end"
+
+    assert redacted(user_line(text)) == (
+        f"{prefix}token [REDACTED:github_token] and PASSWORD = \"[REDACTED:assigned_secret]\" end"
+    )
+
+
+def test_secrets_are_found_where_they_are():
+    text = f"İİ password: {ASSIGNED_PASSWORD}, key {AWS_ACCESS_KEY}"
+
+    assert [(kind, text[start:end]) for kind, start, end in find_secrets(text)] == [
+        ("assigned_secret", ASSIGNED_PASSWORD), ("aws_access_key", AWS_ACCESS_KEY),
+    ]
+
+
+def test_placeholders_and_longer_words_are_not_secrets():
+    assert find_secrets('password = "your-password-here"') == []
+    assert find_secrets(f"x{AWS_ACCESS_KEY}") == []
+
+
+def test_base64_payloads_are_neither_scanned_nor_redacted(tmp_path):
+    transcript = tmp_path / "session.jsonl"
+    image = image_line(f"iVBORw0KGgo{GITHUB_TOKEN}{AWS_ACCESS_KEY}AAAA")
+    transcript.write_bytes(image + user_line(f"key {AWS_ACCESS_KEY}"))
+    stats = SecretScanStats()
+
+    lines = scan_transcript(str(transcript), stats)
+
+    assert lines == {2}
+    assert [(finding.line, finding.kind) for finding in stats.findings] == [(2, "aws_access_key")]
+    assert redact_line(image, lambda kind, secret: None) == image
+
+
+def test_redacted_copies_are_staged_and_clean_transcripts_left_alone(tmp_path):
+    secret = tmp_path / "session.jsonl"
+    clean = tmp_path / "agent-a.jsonl"
+    secret.write_bytes(user_line("hello") + user_line(f"token {GITHUB_TOKEN}"))
+    clean.write_bytes(user_line("hello"))
+    staging_dir = tmp_path / "staging"
+    staging_dir.mkdir()
+
+    paths, stats = scan_secrets([str(secret), str(clean)], str(staging_dir), redact=True)
+
+    assert paths == [str(staging_dir / "session.jsonl"), str(clean)]
+    staged = (staging_dir / "session.jsonl").read_bytes().splitlines(keepends=True)
+    assert staged == [user_line("hello"), user_line("token [REDACTED:github_token]")]
+    assert stats.redacted_files == 1
+
+
+def test_large_transcripts_scanned_on_a_process_pool_find_the_same_lines(tmp_path, monkeypatch):
+    transcript = tmp_path / "session.jsonl"
+    lines = [user_line(f"line {number}") for number in range(300)]
+    for number in (0, 57, 58, 150, 299):
+        lines[number] = user_line(f"line {number} {GITHUB_TOKEN}")
+    transcript.write_bytes(b"".join(lines))
+    # Scan in ranges of a few lines each, with this process splitting the file
+    monkeypatch.setattr(secret_scan, "PARALLEL_SCAN_BYTES", 1)
+    monkeypatch.setattr(secret_scan, "RANGE_SIZE", 1000)
+    assert len(secret_scan._line_ranges(str(transcript), 0, transcript.stat().st_size)) > 10
+
+    serial_stats = SecretScanStats()
+    serial_lines = scan_transcript(str(transcript), serial_stats)
+    pool_stats = SecretScanStats()
+    with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pool_lines = scan_transcript(str(transcript), pool_stats, executor)
+
+    assert serial_lines == pool_lines == {1, 58, 59, 151, 300}
+    assert pool_stats.findings == serial_stats.findings
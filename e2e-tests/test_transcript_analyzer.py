@@ -0,0 +1,115 @@
+"""Tests of the gist sample analyzer's resumable cache (samples/scripts/transcript_analyzer.py).
+
+Each test analyzes a transcript with an AnalysisCache, changes the file, and
+checks that a fresh cache loaded from disk resumes only when the analyzed
+prefix is still there, with the same result as analyzing from scratch.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "samples" / "scripts"))
+from transcript_analyzer import AnalysisCache, analyze_files  # noqa: E402
+
+
+def tool_use_line(tool: str, timestamp: str) -> bytes:
+    entry = {
+        "type": "assistant",
+        "timestamp": timestamp,
+        "message": {"role": "assistant", "content": [{"type": "tool_use", "id": "toolu_stub", "name": tool}]},
+    }
+    return json.dumps(entry, separators=(",", ":")).encode() + b"\n"
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    transcript = tmp_path / "session.jsonl"
+    transcript.write_bytes(b"".join(tool_use_line("Read", f"2026-01-01T00:00:0{second}Z") for second in range(5)))
+    return transcript
+
+
+@pytest.fixture
+def analyze(tmp_path):
+    """Return a function that analyzes the transcript with a cache loaded from disk, as the next run would.
+
+    It returns the analysis and the cache, whose counters tell how the transcript was resumed.
+    """
+    cache_path = tmp_path / "analysis-cache.json"
+
+    def run(transcript: Path) -> tuple[dict, AnalysisCache]:
+        cache = AnalysisCache(str(cache_path), str(transcript.parent))
+        [analysis] = analyze_files([str(transcript)], cache=cache)
+        cache.save()
+        return analysis, cache
+
+    return run
+
+
+def fresh_analysis(transcript: Path) -> dict:
+    [analysis] = analyze_files([str(transcript)])
+    return analysis
+
+
+def test_appended_lines_are_analyzed_from_the_cached_offset(transcript, analyze):
+    analyze(transcript)
+    with open(transcript, "ab") as f:
+        f.write(tool_use_line("Bash", "2026-01-01T00:00:09Z"))
+
+    analysis, cache = analyze(transcript)
+
+    assert cache.resumed == 1 and cache.parsed == 0
+    assert analysis == fresh_analysis(transcript)
+    assert analysis["tools_used"] == ["Bash", "Read"]
+    assert analysis["last_timestamp"] == "2026-01-01T00:00:09Z"
+
+
+def test_an_unchanged_transcript_is_not_parsed_again(transcript, analyze):
+    first, _ = analyze(transcript)
+
+    analysis, cache = analyze(transcript)
+
+    assert cache.unchanged == 1 and cache.parsed == 0
+    assert analysis == first
+
+
+def test_a_truncated_transcript_is_analyzed_from_the_start(transcript, analyze):
+    analyze(transcript)
+    transcript.write_bytes(b"".join(transcript.read_bytes().splitlines(keepends=True)[:2]))
+
+    analysis, cache = analyze(transcript)
+
+    assert cache.parsed == 1 and cache.resumed == 0
+    assert analysis == fresh_analysis(transcript)
+    assert analysis["total_entries"] == 2
+
+
+def test_a_rewritten_prefix_is_analyzed_from_the_start(transcript, analyze):
+    analyze(transcript)
+    # Same length, so only the hash of the prefix can tell
+    rewritten = transcript.read_bytes().replace(b'"name":"Read"', b'"name":"Edit"', 1)
+    transcript.write_bytes(rewritten + tool_use_line("Bash", "2026-01-01T00:00:09Z"))
+
+    analysis, cache = analyze(transcript)
+
+    assert cache.parsed == 1 and cache.resumed == 0
+    assert analysis == fresh_analysis(transcript)
+    assert analysis["tools_used"] == ["Bash", "Edit", "Read"]
+
+
+def test_a_partial_last_line_is_counted_but_not_cached(transcript, analyze):
+    line = tool_use_line("Bash", "2026-01-01T00:00:09Z")
+    with open(transcript, "ab") as f:
+        f.write(line[:20])
+
+    partial, _ = analyze(transcript)
+    with open(transcript, "ab") as f:
+        f.write(line[20:])
+    analysis, cache = analyze(transcript)
+
+    assert partial["total_entries"] == 5
+    assert cache.resumed == 1
+    assert analysis == fresh_analysis(transcript)
+    assert analysis["total_entries"] == 6
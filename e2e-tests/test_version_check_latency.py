@@ -0,0 +1,117 @@
+"""End-to-end test that the plugin version check never slows down publishing.
+
+Publishes a sample session with the publish script against a local stub
+server that stands in for both the GitHub API and the plugin.json the
+version check fetches, so no real gist is created. The stub can be made to
+answer the version check slowly, and records the requests it gets.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).parent.parent
+SCRIPTS_DIR = REPO_DIR / "claude-code-session-share" / "commands" / "publish" / "scripts"
+PUBLISH_SCRIPT = SCRIPTS_DIR / "publish_session.py"
+CHECK_VERSION_SCRIPT = SCRIPTS_DIR / "check_version.py"
+SAMPLES_DIR = REPO_DIR / "samples" / "claude-code-projects"
+SAMPLE_SESSION_ID = "0ccf1a04-1b4c-43b6-8aa5-79e41db43a68"
+
+REMOTE_VERSION = "999.0.0"
+VERSION_ETAG = '"stub-etag"'
+SLOW_VERSION_SECONDS = 5
+
+
+@pytest.fixture
+def version_server(stub_server):
+    """The stub gist API, also serving plugin.json with REMOTE_VERSION."""
+    stub_server.plugin_json = {"version": REMOTE_VERSION}
+    stub_server.plugin_etag = VERSION_ETAG
+    return stub_server
+
+
+@pytest.fixture
+def env(tmp_path, version_server):
+    """The environment the scripts run in: the stub for every request, and caches under tmp_path."""
+    return {
+        **os.environ,
+        "CLAUDE_CONFIG_DIR": str(tmp_path / "claude"),
+        "SESSION_SHARE_CACHE_DIR": str(tmp_path / "cache"),
+        "SESSION_SHARE_GITHUB_API_URL": version_server.url,
+        "SESSION_SHARE_VERSION_URL": f"{version_server.url}/plugin.json",
+        "GH_TOKEN": "stub-token",
+    }
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """The version check's cache file. Tests seed it, since publishing never waits for the check to write it."""
+    cache_path = tmp_path / "cache" / "version-check.json"
+    cache_path.parent.mkdir(parents=True)
+    return cache_path
+
+
+@pytest.fixture
+def publish(tmp_path, env):
+    """Return a function that publishes the sample session and returns (seconds taken, stdout)."""
+    project_dir = tmp_path / "claude" / "projects" / "-stub-project"
+    project_dir.mkdir(parents=True)
+    shutil.copy(SAMPLES_DIR / f"{SAMPLE_SESSION_ID}.jsonl", project_dir)
+    shutil.copytree(SAMPLES_DIR / SAMPLE_SESSION_ID, project_dir / SAMPLE_SESSION_ID)
+
+    def run() -> tuple[float, str]:
+        start = time.monotonic()
+        result = subprocess.run(
+            [sys.executable, str(PUBLISH_SCRIPT), SAMPLE_SESSION_ID, "--new-gist"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=60,
+        )
+        return time.monotonic() - start, result.stdout
+
+    return run
+
+
+def test_slow_version_check_does_not_delay_publish(version_server, publish):
+    version_server.version_delay = SLOW_VERSION_SECONDS
+
+    elapsed, output = publish()
+
+    assert "Session published" in output
+    assert len(version_server.version_requests) == 1
+    assert elapsed < SLOW_VERSION_SECONDS / 2
+
+
+def test_version_check_is_cached_within_its_ttl(version_server, publish, cache_path):
+    cache_path.write_text(json.dumps(
+        {"checked_at": time.time(), "ok": True, "version": REMOTE_VERSION, "etag": VERSION_ETAG}
+    ))
+
+    _, first_output = publish()
+    _, second_output = publish()
+
+    assert f"the latest is v{REMOTE_VERSION}" in first_output
+    assert f"the latest is v{REMOTE_VERSION}" in second_output
+    assert version_server.version_requests == []
+
+
+def test_expired_version_check_revalidates_with_etag(version_server, env, cache_path):
+    cache_path.write_text(json.dumps({"checked_at": 0, "ok": True, "version": REMOTE_VERSION, "etag": VERSION_ETAG}))
+
+    # check_version.py waits for the check, where publishing would exit without it
+    result = subprocess.run(
+        [sys.executable, str(CHECK_VERSION_SCRIPT)], env=env, capture_output=True, text=True, check=True, timeout=60
+    )
+
+    assert f"the latest is v{REMOTE_VERSION}" in result.stdout
+    assert len(version_server.version_requests) == 1
+    assert version_server.version_requests[0].get("If-None-Match") == VERSION_ETAG
+    assert json.loads(cache_path.read_text())["checked_at"] > 0
@@ -0,0 +1,123 @@
+"""End-to-end test of publish_session.py --watch.
+
+Publishes a sample session in watch mode against a local stub of the GitHub
+API, then appends to its transcripts and checks that only the changed files
+are pushed to the same gist, within seconds.
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).parent.parent
+PUBLISH_SCRIPT = REPO_DIR / "claude-code-session-share" / "commands" / "publish" / "scripts" / "publish_session.py"
+SAMPLES_DIR = REPO_DIR / "samples" / "claude-code-projects"
+SAMPLE_SESSION_ID = "0ccf1a04-1b4c-43b6-8aa5-79e41db43a68"
+MAIN_FILENAME = f"{SAMPLE_SESSION_ID}.jsonl"
+
+# Debounce (2s) plus restaging, with room for a slow machine
+UPDATE_TIMEOUT_SECONDS = 15
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    project_dir = tmp_path / "claude" / "projects" / "-stub-project"
+    project_dir.mkdir(parents=True)
+    shutil.copy(SAMPLES_DIR / MAIN_FILENAME, project_dir)
+    shutil.copytree(SAMPLES_DIR / SAMPLE_SESSION_ID, project_dir / SAMPLE_SESSION_ID)
+    return project_dir
+
+
+@pytest.fixture
+def watcher(tmp_path, stub_server, project_dir):
+    """Start publish_session.py --watch; yields the process once its first publish is done."""
+    env = {
+        **os.environ,
+        "CLAUDE_CONFIG_DIR": str(tmp_path / "claude"),
+        "SESSION_SHARE_CACHE_DIR": str(tmp_path / "cache"),
+        "SESSION_SHARE_GITHUB_API_URL": stub_server.url,
+        "SESSION_SHARE_VERSION_URL": f"{stub_server.url}/plugin.json",
+        "GH_TOKEN": "stub-token",
+        "PYTHONUNBUFFERED": "1",
+    }
+    process = subprocess.Popen(
+        [sys.executable, str(PUBLISH_SCRIPT), SAMPLE_SESSION_ID, "--new-gist", "--watch", "--watch-interval", "0.5"],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        for line in process.stdout:
+            if line.startswith("Watching for changes"):
+                break
+        else:
+            pytest.fail("publish_session.py --watch exited before watching")
+        yield process
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def wait_for_updates(server, count: int) -> float:
+    """Wait until the stub has seen count file updates. Returns the seconds waited."""
+    start = time.monotonic()
+    while len(server.updates) < count:
+        if time.monotonic() - start > UPDATE_TIMEOUT_SECONDS:
+            pytest.fail(f"expected {count} update(s), got {len(server.updates)}")
+        time.sleep(0.05)
+    return time.monotonic() - start
+
+
+def sample_lines(path: Path, count: int) -> str:
+    return "".join(path.read_text(encoding="utf-8").splitlines(keepends=True)[-count:])
+
+
+def test_appended_lines_are_pushed_to_the_same_gist(stub_server, project_dir, watcher):
+    main_path = project_dir / MAIN_FILENAME
+    with open(main_path, "a", encoding="utf-8") as f:
+        f.write(sample_lines(main_path, 3))
+
+    wait_for_updates(stub_server, 1)
+
+    path, files = stub_server.updates[0]
+    assert path == "/gists/stubgist1"
+    assert MAIN_FILENAME in files
+    assert not any(name.startswith("agent-") for name in files)
+
+
+def test_new_subagent_transcripts_are_pushed_alone(stub_server, project_dir, watcher):
+    subagents_dir = project_dir / SAMPLE_SESSION_ID / "subagents"
+    existing = sorted(subagents_dir.glob("agent-*.jsonl"))[0]
+    (subagents_dir / "agent-new.jsonl").write_text(sample_lines(existing, 2), encoding="utf-8")
+
+    wait_for_updates(stub_server, 1)
+
+    _, files = stub_server.updates[0]
+    assert list(files) == ["agent-new.jsonl"]
+
+
+def test_half_written_lines_are_held_back(stub_server, project_dir, watcher):
+    main_path = project_dir / MAIN_FILENAME
+    line = sample_lines(main_path, 1)
+    with open(main_path, "a", encoding="utf-8") as f:
+        f.write(line[:20])
+
+    time.sleep(4)
+    assert stub_server.updates == []
+
+    with open(main_path, "a", encoding="utf-8") as f:
+        f.write(line[20:])
+    wait_for_updates(stub_server, 1)
+
+    _, files = stub_server.updates[0]
+    assert files[MAIN_FILENAME]["content"].endswith(line)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Benchmark transcript analysis: transcript_analyzer backends versus the original implementation.
+
+Builds a synthetic transcript from the sample sessions, with large base64 image
+entries mixed in, then analyzes it once per implementation. Each run happens in
+its own subprocess so peak RSS is measured per implementation. Finally it
+appends to the transcript and times re-analysis through the AnalysisCache.
+"""
+import argparse
+import base64
+import glob
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import transcript_analyzer
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "claude-code-projects")
+
+
+def legacy_analyze_transcript(path: str) -> dict:
+    """The dict-based implementation fetch_gist_samples.py used before transcript_analyzer."""
+    entry_type_counts: dict[str, int] = {}
+    content_block_counts: dict[str, int] = {}
+    tools_used: set[str] = set()
+    has_thinking = False
+    has_images = False
+    total_entries = 0
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            total_entries += 1
+            entry_type = entry.get("type", "unknown")
+            entry_type_counts[entry_type] = entry_type_counts.get(entry_type, 0) + 1
+
+            message = entry.get("message", {})
+            content = message.get("content", [])
+            if isinstance(content, list):
+                for block in content:
+                    if not isinstance(block, dict):
+                        continue
+                    block_type = block.get("type", "")
+                    content_block_counts[block_type] = content_block_counts.get(block_type, 0) + 1
+                    if block_type == "tool_use":
+                        tool_name = block.get("name")
+                        if tool_name:
+                            tools_used.add(tool_name)
+                    elif block_type == "thinking":
+                        has_thinking = True
+                    elif block_type == "image":
+                        has_images = True
+                    elif block_type == "tool_result":
+                        inner = block.get("content", [])
+                        if isinstance(inner, list):
+                            for inner_block in inner:
+                                if isinstance(inner_block, dict):
+                                    if inner_block.get("type", "") == "image":
+                                        has_images = True
+
+    return {
+        "entry_type_counts": entry_type_counts,
+        "content_block_counts": content_block_counts,
+        "tools_used": sorted(tools_used),
+        "has_thinking": has_thinking,
+        "has_images": has_images,
+        "total_entries": total_entries,
+    }
+
+
+def image_entry(payload: str) -> str:
+    # Compact separators, as Claude Code writes them
+    return json.dumps(separators=(",", ":"), obj={
+        "type": "user",
+        "message": {"role": "user", "content": [
+            {"type": "text", "text": "[Image #1]"},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": payload}},
+        ]},
+    })
+
+
+def build_transcript(path: str, lines: int, image_every: int, image_kb: int) -> int:
+    """Write a synthetic transcript of about `lines` lines. Returns its size in bytes."""
+    sample_lines = []
+    for sample in sorted(glob.glob(os.path.join(SAMPLES_DIR, "**", "*.jsonl"), recursive=True)):
+        with open(sample, encoding="utf-8") as f:
+            sample_lines.extend(line for line in f if line.strip())
+    payload = base64.b64encode(random.randbytes(image_kb * 1024 * 3 // 4)).decode()
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            if image_every and i % image_every == image_every - 1:
+                f.write(image_entry(payload) + "\n")
+            else:
+                f.write(sample_lines[i % len(sample_lines)].rstrip("\n") + "\n")
+    return os.path.getsize(path)
+
+
+def peak_rss_kb() -> int:
+    """Peak RSS of this process. ru_maxrss survives exec on Linux, so prefer VmHWM, which doesn't."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+def run_one(impl: str, path: str) -> None:
+    """Child-process mode: analyze path with one implementation and print the measurements as JSON."""
+    start = time.perf_counter()
+    if impl == "legacy":
+        result = legacy_analyze_transcript(path)
+    else:
+        result = transcript_analyzer.analyze_transcript(path, backend=impl)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_kb": peak_rss_kb(),
+        "result": result,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--image-every", type=int, default=500, help="one image entry every N lines (0 for none)")
+    parser.add_argument("--image-kb", type=int, default=2048, help="size of each base64 image payload")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run", nargs=2, metavar=("IMPL", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(*args.run)
+        return
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transcript.jsonl")
+        size = build_transcript(path, args.lines, args.image_every, args.image_kb)
+        print(f"Synthetic transcript: {args.lines} lines, {size / 1024 / 1024:.1f} MB")
+
+        baseline = None
+        for impl in ["legacy", *transcript_analyzer.BACKENDS]:
+            out = subprocess.run(
+                [sys.executable, __file__, "--run", impl, path], capture_output=True, text=True, check=True
+            ).stdout
+            measured = json.loads(out)
+            if baseline is None:
+                baseline = measured
+            elif {k: measured["result"][k] for k in baseline["result"]} != baseline["result"]:
+                raise RuntimeError(f"{impl} disagrees with the legacy implementation")
+            label = impl if impl == "legacy" else f"transcript_analyzer ({impl})"
+            lines_per_sec = args.lines / measured["seconds"]
+            speedup = baseline["seconds"] / measured["seconds"]
+            print(
+                f"{label:<32} {lines_per_sec:>12,.0f} lines/s   {measured['seconds']:7.2f} s   "
+                f"peak RSS {measured['peak_rss_kb'] / 1024:7.1f} MB   {speedup:5.1f}x"
+            )
+
+        cache = transcript_analyzer.AnalysisCache(os.path.join(tmp, "analysis.json"), tmp)
+        transcript_analyzer.analyze_files([path], cache=cache)
+        with open(path, "rb") as f:
+            appended = b"".join(line for _, line in zip(range(args.lines // 100), f) if b'"image"' not in line)
+        with open(path, "ab") as f:
+            f.write(appended)
+        start = time.perf_counter()
+        transcript_analyzer.analyze_files([path], cache=cache)
+        elapsed = time.perf_counter() - start
+        print(f"{'cached prefix + 1% appended':<32} {elapsed * 1000:>12.1f} ms (hashing the prefix, parsing the rest)")
+
+
+if __name__ == "__main__":
+    main()
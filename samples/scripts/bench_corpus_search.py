@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark full-text search over a synthetic corpus store.
+
+Builds a corpus.sqlite with --sessions synthetic gists (10k by default). Each
+gist gets the search documents of the sample transcripts, with a few random
+words mixed in so terms have realistic, uneven frequencies. It then times
+ranked queries through CorpusStore.search.
+"""
+import argparse
+import glob
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from corpus_search import gist_documents, to_match_expression
+from corpus_store import CorpusStore
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "claude-code-projects")
+VOCABULARY = [
+    "refactor", "useEffect", "cleanup", "migration", "schema", "flaky", "timeout", "retry", "websocket",
+    "tailwind", "vitest", "playwright", "gist", "manifest", "compression", "tokenizer", "deadlock",
+    "pagination", "throttle", "debounce", "sqlite", "parquet", "benchmark", "latency", "regression",
+]
+QUERIES = ["curry", "useEffect cleanup", "deadlock timeout", "search", "tool:WebSearch", "path:src"]
+
+
+def sample_documents() -> list[tuple]:
+    paths = sorted(glob.glob(os.path.join(SAMPLES_DIR, "**", "*.jsonl"), recursive=True))
+    return list(gist_documents(paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    documents = sample_documents()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CorpusStore(os.path.join(tmp, "corpus.sqlite"))
+        start = time.perf_counter()
+        for i in range(args.sessions):
+            gist_id = f"{i:032x}"
+            store.upsert_gist({
+                "gist_id": gist_id,
+                "viewer_url": f"https://custardseed.com/g/{gist_id}",
+                "main_transcript": None,
+                "subagent_transcripts": [],
+            }, i)
+            path = f"src/{random.choice(VOCABULARY)}/{random.choice(VOCABULARY)}.ts"
+            store.replace_search_documents(gist_id, (
+                (filename, uuid, anchor, kind, f"{text} {' '.join(random.sample(VOCABULARY, 3))}", tool,
+                 path if tool else "")
+                for filename, uuid, anchor, kind, text, tool, _ in documents
+            ))
+        build_seconds = time.perf_counter() - start
+        rows = store.conn.execute("SELECT COUNT(*) FROM search_rows").fetchone()[0]
+        size_mb = os.path.getsize(os.path.join(tmp, "corpus.sqlite")) / 1024 / 1024
+        print(f"Indexed {args.sessions} sessions ({rows} documents, {size_mb:.0f} MB) in {build_seconds:.1f}s")
+
+        for query in QUERIES:
+            match = query if ":" in query else to_match_expression(query)
+            samples = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                hits = store.search(match, 20).fetchall()
+                samples.append(time.perf_counter() - start)
+            print(f"{query!r:<24} median {statistics.median(samples) * 1000:7.2f} ms   "
+                  f"max {max(samples) * 1000:7.2f} ms   ({len(hits)} hits)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark session lookup: the session index versus globbing every project.
+
+Builds a synthetic ~/.claude/projects tree (10k+ empty session files by default)
+in a temp dir and times find_transcript_paths through each path.
+"""
+import argparse
+import glob
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+PLUGIN_SCRIPTS_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "claude-code-session-share", "commands", "publish", "scripts"
+)
+sys.path.insert(0, os.path.abspath(PLUGIN_SCRIPTS_DIR))
+
+from session_index import SessionIndex, find_indexed_transcript  # noqa: E402
+
+
+def build_projects_tree(root: str, projects: int, sessions: int) -> list[str]:
+    """Create `projects` project dirs holding `sessions` transcripts in total. Returns the session ids."""
+    session_ids = []
+    for p in range(projects):
+        project_dir = os.path.join(root, f"-Users-dev-src-project-{p:04d}")
+        os.makedirs(project_dir)
+    for i in range(sessions):
+        session_id = str(uuid.UUID(int=random.getrandbits(128)))
+        project_dir = os.path.join(root, f"-Users-dev-src-project-{i % projects:04d}")
+        open(os.path.join(project_dir, f"{session_id}.jsonl"), "w").close()
+        session_ids.append(session_id)
+    return session_ids
+
+
+def time_lookups(label: str, lookup, session_ids: list[str]) -> None:
+    samples = []
+    for session_id in session_ids:
+        start = time.perf_counter()
+        path = lookup(session_id)
+        samples.append(time.perf_counter() - start)
+        if not path:
+            raise RuntimeError(f"{label}: lookup failed for {session_id}")
+    mean_ms = statistics.mean(samples) * 1000
+    p95_ms = sorted(samples)[int(len(samples) * 0.95) - 1] * 1000
+    print(f"{label:<32} mean {mean_ms:8.3f} ms   p95 {p95_ms:8.3f} ms   ({len(samples)} lookups)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=300)
+    parser.add_argument("--sessions", type=int, default=12000)
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        projects_dir = os.path.join(tmp, "projects")
+        os.environ["SESSION_SHARE_CACHE_DIR"] = os.path.join(tmp, "cache")
+        # Keep the cwd probe from short-circuiting the index in this benchmark
+        os.chdir(tmp)
+
+        print(f"Building {args.sessions} sessions across {args.projects} projects...")
+        session_ids = build_projects_tree(projects_dir, args.projects, args.sessions)
+        targets = random.sample(session_ids, args.lookups)
+
+        def glob_lookup(session_id: str) -> str | None:
+            matches = glob.glob(os.path.join(projects_dir, "*", f"{session_id}.jsonl"))
+            return matches[0] if matches else None
+
+        start = time.perf_counter()
+        index = SessionIndex(projects_dir)
+        index.refresh()
+        index.save()
+        print(f"{'index cold build':<32} {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        time_lookups("glob (current fallback)", glob_lookup, targets)
+        time_lookups("index hit", lambda sid: find_indexed_transcript(sid, projects_dir), targets)
+
+        # A brand-new session appears before each lookup, so every lookup is an index miss
+        samples = []
+        for n in range(args.lookups):
+            session_id = str(uuid.uuid4())
+            project_dir = os.path.join(projects_dir, f"-Users-dev-src-project-{n % args.projects:04d}")
+            open(os.path.join(project_dir, f"{session_id}.jsonl"), "w").close()
+            start = time.perf_counter()
+            if not find_indexed_transcript(session_id, projects_dir):
+                raise RuntimeError(f"index miss path failed for {session_id}")
+            samples.append(time.perf_counter() - start)
+        print(f"{'index miss + incremental refresh':<32} mean {statistics.mean(samples) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
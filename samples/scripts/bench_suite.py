@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Benchmark suite for tracking throughput and memory regressions over time.
+
+Generates synthetic sessions at each requested size (see synthetic_transcripts.py)
+in a temp ~/.claude/projects tree padded with decoy sessions, then times:
+
+- find_transcript_paths: with a cold session index, then a warm one
+- analyze_transcript: the main transcript, with the default backend
+- build_index_md: over --index-entries sample index entries
+- publish: publish_session.py end to end with default options, against a local
+  fake GitHub gist API served from this process
+
+Each benchmark runs in its own subprocess, best of --repeat, so peak RSS is
+measured per benchmark. With --json the results are appended as one JSON line
+to a history file; with --baseline they are compared against the last run in
+such a file, and the exit status is 1 if anything got slower or bigger by more
+than --threshold.
+
+    python3 bench_suite.py --sizes-mb 1,10,100 --json bench-history.jsonl --baseline bench-history.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import transcript_analyzer
+from bench_analyze_transcript import peak_rss_kb
+from synthetic_transcripts import write_session
+
+PLUGIN_SCRIPTS_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "claude-code-session-share", "commands", "publish", "scripts"
+)
+sys.path.insert(0, os.path.abspath(PLUGIN_SCRIPTS_DIR))
+
+BENCHMARKS = ("find_transcript_paths", "analyze_transcript", "build_index_md", "publish")
+# Benchmarks timed once per run rather than once per session size
+UNSIZED = ("build_index_md",)
+
+
+class FakeGistAPI(BaseHTTPRequestHandler):
+    """Accepts gist creates and updates, discarding the files, and serves plugin.json for the version check."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _discard_body(self) -> None:
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+
+    def do_POST(self):
+        self._discard_body()
+        self._reply(201, {"id": uuid.uuid4().hex, "files": {}})
+
+    def do_PATCH(self):
+        self._discard_body()
+        self._reply(200, {"id": self.path.rsplit("/", 1)[-1], "files": {}})
+
+    def do_GET(self):
+        self._reply(200, {"version": "0.0.0"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_api() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGistAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_decoys(projects_dir: str, projects: int, sessions: int) -> None:
+    """Pad the projects tree with empty sessions, so session lookup has something to search."""
+    rng = random.Random(1)
+    for p in range(projects):
+        os.makedirs(os.path.join(projects_dir, f"-Users-dev-src-decoy-{p:04d}"), exist_ok=True)
+    for i in range(sessions):
+        session_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        open(os.path.join(projects_dir, f"-Users-dev-src-decoy-{i % projects:04d}", f"{session_id}.jsonl"), "w").close()
+
+
+def index_entries(count: int, seed: int) -> list[dict]:
+    """Sample index entries shaped like fetch_gist_samples.analyze_gist's."""
+    rng = random.Random(seed)
+    tools = ["Bash", "Edit", "Glob", "Grep", "Read", "Task", "TodoWrite", "WebFetch", "WebSearch", "Write"]
+    entries = []
+    for _ in range(count):
+        gist_id = f"{rng.getrandbits(128):032x}"
+        entries.append({
+            "gist_id": gist_id,
+            "viewer_url": f"https://custardseed.com/g/{gist_id}",
+            "main_transcript": {
+                "total_entries": rng.randint(10, 20_000),
+                "tools_used": sorted(rng.sample(tools, rng.randint(0, len(tools)))),
+                "has_thinking": rng.random() < 0.5,
+                "has_images": rng.random() < 0.2,
+            },
+            "has_subagents": rng.random() < 0.3,
+        })
+    return entries
+
+
+def run_benchmark(name: str, workdir: str, session_id: str, api_url: str, extra: str) -> None:
+    """Child-process mode: run one benchmark and print {timings, peak_rss_kb} as JSON."""
+    timings = {}
+    if name == "build_index_md":
+        from fetch_gist_samples import build_index_md
+        entries = index_entries(int(extra), seed=0)
+        start = time.perf_counter()
+        build_index_md(entries)
+        timings[name] = time.perf_counter() - start
+    else:
+        # The session index and publish state live in the cache, so each run starts from an empty one
+        os.environ["CLAUDE_CONFIG_DIR"] = os.path.join(workdir, "claude")
+        os.environ["SESSION_SHARE_CACHE_DIR"] = tempfile.mkdtemp(prefix="cache-", dir=workdir)
+        os.environ["SESSION_SHARE_GITHUB_API_URL"] = api_url
+        os.environ["SESSION_SHARE_VERSION_URL"] = f"{api_url}/plugin.json"
+        os.environ["GH_TOKEN"] = "bench-token"
+        # Keep the cwd probe from short-circuiting the session index
+        os.chdir(workdir)
+        import publish_session
+
+        if name == "find_transcript_paths":
+            for label in (f"{name} (cold index)", name):
+                start = time.perf_counter()
+                paths = publish_session.find_transcript_paths(session_id)
+                timings[label] = time.perf_counter() - start
+            if not paths:
+                raise RuntimeError(f"session {session_id} not found")
+        elif name == "analyze_transcript":
+            path = publish_session.find_transcript_paths(session_id)[0]
+            start = time.perf_counter()
+            transcript_analyzer.analyze_transcript(path)
+            timings[name] = time.perf_counter() - start
+        elif name == "publish":
+            sys.argv = ["publish_session.py", session_id, "--new-gist", *shlex.split(extra)]
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                publish_session.main()
+            timings[name] = time.perf_counter() - start
+        else:
+            raise ValueError(f"unknown benchmark: {name}")
+    print(json.dumps({"timings": timings, "peak_rss_kb": peak_rss_kb()}))
+
+
+def measure(name: str, workdir: str, session_id: str, api_url: str, extra: str, repeat: int) -> dict:
+    """Best-of-repeat seconds per timing, and the smallest peak RSS, from fresh subprocesses."""
+    best: dict = {}
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, __file__, "--run", name, workdir, session_id, api_url, extra],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        measured = json.loads(out.splitlines()[-1])
+        for label, seconds in measured["timings"].items():
+            if label not in best or seconds < best[label]["seconds"]:
+                best[label] = {"seconds": seconds}
+            rss_mb = measured["peak_rss_kb"] / 1024
+            best[label]["peak_rss_mb"] = min(best[label].get("peak_rss_mb", rss_mb), rss_mb)
+    return best
+
+
+def git_commit() -> str | None:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return result.stdout.strip() or None
+
+
+def load_baseline(path: str) -> dict | None:
+    """The results of the last run recorded in a --json history file."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+    except FileNotFoundError:
+        return None
+    return json.loads(lines[-1])["results"] if lines else None
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    found = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            if before[metric] > 0 and result[metric] > before[metric] * (1 + threshold):
+                found.append(f"{key}: {metric} {before[metric]:.3f} -> {result[metric]:.3f} "
+                             f"(+{(result[metric] / before[metric] - 1) * 100:.0f}%)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", default="1,10,100", help="comma-separated session sizes (default: 1,10,100)")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS),
+                        help=f"comma-separated benchmarks to run (default: {','.join(BENCHMARKS)})")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, best one kept")
+    parser.add_argument("--decoy-sessions", type=int, default=5000, help="other sessions in the projects tree")
+    parser.add_argument("--index-entries", type=int, default=10_000, help="entries for build_index_md")
+    parser.add_argument("--publish-args", default="", help="extra publish_session.py options, e.g. '--compress'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="append this run's results as a JSON line to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against the last run recorded in PATH")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fractional slowdown or memory growth that counts as a regression (default: 0.25)")
+    parser.add_argument("--run", nargs=5, metavar=("NAME", "WORKDIR", "SESSION", "API", "EXTRA"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_benchmark(*args.run)
+        return
+
+    sizes = [float(size) for size in args.sizes_mb.split(",")]
+    benchmarks = args.benchmarks.split(",")
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    server = start_fake_api()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results: dict[str, dict] = {}
+
+    def report(key: str, result: dict, size_mb: float | None) -> None:
+        if size_mb:
+            result["mb_per_s"] = size_mb / result["seconds"]
+        results[key] = result
+        rate = f"{result['mb_per_s']:9.1f} MB/s" if "mb_per_s" in result else " " * 14
+        print(f"{key:<44} {result['seconds'] * 1000:10.1f} ms  {rate}   peak RSS {result['peak_rss_mb']:7.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        projects_dir = os.path.join(tmp, "claude", "projects")
+        build_decoys(projects_dir, max(1, args.decoy_sessions // 50), args.decoy_sessions)
+
+        if "build_index_md" in benchmarks:
+            for label, result in measure("build_index_md", tmp, "", api_url, str(args.index_entries),
+                                         args.repeat).items():
+                report(f"{label} ({args.index_entries} entries)", result, None)
+
+        for size_mb in sizes:
+            session = write_session(projects_dir, int(size_mb * 1024 * 1024), seed=args.seed)
+            actual_mb = session.total_bytes / 1024 / 1024
+            print(f"\nSynthetic session: {actual_mb:.1f} MB, {session.entries} entries, "
+                  f"{len(session.subagent_paths)} subagent transcript(s)")
+            main_mb = os.path.getsize(session.main_path) / 1024 / 1024
+            for name in benchmarks:
+                if name in UNSIZED:
+                    continue
+                extra = args.publish_args if name == "publish" else ""
+                for label, result in measure(name, tmp, session.session_id, api_url, extra, args.repeat).items():
+                    throughput_mb = {"analyze_transcript": main_mb, "publish": actual_mb}.get(name)
+                    report(f"{label} @ {size_mb:g} MB", result, throughput_mb)
+            for path in [session.main_path, *session.subagent_paths]:
+                os.remove(path)
+
+    server.shutdown()
+
+    failed = []
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f"\nNo baseline in {args.baseline} yet")
+        else:
+            failed = regressions(results, baseline, args.threshold)
+            print(f"\n{len(failed)} regression(s) beyond {args.threshold:.0%} against {args.baseline}")
+            for line in failed:
+                print(f"  {line}")
+
+    if args.json:
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Extract full-text search documents from transcripts for the corpus store.
+
+Each user or assistant message becomes one document for its text. Each
+thinking block and each tool call gets a document too, with the tool name and
+any file paths from its input in their own columns. Every document carries the
+viewer anchor it deep-links to: `msg-<uuid>` for messages,
+`msg-<uuid>-thinking` for thinking and `msg-<tool_use id>` for tool calls,
+matching MessageThread in the session viewer. The viewer renders subagent
+entries only inside the Task call that ran them, so documents from subagent
+transcripts (agent-*.jsonl) link to that call's `msg-<tool_use id>` anchor
+instead. Tool results aren't indexed.
+"""
+import json
+import os
+from collections.abc import Iterator
+
+from transcript_analyzer import strip_image_data
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Long tool inputs (whole files passed to Write, say) are cut to keep the index compact
+MAX_DOCUMENT_CHARS = 20_000
+PATH_INPUT_KEYS = ("file_path", "path", "notebook_path")
+
+# (filename, entry_uuid, anchor, kind, text, tool, path)
+SearchDocument = tuple[str, str | None, str | None, str, str, str, str]
+
+
+def _flatten(value) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _flatten(item)
+    elif value is not None:
+        yield str(value)
+
+
+def _document(filename, entry_uuid, anchor, kind, text, tool="", path="") -> SearchDocument:
+    return (filename, entry_uuid, anchor, kind, text[:MAX_DOCUMENT_CHARS], tool, path)
+
+
+def entry_documents(filename: str, entry: dict) -> Iterator[SearchDocument]:
+    kind = entry.get("type")
+    if kind not in ("user", "assistant"):
+        return
+    entry_uuid = entry.get("uuid")
+    anchor = f"msg-{entry_uuid}" if entry_uuid else None
+    message = entry.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    if isinstance(content, str):
+        if content.strip():
+            yield _document(filename, entry_uuid, anchor, kind, content)
+        return
+    if not isinstance(content, list):
+        return
+
+    texts = []
+    for block in content:
+        if not isinstance(block, dict):
+            continue
+        block_type = block.get("type")
+        if block_type == "text" and isinstance(block.get("text"), str):
+            texts.append(block["text"])
+        elif block_type == "thinking" and isinstance(block.get("thinking"), str):
+            thinking_anchor = f"{anchor}-thinking" if anchor else None
+            yield _document(filename, entry_uuid, thinking_anchor, "thinking", block["thinking"])
+        elif block_type == "tool_use":
+            tool_input = block.get("input")
+            paths = []
+            if isinstance(tool_input, dict):
+                paths = [tool_input[k] for k in PATH_INPUT_KEYS if isinstance(tool_input.get(k), str)]
+            tool_anchor = f"msg-{block['id']}" if block.get("id") else anchor
+            yield _document(filename, entry_uuid, tool_anchor, "tool_use", " ".join(_flatten(tool_input)),
+                            tool=block.get("name") or "", path=" ".join(paths))
+    text = "\n".join(t for t in texts if t.strip())
+    if text:
+        yield _document(filename, entry_uuid, anchor, kind, text)
+
+
+def _subagent_task_ids(entry: dict) -> Iterator[tuple[str, str]]:
+    """(agentId, tool_use id) for a tool result entry that reports a finished subagent."""
+    result = entry.get("toolUseResult")
+    agent_id = result.get("agentId") if isinstance(result, dict) else None
+    message = entry.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    if not isinstance(agent_id, str) or not agent_id or not isinstance(content, list):
+        return
+    for block in content:
+        if isinstance(block, dict) and block.get("type") == "tool_result" and block.get("tool_use_id"):
+            yield agent_id, block["tool_use_id"]
+
+
+def transcript_documents(path: str, task_anchors: dict[str, str] | None = None) -> Iterator[SearchDocument]:
+    """Yield the search documents of one JSONL transcript, in transcript order.
+
+    When task_anchors is given, it is filled with agentId -> anchor of the Task call that ran it.
+    """
+    filename = os.path.basename(path)
+    with open(path, "rb") as f:
+        for line in f:
+            if not line or line.isspace():
+                continue
+            try:
+                entry = _loads(strip_image_data(line))
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                yield from entry_documents(filename, entry)
+                if task_anchors is not None and b'"agentId"' in line:
+                    for agent_id, tool_use_id in _subagent_task_ids(entry):
+                        task_anchors[agent_id] = f"msg-{tool_use_id}"
+
+
+def _subagent_id(path: str) -> str | None:
+    name = os.path.basename(path)
+    if name.startswith("agent-") and name.endswith(".jsonl"):
+        return name[len("agent-"):-len(".jsonl")]
+    return None
+
+
+def gist_documents(transcript_paths: list[str]) -> Iterator[SearchDocument]:
+    """Yield the documents of a gist's transcripts, main transcripts first."""
+    paths = [path for path in transcript_paths if os.path.exists(path)]
+    task_anchors: dict[str, str] = {}
+    for path in paths:
+        if _subagent_id(path) is None:
+            yield from transcript_documents(path, task_anchors)
+    for path in paths:
+        agent_id = _subagent_id(path)
+        if agent_id is None:
+            continue
+        # Without a known Task call, link to the session rather than to an anchor that isn't rendered
+        anchor = task_anchors.get(agent_id)
+        for document in transcript_documents(path):
+            yield document[:2] + (anchor,) + document[3:]
+
+
+def to_match_expression(query: str) -> str:
+    """Quote each word of a plain query, so paths and punctuation don't trip FTS5's query syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
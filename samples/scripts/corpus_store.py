@@ -0,0 +1,339 @@
+"""SQLite store for gist sample metadata: one row per gist and per transcript.
+
+fetch_gist_samples.py upserts each gist as it is analyzed, and index.json /
+index.md are generated from the store rather than being the source of truth.
+Corpus-wide questions become indexed queries (see query_corpus.py) instead of
+loading every nested JSON entry into memory.
+
+Counter tables keep a `position` column so the generated index.json lists
+entry and block types in the order they were first seen, as before.
+"""
+import sqlite3
+from collections.abc import Iterator
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS gists (
+    gist_id TEXT PRIMARY KEY,
+    viewer_url TEXT NOT NULL,
+    fetched_at TEXT,
+    updated_at TEXT,
+    position INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS transcripts (
+    gist_id TEXT NOT NULL REFERENCES gists(gist_id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('main', 'subagent')),
+    ordinal INTEGER NOT NULL,
+    total_entries INTEGER NOT NULL,
+    has_thinking INTEGER NOT NULL,
+    has_images INTEGER NOT NULL,
+    byte_size INTEGER,
+    first_timestamp TEXT,
+    last_timestamp TEXT,
+    duration_seconds REAL,
+    PRIMARY KEY (gist_id, filename)
+);
+CREATE INDEX IF NOT EXISTS transcripts_by_size ON transcripts(byte_size);
+CREATE INDEX IF NOT EXISTS transcripts_by_duration ON transcripts(duration_seconds);
+
+CREATE TABLE IF NOT EXISTS entry_type_counts (
+    gist_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    entry_type TEXT,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (gist_id, filename, position),
+    FOREIGN KEY (gist_id, filename) REFERENCES transcripts(gist_id, filename) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS entry_type_counts_by_type ON entry_type_counts(entry_type);
+
+CREATE TABLE IF NOT EXISTS block_type_counts (
+    gist_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    block_type TEXT,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (gist_id, filename, position),
+    FOREIGN KEY (gist_id, filename) REFERENCES transcripts(gist_id, filename) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS block_type_counts_by_type ON block_type_counts(block_type);
+
+CREATE TABLE IF NOT EXISTS transcript_tools (
+    gist_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    PRIMARY KEY (gist_id, filename, tool),
+    FOREIGN KEY (gist_id, filename) REFERENCES transcripts(gist_id, filename) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS transcript_tools_by_tool ON transcript_tools(tool);
+
+-- Full-text search: search_text holds the indexed text, search_rows says where each row came from
+CREATE TABLE IF NOT EXISTS search_rows (
+    rowid INTEGER PRIMARY KEY,
+    gist_id TEXT NOT NULL REFERENCES gists(gist_id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    entry_uuid TEXT,
+    anchor TEXT,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_rows_by_gist ON search_rows(gist_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_text USING fts5(text, tool, path, tokenize = 'unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS search_rows_delete AFTER DELETE ON search_rows BEGIN
+    DELETE FROM search_text WHERE rowid = old.rowid;
+END;
+CREATE TABLE IF NOT EXISTS search_indexed (
+    gist_id TEXT PRIMARY KEY REFERENCES gists(gist_id) ON DELETE CASCADE,
+    updated_at TEXT
+);
+"""
+
+# Tool names weigh most, then paths, then free text
+SEARCH_RANK = "bm25(1.0, 4.0, 2.0)"
+SEARCH_CANDIDATES = 5000
+# Bump when corpus_search.py changes the documents it extracts, so every gist is reindexed
+SEARCH_DOCUMENTS_VERSION = 2
+
+
+def duration_seconds(first: str | None, last: str | None) -> float | None:
+    if not first or not last:
+        return None
+    try:
+        start = datetime.fromisoformat(first.replace("Z", "+00:00"))
+        end = datetime.fromisoformat(last.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return (end - start).total_seconds()
+
+
+class CorpusStore:
+    """One SQLite connection. Use it from the thread that created it."""
+
+    def __init__(self, path: str, readonly: bool = False):
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        # Has no effect inside a transaction, so it goes first
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        if not readonly:
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.executescript(SCHEMA)
+            with self.conn:
+                self.conn.execute("INSERT INTO search_text (search_text, rank) VALUES ('rank', ?)", (SEARCH_RANK,))
+                if self.conn.execute("PRAGMA user_version").fetchone()[0] < SEARCH_DOCUMENTS_VERSION:
+                    self.conn.execute("DELETE FROM search_indexed")
+                    self.conn.execute(f"PRAGMA user_version = {SEARCH_DOCUMENTS_VERSION}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM gists LIMIT 1").fetchone() is None
+
+    def updated_at(self, gist_id: str) -> str | None:
+        row = self.conn.execute("SELECT updated_at FROM gists WHERE gist_id = ?", (gist_id,)).fetchone()
+        return row["updated_at"] if row else None
+
+    def has_gist(self, gist_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM gists WHERE gist_id = ?", (gist_id,)).fetchone() is not None
+
+    def set_order(self, gist_ids: list[str]) -> None:
+        """Record the discovery order of the current gists, dropping gists that no longer exist."""
+        with self.conn:
+            self.conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS current_gists (gist_id TEXT PRIMARY KEY, position INTEGER)"
+            )
+            self.conn.execute("DELETE FROM current_gists")
+            self.conn.executemany("INSERT INTO current_gists VALUES (?, ?)",
+                                  [(gist_id, i) for i, gist_id in enumerate(gist_ids)])
+            self.conn.execute("DELETE FROM gists WHERE gist_id NOT IN (SELECT gist_id FROM current_gists)")
+            self.conn.execute(
+                "UPDATE gists SET position = (SELECT position FROM current_gists c WHERE c.gist_id = gists.gist_id)"
+            )
+
+    def upsert_gist(self, entry: dict, position: int) -> None:
+        """Insert or update a gist and its transcripts from an index entry, in one transaction."""
+        gist_id = entry["gist_id"]
+        transcripts = []
+        if entry.get("main_transcript"):
+            transcripts.append(("main", entry["main_transcript"]))
+        transcripts.extend(("subagent", t) for t in entry.get("subagent_transcripts") or [])
+
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO gists (gist_id, viewer_url, fetched_at, updated_at, position)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (gist_id) DO UPDATE SET
+                    viewer_url = excluded.viewer_url, fetched_at = excluded.fetched_at,
+                    updated_at = excluded.updated_at, position = excluded.position
+                """,
+                (gist_id, entry["viewer_url"], entry.get("fetched_at"), entry.get("updated_at"), position),
+            )
+            filenames = [t["filename"] for _, t in transcripts]
+            placeholders = ",".join("?" * len(filenames))
+            self.conn.execute(
+                f"DELETE FROM transcripts WHERE gist_id = ? AND filename NOT IN ({placeholders})",
+                (gist_id, *filenames),
+            )
+            for ordinal, (role, t) in enumerate(transcripts):
+                self._upsert_transcript(gist_id, role, ordinal, t)
+
+    def _upsert_transcript(self, gist_id: str, role: str, ordinal: int, t: dict) -> None:
+        key = (gist_id, t["filename"])
+        first, last = t.get("first_timestamp"), t.get("last_timestamp")
+        self.conn.execute(
+            """
+            INSERT INTO transcripts (gist_id, filename, role, ordinal, total_entries, has_thinking, has_images,
+                                     byte_size, first_timestamp, last_timestamp, duration_seconds)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (gist_id, filename) DO UPDATE SET
+                role = excluded.role, ordinal = excluded.ordinal, total_entries = excluded.total_entries,
+                has_thinking = excluded.has_thinking, has_images = excluded.has_images,
+                byte_size = excluded.byte_size, first_timestamp = excluded.first_timestamp,
+                last_timestamp = excluded.last_timestamp, duration_seconds = excluded.duration_seconds
+            """,
+            (*key, role, ordinal, t["total_entries"], t["has_thinking"], t["has_images"],
+             t.get("byte_size"), first, last, duration_seconds(first, last)),
+        )
+        for table in ("entry_type_counts", "block_type_counts", "transcript_tools"):
+            self.conn.execute(f"DELETE FROM {table} WHERE gist_id = ? AND filename = ?", key)
+        self.conn.executemany(
+            "INSERT INTO entry_type_counts VALUES (?, ?, ?, ?, ?)",
+            [(*key, i, name, count) for i, (name, count) in enumerate(t["entry_type_counts"].items())],
+        )
+        self.conn.executemany(
+            "INSERT INTO block_type_counts VALUES (?, ?, ?, ?, ?)",
+            [(*key, i, name, count) for i, (name, count) in enumerate(t["content_block_counts"].items())],
+        )
+        self.conn.executemany(
+            "INSERT INTO transcript_tools VALUES (?, ?, ?)", [(*key, tool) for tool in t["tools_used"]]
+        )
+
+    def _counts(self, table: str, column: str, gist_id: str, filename: str) -> dict:
+        rows = self.conn.execute(
+            f"SELECT {column}, count FROM {table} WHERE gist_id = ? AND filename = ? ORDER BY position",
+            (gist_id, filename),
+        )
+        return {row[0]: row[1] for row in rows}
+
+    def _analysis(self, row: sqlite3.Row) -> dict:
+        gist_id, filename = row["gist_id"], row["filename"]
+        tools = self.conn.execute(
+            "SELECT tool FROM transcript_tools WHERE gist_id = ? AND filename = ? ORDER BY tool", (gist_id, filename)
+        )
+        return {
+            "entry_type_counts": self._counts("entry_type_counts", "entry_type", gist_id, filename),
+            "content_block_counts": self._counts("block_type_counts", "block_type", gist_id, filename),
+            "tools_used": [r[0] for r in tools],
+            "has_thinking": bool(row["has_thinking"]),
+            "has_images": bool(row["has_images"]),
+            "total_entries": row["total_entries"],
+            "filename": filename,
+        }
+
+    def index_entries(self) -> Iterator[dict]:
+        """Yield index.json entries, in discovery order, one gist at a time."""
+        gists = self.conn.execute("SELECT * FROM gists ORDER BY position, gist_id").fetchall()
+        for gist in gists:
+            transcripts = self.conn.execute(
+                "SELECT * FROM transcripts WHERE gist_id = ? ORDER BY ordinal", (gist["gist_id"],)
+            ).fetchall()
+            main = [self._analysis(t) for t in transcripts if t["role"] == "main"]
+            subagents = [self._analysis(t) for t in transcripts if t["role"] == "subagent"]
+            entry = {
+                "gist_id": gist["gist_id"],
+                "viewer_url": gist["viewer_url"],
+                "fetched_at": gist["fetched_at"],
+                "main_transcript": main[0] if main else None,
+                "subagent_transcripts": subagents,
+                "has_subagents": bool(subagents),
+            }
+            if gist["updated_at"] is not None:
+                entry["updated_at"] = gist["updated_at"]
+            yield entry
+
+    def transcript_filenames(self, gist_id: str) -> list[str]:
+        rows = self.conn.execute("SELECT filename FROM transcripts WHERE gist_id = ? ORDER BY ordinal", (gist_id,))
+        return [row[0] for row in rows]
+
+    def gists_missing_search_index(self) -> list[str]:
+        """Gists whose current version hasn't been added to the full-text index yet."""
+        rows = self.conn.execute(
+            """
+            SELECT g.gist_id FROM gists g LEFT JOIN search_indexed s USING (gist_id)
+            WHERE s.gist_id IS NULL OR s.updated_at IS NOT g.updated_at
+            ORDER BY g.position
+            """
+        )
+        return [row[0] for row in rows]
+
+    def replace_search_documents(self, gist_id: str, documents) -> int:
+        """Swap a gist's full-text rows for `documents` (filename, entry_uuid, anchor, kind, text, tool, path)."""
+        count = 0
+        with self.conn:
+            self.conn.execute("DELETE FROM search_rows WHERE gist_id = ?", (gist_id,))
+            for filename, entry_uuid, anchor, kind, text, tool, path in documents:
+                cursor = self.conn.execute(
+                    "INSERT INTO search_rows (gist_id, filename, entry_uuid, anchor, kind) VALUES (?, ?, ?, ?, ?)",
+                    (gist_id, filename, entry_uuid, anchor, kind),
+                )
+                self.conn.execute(
+                    "INSERT INTO search_text (rowid, text, tool, path) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, text, tool, path),
+                )
+                count += 1
+            self.conn.execute(
+                """
+                INSERT INTO search_indexed (gist_id, updated_at)
+                SELECT gist_id, updated_at FROM gists WHERE gist_id = ?
+                ON CONFLICT (gist_id) DO UPDATE SET updated_at = excluded.updated_at
+                """,
+                (gist_id,),
+            )
+        return count
+
+    def search(self, match: str, limit: int = 20, candidates: int = SEARCH_CANDIDATES) -> sqlite3.Cursor:
+        """Ranked full-text hits for an FTS5 MATCH expression, best first.
+
+        bm25 costs a few microseconds per matching row, so a term that matches most of a large corpus
+        is only ranked across its `candidates` most recently indexed matches.
+        """
+        boundary = self._nth_newest_match(match, candidates - 1)
+        return self.conn.execute(
+            """
+            SELECT r.gist_id, r.filename, r.kind, r.entry_uuid,
+                   g.viewer_url || COALESCE('#' || r.anchor, '') AS url, hit.snippet, hit.score
+            FROM (
+                SELECT rowid, snippet(search_text, -1, '[', ']', '...', 12) AS snippet,
+                       round(-rank, 3) AS score
+                FROM search_text
+                WHERE search_text MATCH ? AND rowid >= ?
+                ORDER BY rank
+                LIMIT ?
+            ) hit
+            JOIN search_rows r ON r.rowid = hit.rowid
+            JOIN gists g ON g.gist_id = r.gist_id
+            ORDER BY hit.score DESC
+            """,
+            (match, boundary if boundary is not None else 0, limit),
+        )
+
+    def search_is_capped(self, match: str, candidates: int = SEARCH_CANDIDATES) -> bool:
+        """Whether search() leaves older matches unranked because there are more than `candidates`."""
+        return self._nth_newest_match(match, candidates) is not None
+
+    def _nth_newest_match(self, match: str, n: int) -> int | None:
+        row = self.conn.execute(
+            "SELECT rowid FROM search_text WHERE search_text MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (match, n),
+        ).fetchone()
+        return row[0] if row else None
+
+    def import_index(self, entries: list[dict]) -> None:
+        """Seed an empty store from an existing index.json."""
+        for position, entry in enumerate(entries):
+            self.upsert_gist(entry, position)
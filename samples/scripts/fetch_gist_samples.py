@@ -1,39 +1,140 @@
 #!/usr/bin/env python3
-"""Fetch and index CustardSeed transcript gists from GitHub."""
+"""Fetch and index CustardSeed transcript gists from GitHub.
+
+Gists are downloaded by a bounded pool of worker threads. Gists whose
+`updated_at` matches their entry in the corpus store are skipped, and each
+gist's metadata is committed to the store as soon as it completes, so an
+interrupted run resumes where it stopped.
+
+When a GitHub token is available, API requests go straight to the API through
+the plugin's GistClient, revalidated against the shared on-disk HTTP cache: a
+gist that hasn't changed since the last run costs a 304, not a download.
+Without a token, requests fall back to the gh CLI.
+
+Metadata is upserted into a SQLite store (gist-samples/corpus.sqlite, see
+corpus_store.py) as each gist completes; index.json and index.md are
+generated from it at the end of the run. New and updated gists are then added
+to the store's full-text search index (see corpus_search.py).
+"""
+import argparse
+import atexit
+import functools
 import json
+import multiprocessing
 import os
+import random
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 
+PLUGIN_SCRIPTS_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "claude-code-session-share", "commands", "publish", "scripts"
+)
+sys.path.insert(0, os.path.abspath(PLUGIN_SCRIPTS_DIR))
+
+from corpus_search import gist_documents  # noqa: E402
+from corpus_store import CorpusStore  # noqa: E402
+from compression import COMPRESSED_SUFFIX, decompress_file  # noqa: E402
+from file_snapshots import REF_PREFIX, SNAPSHOTS_FILENAME, expand_refs, read_snapshot_texts  # noqa: E402
+from gist_api import GistClient, GitHubAPIError, get_gh_token  # noqa: E402
+from http_cache import DEFAULT_MAX_BYTES, HttpCache, fetch_url  # noqa: E402
+from normalization import NORMALIZED_SUFFIX  # noqa: E402
+from subagent_bundles import BUNDLE_FORMAT, BUNDLE_MANIFEST_FILENAME  # noqa: E402
+import tracing  # noqa: E402
+from transcript_analyzer import LARGE_FILE_BYTES, AnalysisCache, analyze_files  # noqa: E402
 
 GIST_SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "gist-samples")
+CORPUS_DB_FILENAME = "corpus.sqlite"
 DESCRIPTION_MARKER = "Claude Code session transcript:"
+DEFAULT_WORKERS = 8
+MAX_RATE_LIMIT_RETRIES = 6
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+def is_rate_limited(stderr: str) -> bool:
+    return "HTTP 429" in stderr or ("HTTP 403" in stderr and "rate limit" in stderr.lower())
+
+
+def backoff(attempt: int) -> None:
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+    delay *= random.uniform(0.5, 1.0)
+    print(f"  Rate limited, retrying in {delay:.1f}s...", file=sys.stderr)
+    time.sleep(delay)
 
 
 def run_gh(args: list[str]) -> str:
-    result = subprocess.run(["gh", *args], capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"gh {' '.join(args)} failed: {result.stderr}")
-    return result.stdout
+    """Run a gh command, backing off exponentially (with jitter) while rate limited."""
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        tracing.count("subprocesses")
+        result = subprocess.run(["gh", *args], capture_output=True, text=True)
+        if result.returncode == 0:
+            return result.stdout
+        if not is_rate_limited(result.stderr) or attempt == MAX_RATE_LIMIT_RETRIES:
+            break
+        backoff(attempt)
+    raise RuntimeError(f"gh {' '.join(args)} failed: {result.stderr}")
+
+
+class GistFetcher:
+    """Reads from the gist API: per-thread GistClients sharing one HTTP cache, or gh without a token."""
+
+    def __init__(self, token: str | None, cache: HttpCache | None):
+        self.token = token
+        self.cache = cache
+        self._local = threading.local()
+
+    def _client(self) -> GistClient:
+        # GistClient serializes requests on its one connection, so each worker gets its own
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = GistClient(self.token, cache=self.cache)
+        return client
+
+    def _with_backoff(self, fn, *args):
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            try:
+                return fn(*args)
+            except GitHubAPIError as e:
+                rate_limited = e.status == 429 or (e.status == 403 and b"rate limit" in e.body.lower())
+                if not rate_limited or attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                backoff(attempt)
+
+    def get_json(self, path: str) -> dict:
+        if self.token is None:
+            return json.loads(run_gh(["api", path]))
+        return self._with_backoff(self._client().request_json, "GET", path)
+
+    def get_all(self, path: str) -> list:
+        if self.token is None:
+            return json.loads(run_gh(["api", path, "--paginate"]))
+        return self._with_backoff(self._client().get_paginated, path)
 
+    def get_raw(self, url: str) -> bytes:
+        return fetch_url(url, self.cache)
 
-def discover_gists() -> list[dict]:
+
+def discover_gists(fetcher: GistFetcher) -> list[dict]:
     """Return all gists whose description contains the CustardSeed marker."""
-    raw = run_gh(["api", "/gists", "--paginate"])
-    all_gists = json.loads(raw)
+    all_gists = fetcher.get_all("/gists?per_page=100")
     return [g for g in all_gists if DESCRIPTION_MARKER in (g.get("description") or "")]
 
 
-def download_gist(gist_id: str, dest_dir: str) -> list[str]:
+def download_gist(fetcher: GistFetcher, gist_id: str, dest_dir: str) -> list[str]:
     """Download all files in a gist to dest_dir. Returns list of downloaded file paths."""
     os.makedirs(dest_dir, exist_ok=True)
-    raw = run_gh(["api", f"/gists/{gist_id}"])
-    gist_data = json.loads(raw)
+    gist_data = fetcher.get_json(f"/gists/{gist_id}")
     files = gist_data.get("files", {})
     written = []
     for filename, file_info in files.items():
         content = file_info.get("content", "")
+        if file_info.get("truncated"):
+            # The API only inlines the first ~1 MB of each file
+            content = fetcher.get_raw(file_info["raw_url"]).decode("utf-8")
         path = os.path.join(dest_dir, filename)
         with open(path, "w", encoding="utf-8") as f:
             f.write(content)
@@ -41,91 +142,125 @@ def download_gist(gist_id: str, dest_dir: str) -> list[str]:
     return written
 
 
-def analyze_transcript(path: str) -> dict:
-    """Parse a JSONL transcript and return analysis metadata."""
-    entry_type_counts: dict[str, int] = {}
-    content_block_counts: dict[str, int] = {}
-    tools_used: set[str] = set()
-    has_thinking = False
-    has_images = False
-    total_entries = 0
-
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            total_entries += 1
-            entry_type = entry.get("type", "unknown")
-            entry_type_counts[entry_type] = entry_type_counts.get(entry_type, 0) + 1
-
-            # Inspect content blocks in user/assistant messages
-            message = entry.get("message", {})
-            content = message.get("content", [])
-            if isinstance(content, list):
-                for block in content:
-                    if not isinstance(block, dict):
-                        continue
-                    block_type = block.get("type", "")
-                    content_block_counts[block_type] = content_block_counts.get(block_type, 0) + 1
-                    if block_type == "tool_use":
-                        tool_name = block.get("name")
-                        if tool_name:
-                            tools_used.add(tool_name)
-                    elif block_type == "thinking":
-                        has_thinking = True
-                    elif block_type == "image":
-                        has_images = True
-                    elif block_type == "tool_result":
-                        # tool_result content can itself be a list of blocks
-                        inner = block.get("content", [])
-                        if isinstance(inner, list):
-                            for inner_block in inner:
-                                if isinstance(inner_block, dict):
-                                    inner_type = inner_block.get("type", "")
-                                    if inner_type == "image":
-                                        has_images = True
-
-    return {
-        "entry_type_counts": entry_type_counts,
-        "content_block_counts": content_block_counts,
-        "tools_used": sorted(tools_used),
-        "has_thinking": has_thinking,
-        "has_images": has_images,
-        "total_entries": total_entries,
-    }
-
-
-def process_gist(gist_id: str) -> dict:
+def decode_compressed_transcripts(file_paths: list[str]) -> list[str]:
+    """Decode files published with --compress, returning paths with the decoded files in their place."""
+    result = []
+    for path in file_paths:
+        if path.endswith(COMPRESSED_SUFFIX):
+            decoded_path = path.removesuffix(COMPRESSED_SUFFIX)
+            decompress_file(path, decoded_path)
+            path = decoded_path
+        result.append(path)
+    return result
+
+
+def reassemble_chunked_transcripts(file_paths: list[str]) -> list[str]:
+    """Join chunked transcript parts back into one file per manifest.
+
+    Returns file_paths with each manifest and its parts replaced by the reassembled transcript.
+    """
+    manifests = [p for p in file_paths if p.endswith(".manifest.json")]
+    result = [p for p in file_paths if p not in manifests]
+    for manifest_path in manifests:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != "session-share-chunked":
+            continue
+        dest_dir = os.path.dirname(manifest_path)
+        part_paths = [
+            os.path.join(dest_dir, part["filename"].removesuffix(COMPRESSED_SUFFIX))
+            for part in manifest["parts"]
+        ]
+        transcript_path = os.path.join(dest_dir, manifest["transcript"])
+        with open(transcript_path, "wb") as out:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part:
+                    out.write(part.read())
+        result = [p for p in result if p not in part_paths] + [transcript_path]
+    return result
+
+
+def split_subagent_bundles(file_paths: list[str]) -> list[str]:
+    """Split bundled subagent transcripts back into one file per agent.
+
+    Returns file_paths with the bundle manifest and its bundles replaced by the agent transcripts.
+    """
+    manifests = [p for p in file_paths if os.path.basename(p) == BUNDLE_MANIFEST_FILENAME]
+    result = [p for p in file_paths if p not in manifests]
+    for manifest_path in manifests:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != BUNDLE_FORMAT:
+            continue
+        dest_dir = os.path.dirname(manifest_path)
+        bundle_paths = [
+            os.path.join(dest_dir, bundle["filename"].removesuffix(COMPRESSED_SUFFIX))
+            for bundle in manifest["bundles"]
+        ]
+        agent_paths = []
+        for agent in manifest["agents"].values():
+            with open(os.path.join(dest_dir, agent["bundle"].removesuffix(COMPRESSED_SUFFIX)), "rb") as bundle:
+                bundle.seek(agent["offset"])
+                data = bundle.read(agent["length"])
+            agent_path = os.path.join(dest_dir, agent["filename"])
+            with open(agent_path, "wb") as out:
+                out.write(data)
+            agent_paths.append(agent_path)
+        result = [p for p in result if p not in bundle_paths] + agent_paths
+    return result
+
+
+def expand_snapshot_refs(file_paths: list[str]) -> list[str]:
+    """Expand the file snapshot references in transcripts published with --dedupe-files, in place.
+
+    Returns file_paths without the snapshot store, which is not a transcript.
+    """
+    store_paths = [p for p in file_paths if os.path.basename(p) == SNAPSHOTS_FILENAME]
+    result = [p for p in file_paths if p not in store_paths]
+    if not store_paths:
+        return result
+    texts = read_snapshot_texts(store_paths[0])
+    for path in result:
+        if not path.endswith(".jsonl") or path.endswith(NORMALIZED_SUFFIX):
+            continue
+        with open(path, "rb") as f:
+            lines = f.readlines()
+        if not any(REF_PREFIX in line for line in lines):
+            continue
+        with open(path, "wb") as f:
+            for line in lines:
+                if REF_PREFIX in line:
+                    line = expand_refs(line.decode("utf-8"), texts).encode("utf-8")
+                f.write(line)
+    return result
+
+
+def process_gist(fetcher: GistFetcher, gist_id: str, analyze=analyze_files) -> dict:
+    """Download and analyze one gist. `analyze` maps a list of transcript paths to their analyses, in order."""
     dest_dir = os.path.join(GIST_SAMPLES_DIR, gist_id)
-    print(f"  Downloading {gist_id}...", end=" ", flush=True)
-    file_paths = download_gist(gist_id, dest_dir)
-    print(f"{len(file_paths)} file(s)")
+    with tracing.span("download", gist_id=gist_id):
+        file_paths = download_gist(fetcher, gist_id, dest_dir)
+    print(f"  Downloaded {gist_id}: {len(file_paths)} file(s)")
 
-    jsonl_files = [p for p in file_paths if p.endswith(".jsonl")]
+    with tracing.span("unpack", gist_id=gist_id):
+        file_paths = split_subagent_bundles(reassemble_chunked_transcripts(decode_compressed_transcripts(file_paths)))
+        file_paths = expand_snapshot_refs(file_paths)
+    jsonl_files = [p for p in file_paths if p.endswith(".jsonl") and not p.endswith(NORMALIZED_SUFFIX)]
 
     # Separate main transcript from subagent transcripts
     # Main transcript: the one whose filename looks like a session UUID (no "agent-" prefix)
     main_files = [p for p in jsonl_files if not os.path.basename(p).startswith("agent-")]
     agent_files = [p for p in jsonl_files if os.path.basename(p).startswith("agent-")]
 
-    main_transcript = None
-    if main_files:
-        path = main_files[0]
-        analysis = analyze_transcript(path)
+    transcript_paths = main_files[:1] + agent_files
+    with tracing.span("analyze", gist_id=gist_id, transcripts=len(transcript_paths)):
+        analyses = analyze(transcript_paths)
+    for path, analysis in zip(transcript_paths, analyses):
         analysis["filename"] = os.path.basename(path)
-        main_transcript = analysis
+        analysis["byte_size"] = os.path.getsize(path)
 
-    subagent_transcripts = []
-    for path in agent_files:
-        analysis = analyze_transcript(path)
-        analysis["filename"] = os.path.basename(path)
-        subagent_transcripts.append(analysis)
+    main_transcript = analyses[0] if main_files else None
+    subagent_transcripts = analyses[1:] if main_files else analyses
 
     return {
         "gist_id": gist_id,
@@ -166,36 +301,146 @@ def build_index_md(entries: list[dict]) -> str:
     return "\n".join(lines)
 
 
+def load_existing_index(path: str) -> list[dict]:
+    """Return the entries of a previous index.json (empty if there is none)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+    return [e for e in entries if isinstance(e, dict) and "gist_id" in e] if isinstance(entries, list) else []
+
+
+def write_index_json(path: str, entries: list[dict]) -> None:
+    """Replace index.json atomically, so an interrupted run never leaves it half-written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(gist: dict, stored_updated_at: str | None) -> bool:
+    if stored_updated_at is None or not gist.get("updated_at"):
+        return False
+    return (
+        stored_updated_at == gist["updated_at"]
+        and os.path.isdir(os.path.join(GIST_SAMPLES_DIR, gist["id"]))
+    )
+
+
+def update_search_index(store: CorpusStore) -> None:
+    """Full-text index every gist that is new or has changed since it was last indexed."""
+    gist_ids = store.gists_missing_search_index()
+    if not gist_ids:
+        return
+    start = time.perf_counter()
+    documents = 0
+    for gist_id in gist_ids:
+        paths = [os.path.join(GIST_SAMPLES_DIR, gist_id, name) for name in store.transcript_filenames(gist_id)]
+        documents += store.replace_search_documents(gist_id, gist_documents(paths))
+    print(f"Search index: {documents} document(s) from {len(gist_ids)} gist(s) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent gist downloads")
+    parser.add_argument("--force", action="store_true", help="re-download gists even if unchanged")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="processes for transcript analysis (1 analyzes in this process)")
+    parser.add_argument("--large-file-mb", type=int, default=LARGE_FILE_BYTES // (1024 * 1024),
+                        help="transcripts larger than this are split into byte ranges analyzed in parallel")
+    parser.add_argument("--no-analysis-cache", action="store_true",
+                        help="re-analyze every transcript from the start instead of resuming from cached offsets")
+    parser.add_argument("--no-http-cache", action="store_true", help="don't revalidate against the HTTP cache")
+    parser.add_argument("--http-cache-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="HTTP cache size limit in MB (least recently used entries are evicted)")
+    parser.add_argument("--trace", nargs="?", const="", default=None, metavar="PATH",
+                        help="write a Chrome trace of the run to PATH (default: the plugin cache's traces/ "
+                             "directory) and print a summary (or set SESSION_SHARE_TRACE to a path or 1)")
+    return parser.parse_args(argv)
+
+
 def main():
+    args = parse_args(sys.argv[1:])
     os.makedirs(GIST_SAMPLES_DIR, exist_ok=True)
+    trace_path = tracing.trace_path_from_env("fetch-gist-samples") if args.trace is None else args.trace
+    if trace_path is not None:
+        tracing.start_tracing("fetch-gist-samples")
+        atexit.register(tracing.finish_tracing, trace_path or tracing.default_trace_path("fetch-gist-samples"))
+
+    cache = None if args.no_http_cache else HttpCache(max_bytes=args.http_cache_mb * 1024 * 1024)
+    fetcher = GistFetcher(get_gh_token(), cache)
 
     print("Discovering CustardSeed transcript gists...")
-    gists = discover_gists()
+    with tracing.span("discover"):
+        gists = discover_gists(fetcher)
     print(f"Found {len(gists)} gist(s)")
 
     if not gists:
         print("No matching gists found. Make sure 'gh auth login' has been run.")
         sys.exit(1)
 
-    index = []
-    for gist in gists:
-        gist_id = gist["id"]
-        try:
-            entry = process_gist(gist_id)
-            index.append(entry)
-        except Exception as e:
-            print(f"  ERROR processing {gist_id}: {e}", file=sys.stderr)
-
     index_json_path = os.path.join(GIST_SAMPLES_DIR, "index.json")
-    with open(index_json_path, "w", encoding="utf-8") as f:
-        json.dump(index, f, indent=2)
+    store = CorpusStore(os.path.join(GIST_SAMPLES_DIR, CORPUS_DB_FILENAME))
+    if store.is_empty():
+        # First run with the store: carry over what the committed index.json already knows
+        store.import_index(load_existing_index(index_json_path))
+    store.set_order([gist["id"] for gist in gists])
+    positions = {gist["id"]: i for i, gist in enumerate(gists)}
+
+    pending = [
+        gist for gist in gists
+        if args.force or not is_up_to_date(gist, store.updated_at(gist["id"]))
+    ]
+    print(f"{len(gists) - len(pending)} unchanged, {len(pending)} to download")
+
+    # Spawn rather than fork: the download threads are already running when workers start
+    analysis_pool = None
+    if args.jobs > 1:
+        analysis_pool = ProcessPoolExecutor(args.jobs, mp_context=multiprocessing.get_context("spawn"))
+        tracing.count("subprocesses", args.jobs)
+    analysis_cache = None
+    if not args.no_analysis_cache:
+        analysis_cache = AnalysisCache(os.path.join(GIST_SAMPLES_DIR, ".cache", "analysis.json"), GIST_SAMPLES_DIR)
+    analyze = functools.partial(analyze_files, executor=analysis_pool, jobs=args.jobs,
+                                large_file_bytes=args.large_file_mb * 1024 * 1024, cache=analysis_cache)
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(process_gist, fetcher, gist["id"], analyze): gist for gist in pending}
+        for future in as_completed(futures):
+            gist = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"  ERROR processing {gist['id']}: {e}", file=sys.stderr)
+                continue
+            entry["updated_at"] = gist.get("updated_at")
+            # Committed per gist, so an interrupted run resumes from here
+            store.upsert_gist(entry, positions[gist["id"]])
+            if analysis_cache is not None:
+                analysis_cache.save()
+
+    if analysis_pool is not None:
+        analysis_pool.shutdown()
+
+    with tracing.span("search_index"):
+        update_search_index(store)
+    with tracing.span("write_index"):
+        index = list(store.index_entries())
+        store.close()
+        write_index_json(index_json_path, index)
+        index_md_path = os.path.join(GIST_SAMPLES_DIR, "index.md")
+        with open(index_md_path, "w", encoding="utf-8") as f:
+            f.write(build_index_md(index))
     print(f"\nWrote {index_json_path}")
-
-    index_md_path = os.path.join(GIST_SAMPLES_DIR, "index.md")
-    with open(index_md_path, "w", encoding="utf-8") as f:
-        f.write(build_index_md(index))
     print(f"Wrote {index_md_path}")
 
+    if analysis_cache is not None:
+        print(analysis_cache.summary())
+    if cache is not None:
+        print(cache.summary())
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Query the gist sample corpus store built by fetch_gist_samples.py.
+
+Every command streams rows straight from SQLite, so memory use doesn't grow
+with the corpus. Output is tab-separated with a header row.
+
+    query_corpus.py summary
+    query_corpus.py tools
+    query_corpus.py entry-types
+    query_corpus.py largest -n 20
+    query_corpus.py search "useEffect cleanup" -n 10
+    query_corpus.py sql "SELECT tool, COUNT(*) FROM transcript_tools GROUP BY tool"
+
+Search hits are ranked (tool names, then file paths, then text) and link to
+the viewer with the message's anchor. Only the most recently indexed
+--candidates matches are ranked; a note on stderr says when that left older
+matches out.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from corpus_search import to_match_expression
+from corpus_store import SEARCH_CANDIDATES, CorpusStore
+
+DEFAULT_DB = os.path.join(os.path.dirname(__file__), "..", "gist-samples", "corpus.sqlite")
+
+QUERIES = {
+    "summary": """
+        SELECT
+            (SELECT COUNT(*) FROM gists) AS gists,
+            COUNT(*) AS transcripts,
+            SUM(role = 'subagent') AS subagent_transcripts,
+            SUM(total_entries) AS entries,
+            SUM(byte_size) AS bytes,
+            SUM(has_images) AS with_images,
+            SUM(has_thinking) AS with_thinking
+        FROM transcripts
+    """,
+    "tools": """
+        SELECT tool, COUNT(DISTINCT t.gist_id) AS sessions, COUNT(*) AS transcripts,
+               ROUND(AVG(tr.duration_seconds), 1) AS avg_duration_s
+        FROM transcript_tools t
+        JOIN transcripts tr USING (gist_id, filename)
+        GROUP BY tool
+        ORDER BY sessions DESC, tool
+    """,
+    "entry-types": """
+        SELECT entry_type, SUM(count) AS entries, COUNT(*) AS transcripts
+        FROM entry_type_counts
+        GROUP BY entry_type
+        ORDER BY entries DESC
+    """,
+    "largest": """
+        SELECT gist_id, filename, role, byte_size, total_entries, duration_seconds
+        FROM transcripts
+        WHERE byte_size IS NOT NULL
+        ORDER BY byte_size DESC
+        LIMIT ?
+    """,
+}
+
+
+def print_rows(cursor: sqlite3.Cursor, out=sys.stdout) -> None:
+    print("\t".join(column[0] for column in cursor.description), file=out)
+    for row in cursor:
+        print("\t".join("" if value is None else str(value) for value in row), file=out)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DEFAULT_DB, help="corpus store (default: gist-samples/corpus.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("summary", help="corpus totals")
+    commands.add_parser("tools", help="sessions and transcripts using each tool")
+    commands.add_parser("entry-types", help="entry counts by type across the corpus")
+    largest = commands.add_parser("largest", help="largest transcripts by size")
+    largest.add_argument("-n", type=int, default=10)
+    search = commands.add_parser("search", help="ranked full-text search over messages, tool calls and paths")
+    search.add_argument("query")
+    search.add_argument("-n", type=int, default=20)
+    search.add_argument("--raw", action="store_true", help="pass the query through as FTS5 syntax")
+    search.add_argument("--candidates", type=int, default=SEARCH_CANDIDATES,
+                        help=f"rank only this many of the most recently indexed matches (default: {SEARCH_CANDIDATES})")
+    sql = commands.add_parser("sql", help="run a read-only SQL query")
+    sql.add_argument("query")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if not os.path.exists(args.db):
+        print(f"Error: {args.db} not found. Run fetch_gist_samples.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    store = CorpusStore(args.db, readonly=True)
+    start = time.perf_counter()
+    try:
+        if args.command == "sql":
+            cursor = store.conn.execute(args.query)
+        elif args.command == "search":
+            match = args.query if args.raw else to_match_expression(args.query)
+            cursor = store.search(match, args.n, args.candidates)
+        elif args.command == "largest":
+            cursor = store.conn.execute(QUERIES["largest"], (args.n,))
+        else:
+            cursor = store.conn.execute(QUERIES[args.command])
+        print_rows(cursor)
+        if args.command == "search":
+            print(f"({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+            if store.search_is_capped(match, args.candidates):
+                print(f"(ranked only the {args.candidates} most recent matches; raise --candidates to rank more)",
+                      file=sys.stderr)
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Generate synthetic Claude Code sessions of a given size, for benchmarks.
+
+A session is written the way Claude Code lays it out under ~/.claude/projects:
+`<project>/<session>.jsonl` plus `<project>/<session>/subagents/agent-<id>.jsonl`.
+The main transcript is a run of turns: a user prompt, then assistant entries
+with thinking, text and tool_use blocks, each answered by a user tool_result
+(file contents, command output, search results, or a screenshot). Every so
+often a Task call runs a subagent, whose own transcript goes in the subagents
+directory and whose agentId the Task result names. Progress, system and
+file-history-snapshot entries are mixed in as the real thing does.
+
+Output is deterministic for a given seed and streamed to disk, so sizes from
+1 MB to 1 GB take no more memory than a few entries.
+
+    python3 synthetic_transcripts.py <projects dir> --size-mb 100
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+PROJECT_NAME = "-Users-dev-src-synthetic-project"
+CWD = "/Users/dev/src/synthetic-project"
+CLAUDE_VERSION = "2.1.16"
+MAIN_MODEL = "claude-opus-4-5-20251101"
+SUBAGENT_MODEL = "claude-haiku-4-5-20251001"
+TOOLS = ("Read", "Bash", "Grep", "Edit", "WebSearch")
+WORDS = (
+    "the a component state render effect cleanup query index cache request response handler module function "
+    "return value error retry timeout stream buffer parse token entry message session transcript viewer "
+    "gist upload batch worker thread process file path directory config build test assert fixture mock "
+    "latency throughput memory allocation profile trace span metric counter schema validate normalize "
+    "because when then which while after before instead so that this it we should could would will"
+).split()
+CODE_LINES = (
+    "def {name}(self, {arg}: str) -> dict:",
+    "    result = self._{name}({arg}, timeout=self.timeout)",
+    "    if not result:",
+    "        raise ValueError(f\"missing {arg}: {{{arg}}}\")",
+    "    return {{key: value for key, value in result.items() if value is not None}}",
+    "export function {name}({arg}: string): Promise<void> {{",
+    "  const {arg}Ref = useRef<HTMLDivElement>(null)",
+    "  return fetch(`/api/{name}/${{{arg}}}`).then((res) => res.json())",
+    "}}",
+    "import {{ {name} }} from './{arg}'",
+)
+# Pools of pre-generated text, picked from at random, keep generation fast at large sizes
+PARAGRAPH_POOL_SIZE = 256
+FILE_POOL_SIZE = 64
+DISTINCT_IMAGES = 8
+
+
+@dataclass
+class SyntheticSession:
+    session_id: str
+    main_path: str
+    subagent_paths: list[str] = field(default_factory=list)
+    total_bytes: int = 0
+    entries: int = 0
+
+
+class _Generator:
+    """Builds entries for one session from a seeded random source and pools of text."""
+
+    def __init__(self, rng: random.Random, session_id: str, image_kb: int):
+        self.rng = rng
+        self.session_id = session_id
+        self.clock = datetime(2026, 1, 22, 19, 38, tzinfo=timezone.utc)
+        self.paragraphs = [self._paragraph() for _ in range(PARAGRAPH_POOL_SIZE)]
+        self.files = [self._file_contents() for _ in range(FILE_POOL_SIZE)]
+        self.images = [
+            base64.b64encode(rng.randbytes(max(1, image_kb * 1024 * 3 // 4))).decode()
+            for _ in range(DISTINCT_IMAGES)
+        ] if image_kb else []
+
+    def _paragraph(self) -> str:
+        sentences = []
+        for _ in range(self.rng.randint(1, 6)):
+            words = self.rng.choices(WORDS, k=self.rng.randint(6, 24))
+            sentences.append(" ".join(words).capitalize() + ".")
+        return " ".join(sentences)
+
+    def _file_contents(self) -> str:
+        lines = []
+        for number in range(1, self.rng.randint(20, 400)):
+            template = self.rng.choice(CODE_LINES)
+            line = template.format(name=self.rng.choice(WORDS), arg=self.rng.choice(WORDS))
+            lines.append(f"{number:>6}→{line}")
+        return "\n".join(lines)
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def short_id(self, prefix: str, length: int = 24) -> str:
+        alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+        return prefix + "".join(self.rng.choices(alphabet, k=length))
+
+    def text(self, paragraphs: int = 1) -> str:
+        return "\n\n".join(self.rng.choices(self.paragraphs, k=paragraphs))
+
+    def timestamp(self) -> str:
+        self.clock += timedelta(milliseconds=self.rng.randint(50, 20_000))
+        return self.clock.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    def envelope(self, entry_type: str, parent: str | None, agent_id: str | None) -> dict:
+        entry = {
+            "parentUuid": parent,
+            "isSidechain": agent_id is not None,
+            "userType": "external",
+            "cwd": CWD,
+            "sessionId": self.session_id,
+            "version": CLAUDE_VERSION,
+            "gitBranch": "main",
+        }
+        if agent_id is not None:
+            entry["agentId"] = agent_id
+        entry["type"] = entry_type
+        return entry
+
+    def user(self, parent: str | None, agent_id: str | None, content) -> dict:
+        entry = self.envelope("user", parent, agent_id)
+        entry["message"] = {"role": "user", "content": content}
+        entry["uuid"] = self.uuid()
+        entry["timestamp"] = self.timestamp()
+        return entry
+
+    def assistant(self, parent: str, agent_id: str | None, message_id: str, block: dict) -> dict:
+        entry = self.envelope("assistant", parent, agent_id)
+        entry["message"] = {
+            "model": SUBAGENT_MODEL if agent_id else MAIN_MODEL,
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "content": [block],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": self.rng.randint(1, 20),
+                "cache_creation_input_tokens": self.rng.randint(0, 5000),
+                "cache_read_input_tokens": self.rng.randint(0, 80_000),
+                "output_tokens": self.rng.randint(1, 2000),
+                "service_tier": "standard",
+            },
+        }
+        entry["requestId"] = self.short_id("req_")
+        entry["uuid"] = self.uuid()
+        entry["timestamp"] = self.timestamp()
+        return entry
+
+    def tool_call(self, tool: str) -> tuple[dict, list | str, dict]:
+        """(tool input, tool_result content, toolUseResult) for one call of tool."""
+        if tool == "Read":
+            path = f"{CWD}/src/{self.rng.choice(WORDS)}/{self.rng.choice(WORDS)}.py"
+            contents = self.rng.choice(self.files)
+            lines = contents.count("\n") + 1
+            return ({"file_path": path}, contents,
+                    {"type": "text", "file": {"filePath": path, "content": contents, "numLines": lines,
+                                              "startLine": 1, "totalLines": lines}})
+        if tool == "Bash":
+            command = f"npm test -- {self.rng.choice(WORDS)}"
+            stdout = self.text(self.rng.randint(1, 4))
+            return ({"command": command, "description": self.text()[:60]}, stdout,
+                    {"stdout": stdout, "stderr": "", "interrupted": False, "isImage": False})
+        if tool == "Grep":
+            pattern = self.rng.choice(WORDS)
+            matches = "\n".join(f"src/{self.rng.choice(WORDS)}.ts" for _ in range(self.rng.randint(1, 30)))
+            return ({"pattern": pattern, "output_mode": "files_with_matches"}, matches,
+                    {"mode": "files_with_matches", "filenames": matches.split("\n"), "numFiles": matches.count("\n") + 1})
+        if tool == "Edit":
+            path = f"{CWD}/src/{self.rng.choice(WORDS)}.ts"
+            old, new = self.rng.choice(self.paragraphs)[:200], self.rng.choice(self.paragraphs)[:200]
+            return ({"file_path": path, "old_string": old, "new_string": new},
+                    f"The file {path} has been updated.",
+                    {"filePath": path, "oldString": old, "newString": new, "replaceAll": False})
+        query = " ".join(self.rng.choices(WORDS, k=4))
+        results = f"Web search results for query: \"{query}\"\n\n{self.text(self.rng.randint(2, 6))}"
+        return {"query": query}, results, {"query": query, "durationSeconds": self.rng.uniform(0.5, 4)}
+
+    def screenshot(self) -> list:
+        return [
+            {"type": "text", "text": "Screenshot captured"},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png",
+                                         "data": self.rng.choice(self.images)}},
+        ]
+
+
+class _Writer:
+    """Writes entries as compact JSONL lines (as Claude Code does), counting bytes."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "w", encoding="utf-8")
+        self.bytes = 0
+        self.entries = 0
+
+    def write(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self.file.write(line)
+        self.bytes += len(line.encode())
+        self.entries += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _write_turns(gen: _Generator, out: _Writer, target_bytes: int, agent_id: str | None, prompt: str,
+                 image_every: int, on_task=None) -> None:
+    """Write turns (a prompt, tool calls and their results, a reply) until out holds target_bytes."""
+    parent = None
+    turn = 0
+    while out.bytes < target_bytes:
+        turn += 1
+        if agent_id is None:
+            message_id = gen.uuid()
+            out.write({"type": "file-history-snapshot", "messageId": message_id,
+                       "snapshot": {"messageId": message_id, "trackedFileBackups": {}, "timestamp": gen.timestamp()},
+                       "isSnapshotUpdate": False})
+        user = gen.user(parent, agent_id, prompt if turn == 1 else gen.text(gen.rng.randint(1, 3)))
+        out.write(user)
+        parent = user["uuid"]
+
+        message_id = gen.short_id("msg_")
+        if gen.rng.random() < 0.6:
+            thinking = gen.assistant(parent, agent_id, message_id,
+                                     {"type": "thinking", "thinking": gen.text(gen.rng.randint(1, 4)),
+                                      "signature": gen.short_id("", 120)})
+            out.write(thinking)
+            parent = thinking["uuid"]
+
+        for _ in range(gen.rng.randint(1, 6)):
+            tool_use_id = gen.short_id("toolu_")
+            run_task = on_task is not None and gen.rng.random() < 0.1
+            tool = "Task" if run_task else gen.rng.choice(TOOLS)
+            if run_task:
+                description = " ".join(gen.rng.choices(WORDS, k=4))
+                tool_input = {"description": description, "prompt": gen.text(), "subagent_type": "general-purpose"}
+                subagent_id, summary = on_task(tool_input["prompt"])
+                result = [{"type": "text", "text": summary}]
+                tool_use_result = {"status": "completed", "prompt": tool_input["prompt"], "agentId": subagent_id,
+                                   "content": result, "totalDurationMs": gen.rng.randint(1000, 90_000),
+                                   "totalTokens": gen.rng.randint(1000, 50_000), "totalToolUseCount": 3}
+            else:
+                tool_input, result, tool_use_result = gen.tool_call(tool)
+                if tool == "Bash" and gen.images and image_every and turn % image_every == 0:
+                    result = gen.screenshot()
+                    tool_use_result = {"stdout": "", "stderr": "", "interrupted": False, "isImage": True}
+
+            call = gen.assistant(parent, agent_id, message_id,
+                                 {"type": "tool_use", "id": tool_use_id, "name": tool, "input": tool_input})
+            out.write(call)
+            if tool == "Bash" and gen.rng.random() < 0.3:
+                progress = gen.envelope("progress", call["uuid"], agent_id)
+                progress.update({"data": {"type": "bash_progress", "output": "", "fullOutput": "",
+                                          "elapsedTimeSeconds": 2, "totalLines": 0},
+                                 "toolUseID": "bash-progress-0", "parentToolUseID": tool_use_id,
+                                 "uuid": gen.uuid(), "timestamp": gen.timestamp()})
+                out.write(progress)
+            tool_result = gen.user(call["uuid"], agent_id,
+                                   [{"tool_use_id": tool_use_id, "type": "tool_result", "content": result}])
+            tool_result["toolUseResult"] = tool_use_result
+            out.write(tool_result)
+            parent = tool_result["uuid"]
+
+        reply = gen.assistant(parent, agent_id, message_id, {"type": "text", "text": gen.text(gen.rng.randint(1, 5))})
+        out.write(reply)
+        parent = reply["uuid"]
+        if agent_id is None and gen.rng.random() < 0.02:
+            system = gen.envelope("system", parent, None)
+            system.update({"subtype": "api_error", "level": "error", "retryInMs": 500.0, "retryAttempt": 1,
+                           "maxRetries": 10, "timestamp": gen.timestamp(), "uuid": gen.uuid()})
+            out.write(system)
+
+
+def write_session(projects_dir: str, size_bytes: int, seed: int = 0, image_kb: int = 256,
+                  image_every: int = 25, subagent_share: float = 0.2, subagent_bytes: int = 200_000,
+                  project_name: str = PROJECT_NAME) -> SyntheticSession:
+    """Write one synthetic session of about size_bytes into projects_dir.
+
+    Roughly subagent_share of the bytes go to subagent transcripts of about
+    subagent_bytes each. One turn in image_every has a screenshot of about
+    image_kb (0 for none).
+    """
+    rng = random.Random(seed)
+    session_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    gen = _Generator(rng, session_id, image_kb)
+    project_dir = os.path.join(projects_dir, project_name)
+    subagents_dir = os.path.join(project_dir, session_id, "subagents")
+    os.makedirs(subagents_dir, exist_ok=True)
+
+    session = SyntheticSession(session_id, os.path.join(project_dir, f"{session_id}.jsonl"))
+    subagent_budget = int(size_bytes * subagent_share)
+    written = {"subagents": 0}
+
+    def run_subagent(prompt: str) -> tuple[str, str]:
+        agent_id = f"a{rng.getrandbits(24):06x}"
+        if written["subagents"] >= subagent_budget:
+            return agent_id, gen.text()
+        path = os.path.join(subagents_dir, f"agent-{agent_id}.jsonl")
+        out = _Writer(path)
+        try:
+            _write_turns(gen, out, min(subagent_bytes, subagent_budget - written["subagents"]), agent_id, prompt,
+                         image_every)
+        finally:
+            out.close()
+        written["subagents"] += out.bytes
+        session.subagent_paths.append(path)
+        session.entries += out.entries
+        return agent_id, gen.text(gen.rng.randint(1, 3))
+
+    out = _Writer(session.main_path)
+    try:
+        _write_turns(gen, out, size_bytes - subagent_budget, None, gen.text(), image_every,
+                     on_task=run_subagent if subagent_share else None)
+        out.write({"type": "summary", "summary": " ".join(rng.choices(WORDS, k=6)), "leafUuid": gen.uuid()})
+    finally:
+        out.close()
+    session.entries += out.entries
+    session.total_bytes = out.bytes + written["subagents"]
+    session.subagent_paths.sort()
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("projects_dir", help="directory to write the project tree into")
+    parser.add_argument("--size-mb", type=float, default=10, help="approximate size of the whole session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--image-kb", type=int, default=256, help="size of each screenshot (0 for none)")
+    parser.add_argument("--image-every", type=int, default=25, help="one turn in N has a screenshot")
+    parser.add_argument("--subagent-share", type=float, default=0.2,
+                        help="fraction of the size that goes to subagent transcripts")
+    args = parser.parse_args()
+
+    session = write_session(args.projects_dir, int(args.size_mb * 1024 * 1024), seed=args.seed,
+                            image_kb=args.image_kb, image_every=args.image_every,
+                            subagent_share=args.subagent_share)
+    print(f"Session {session.session_id}: {session.total_bytes / 1024 / 1024:.1f} MB, {session.entries} entries, "
+          f"{len(session.subagent_paths)} subagent transcript(s)")
+    print(session.main_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+"""Single-pass transcript analysis for the gist sample index.
+
+Only a handful of fields matter for the index (entry types, content block
+types, tool names), but transcript lines routinely carry multi-megabyte base64
+image payloads. The analyzer avoids building those strings:
+
+- long base64 `"data"` values are blanked out of the raw line bytes (a couple
+  of memchr-speed scans) before anything is decoded;
+- with msgspec installed, each line is then decoded into small typed structs
+  that declare only the fields we read, and everything else is skipped
+  without being allocated; otherwise orjson, then the stdlib json module,
+  decode the (now small) line into dicts.
+
+Counts are kept in Counters and the result has the same keys, in the same
+order, as the original dict-based implementation, plus the first and last
+entry timestamps.
+
+analyze_files() fans a batch of transcripts out to a process pool. A file
+above large_file_bytes is split into byte ranges on line boundaries, and the
+partial counters are merged back in range order, so the result is identical
+to a serial run.
+
+Transcripts only grow by appending, so AnalysisCache remembers, per file, how
+many bytes have been analyzed, a sha256 of those bytes and the counters so
+far. When the prefix still hashes the same, analysis resumes at the stored
+offset instead of byte 0. Hashing is far cheaper than parsing.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from typing import Any, Union
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = [name for name, module in (("msgspec", msgspec), ("orjson", orjson)) if module] + ["json"]
+DEFAULT_BACKEND = BACKENDS[0]
+LARGE_FILE_BYTES = 64 * 1024 * 1024
+ANALYSIS_CACHE_VERSION = 2
+_READ_CHUNK = 1024 * 1024
+
+_DATA_KEY = b'"data":'
+# Shorter "data" strings aren't worth cutting out
+_MIN_STRIPPED_DATA = 256
+
+
+if msgspec is not None:
+    class _InnerBlock(msgspec.Struct):
+        type: Any = ""
+
+    class _Block(msgspec.Struct):
+        type: Any = ""
+        name: Any = None
+        content: Union[list[_InnerBlock], str, None] = None
+
+    class _Message(msgspec.Struct):
+        content: Union[list[_Block], str, None] = None
+
+    class _Entry(msgspec.Struct):
+        type: Any = "unknown"
+        timestamp: Any = None
+        message: Union[_Message, None] = None
+
+    _entry_decoder = msgspec.json.Decoder(_Entry)
+
+
+class TranscriptStats:
+    """Counters accumulated over one transcript (or one byte range of it)."""
+
+    __slots__ = ("entry_types", "block_types", "tools", "has_thinking", "has_images", "total_entries",
+                 "first_timestamp", "last_timestamp")
+
+    def __init__(self):
+        self.entry_types: Counter = Counter()
+        self.block_types: Counter = Counter()
+        self.tools: set[str] = set()
+        self.has_thinking = False
+        self.has_images = False
+        self.total_entries = 0
+        self.first_timestamp: str | None = None
+        self.last_timestamp: str | None = None
+
+    def add_timestamp(self, timestamp) -> None:
+        # ISO 8601 UTC timestamps order correctly as strings
+        if not isinstance(timestamp, str):
+            return
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+    def add_block(self, block_type, name=None, inner_types=()) -> None:
+        self.block_types[block_type] += 1
+        if block_type == "tool_use":
+            if name:
+                self.tools.add(name)
+        elif block_type == "thinking":
+            self.has_thinking = True
+        elif block_type == "image":
+            self.has_images = True
+        elif block_type == "tool_result" and "image" in inner_types:
+            self.has_images = True
+
+    def merge(self, other: "TranscriptStats") -> None:
+        """Fold in the stats of the range that follows this one; key order stays first-seen order."""
+        self.entry_types.update(other.entry_types)
+        self.block_types.update(other.block_types)
+        self.tools |= other.tools
+        self.has_thinking |= other.has_thinking
+        self.has_images |= other.has_images
+        self.total_entries += other.total_entries
+        self.add_timestamp(other.first_timestamp)
+        self.add_timestamp(other.last_timestamp)
+
+    def to_state(self) -> dict:
+        """JSON-safe snapshot for the analysis cache. Counters are pairs so key order (and type) survive."""
+        return {
+            "entry_types": list(self.entry_types.items()),
+            "block_types": list(self.block_types.items()),
+            "tools": sorted(self.tools),
+            "has_thinking": self.has_thinking,
+            "has_images": self.has_images,
+            "total_entries": self.total_entries,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "TranscriptStats":
+        stats = cls()
+        stats.entry_types = Counter(dict(state["entry_types"]))
+        stats.block_types = Counter(dict(state["block_types"]))
+        stats.tools = set(state["tools"])
+        stats.has_thinking = state["has_thinking"]
+        stats.has_images = state["has_images"]
+        stats.total_entries = state["total_entries"]
+        stats.first_timestamp = state["first_timestamp"]
+        stats.last_timestamp = state["last_timestamp"]
+        return stats
+
+    def to_dict(self) -> dict:
+        return {
+            "entry_type_counts": dict(self.entry_types),
+            "content_block_counts": dict(self.block_types),
+            "tools_used": sorted(self.tools),
+            "has_thinking": self.has_thinking,
+            "has_images": self.has_images,
+            "total_entries": self.total_entries,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+        }
+
+
+def _add_struct_entry(stats: TranscriptStats, entry: "_Entry") -> None:
+    stats.total_entries += 1
+    stats.entry_types[entry.type] += 1
+    stats.add_timestamp(entry.timestamp)
+    content = entry.message.content if entry.message is not None else None
+    if isinstance(content, list):
+        for block in content:
+            inner = block.content
+            inner_types = [b.type for b in inner] if block.type == "tool_result" and isinstance(inner, list) else ()
+            stats.add_block(block.type, block.name, inner_types)
+
+
+def _add_dict_entry(stats: TranscriptStats, entry: dict) -> None:
+    stats.total_entries += 1
+    stats.entry_types[entry.get("type", "unknown")] += 1
+    stats.add_timestamp(entry.get("timestamp"))
+    message = entry.get("message")
+    content = message.get("content", []) if isinstance(message, dict) else None
+    if isinstance(content, list):
+        for block in content:
+            if not isinstance(block, dict):
+                continue
+            block_type = block.get("type", "")
+            inner_types = ()
+            if block_type == "tool_result":
+                inner = block.get("content", [])
+                if isinstance(inner, list):
+                    inner_types = [b.get("type", "") for b in inner if isinstance(b, dict)]
+            stats.add_block(block_type, block.get("name"), inner_types)
+
+
+def strip_image_data(line: bytes) -> bytes:
+    """Blank out long "data" string values (base64 payloads) before the line is decoded."""
+    start = line.find(_DATA_KEY)
+    if start < 0:
+        return line
+    pieces = []
+    pos = 0
+    while start >= 0:
+        value_start = start + len(_DATA_KEY)
+        while line[value_start:value_start + 1] in (b" ", b"\t"):
+            value_start += 1
+        end = -1
+        if line[value_start:value_start + 1] == b'"':
+            value_start += 1
+            end = line.find(b'"', value_start)
+        if end < 0:
+            start = line.find(_DATA_KEY, value_start)
+            continue
+        # Without a backslash in between, that quote is the real end of the string
+        if end - value_start >= _MIN_STRIPPED_DATA and line.find(b"\\", value_start, end) < 0:
+            pieces.append(line[pos:value_start])
+            pos = end
+        start = line.find(_DATA_KEY, end)
+    if not pieces:
+        return line
+    pieces.append(line[pos:])
+    return b"".join(pieces)
+
+
+def _loads_dict(line: bytes, backend: str):
+    if backend == "json":
+        return json.loads(line)
+    return orjson.loads(line)
+
+
+def add_line(stats: TranscriptStats, line: bytes, backend: str = DEFAULT_BACKEND) -> None:
+    """Fold one raw JSONL line into stats. Blank and malformed lines are ignored."""
+    # All the decoders accept surrounding whitespace, so don't copy the line just to strip it
+    if not line or line.isspace():
+        return
+    # Even msgspec, which skips unknown fields, has to scan a payload for escapes; finding its end is cheaper
+    line = strip_image_data(line)
+    if backend == "msgspec":
+        try:
+            _add_struct_entry(stats, _entry_decoder.decode(line))
+            return
+        except msgspec.ValidationError:
+            # Valid JSON in an unexpected shape: use the generic dict path for this line
+            backend = "orjson" if orjson is not None else "json"
+        except msgspec.DecodeError:
+            return
+    try:
+        entry = _loads_dict(line, backend)
+    except ValueError:
+        return
+    if isinstance(entry, dict):
+        _add_dict_entry(stats, entry)
+
+
+def analyze_lines(lines, backend: str = DEFAULT_BACKEND) -> TranscriptStats:
+    stats = TranscriptStats()
+    for line in lines:
+        add_line(stats, line, backend)
+    return stats
+
+
+def analyze_transcript(path: str, backend: str = DEFAULT_BACKEND) -> dict:
+    """Parse a JSONL transcript and return analysis metadata."""
+    with open(path, "rb") as f:
+        return analyze_lines(f, backend).to_dict()
+
+
+def split_ranges(path: str, parts: int, start: int = 0, end: int | None = None) -> list[tuple[int, int]]:
+    """Split [start, end) of a file into up to `parts` contiguous byte ranges that begin on line boundaries.
+
+    start must itself be a line boundary; end defaults to the file size.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    bounds = [start]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(start + (end - start) * i // parts)
+            # The line straddling the cut belongs to the range before it
+            f.readline()
+            pos = f.tell()
+            if bounds[-1] < pos < end:
+                bounds.append(pos)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def analyze_range(path: str, start: int, end: int, backend: str = DEFAULT_BACKEND) -> TranscriptStats:
+    """Analyze the lines starting in [start, end) of a file; start must be a line boundary."""
+    stats = TranscriptStats()
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            add_line(stats, line, backend)
+    return stats
+
+
+def _complete_lines_end(f, size: int) -> int:
+    """Offset just past the last newline in the file (0 if there is none)."""
+    pos = size
+    while pos > 0:
+        block_start = max(0, pos - 64 * 1024)
+        f.seek(block_start)
+        newline = f.read(pos - block_start).rfind(b"\n")
+        if newline >= 0:
+            return block_start + newline + 1
+        pos = block_start
+    return 0
+
+
+def _hash_bytes(f, digest, length: int) -> None:
+    """Feed the next `length` bytes of f into digest."""
+    while length > 0:
+        chunk = f.read(min(_READ_CHUNK, length))
+        if not chunk:
+            break
+        digest.update(chunk)
+        length -= len(chunk)
+
+
+class AnalysisCache:
+    """Analysis progress per transcript, persisted as one JSON file. Thread safe.
+
+    Only complete lines are recorded, so a transcript caught mid-append resumes cleanly.
+    """
+
+    def __init__(self, path: str, root: str):
+        self.path = path
+        self.root = root
+        self.unchanged = 0
+        self.resumed = 0
+        self.parsed = 0
+        self._lock = threading.Lock()
+        self._records = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != ANALYSIS_CACHE_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+
+    def resume(self, path: str) -> tuple[TranscriptStats, int, int, str]:
+        """Return (stats so far, offset to resume from, end of the last complete line, sha256 of [0, that end)).
+
+        The whole complete-line prefix is hashed in one pass; the stored offset is only trusted if the
+        hash of [0, offset) still matches.
+        """
+        with self._lock:
+            record = self._records.get(self._key(path))
+        stats = TranscriptStats()
+        offset = 0
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            end = _complete_lines_end(f, os.path.getsize(path))
+            f.seek(0)
+            if record and record["offset"] <= end:
+                _hash_bytes(f, digest, record["offset"])
+                if digest.hexdigest() == record["sha256"]:
+                    stats = TranscriptStats.from_state(record["stats"])
+                    offset = record["offset"]
+            _hash_bytes(f, digest, end - f.tell())
+        with self._lock:
+            if offset == 0:
+                self.parsed += 1
+            elif offset == end:
+                self.unchanged += 1
+            else:
+                self.resumed += 1
+        return stats, offset, end, digest.hexdigest()
+
+    def store(self, path: str, offset: int, sha256: str, stats: TranscriptStats) -> None:
+        with self._lock:
+            self._records[self._key(path)] = {"offset": offset, "sha256": sha256, "stats": stats.to_state()}
+
+    def save(self) -> None:
+        """Write the cache atomically."""
+        with self._lock:
+            data = json.dumps({"version": ANALYSIS_CACHE_VERSION, "files": self._records})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        return (
+            f"Analysis cache: {self.unchanged} unchanged, {self.resumed} resumed from a cached offset, "
+            f"{self.parsed} parsed from the start"
+        )
+
+
+def _analyze_task(task: tuple[str, int, int, str]) -> TranscriptStats:
+    return analyze_range(*task)
+
+
+def analyze_files(paths: list[str], executor=None, jobs: int = 1, large_file_bytes: int = LARGE_FILE_BYTES,
+                  backend: str = DEFAULT_BACKEND, cache: AnalysisCache | None = None) -> list[dict]:
+    """Analyze several transcripts, on executor (a ProcessPoolExecutor with `jobs` workers) if given.
+
+    With a cache, each file is only parsed from where the previous analysis stopped. Results are in
+    the order of paths.
+    """
+    bases = []
+    resume_points = []
+    tasks = []
+    owners = []
+    is_tail = []
+    for i, path in enumerate(paths):
+        size = os.path.getsize(path)
+        if cache is not None:
+            base, start, end, sha256 = cache.resume(path)
+        else:
+            base, start, end, sha256 = TranscriptStats(), 0, size, None
+        bases.append(base)
+        resume_points.append((end, sha256))
+
+        length = end - start
+        parts = min(jobs, -(-length // large_file_bytes)) if executor is not None and large_file_bytes > 0 else 1
+        ranges = split_ranges(path, parts, start, end) if parts > 1 else [(start, end)]
+        for range_start, range_end in ranges:
+            if range_start < range_end:
+                tasks.append((path, range_start, range_end, backend))
+                owners.append(i)
+                is_tail.append(False)
+        if end < size:
+            # A trailing partial line is analyzed but never cached
+            tasks.append((path, end, size, backend))
+            owners.append(i)
+            is_tail.append(True)
+
+    if executor is None:
+        results = map(_analyze_task, tasks)
+    else:
+        # Batch small tasks per IPC round trip; map() yields results in submission order
+        results = executor.map(_analyze_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+
+    tails = {}
+    for owner, tail, stats in zip(owners, is_tail, results):
+        if tail:
+            tails[owner] = stats
+        else:
+            bases[owner].merge(stats)
+    if cache is not None:
+        for path, base, (end, sha256) in zip(paths, bases, resume_points):
+            cache.store(path, end, sha256, base)
+    for owner, stats in tails.items():
+        bases[owner].merge(stats)
+    return [stats.to_dict() for stats in bases]
@@ -0,0 +1,44 @@
+import { useEffect, useRef } from 'react'
+
+interface LoadMoreButtonProps {
+  label: string
+  loading: boolean
+  onLoad: () => void
+  /** Load as soon as the button comes near the viewport, instead of waiting for a click */
+  loadWhenVisible?: boolean
+}
+
+export function LoadMoreButton({
+  label,
+  loading,
+  onLoad,
+  loadWhenVisible = false,
+}: LoadMoreButtonProps) {
+  const buttonRef = useRef<HTMLButtonElement>(null)
+
+  useEffect(() => {
+    const button = buttonRef.current
+    if (!loadWhenVisible || loading || !button || typeof IntersectionObserver === 'undefined') {
+      return
+    }
+    const observer = new IntersectionObserver(
+      (observed) => {
+        if (observed.some((entry) => entry.isIntersecting)) onLoad()
+      },
+      { rootMargin: '1000px 0px' }
+    )
+    observer.observe(button)
+    return () => observer.disconnect()
+  }, [loadWhenVisible, loading, onLoad])
+
+  return (
+    <button
+      ref={buttonRef}
+      onClick={onLoad}
+      disabled={loading}
+      className="w-full px-3 py-2 text-sm text-gray-600 bg-gray-100 hover:bg-gray-200 rounded transition-colors disabled:opacity-50"
+    >
+      {loading ? 'Loading...' : label}
+    </button>
+  )
+}
@@ -0,0 +1,69 @@
+import { createContext, useContext, useState } from 'react'
+import type { TranscriptEntry } from '../domain/transcriptEntry'
+import type { SubagentLoader } from '../lib/gistGateway'
+import { MessageThread } from './MessageThread'
+
+/** Provided by the transcript viewer when the gist has subagent transcripts */
+export const SubagentLoaderContext = createContext<SubagentLoader | undefined>(undefined)
+
+/** The agent id a Task tool call's result names, if it ran a subagent */
+export function subagentIdOf(rawToolUseResult: unknown): string | undefined {
+  if (typeof rawToolUseResult !== 'object' || rawToolUseResult === null) return undefined
+  const { agentId } = rawToolUseResult as { agentId?: unknown }
+  return typeof agentId === 'string' && agentId ? agentId : undefined
+}
+
+const linkClass = 'text-sm text-gray-500 hover:underline cursor-pointer'
+const linkWrapperClass = 'mt-2 text-right'
+
+interface SubagentTranscriptProps {
+  agentId: string
+}
+
+/** A subagent's conversation, fetched the first time it is shown */
+export function SubagentTranscript({ agentId }: SubagentTranscriptProps) {
+  const loadSubagent = useContext(SubagentLoaderContext)
+  const [expanded, setExpanded] = useState(false)
+  const [entries, setEntries] = useState<TranscriptEntry[] | null>(null)
+  const [error, setError] = useState<string | null>(null)
+  if (!loadSubagent) return null
+
+  function show() {
+    setExpanded(true)
+    setError(null)
+    loadSubagent!(agentId)
+      .then(setEntries)
+      .catch((err) => setError(err instanceof Error ? err.message : String(err)))
+  }
+
+  if (!expanded) {
+    return (
+      <div className={linkWrapperClass}>
+        <a className={linkClass} onClick={show}>
+          show subagent transcript
+        </a>
+      </div>
+    )
+  }
+
+  return (
+    <>
+      <hr className="border-gray-200 my-2" />
+      <div className="text-sm font-medium text-gray-600 mb-2">Subagent Transcript:</div>
+      {error ? (
+        <p className="text-sm text-red-500">{error}</p>
+      ) : entries ? (
+        <div className="pl-4 border-l-2 border-gray-200">
+          <MessageThread entries={entries} />
+        </div>
+      ) : (
+        <p className="text-sm text-gray-400">Loading subagent transcript...</p>
+      )}
+      <div className={linkWrapperClass}>
+        <a className={linkClass} onClick={() => setExpanded(false)}>
+          hide subagent transcript
+        </a>
+      </div>
+    </>
+  )
+}
@@ -1,10 +1,12 @@
-import { useEffect, useMemo, useState } from 'react'
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react'
 import { useParams, useLocation } from 'react-router-dom'
-import { extractSessionMetadata } from '../domain/transcriptEntry'
-import { fetchGistTranscriptFull, type TranscriptData } from '../lib/gistGateway'
+import { extractSessionMetadata, type TranscriptEntry } from '../domain/transcriptEntry'
+import { fetchGistTranscript, type TranscriptData, type TranscriptPager } from '../lib/gistGateway'
+import { LoadMoreButton } from './LoadMoreButton'
 import { MessageThread } from './MessageThread'
 import { RawTranscriptView } from './RawTranscriptView'
 import { SessionMetadataHeader } from './SessionMetadataHeader'
+import { SubagentLoaderContext } from './SubagentTranscript'
 import { ViewToggle, type ViewMode } from './ViewToggle'
 
 export function TranscriptViewer() {
@@ -14,6 +16,11 @@ export function TranscriptViewer() {
   const [viewMode, setViewMode] = useState<ViewMode>('conversation')
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  const [loadingPage, setLoadingPage] = useState(false)
+  const [pageError, setPageError] = useState<string | null>(null)
+  // Read when the transcript loads, so a large one can start at the linked page
+  const hashRef = useRef(location.hash)
+  hashRef.current = location.hash
 
   useEffect(() => {
     if (!gistId) return
@@ -22,7 +29,10 @@ export function TranscriptViewer() {
       try {
         setLoading(true)
         setError(null)
-        const transcriptData = await fetchGistTranscriptFull(gistId!)
+        const transcriptData = await fetchGistTranscript(
+          gistId!,
+          hashRef.current.slice(1) || undefined
+        )
         setData(transcriptData)
       } catch (err) {
         setError(err instanceof Error ? err.message : 'Failed to load transcript')
@@ -44,11 +54,45 @@ export function TranscriptViewer() {
         setTimeout(() => {
           element.scrollIntoView({ behavior: 'smooth', block: 'start' })
         }, 100)
+      } else if (data.pager) {
+        // Not on the loaded pages yet: load its page, and scroll once that renders
+        const loadedEntries = data.entries
+        data.pager
+          .reveal(anchorId)
+          .then((entries) => {
+            if (entries !== loadedEntries) {
+              setData((current) => current && { ...current, entries })
+            }
+          })
+          .catch((err) => setPageError(err instanceof Error ? err.message : String(err)))
       }
     }
   }, [data, location.hash])
 
-  const metadata = useMemo(() => (data ? extractSessionMetadata(data.entries) : null), [data])
+  const pager = data?.pager
+  const loadPage = useCallback(
+    async (load: (pager: TranscriptPager) => Promise<TranscriptEntry[]>) => {
+      if (!pager) return
+      try {
+        setLoadingPage(true)
+        setPageError(null)
+        const entries = await load(pager)
+        setData((current) => current && { ...current, entries })
+      } catch (err) {
+        setPageError(err instanceof Error ? err.message : 'Failed to load more of the transcript')
+      } finally {
+        setLoadingPage(false)
+      }
+    },
+    [pager]
+  )
+  const loadPrevious = useCallback(() => loadPage((pager) => pager.loadPrevious()), [loadPage])
+  const loadNext = useCallback(() => loadPage((pager) => pager.loadNext()), [loadPage])
+
+  const metadata = useMemo(() => {
+    if (!data) return null
+    return data.metadata !== undefined ? data.metadata : extractSessionMetadata(data.entries)
+  }, [data])
 
   if (loading) {
     return (
@@ -82,11 +126,33 @@ export function TranscriptViewer() {
         <ViewToggle currentView={viewMode} onViewChange={setViewMode} />
       </div>
       {metadata && <SessionMetadataHeader metadata={metadata} />}
+      {pager?.hasPrevious() && (
+        <div className="mb-6">
+          <LoadMoreButton
+            label="Load earlier messages"
+            loading={loadingPage}
+            onLoad={loadPrevious}
+          />
+        </div>
+      )}
       {viewMode === 'conversation' ? (
-        <MessageThread entries={data.entries} />
+        <SubagentLoaderContext.Provider value={data.subagents}>
+          <MessageThread entries={data.entries} />
+        </SubagentLoaderContext.Provider>
       ) : (
         <RawTranscriptView entries={data.entries} />
       )}
+      {pageError && <p className="mt-6 text-sm text-red-500">{pageError}</p>}
+      {pager?.hasNext() && (
+        <div className="mt-6">
+          <LoadMoreButton
+            label="Load more messages"
+            loading={loadingPage}
+            onLoad={loadNext}
+            loadWhenVisible={!pageError}
+          />
+        </div>
+      )}
     </div>
   )
 }
@@ -1,11 +1,62 @@
-import type { ImageSource } from '../../domain/transcriptEntry'
+import { useEffect, useRef, useState } from 'react'
+import type { ImageSource, UrlImageSource } from '../../domain/transcriptEntry'
+import { fetchImageObjectUrl } from '../../lib/gistGateway'
 
 interface Base64ImageProps {
   source: ImageSource
   alt: string
 }
 
+const IMAGE_CLASS = 'max-w-full border border-gray-200 shadow-sm'
+
 export function Base64Image({ source, alt }: Base64ImageProps) {
+  if (source.type === 'url') {
+    return <ImageFile source={source} alt={alt} />
+  }
   const src = `data:${source.media_type};base64,${source.data}`
-  return <img src={src} alt={alt} className="max-w-full border border-gray-200 shadow-sm" />
+  return <img src={src} alt={alt} className={IMAGE_CLASS} />
+}
+
+/** An image published as its own file: fetched once it comes near the viewport */
+function ImageFile({ source, alt }: { source: UrlImageSource; alt: string }) {
+  const placeholderRef = useRef<HTMLDivElement>(null)
+  const [visible, setVisible] = useState(typeof IntersectionObserver === 'undefined')
+  const [src, setSrc] = useState<string | null>(null)
+  const [failed, setFailed] = useState(false)
+
+  useEffect(() => {
+    const placeholder = placeholderRef.current
+    if (visible || !placeholder) return
+    const observer = new IntersectionObserver(
+      (observed) => {
+        if (observed.some((entry) => entry.isIntersecting)) setVisible(true)
+      },
+      { rootMargin: '500px 0px' }
+    )
+    observer.observe(placeholder)
+    return () => observer.disconnect()
+  }, [visible])
+
+  useEffect(() => {
+    if (!visible) return
+    let cancelled = false
+    fetchImageObjectUrl(source)
+      .then((objectUrl) => !cancelled && setSrc(objectUrl))
+      .catch(() => !cancelled && setFailed(true))
+    return () => {
+      cancelled = true
+    }
+  }, [visible, source])
+
+  if (src) {
+    return <img src={src} alt={alt} className={IMAGE_CLASS} />
+  }
+  return (
+    <div
+      ref={placeholderRef}
+      className="flex items-center justify-center h-32 text-sm text-gray-400 bg-gray-50 border border-gray-200"
+    >
+      {failed ? 'Image failed to load' : 'Loading image...'}
+    </div>
+  )
 }
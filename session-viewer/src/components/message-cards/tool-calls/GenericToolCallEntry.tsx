@@ -1,5 +1,6 @@
 import { Tool } from '@geist-ui/icons'
 import type { GenericToolCall } from '../../../domain/transcriptEntry'
+import { SubagentTranscript, subagentIdOf } from '../../SubagentTranscript'
 import { ExpandableMessageCard } from '../ExpandableMessageCard'
 import { CodeBlock } from './CodeBlock'
 import { RawToolResult } from './RawToolResult'
@@ -12,6 +13,7 @@ interface GenericToolCallEntryProps {
 
 export function GenericToolCallEntry({ toolCall, anchorId }: GenericToolCallEntryProps) {
   const hasResult = toolCall.result !== undefined
+  const agentId = subagentIdOf(toolCall.rawToolUseResult)
 
   return (
     <ExpandableMessageCard
@@ -32,6 +34,7 @@ export function GenericToolCallEntry({ toolCall, anchorId }: GenericToolCallEntr
             <div className="text-sm font-medium text-gray-600 mb-2">Result:</div>
             <ToolResultContent content={toolCall.result!} />
             <RawToolResult data={toolCall.rawToolUseResult} />
+            {agentId && <SubagentTranscript agentId={agentId} />}
           </div>
         ) : undefined
       }
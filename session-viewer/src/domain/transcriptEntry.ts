@@ -6,12 +6,21 @@ export interface TextBlock {
   text: string
 }
 
-export interface ImageSource {
+export interface Base64ImageSource {
   type: 'base64'
   media_type: string
   data: string
 }
 
+/** An image published as its own gist file, fetched when it is displayed */
+export interface UrlImageSource {
+  type: 'url'
+  media_type: string
+  url: string
+}
+
+export type ImageSource = Base64ImageSource | UrlImageSource
+
 export interface ImageBlock {
   type: 'image'
   source: ImageSource
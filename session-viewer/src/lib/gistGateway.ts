@@ -9,14 +9,21 @@ import type {
   AssistantStructuredEntry,
   UserStructuredEntry,
   UserContentBlock,
+  ToolResultContentItem,
+  EditToolResult,
+  ImageSource,
+  UrlImageSource,
+  SessionMetadata,
 } from '../domain/transcriptEntry'
+import { isMessageEntry } from '../domain/transcriptEntry'
 
-interface GistFile {
+export interface GistFile {
   filename: string
   raw_url: string
+  size?: number
 }
 
-interface GistResponse {
+export interface GistResponse {
   files: Record<string, GistFile>
 }
 
@@ -32,9 +39,15 @@ const Base64SourceSchema = z.object({
   data: z.string(),
 })
 
+const UrlSourceSchema = z.object({
+  type: z.literal('url'),
+  media_type: z.string(),
+  url: z.string(),
+})
+
 const ImageBlockSchema = z.object({
   type: z.literal('image'),
-  source: Base64SourceSchema,
+  source: z.discriminatedUnion('type', [Base64SourceSchema, UrlSourceSchema]),
 })
 
 const ToolResultContentItemSchema = z.discriminatedUnion('type', [
@@ -150,11 +163,207 @@ const SystemEntrySchema = z.object({
   durationMs: z.number().optional(),
 })
 
+/**
+ * The publish script's image extraction stage uploads each distinct image once,
+ * as its base64 data under image-<sha256>.b64, and refers to it by sha256
+ */
+const IMAGE_FILE_PATTERN = /^image-([0-9a-f]{64})\.b64$/
+
+/** sha256 → where to fetch an image file from */
+export type ImagePayloads = Record<string, { url: string }>
+
+/**
+ * Oversized main transcripts are published as ordered part files plus a manifest
+ * (see the publish script's chunking stage)
+ */
+const MANIFEST_SUFFIX = '.manifest.json'
+const PART_FILE_PATTERN = /\.part-\d+\.jsonl(\.gz\.b64)?$/
+
+/** Transcripts published with --compress are gzipped, then base64 encoded */
+const COMPRESSED_SUFFIX = '.gz.b64'
+
+function isTranscriptFile(filename: string): boolean {
+  return filename.endsWith('.jsonl') || filename.endsWith(`.jsonl${COMPRESSED_SUFFIX}`)
+}
+
+const ChunkManifestSchema = z.object({
+  format: z.literal('session-share-chunked'),
+  version: z.literal(1),
+  transcript: z.string(),
+  parts: z.array(
+    z.object({
+      filename: z.string(),
+      lines: z.number(),
+      bytes: z.number(),
+      sha256: z.string(),
+    })
+  ),
+})
+
+/**
+ * Main transcripts are published with a pre-normalized outline (see the publish
+ * script's normalization stage): a header line, then one line per entry recording
+ * how it validated and which tool results its tool calls pair with. Large outlines
+ * are chunked like transcripts, and compressed with --compress.
+ */
+const NORMALIZED_SUFFIX = '.normalized.jsonl'
+const NORMALIZED_MANIFEST_SUFFIX = '.normalized.manifest.json'
+const NORMALIZED_PART_PATTERN = /\.normalized\.part-\d+\.jsonl(\.gz\.b64)?$/
+
+/** Must match NORMALIZED_VERSION in normalization.py; other versions are ignored */
+const NORMALIZED_VERSION = 3
+
+function isNormalizedFile(filename: string): boolean {
+  return (
+    filename.endsWith(NORMALIZED_SUFFIX) ||
+    filename.endsWith(`${NORMALIZED_SUFFIX}${COMPRESSED_SUFFIX}`) ||
+    filename.endsWith(NORMALIZED_MANIFEST_SUFFIX) ||
+    NORMALIZED_PART_PATTERN.test(filename)
+  )
+}
+
+const NormalizedHeaderSchema = z.object({
+  format: z.literal('session-share-normalized'),
+  version: z.literal(NORMALIZED_VERSION),
+  transcript: z.string(),
+  transcriptBytes: z.number(),
+  metadata: z
+    .object({
+      sessionId: z.string(),
+      gitBranch: z.string().nullable(),
+      startTime: z.string(),
+      endTime: z.string(),
+      userMessageCount: z.number(),
+    })
+    .nullable(),
+  messageCounts: z.record(z.number()),
+  entryCount: z.number(),
+})
+
+export type NormalizedHeader = z.infer<typeof NormalizedHeaderSchema>
+
+/**
+ * Main transcripts are published with a page index (see the publish script's
+ * transcript_index.py): byte ranges that tile the transcript every few hundred
+ * entries, plus the position of every user turn. Large sessions are loaded a
+ * page at a time from it. When the normalized outline was published too, each
+ * page also has the byte range of its outline lines, and is built from them.
+ */
+const INDEX_SUFFIX = '.index.json'
+
+const TranscriptIndexSchema = z.object({
+  format: z.literal('session-share-index'),
+  version: z.literal(1),
+  transcript: z.string(),
+  transcriptBytes: z.number(),
+  entryCount: z.number(),
+  metadata: NormalizedHeaderSchema.shape.metadata,
+  pages: z.array(
+    z.object({
+      entry: z.number(),
+      entries: z.number(),
+      uuid: z.string().nullable(),
+      offset: z.number(),
+      length: z.number(),
+      outlineOffset: z.number().optional(),
+      outlineLength: z.number().optional(),
+    })
+  ),
+  /** The normalized outline the pages' outline ranges are into; its header precedes them */
+  outline: z.object({ filename: z.string(), bytes: z.number() }).optional(),
+  anchors: z.array(
+    z.object({
+      uuid: z.string(),
+      entry: z.number(),
+      offset: z.number(),
+      length: z.number(),
+    })
+  ),
+})
+
+export type TranscriptIndex = z.infer<typeof TranscriptIndexSchema>
+
+/**
+ * Sessions with many subagents have their agent-<id>.jsonl transcripts
+ * concatenated into a few bundle files (see the publish script's
+ * subagent_bundles.py), with a manifest giving each agent's byte range
+ */
+const BUNDLE_MANIFEST_FILENAME = 'agent-bundles.json'
+const SUBAGENT_FILE_PATTERN = /^agent-(.+)\.jsonl(\.gz\.b64)?$/
+
+const BundleManifestSchema = z.object({
+  format: z.literal('session-share-agent-bundles'),
+  version: z.literal(1),
+  bundles: z.array(
+    z.object({
+      filename: z.string(),
+      bytes: z.number(),
+      sha256: z.string(),
+    })
+  ),
+  agents: z.record(
+    z.object({
+      filename: z.string(),
+      bundle: z.string(),
+      offset: z.number(),
+      length: z.number(),
+    })
+  ),
+})
+
+type BundleManifest = z.infer<typeof BundleManifestSchema>
+
+/**
+ * Transcripts published with --dedupe-files hold each file's contents once, in
+ * file-snapshots.jsonl (chunked and compressed like transcripts), and refer to
+ * them from Read/Edit/Write results (see the publish script's file_snapshots.py).
+ * A ref stands in for a JSON string: the snapshot's text, or its lines numbered
+ * the way the Read tool shows them followed by a suffix.
+ */
+const SNAPSHOTS_FILENAME = 'file-snapshots.jsonl'
+const SNAPSHOTS_MANIFEST_FILENAME = 'file-snapshots.manifest.json'
+const SNAPSHOT_FILE_PATTERN = /^file-snapshots\.(part-\d+\.)?jsonl(\.gz\.b64)?$/
+const SNAPSHOT_REF_PREFIX = '{"$snapshot":'
+const SNAPSHOT_REF_PATTERN =
+  /\{"\$snapshot":"([0-9a-f]{64})"(?:,"numbered":(\d+),"separator":("(?:[^"\\]|\\.)*"),"suffix":("(?:[^"\\]|\\.)*"))?\}/g
+
+const SnapshotsHeaderSchema = z.object({
+  format: z.literal('session-share-snapshots'),
+  version: z.literal(1),
+})
+
+const SnapshotRecordSchema = z.union([
+  z.object({ sha256: z.string(), text: z.string() }),
+  /** Positive numbers copy that many lines of the base, negative ones skip them, strings are inserted lines */
+  z.object({ sha256: z.string(), base: z.string(), diff: z.array(z.union([z.number(), z.string()])) }),
+])
+
+type SnapshotRecord = z.infer<typeof SnapshotRecordSchema>
+
+/** Entry indices (and a content block index) that a tool call takes its result from */
+interface ToolCallOutline {
+  kind: ToolCall['kind']
+  result?: [number, number]
+  rawToolUseResult?: number
+  toolUseResult?: number
+}
+
+type EntryOutline =
+  | { kind: 'meta' | 'unsupported' | 'progress' | 'system' }
+  | { kind: 'user'; isToolResultOnly: boolean }
+  | { kind: 'assistant'; toolCalls?: ToolCallOutline[] }
+
 /** Meta entry types - no structured parsing needed */
 const META_TYPES = ['file-history-snapshot', 'queue-operation', 'summary'] as const
 
 export interface TranscriptData {
   entries: TranscriptEntry[]
+  /** Precomputed at publish time; undefined means derive it from the entries */
+  metadata?: SessionMetadata | null
+  /** Set when entries are only the pages loaded so far */
+  pager?: TranscriptPager
+  /** Set when the gist has subagent transcripts */
+  subagents?: SubagentLoader
 }
 
 /** Extracted tool result for correlation */
@@ -390,19 +599,122 @@ function isMetaType(type: string): type is (typeof META_TYPES)[number] {
   return META_TYPES.includes(type as (typeof META_TYPES)[number])
 }
 
-export function parseEntries(jsonlContent: string): TranscriptEntry[] {
+function resolveImageRef(block: unknown, images: ImagePayloads): void {
+  if (typeof block !== 'object' || block === null) return
+  const imageBlock = block as { type?: unknown; source?: unknown }
+  const source = imageBlock.source as { type?: unknown; media_type?: unknown; sha256?: unknown }
+  if (imageBlock.type !== 'image' || source?.type !== 'ref') return
+  const sha256 = String(source.sha256)
+  const payload = Object.prototype.hasOwnProperty.call(images, sha256) ? images[sha256] : undefined
+  if (payload) {
+    imageBlock.source = { type: 'url', media_type: source.media_type, url: payload.url }
+  }
+}
+
+/**
+ * Swap image references ({type: 'ref', sha256}) for the URL of their image file,
+ * at the top level of a message and inside tool results.
+ */
+export function resolveImageRefs(parsed: unknown, images: ImagePayloads): void {
+  const content = (parsed as { message?: { content?: unknown } }).message?.content
+  if (!Array.isArray(content)) return
+  for (const block of content) {
+    resolveImageRef(block, images)
+    if (block?.type === 'tool_result' && Array.isArray(block.content)) {
+      for (const inner of block.content) {
+        resolveImageRef(inner, images)
+      }
+    }
+  }
+}
+
+export function parseEntries(jsonlContent: string, images?: ImagePayloads): TranscriptEntry[] {
+  return createEntryParser(images)(jsonlContent)
+}
+
+/** Results parsed for a tool call that hasn't been seen (it's in an earlier slice) */
+interface OrphanResults {
+  result?: ExtractedToolResult['content']
+  toolUseResult?: unknown
+}
+
+/** What a parser carries from one slice of a transcript to the next */
+interface EntryParserState {
+  /** Map of tool_use_id → ToolCall reference for correlation */
+  toolCalls: Map<string, ToolCall>
+  orphans: Map<string, OrphanResults>
+}
+
+function newParserState(): EntryParserState {
+  return { toolCalls: new Map(), orphans: new Map() }
+}
+
+/**
+ * Returns a parser for consecutive slices of one transcript. Tool calls seen in
+ * earlier slices are still matched with results that arrive in later ones.
+ */
+export function createEntryParser(
+  images?: ImagePayloads
+): (jsonlContent: string) => TranscriptEntry[] {
+  const state = newParserState()
+
+  return (jsonlContent) => parseEntrySlice(jsonlContent, state, images)
+}
+
+function applyToolUseResult(toolCall: ToolCall, toolUseId: string, data: unknown): void {
+  // Store raw data for all tool types
+  toolCall.rawToolUseResult = data
+
+  // For Edit tools, also validate and store parsed data for rendering
+  if (toolCall.kind === 'edit') {
+    const validationResult = EditToolResultSchema.safeParse(data)
+    if (validationResult.success) {
+      toolCall.toolUseResult = validationResult.data
+    } else {
+      console.warn(
+        `Edit tool result has invalid structure (id: ${toolUseId}):`,
+        validationResult.error.format(),
+        data
+      )
+    }
+  }
+}
+
+/**
+ * Fold the state of a parser that read the slice just before `state`'s into it:
+ * the earlier slice's tool calls take the results `state` couldn't match.
+ */
+function prependParserState(state: EntryParserState, earlier: EntryParserState): void {
+  for (const [id, toolCall] of earlier.toolCalls) {
+    const orphan = state.orphans.get(id)
+    if (orphan) {
+      if (orphan.result) toolCall.result = orphan.result
+      if ('toolUseResult' in orphan) applyToolUseResult(toolCall, id, orphan.toolUseResult)
+      state.orphans.delete(id)
+    }
+    // A later call with the same id wins, as it would parsing the slices in order
+    if (!state.toolCalls.has(id)) state.toolCalls.set(id, toolCall)
+  }
+  for (const [id, orphan] of earlier.orphans) {
+    if (!state.orphans.has(id)) state.orphans.set(id, orphan)
+  }
+}
+
+function parseEntrySlice(
+  jsonlContent: string,
+  { toolCalls: toolCallMap, orphans }: EntryParserState,
+  images?: ImagePayloads
+): TranscriptEntry[] {
   const lines = jsonlContent.trim().split('\n')
   const entries: TranscriptEntry[] = []
 
-  // Map of tool_use_id → ToolCall reference for correlation
-  const toolCallMap = new Map<string, ToolCall>()
-
   for (const line of lines) {
     if (!line.trim()) continue
     if (line.trim().startsWith('//')) continue
 
     const parsed = JSON.parse(line)
     const type = parsed.type ?? 'unknown'
+    if (images) resolveImageRefs(parsed, images)
 
     // Meta entries - no uuid, no structured parsing
     if (isMetaType(type)) {
@@ -422,33 +734,28 @@ export function parseEntries(jsonlContent: string): TranscriptEntry[] {
       const result = parseUserStructuredEntry(parsed)
       if (result) {
         structuredEntry = result.entry
-        // Correlate tool results to their calls
+        // Correlate tool results to their calls, keeping those for calls in earlier slices
         for (const toolResult of result.toolResults) {
           const toolCall = toolCallMap.get(toolResult.toolUseId)
           if (toolCall) {
             toolCall.result = toolResult.content
+          } else {
+            orphans.set(toolResult.toolUseId, {
+              ...orphans.get(toolResult.toolUseId),
+              result: toolResult.content,
+            })
           }
         }
         // Correlate toolUseResults to all tool calls
         for (const toolUseResult of result.toolUseResults) {
           const toolCall = toolCallMap.get(toolUseResult.toolUseId)
           if (toolCall) {
-            // Store raw data for all tool types
-            toolCall.rawToolUseResult = toolUseResult.data
-
-            // For Edit tools, also validate and store parsed data for rendering
-            if (toolCall.kind === 'edit') {
-              const validationResult = EditToolResultSchema.safeParse(toolUseResult.data)
-              if (validationResult.success) {
-                toolCall.toolUseResult = validationResult.data
-              } else {
-                console.warn(
-                  `Edit tool result has invalid structure (id: ${toolUseResult.toolUseId}):`,
-                  validationResult.error.format(),
-                  toolUseResult.data
-                )
-              }
-            }
+            applyToolUseResult(toolCall, toolUseResult.toolUseId, toolUseResult.data)
+          } else {
+            orphans.set(toolUseResult.toolUseId, {
+              ...orphans.get(toolUseResult.toolUseId),
+              toolUseResult: toolUseResult.data,
+            })
           }
         }
       }
@@ -482,28 +789,1122 @@ export function parseEntries(jsonlContent: string): TranscriptEntry[] {
   return entries
 }
 
-export async function fetchGistTranscriptFull(gistId: string): Promise<TranscriptData> {
-  const metaResponse = await fetch(`https://api.github.com/gists/${gistId}`)
-  if (!metaResponse.ok) {
-    throw new Error(`Failed to fetch gist metadata: ${metaResponse.status}`)
+// Builders for entries the publish script already validated: they copy the
+// fields the Zod schemas above would keep, without checking them again
+
+function toolResultItems(
+  content: z.infer<typeof ToolResultBlockSchema>['content']
+): ToolResultContentItem[] {
+  if (typeof content === 'string') return [{ type: 'text', text: content }]
+  return content.map((item): ToolResultContentItem =>
+    item.type === 'text'
+      ? { type: 'text', text: item.text }
+      : { type: 'image', source: imageSource(item.source) }
+  )
+}
+
+function imageSource(source: z.infer<typeof ImageBlockSchema>['source']): ImageSource {
+  return source.type === 'base64'
+    ? { type: 'base64', media_type: source.media_type, data: source.data }
+    : { type: 'url', media_type: source.media_type, url: source.url }
+}
+
+function outlinedToolCall(
+  block: z.infer<typeof ToolUseBlockSchema>,
+  kind: ToolCall['kind']
+): ToolCall {
+  if (kind === 'read') {
+    const input = block.input as z.infer<typeof ReadToolInputSchema>
+    const readInput: z.infer<typeof ReadToolInputSchema> = { file_path: input.file_path }
+    if ('offset' in input) readInput.offset = input.offset
+    if ('limit' in input) readInput.limit = input.limit
+    return { kind, id: block.id, input: readInput }
+  }
+  if (kind === 'edit') {
+    const input = block.input as z.infer<typeof EditToolInputSchema>
+    return {
+      kind,
+      id: block.id,
+      input: {
+        file_path: input.file_path,
+        old_string: input.old_string,
+        new_string: input.new_string,
+        replace_all: input.replace_all,
+      },
+    }
+  }
+  return { kind: 'generic', id: block.id, name: block.name, input: { ...block.input } }
+}
+
+function outlinedEditResult(data: EditToolResult): EditToolResult {
+  return {
+    filePath: data.filePath,
+    oldString: data.oldString,
+    newString: data.newString,
+    originalFile: data.originalFile,
+    structuredPatch: data.structuredPatch.map((hunk) => ({
+      oldStart: hunk.oldStart,
+      oldLines: hunk.oldLines,
+      newStart: hunk.newStart,
+      newLines: hunk.newLines,
+      lines: hunk.lines,
+    })),
+    userModified: data.userModified,
+    replaceAll: data.replaceAll,
+  }
+}
+
+function outlinedStructuredEntry(
+  parsed: unknown,
+  type: string,
+  outline: EntryOutline
+): MessageStructuredEntry {
+  if (outline.kind !== 'unsupported' && outline.kind !== type) {
+    throw new Error(`Normalized outline says ${outline.kind}, transcript entry is ${type}`)
+  }
+  switch (outline.kind) {
+    case 'user': {
+      const { content } = (parsed as z.infer<typeof UserMessageEntrySchema>).message
+      const blocks: UserContentBlock[] =
+        typeof content === 'string'
+          ? [{ type: 'text', text: content }]
+          : content.map((block): UserContentBlock => {
+              if (block.type === 'text') return { type: 'text', text: block.text }
+              if (block.type === 'image') {
+                return { type: 'image', source: imageSource(block.source) }
+              }
+              return {
+                type: 'tool_result',
+                tool_use_id: block.tool_use_id,
+                content: toolResultItems(block.content),
+              }
+            })
+      return {
+        kind: 'user',
+        role: 'user',
+        content: blocks,
+        isToolResultOnly: outline.isToolResultOnly,
+      }
+    }
+    case 'assistant': {
+      const { content } = (parsed as z.infer<typeof AssistantMessageEntrySchema>).message
+      const toolUseBlocks = content.filter(
+        (block): block is z.infer<typeof ToolUseBlockSchema> => block.type === 'tool_use'
+      )
+      const toolCallOutlines = outline.toolCalls ?? []
+      if (toolCallOutlines.length !== toolUseBlocks.length) {
+        throw new Error('Normalized outline has the wrong number of tool calls')
+      }
+      const hasThinking = content.some((block) => block.type === 'thinking')
+      const hasToolUse = toolUseBlocks.length > 0
+      return {
+        kind: 'assistant',
+        role: 'assistant',
+        content: content
+          .filter((block): block is z.infer<typeof TextBlockSchema> => block.type === 'text')
+          .map((block) => block.text)
+          .join('\n'),
+        thinkingContent: hasThinking
+          ? content
+              .filter(
+                (block): block is z.infer<typeof ThinkingBlockSchema> => block.type === 'thinking'
+              )
+              .map((block) => block.thinking)
+              .join('\n')
+          : undefined,
+        hasToolUse,
+        hasThinking,
+        toolCalls: hasToolUse
+          ? toolUseBlocks.map((block, i) => outlinedToolCall(block, toolCallOutlines[i].kind))
+          : undefined,
+      }
+    }
+    case 'progress': {
+      const entry = parsed as z.infer<typeof ProgressEntrySchema>
+      const data = entry.data as { type: string; agentId?: string }
+      return {
+        kind: 'progress',
+        progressType: data.type,
+        toolUseID: entry.toolUseID,
+        parentToolUseID: entry.parentToolUseID,
+        agentId: data.agentId,
+      }
+    }
+    case 'system': {
+      const entry = parsed as z.infer<typeof SystemEntrySchema>
+      return { kind: 'system', subtype: entry.subtype, durationMs: entry.durationMs }
+    }
+    default:
+      return { kind: 'unsupported', originalType: type }
+  }
+}
+
+/** A tool call built from an outline, with the entries the outline says it takes results from */
+type OutlinedToolCall = [ToolCall, ToolCallOutline]
+
+function parseOutlineLines(lines: string[]): EntryOutline[] {
+  return lines.map((line) => JSON.parse(line))
+}
+
+/**
+ * Build the entries of a slice of the raw JSONL from the outline lines of the
+ * same entries. Their tool calls come back unjoined, for joinOutlinedToolCalls.
+ */
+function buildOutlinedEntries(
+  jsonlContent: string,
+  outlines: EntryOutline[],
+  images?: ImagePayloads
+): { entries: TranscriptEntry[]; toolCalls: OutlinedToolCall[] } {
+  const entries: TranscriptEntry[] = []
+  const toolCalls: OutlinedToolCall[] = []
+  for (const line of jsonlContent.trim().split('\n')) {
+    if (!line.trim()) continue
+    if (line.trim().startsWith('//')) continue
+
+    const outline = outlines[entries.length]
+    if (!outline) {
+      throw new Error('Transcript has more entries than its normalized outline')
+    }
+    const parsed = JSON.parse(line)
+    const type = parsed.type ?? 'unknown'
+    if (images) resolveImageRefs(parsed, images)
+
+    if (isMetaType(type) !== (outline.kind === 'meta')) {
+      throw new Error(`Normalized outline says ${outline.kind}, transcript entry is ${type}`)
+    }
+    if (isMetaType(type)) {
+      entries.push({ timestamp: parsed.timestamp, type, raw: parsed })
+      continue
+    }
+
+    const structuredEntry = outlinedStructuredEntry(parsed, type, outline)
+    if (structuredEntry.kind === 'assistant' && outline.kind === 'assistant') {
+      const toolCallOutlines = outline.toolCalls ?? []
+      structuredEntry.toolCalls?.forEach((toolCall, i) => {
+        toolCalls.push([toolCall, toolCallOutlines[i]])
+      })
+    }
+    entries.push({
+      uuid: parsed.uuid,
+      timestamp: parsed.timestamp,
+      type,
+      raw: parsed,
+      structuredEntry,
+    })
+  }
+  if (entries.length !== outlines.length) {
+    throw new Error('Transcript has fewer entries than its normalized outline')
+  }
+  return { entries, toolCalls }
+}
+
+/**
+ * Join tool calls to the results their outlines point at, looking entries up by
+ * their index in the whole transcript. Returns the calls left unjoined because
+ * entryAt doesn't have an entry they point at yet.
+ */
+function joinOutlinedToolCalls(
+  toolCalls: OutlinedToolCall[],
+  entryAt: (index: number) => TranscriptEntry | undefined
+): OutlinedToolCall[] {
+  const unjoined: OutlinedToolCall[] = []
+  for (const call of toolCalls) {
+    const [toolCall, outline] = call
+    const pointsAt = [outline.result?.[0], outline.rawToolUseResult, outline.toolUseResult]
+    if (pointsAt.some((index) => index !== undefined && !entryAt(index))) {
+      unjoined.push(call)
+      continue
+    }
+    const rawOf = (index: number) =>
+      (entryAt(index)!.raw as { toolUseResult?: unknown }).toolUseResult
+    if (outline.result) {
+      const [entryIndex, blockIndex] = outline.result
+      const entry = entryAt(entryIndex)
+      const block =
+        entry && isMessageEntry(entry) && entry.structuredEntry.kind === 'user'
+          ? entry.structuredEntry.content[blockIndex]
+          : undefined
+      if (block?.type !== 'tool_result') {
+        throw new Error(`Normalized outline points ${toolCall.id} at a missing tool result`)
+      }
+      toolCall.result = block.content
+    }
+    if (outline.rawToolUseResult !== undefined) {
+      toolCall.rawToolUseResult = rawOf(outline.rawToolUseResult)
+    }
+    if (outline.toolUseResult !== undefined && toolCall.kind === 'edit') {
+      toolCall.toolUseResult = outlinedEditResult(rawOf(outline.toolUseResult) as EditToolResult)
+    }
+  }
+  return unjoined
+}
+
+/**
+ * Build transcript entries from the raw JSONL and its pre-normalized outline.
+ * Produces the same entries as parseEntries without validating anything again.
+ * Throws if the outline doesn't fit the transcript.
+ */
+export function parseOutlinedEntries(
+  jsonlContent: string,
+  normalizedContent: string,
+  images?: ImagePayloads
+): TranscriptData {
+  const outlineLines = normalizedContent.trim().split('\n')
+  const header = NormalizedHeaderSchema.parse(JSON.parse(outlineLines[0]))
+  const outlines = parseOutlineLines(outlineLines.slice(1))
+  if (outlines.length !== header.entryCount) {
+    throw new Error(
+      `Normalized outline has ${outlines.length} entries, expected ${header.entryCount}`
+    )
+  }
+
+  const { entries, toolCalls } = buildOutlinedEntries(jsonlContent, outlines, images)
+  const unjoined = joinOutlinedToolCalls(toolCalls, (index) => entries[index])
+  if (unjoined.length > 0) {
+    throw new Error(`Normalized outline points ${unjoined[0][0].id} at a missing entry`)
+  }
+  return { entries, metadata: header.metadata }
+}
+
+async function fetchText(url: string, what: string): Promise<string> {
+  const response = await fetch(url)
+  if (!response.ok) {
+    throw new Error(`Failed to fetch ${what}: ${response.status}`)
+  }
+  return response.text()
+}
+
+function base64ToBytes(base64: string): Uint8Array<ArrayBuffer> {
+  const binary = atob(base64)
+  const bytes = new Uint8Array(binary.length)
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i)
+  }
+  return bytes
+}
+
+/** Decodes a stream of base64 text, carrying partial 4-character groups across chunks */
+function base64DecoderStream(): TransformStream<string, Uint8Array<ArrayBuffer>> {
+  let pending = ''
+  return new TransformStream({
+    transform(chunk, controller) {
+      const text = pending + chunk.replace(/\s/g, '')
+      const usable = text.length - (text.length % 4)
+      pending = text.slice(usable)
+      if (usable > 0) {
+        controller.enqueue(base64ToBytes(text.slice(0, usable)))
+      }
+    },
+    flush(controller) {
+      if (pending) {
+        controller.enqueue(base64ToBytes(pending))
+      }
+    },
+  })
+}
+
+/** Stream-decode a gzip+base64 transcript body back to JSONL text */
+export async function decodeCompressedTranscript(
+  body: ReadableStream<Uint8Array>
+): Promise<string> {
+  const decompressed = body
+    .pipeThrough(new TextDecoderStream())
+    .pipeThrough(base64DecoderStream())
+    .pipeThrough(new DecompressionStream('gzip'))
+  return new Response(decompressed).text()
+}
+
+/** Fetch a transcript file's JSONL text, decoding it if it was published compressed */
+async function fetchTranscriptText(file: GistFile, what: string): Promise<string> {
+  if (!file.filename.endsWith(COMPRESSED_SUFFIX)) {
+    return fetchText(file.raw_url, what)
+  }
+  const response = await fetch(file.raw_url)
+  if (!response.ok || !response.body) {
+    throw new Error(`Failed to fetch ${what}: ${response.status}`)
+  }
+  return decodeCompressedTranscript(response.body)
+}
+
+async function sha256Hex(text: string): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text))
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('')
+}
+
+type ChunkManifest = z.infer<typeof ChunkManifestSchema>
+
+async function fetchChunkManifest(manifestFile: GistFile): Promise<ChunkManifest> {
+  return ChunkManifestSchema.parse(
+    JSON.parse(await fetchText(manifestFile.raw_url, 'transcript manifest'))
+  )
+}
+
+/** Fetch one part listed in a chunk manifest and verify it against its recorded hash */
+async function fetchChunkPart(
+  gist: GistResponse,
+  part: ChunkManifest['parts'][number]
+): Promise<string> {
+  const partFile = gist.files[part.filename]
+  if (!partFile) {
+    throw new Error(`Transcript part missing from gist: ${part.filename}`)
+  }
+  const text = await fetchTranscriptText(partFile, `transcript part ${part.filename}`)
+  if ((await sha256Hex(text)) !== part.sha256) {
+    throw new Error(`Transcript part ${part.filename} does not match its manifest hash`)
+  }
+  return text
+}
+
+/**
+ * Fetch every part listed in a chunk manifest in parallel, verify each against
+ * its recorded hash, and reassemble them in manifest order.
+ */
+export async function fetchChunkedTranscript(
+  gist: GistResponse,
+  manifestFile: GistFile
+): Promise<string> {
+  const manifest = await fetchChunkManifest(manifestFile)
+  const partTexts = await Promise.all(manifest.parts.map((part) => fetchChunkPart(gist, part)))
+  return partTexts.join('')
+}
+
+/** Fetch the normalized outline's text, reassembling it if it was chunked */
+function fetchNormalizedText(gist: GistResponse, normalizedFile: GistFile): Promise<string> {
+  if (normalizedFile.filename.endsWith(NORMALIZED_MANIFEST_SUFFIX)) {
+    return fetchChunkedTranscript(gist, normalizedFile)
+  }
+  return fetchTranscriptText(normalizedFile, 'normalized outline')
+}
+
+/** Lines of text, each keeping its newline (the last has none if text doesn't end in one) */
+function splitLines(text: string): string[] {
+  const lines = text.split('\n').map((line) => `${line}\n`)
+  lines[lines.length - 1] = lines[lines.length - 1].slice(0, -1)
+  return lines[lines.length - 1] ? lines : lines.slice(0, -1)
+}
+
+export function applyLineDiff(base: string, diff: (number | string)[]): string {
+  const baseLines = splitLines(base)
+  let position = 0
+  const out: string[] = []
+  for (const op of diff) {
+    if (typeof op === 'string') {
+      out.push(op)
+    } else if (op >= 0) {
+      out.push(...baseLines.slice(position, position + op))
+      position += op
+    } else {
+      position -= op
+    }
+  }
+  return out.join('')
+}
+
+/** text as the Read tool shows it: each line prefixed with its number, right-aligned in 6 columns */
+function numberedLines(text: string, start: number, separator: string): string {
+  return text
+    .split('\n')
+    .map((line, i) => `${String(start + i).padStart(6, ' ')}${separator}${line}`)
+    .join('\n')
+}
+
+/** Expands the file snapshot refs in a slice of JSONL back into the original text */
+export type SnapshotExpander = (jsonlContent: string) => Promise<string>
+
+const noSnapshots: SnapshotExpander = async (jsonlContent) => jsonlContent
+
+/**
+ * Returns an expander that loads the snapshot store the first time it meets a
+ * ref, and resolves each snapshot (following its diff chain) once, checking it
+ * against its sha256. Expanded text is byte for byte what was published.
+ */
+export function createSnapshotExpander(loadStore: () => Promise<string>): SnapshotExpander {
+  let records: Promise<Map<string, SnapshotRecord>> | undefined
+  const texts = new Map<string, Promise<string>>()
+
+  function loadRecords(): Promise<Map<string, SnapshotRecord>> {
+    if (!records) {
+      records = loadStore().then((content) => {
+        const lines = content.trim().split('\n')
+        SnapshotsHeaderSchema.parse(JSON.parse(lines[0]))
+        const parsed = lines.slice(1).map((line) => SnapshotRecordSchema.parse(JSON.parse(line)))
+        return new Map(parsed.map((record) => [record.sha256, record]))
+      })
+      // Let a failed fetch be retried
+      records.catch(() => (records = undefined))
+    }
+    return records
+  }
+
+  function resolve(sha256: string, store: Map<string, SnapshotRecord>): Promise<string> {
+    let text = texts.get(sha256)
+    if (!text) {
+      const record = store.get(sha256)
+      if (!record) {
+        return Promise.reject(new Error(`File snapshot ${sha256} missing from ${SNAPSHOTS_FILENAME}`))
+      }
+      const unchecked =
+        'text' in record
+          ? Promise.resolve(record.text)
+          : resolve(record.base, store).then((base) => applyLineDiff(base, record.diff))
+      text = unchecked.then(async (resolved) => {
+        if ((await sha256Hex(resolved)) !== sha256) {
+          throw new Error(`File snapshot ${sha256} does not match its hash`)
+        }
+        return resolved
+      })
+      texts.set(sha256, text)
+    }
+    return text
+  }
+
+  return async (jsonlContent) => {
+    if (!jsonlContent.includes(SNAPSHOT_REF_PREFIX)) return jsonlContent
+    const store = await loadRecords()
+    const refs = new Set(Array.from(jsonlContent.matchAll(SNAPSHOT_REF_PATTERN), (match) => match[1]))
+    const resolved = new Map(
+      await Promise.all([...refs].map(async (sha256) => [sha256, await resolve(sha256, store)] as const))
+    )
+    return jsonlContent.replace(
+      SNAPSHOT_REF_PATTERN,
+      (_ref, sha256: string, numbered?: string, separator?: string, suffix?: string) => {
+        const text = resolved.get(sha256)!
+        if (numbered === undefined) return JSON.stringify(text)
+        return JSON.stringify(
+          numberedLines(text, Number(numbered), JSON.parse(separator!)) + JSON.parse(suffix!)
+        )
+      }
+    )
+  }
+}
+
+/** The gist's snapshot expander, or one that leaves text alone if it has no snapshot store */
+function gistSnapshotExpander(gist: GistResponse): SnapshotExpander {
+  const manifestFile = gist.files[SNAPSHOTS_MANIFEST_FILENAME]
+  const storeFile =
+    gist.files[SNAPSHOTS_FILENAME] ?? gist.files[`${SNAPSHOTS_FILENAME}${COMPRESSED_SUFFIX}`]
+  if (manifestFile) {
+    return createSnapshotExpander(() => fetchChunkedTranscript(gist, manifestFile))
+  }
+  if (storeFile) {
+    return createSnapshotExpander(() => fetchTranscriptText(storeFile, 'file snapshots'))
+  }
+  return noSnapshots
+}
+
+/** Fetches the text of a byte range of the main transcript */
+export type TranscriptRangeFetcher = (offset: number, length: number) => Promise<string>
+
+const utf8Decoder = new TextDecoder()
+
+/** Fetch byte ranges of a single transcript file with HTTP Range requests */
+function rangeRequestFetcher(file: GistFile, transcriptBytes: number): TranscriptRangeFetcher {
+  let whole: Promise<Uint8Array> | undefined
+
+  return async (offset, length) => {
+    if (!whole) {
+      const response = await fetch(file.raw_url, {
+        headers: { Range: `bytes=${offset}-${offset + length - 1}` },
+      })
+      if (!response.ok) {
+        throw new Error(`Failed to fetch transcript page: ${response.status}`)
+      }
+      if (response.status === 206) {
+        const total = response.headers.get('Content-Range')?.split('/')[1]
+        if (total && total !== '*' && Number(total) !== transcriptBytes) {
+          throw new Error('Transcript does not match its page index')
+        }
+        return response.text()
+      }
+      // The server ignored the range and sent the whole file: slice pages out of that
+      whole ??= response.arrayBuffer().then((buffer) => new Uint8Array(buffer))
+    }
+    const bytes = await whole
+    if (bytes.length !== transcriptBytes) {
+      throw new Error('Transcript does not match its page index')
+    }
+    return utf8Decoder.decode(bytes.subarray(offset, offset + length))
+  }
+}
+
+/** Fetch byte ranges of a chunked transcript from the parts that cover them */
+function chunkPartsFetcher(
+  gist: GistResponse,
+  manifest: ChunkManifest,
+  transcriptBytes: number
+): TranscriptRangeFetcher {
+  const starts: number[] = []
+  let total = 0
+  for (const part of manifest.parts) {
+    starts.push(total)
+    total += part.bytes
+  }
+  if (total !== transcriptBytes) {
+    throw new Error('Transcript parts do not match its page index')
+  }
+
+  const partBytes = new Map<number, Promise<Uint8Array>>()
+  function fetchPartBytes(i: number): Promise<Uint8Array> {
+    let bytes = partBytes.get(i)
+    if (!bytes) {
+      bytes = fetchChunkPart(gist, manifest.parts[i]).then((text) => new TextEncoder().encode(text))
+      partBytes.set(i, bytes)
+    }
+    return bytes
+  }
+
+  return async (offset, length) => {
+    const end = offset + length
+    const covering = manifest.parts.flatMap((part, i) =>
+      starts[i] < end && starts[i] + part.bytes > offset ? [i] : []
+    )
+    // Parts end on line boundaries, so each piece decodes on its own
+    const pieces = await Promise.all(
+      covering.map(async (i) => {
+        const bytes = await fetchPartBytes(i)
+        return utf8Decoder.decode(bytes.subarray(Math.max(offset - starts[i], 0), end - starts[i]))
+      })
+    )
+    return pieces.join('')
+  }
+}
+
+/** The window of transcript pages loaded so far, which grows or moves as the reader scrolls */
+export interface TranscriptPager {
+  index: TranscriptIndex
+  hasPrevious(): boolean
+  hasNext(): boolean
+  loadPrevious(): Promise<TranscriptEntry[]>
+  loadNext(): Promise<TranscriptEntry[]>
+  /** Load the page holding an element's anchor id (msg-<uuid> or msg-<tool call id>) */
+  reveal(anchorId: string): Promise<TranscriptEntry[]>
+}
+
+function hasAnchor(entries: TranscriptEntry[], anchorId: string): boolean {
+  return entries.some(
+    (entry) =>
+      isMessageEntry(entry) &&
+      (anchorId === `msg-${entry.uuid}` ||
+        anchorId === `msg-${entry.uuid}-thinking` ||
+        (entry.structuredEntry.kind === 'assistant' &&
+          entry.structuredEntry.toolCalls?.some((toolCall) => anchorId === `msg-${toolCall.id}`)))
+  )
+}
+
+type IndexPage = TranscriptIndex['pages'][number]
+
+/**
+ * A pager over an indexed transcript. Given fetchOutlineRange, for the normalized
+ * outline the index locates its pages in, pages are built from their outline
+ * lines; otherwise (or if the outline is for something else) they are parsed.
+ */
+export function createTranscriptPager(
+  index: TranscriptIndex,
+  fetchRange: TranscriptRangeFetcher,
+  images?: ImagePayloads,
+  fetchOutlineRange?: TranscriptRangeFetcher
+): TranscriptPager {
+  const { pages } = index
+  // Loaded pages are [first, next)
+  let first = 0
+  let next = 0
+  let entries: TranscriptEntry[] = []
+  // Parsing: what the window's parser carries to the next page
+  let state = newParserState()
+  // Outlined: tool calls whose results are on pages not loaded yet
+  let unjoined: OutlinedToolCall[] = []
+  let outlined: Promise<boolean> | undefined
+  let pending: Promise<unknown> = Promise.resolve()
+
+  // Loads run one at a time, each starting from the window the previous one left
+  function serialized(load: () => Promise<void>): Promise<TranscriptEntry[]> {
+    const result = pending.then(load).then(() => entries)
+    pending = result.catch(() => undefined)
+    return result
+  }
+
+  function countEntries(from: number, to: number): number {
+    return pages.slice(from, to).reduce((sum, page) => sum + page.entries, 0)
+  }
+
+  function checkEntryCount(parsed: TranscriptEntry[], expected: number): void {
+    if (parsed.length !== expected) {
+      throw new Error(`Transcript page has ${parsed.length} entries, its index says ${expected}`)
+    }
+  }
+
+  /** Whether pages are built from the outline: its header has to be for this transcript */
+  function useOutline(): Promise<boolean> {
+    outlined ??= (async () => {
+      const headerLength = pages[0].outlineOffset
+      const hasRanges = pages.every(
+        (page) => page.outlineOffset !== undefined && page.outlineLength !== undefined
+      )
+      if (!fetchOutlineRange || !index.outline || headerLength === undefined || !hasRanges) {
+        return false
+      }
+      try {
+        const header = NormalizedHeaderSchema.parse(
+          JSON.parse(await fetchOutlineRange(0, headerLength))
+        )
+        if (
+          header.transcript !== index.transcript ||
+          header.transcriptBytes !== index.transcriptBytes ||
+          header.entryCount !== index.entryCount
+        ) {
+          throw new Error(`Normalized outline is for ${header.transcript}, not ${index.transcript}`)
+        }
+        return true
+      } catch (err) {
+        // From another version of the publish script, or out of step: validate from scratch
+        console.warn('Ignoring the normalized outline:', err)
+        return false
+      }
+    })()
+    return outlined
+  }
+
+  /** Fetch pages [from, to) as one range, with their outline lines if pages are outlined */
+  async function fetchPages(
+    from: number,
+    to: number
+  ): Promise<[string, EntryOutline[] | undefined]> {
+    const range = (offset: (page: IndexPage) => number, length: (page: IndexPage) => number) => {
+      const start = offset(pages[from])
+      return [start, offset(pages[to - 1]) + length(pages[to - 1]) - start] as const
+    }
+    return Promise.all([
+      fetchRange(...range((page) => page.offset, (page) => page.length)),
+      useOutline().then(async (use) => {
+        if (!use) return undefined
+        const [offset, length] = range(
+          (page) => page.outlineOffset!,
+          (page) => page.outlineLength!
+        )
+        const text = await fetchOutlineRange!(offset, length)
+        const outlines = parseOutlineLines(text.trim().split('\n'))
+        const expected = countEntries(from, to)
+        if (outlines.length !== expected) {
+          throw new Error(`Outline page has ${outlines.length} entries, its index says ${expected}`)
+        }
+        return outlines
+      }),
+    ])
+  }
+
+  /** Replace the window with pages [from, to), fetched as one range */
+  async function loadWindow(from: number, to: number): Promise<void> {
+    const [text, outlines] = await fetchPages(from, to)
+    if (outlines) {
+      const built = buildOutlinedEntries(text, outlines, images)
+      const base = pages[from].entry
+      unjoined = joinOutlinedToolCalls(built.toolCalls, (i) => built.entries[i - base])
+      entries = built.entries
+    } else {
+      const windowState = newParserState()
+      const parsed = parseEntrySlice(text, windowState, images)
+      checkEntryCount(parsed, countEntries(from, to))
+      state = windowState
+      entries = parsed
+    }
+    first = from
+    next = to
+  }
+
+  async function appendNext(): Promise<void> {
+    if (next >= pages.length) return
+    if (next === first) return loadWindow(next, next + 1)
+    const [text, outlines] = await fetchPages(next, next + 1)
+    if (outlines) {
+      const built = buildOutlinedEntries(text, outlines, images)
+      const window = [...entries, ...built.entries]
+      const base = pages[first].entry
+      unjoined = joinOutlinedToolCalls(
+        [...unjoined, ...built.toolCalls],
+        (i) => window[i - base]
+      )
+      entries = window
+    } else {
+      const parsed = parseEntrySlice(text, state, images)
+      checkEntryCount(parsed, pages[next].entries)
+      entries = [...entries, ...parsed]
+    }
+    next += 1
+  }
+
+  async function prependPrevious(): Promise<void> {
+    if (first === 0) return
+    const [text, outlines] = await fetchPages(first - 1, first)
+    // Tool calls on the new page may have their results on pages already loaded
+    if (outlines) {
+      const built = buildOutlinedEntries(text, outlines, images)
+      const window = [...built.entries, ...entries]
+      const base = pages[first - 1].entry
+      const newUnjoined = joinOutlinedToolCalls(built.toolCalls, (i) => window[i - base])
+      unjoined = [...newUnjoined, ...unjoined]
+      entries = window
+    } else {
+      const pageState = newParserState()
+      const parsed = parseEntrySlice(text, pageState, images)
+      checkEntryCount(parsed, pages[first - 1].entries)
+      prependParserState(state, pageState)
+      entries = [...parsed, ...entries]
+    }
+    first -= 1
   }
 
-  const gist: GistResponse = await metaResponse.json()
+  function pageOfEntry(entry: number): number {
+    let page = 0
+    while (page + 1 < pages.length && pages[page + 1].entry <= entry) page++
+    return page
+  }
+
+  async function revealAnchor(anchorId: string): Promise<void> {
+    if (hasAnchor(entries, anchorId)) return
+    const uuid = anchorId.replace(/^msg-/, '').replace(/-thinking$/, '')
+    const entry =
+      index.anchors.find((anchor) => anchor.uuid === uuid)?.entry ??
+      pages.find((page) => page.uuid === uuid)?.entry
+    if (entry === undefined) {
+      // Not an indexed turn: only the whole transcript is sure to have it
+      if (first > 0 || next < pages.length) await loadWindow(0, pages.length)
+      return
+    }
+    const page = pageOfEntry(entry)
+    if (page === next && next > first) return appendNext()
+    if (page < first || page >= next) return loadWindow(page, page + 1)
+  }
+
+  return {
+    index,
+    hasPrevious: () => first > 0,
+    hasNext: () => next < pages.length,
+    loadPrevious: () => serialized(prependPrevious),
+    loadNext: () => serialized(appendNext),
+    reveal: (anchorId) => serialized(() => revealAnchor(anchorId)),
+  }
+}
+
+/** Main transcripts at least this big are loaded a page at a time when the gist has an index */
+const PAGED_TRANSCRIPT_BYTES = 1_000_000
+
+type MainTranscript = { manifestFile: GistFile } | { jsonlFile: GistFile }
 
-  const allJsonlFiles = Object.values(gist.files).filter((f) => f.filename.endsWith('.jsonl'))
+function findMainTranscript(gist: GistResponse): MainTranscript {
+  const transcriptFiles = Object.values(gist.files).filter(
+    (f) => !isNormalizedFile(f.filename) && !SNAPSHOT_FILE_PATTERN.test(f.filename)
+  )
+  const manifestFile = transcriptFiles.find(
+    (f) =>
+      f.filename.endsWith(MANIFEST_SUFFIX) &&
+      !f.filename.startsWith('agent-') &&
+      f.filename !== SNAPSHOTS_MANIFEST_FILENAME
+  )
+  if (manifestFile) {
+    return { manifestFile }
+  }
+
+  const allJsonlFiles = transcriptFiles.filter(
+    (f) => isTranscriptFile(f.filename) && !PART_FILE_PATTERN.test(f.filename)
+  )
   const jsonlFile = allJsonlFiles.find((f) => !f.filename.startsWith('agent-')) ?? allJsonlFiles[0]
 
   if (!jsonlFile) {
     throw new Error('No .jsonl file found in gist')
   }
+  return { jsonlFile }
+}
 
-  const contentResponse = await fetch(jsonlFile.raw_url)
-  if (!contentResponse.ok) {
-    throw new Error(`Failed to fetch transcript content: ${contentResponse.status}`)
+/** Where to find the gist's images: image files are only fetched once displayed */
+function findImages(gist: GistResponse): ImagePayloads | undefined {
+  const images: ImagePayloads = {}
+  for (const file of Object.values(gist.files)) {
+    const match = IMAGE_FILE_PATTERN.exec(file.filename)
+    if (match) {
+      images[match[1]] = { url: file.raw_url }
+    }
   }
+  return Object.keys(images).length > 0 ? images : undefined
+}
+
+const imageObjectUrls = new Map<string, Promise<string>>()
 
-  const content = await contentResponse.text()
+/**
+ * Fetch an image file and return an object URL for it. Each file is fetched and
+ * decoded once, however many blocks show it.
+ */
+export function fetchImageObjectUrl(source: UrlImageSource): Promise<string> {
+  let objectUrl = imageObjectUrls.get(source.url)
+  if (!objectUrl) {
+    objectUrl = fetchText(source.url, 'image').then((base64) =>
+      URL.createObjectURL(new Blob([base64ToBytes(base64.trim())], { type: source.media_type }))
+    )
+    // Let a failed fetch be retried
+    objectUrl.catch(() => imageObjectUrls.delete(source.url))
+    imageObjectUrls.set(source.url, objectUrl)
+  }
+  return objectUrl
+}
+
+/** Fetches and parses one subagent's transcript, by agent id */
+export type SubagentLoader = (agentId: string) => Promise<TranscriptEntry[]>
+
+/**
+ * Fetch byte ranges of a file that has to be downloaded whole (a compressed one),
+ * checking it against its manifest hash if it has one
+ */
+function wholeFileFetcher(file: GistFile, what: string, sha256?: string): TranscriptRangeFetcher {
+  let whole: Promise<Uint8Array> | undefined
+  return async (offset, length) => {
+    whole ??= fetchTranscriptText(file, what).then(async (text) => {
+      if (sha256 !== undefined && (await sha256Hex(text)) !== sha256) {
+        throw new Error(`${file.filename} does not match its manifest hash`)
+      }
+      return new TextEncoder().encode(text)
+    })
+    return utf8Decoder.decode((await whole).subarray(offset, offset + length))
+  }
+}
+
+/**
+ * Load subagent transcripts on demand, each fetched once. Agents published as
+ * their own file are fetched whole; bundled agents are fetched as a byte range
+ * of their bundle. Returns undefined if the gist has no subagent transcripts.
+ */
+export function createSubagentLoader(
+  gist: GistResponse,
+  images?: ImagePayloads,
+  expandSnapshots: SnapshotExpander = noSnapshots
+): SubagentLoader | undefined {
+  const agentFiles = new Map<string, GistFile>()
+  for (const file of Object.values(gist.files)) {
+    const match = SUBAGENT_FILE_PATTERN.exec(file.filename)
+    if (match) {
+      agentFiles.set(match[1], file)
+    }
+  }
+  const manifestFile = gist.files[BUNDLE_MANIFEST_FILENAME]
+  if (agentFiles.size === 0 && !manifestFile) {
+    return undefined
+  }
+
+  let manifest: Promise<BundleManifest> | undefined
+  const bundleFetchers = new Map<string, TranscriptRangeFetcher>()
+  const loaded = new Map<string, Promise<TranscriptEntry[]>>()
+
+  function bundleFetcher(bundle: BundleManifest['bundles'][number]): TranscriptRangeFetcher {
+    let fetcher = bundleFetchers.get(bundle.filename)
+    if (!fetcher) {
+      const file = gist.files[bundle.filename]
+      if (!file) {
+        throw new Error(`Subagent bundle missing from gist: ${bundle.filename}`)
+      }
+      fetcher = file.filename.endsWith(COMPRESSED_SUFFIX)
+        ? wholeFileFetcher(file, `subagent bundle ${file.filename}`, bundle.sha256)
+        : rangeRequestFetcher(file, bundle.bytes)
+      bundleFetchers.set(bundle.filename, fetcher)
+    }
+    return fetcher
+  }
+
+  async function fetchSubagentText(agentId: string): Promise<string> {
+    const file = agentFiles.get(agentId)
+    if (file) {
+      return fetchTranscriptText(file, `subagent transcript ${agentId}`)
+    }
+    if (!manifestFile) {
+      throw new Error(`Subagent ${agentId} was not published with this session`)
+    }
+    if (!manifest) {
+      manifest = fetchText(manifestFile.raw_url, 'subagent manifest').then((text) =>
+        BundleManifestSchema.parse(JSON.parse(text))
+      )
+      manifest.catch(() => (manifest = undefined))
+    }
+    const { bundles, agents } = await manifest
+    const agent = Object.prototype.hasOwnProperty.call(agents, agentId) ? agents[agentId] : undefined
+    const bundle = agent && bundles.find((b) => b.filename === agent.bundle)
+    if (!agent || !bundle) {
+      throw new Error(`Subagent ${agentId} was not published with this session`)
+    }
+    return bundleFetcher(bundle)(agent.offset, agent.length)
+  }
+
+  return (agentId) => {
+    let entries = loaded.get(agentId)
+    if (!entries) {
+      entries = fetchSubagentText(agentId)
+        .then(expandSnapshots)
+        .then((text) => parseEntries(text, images))
+      // Let a failed fetch be retried
+      entries.catch(() => loaded.delete(agentId))
+      loaded.set(agentId, entries)
+    }
+    return entries
+  }
+}
+
+/** Fetch byte ranges of the normalized outline an index locates its pages in */
+async function outlineRangeFetcher(
+  gist: GistResponse,
+  outline: NonNullable<TranscriptIndex['outline']>
+): Promise<TranscriptRangeFetcher | undefined> {
+  const manifestFile = gist.files[outline.filename.replace(/\.jsonl$/, MANIFEST_SUFFIX)]
+  if (manifestFile) {
+    const manifest = await fetchChunkManifest(manifestFile)
+    if (manifest.transcript !== outline.filename) {
+      throw new Error(`Outline manifest is for ${manifest.transcript}, not ${outline.filename}`)
+    }
+    return chunkPartsFetcher(gist, manifest, outline.bytes)
+  }
+  const file = gist.files[outline.filename]
+  if (file) {
+    return rangeRequestFetcher(file, outline.bytes)
+  }
+  const compressedFile = gist.files[`${outline.filename}${COMPRESSED_SUFFIX}`]
+  if (compressedFile) {
+    return wholeFileFetcher(compressedFile, 'normalized outline')
+  }
+  return undefined
+}
+
+/**
+ * Load the first page of a large indexed transcript, or the page holding anchorId.
+ * Returns undefined if the transcript should be loaded whole instead.
+ */
+async function openPagedTranscript(
+  gist: GistResponse,
+  anchorId?: string
+): Promise<TranscriptData | undefined> {
+  const indexFile = Object.values(gist.files).find(
+    (f) => f.filename.endsWith(INDEX_SUFFIX) && !f.filename.startsWith('agent-')
+  )
+  if (!indexFile) {
+    return undefined
+  }
+  const main = findMainTranscript(gist)
+  if (
+    'jsonlFile' in main &&
+    // A compressed file can't be read from the middle, and a small one isn't worth paging
+    (main.jsonlFile.filename.endsWith(COMPRESSED_SUFFIX) ||
+      (main.jsonlFile.size ?? 0) < PAGED_TRANSCRIPT_BYTES)
+  ) {
+    return undefined
+  }
+
+  const [index, source] = await Promise.all([
+    fetchText(indexFile.raw_url, 'transcript index').then((text) =>
+      TranscriptIndexSchema.parse(JSON.parse(text))
+    ),
+    'manifestFile' in main ? fetchChunkManifest(main.manifestFile) : main.jsonlFile,
+  ])
+  const images = findImages(gist)
+  if (index.pages.length === 0) {
+    return undefined
+  }
+  const transcriptName = 'parts' in source ? source.transcript : source.filename
+  if (index.transcript !== transcriptName) {
+    throw new Error(`Page index is for ${index.transcript}, not ${transcriptName}`)
+  }
+
+  const fetchPublishedRange =
+    'parts' in source
+      ? chunkPartsFetcher(gist, source, index.transcriptBytes)
+      : rangeRequestFetcher(source, index.transcriptBytes)
+  // Page offsets are into the transcript as published: expand each page once fetched
+  const expandSnapshots = gistSnapshotExpander(gist)
+  const fetchRange: TranscriptRangeFetcher = (offset, length) =>
+    fetchPublishedRange(offset, length).then(expandSnapshots)
+  // Without the outline, pages are parsed instead
+  const fetchOutlineRange = index.outline
+    ? await outlineRangeFetcher(gist, index.outline).catch((err) => {
+        console.warn('Could not fetch the normalized outline, parsing the transcript instead:', err)
+        return undefined
+      })
+    : undefined
+  const pager = createTranscriptPager(index, fetchRange, images, fetchOutlineRange)
+  const entries = anchorId ? await pager.reveal(anchorId) : await pager.loadNext()
   return {
-    entries: parseEntries(content),
+    entries,
+    metadata: index.metadata,
+    pager,
+    subagents: createSubagentLoader(gist, images, expandSnapshots),
+  }
+}
+
+/**
+ * Where gist metadata comes from. Point VITE_GIST_API_URL at the plugin's local
+ * preview server (preview_server.py) to view sessions without publishing them.
+ */
+const GIST_API_URL = import.meta.env.VITE_GIST_API_URL ?? 'https://api.github.com'
+
+async function fetchGist(gistId: string): Promise<GistResponse> {
+  const metaResponse = await fetch(`${GIST_API_URL}/gists/${gistId}`)
+  if (!metaResponse.ok) {
+    throw new Error(`Failed to fetch gist metadata: ${metaResponse.status}`)
+  }
+  return metaResponse.json()
+}
+
+async function loadFullTranscript(gist: GistResponse): Promise<TranscriptData> {
+  const main = findMainTranscript(gist)
+  const expandSnapshots = gistSnapshotExpander(gist)
+  const transcriptContent = (
+    'manifestFile' in main
+      ? fetchChunkedTranscript(gist, main.manifestFile)
+      : fetchTranscriptText(main.jsonlFile, 'transcript content')
+  ).then(expandSnapshots)
+
+  const allFiles = Object.values(gist.files)
+  const normalizedFile =
+    allFiles.find((f) => f.filename.endsWith(NORMALIZED_MANIFEST_SUFFIX)) ??
+    allFiles.find((f) => isNormalizedFile(f.filename) && !NORMALIZED_PART_PATTERN.test(f.filename))
+  const normalizedContent = normalizedFile
+    ? fetchNormalizedText(gist, normalizedFile).catch((err) => {
+        console.warn('Could not fetch the normalized outline, parsing the transcript instead:', err)
+        return undefined
+      })
+    : Promise.resolve(undefined)
+
+  const [content, normalized] = await Promise.all([transcriptContent, normalizedContent])
+  const images = findImages(gist)
+
+  const subagents = createSubagentLoader(gist, images, expandSnapshots)
+  if (normalized !== undefined) {
+    try {
+      return { ...parseOutlinedEntries(content, normalized, images), subagents }
+    } catch (err) {
+      // From another version of the publish script, or out of step: validate from scratch
+      console.warn('Ignoring the normalized outline:', err)
+    }
+  }
+
+  return {
+    entries: parseEntries(content, images),
+    subagents,
+  }
+}
+
+export async function fetchGistTranscriptFull(gistId: string): Promise<TranscriptData> {
+  return loadFullTranscript(await fetchGist(gistId))
+}
+
+/**
+ * Load a gist's transcript for display. Large indexed transcripts come back with
+ * just the first page (or the page holding anchorId) and a pager for the rest.
+ */
+export async function fetchGistTranscript(
+  gistId: string,
+  anchorId?: string
+): Promise<TranscriptData> {
+  const gist = await fetchGist(gistId)
+  try {
+    const paged = await openPagedTranscript(gist, anchorId)
+    if (paged) {
+      return paged
+    }
+  } catch (err) {
+    console.warn('Could not load the transcript page by page, loading all of it:', err)
   }
+  return loadFullTranscript(gist)
 }
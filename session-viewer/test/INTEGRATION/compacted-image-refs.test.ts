@@ -0,0 +1,72 @@
+import { describe, it, expect } from 'vitest'
+import { createHash } from 'crypto'
+import { readFileSync } from 'fs'
+import { join } from 'path'
+import { parseEntries, type ImagePayloads } from '../../src/lib/gistGateway'
+
+const fixture = readFileSync(join(__dirname, 'fixtures/images-in-user-messages.jsonl'), 'utf-8')
+
+interface ImageLike {
+  type?: string
+  source?: { type: string; media_type: string; data?: string; sha256?: string }
+  content?: unknown
+}
+
+/** Mimic the publish script's image extraction: move base64 image data out, keyed by sha256 */
+function compactImages(jsonl: string): { compacted: string; sha256s: Set<string> } {
+  const sha256s = new Set<string>()
+
+  const toRef = (block: ImageLike) => {
+    if (block.type !== 'image' || block.source?.type !== 'base64') return
+    const data = block.source.data!
+    const sha256 = createHash('sha256').update(data).digest('hex')
+    sha256s.add(sha256)
+    block.source = { type: 'ref', media_type: block.source.media_type, sha256 }
+  }
+
+  const lines = jsonl.split('\n').map((line) => {
+    if (!line.trim() || line.trim().startsWith('//')) return line
+    const parsed = JSON.parse(line)
+    const content = parsed.message?.content
+    if (Array.isArray(content)) {
+      for (const block of content as ImageLike[]) {
+        toRef(block)
+        if (block.type === 'tool_result' && Array.isArray(block.content)) {
+          ;(block.content as ImageLike[]).forEach(toRef)
+        }
+      }
+    }
+    return JSON.stringify(parsed)
+  })
+
+  return { compacted: lines.join('\n'), sha256s }
+}
+
+describe('compacted image references', () => {
+  it('points refs to uploaded image files at their URLs, to fetch when displayed', () => {
+    const { compacted, sha256s } = compactImages(fixture)
+    expect(sha256s.size).toBeGreaterThan(0)
+    expect(compacted).not.toContain('"type":"base64"')
+    const files: ImagePayloads = {}
+    for (const sha256 of sha256s) {
+      files[sha256] = { url: `https://gist.example/image-${sha256}.b64` }
+    }
+
+    const original = parseEntries(fixture)
+    const resolved = parseEntries(compacted, files)
+
+    const sources = (entries: typeof original) =>
+      entries.flatMap((e) =>
+        'structuredEntry' in e && e.structuredEntry.kind === 'user'
+          ? e.structuredEntry.content.flatMap((block) => (block.type === 'image' ? [block.source] : []))
+          : []
+      )
+    expect(sources(resolved)).toHaveLength(sources(original).length)
+    sources(resolved).forEach((source, i) => {
+      const expected = sources(original)[i]
+      expect(source.type).toBe('url')
+      expect(source.media_type).toBe(expected.media_type)
+      expect(source.type === 'url' && source.url.includes('image-')).toBe(true)
+    })
+  })
+})
@@ -0,0 +1,53 @@
+import { describe, it, expect } from 'vitest'
+import { readFileSync } from 'fs'
+import { join } from 'path'
+import { decodeCompressedTranscript, parseEntries } from '../../src/lib/gistGateway'
+
+// Fixtures were produced by the publish script's --compress encoder (compression.py)
+// from the sample sessions in samples/claude-code-projects
+const SAMPLES_DIR = join(__dirname, '../../../samples/claude-code-projects')
+
+const corpus = [
+  {
+    fixture: '0ccf1a04-1b4c-43b6-8aa5-79e41db43a68.jsonl.gz.b64',
+    original: '0ccf1a04-1b4c-43b6-8aa5-79e41db43a68.jsonl',
+  },
+  {
+    fixture: '4b2030ed-5563-49ea-b703-6a002f2d3cc8.jsonl.gz.b64',
+    original: '4b2030ed-5563-49ea-b703-6a002f2d3cc8.jsonl',
+  },
+  {
+    fixture: 'agent-a5bdbc1.jsonl.gz.b64',
+    original: '0ccf1a04-1b4c-43b6-8aa5-79e41db43a68/subagents/agent-a5bdbc1.jsonl',
+  },
+]
+
+function streamOf(text: string, chunkSize: number): ReadableStream<Uint8Array> {
+  const bytes = new TextEncoder().encode(text)
+  let offset = 0
+  return new ReadableStream({
+    pull(controller) {
+      if (offset >= bytes.length) {
+        controller.close()
+        return
+      }
+      controller.enqueue(bytes.slice(offset, offset + chunkSize))
+      offset += chunkSize
+    },
+  })
+}
+
+describe('compressed transcripts', () => {
+  for (const { fixture, original } of corpus) {
+    it(`round-trips ${original}`, async () => {
+      const encoded = readFileSync(join(__dirname, 'fixtures/compressed', fixture), 'utf-8')
+      const expected = readFileSync(join(SAMPLES_DIR, original), 'utf-8')
+
+      // Odd chunk size, so base64 groups are split across chunks
+      const decoded = await decodeCompressedTranscript(streamOf(encoded, 1021))
+
+      expect(decoded).toBe(expected)
+      expect(parseEntries(decoded)).toEqual(parseEntries(expected))
+    })
+  }
+})
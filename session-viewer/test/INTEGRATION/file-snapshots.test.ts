@@ -0,0 +1,77 @@
+import { describe, it, expect, assert } from 'vitest'
+import { readFileSync } from 'fs'
+import { join } from 'path'
+import { createSnapshotExpander, parseEntries } from '../../src/lib/gistGateway'
+import { isAssistantEntry, isEditToolCall } from '../../src/domain/transcriptEntry'
+
+// Fixtures were produced by the publish script's --dedupe-files stage (file_snapshots.py)
+// from fixtures/repeated-file-reads.jsonl
+const FIXTURES_DIR = join(__dirname, 'fixtures')
+const original = readFileSync(join(FIXTURES_DIR, 'repeated-file-reads.jsonl'), 'utf-8')
+const encoded = readFileSync(join(FIXTURES_DIR, 'snapshots/repeated-file-reads.jsonl'), 'utf-8')
+const store = readFileSync(join(FIXTURES_DIR, 'snapshots/file-snapshots.jsonl'), 'utf-8')
+
+function countingLoader(content: string) {
+  const loader = async () => {
+    loader.calls += 1
+    return content
+  }
+  loader.calls = 0
+  return loader
+}
+
+describe('file snapshots', () => {
+  it('expands a transcript back to the original byte for byte', async () => {
+    expect(encoded.length).toBeLessThan(original.length / 2)
+
+    const expanded = await createSnapshotExpander(async () => store)(encoded)
+
+    expect(expanded).toBe(original)
+    expect(parseEntries(expanded)).toEqual(parseEntries(original))
+  })
+
+  it('restores Edit results with their original file contents', async () => {
+    const entries = parseEntries(await createSnapshotExpander(async () => store)(encoded))
+
+    const edits = entries
+      .filter(isAssistantEntry)
+      .flatMap((e) => e.structuredEntry.toolCalls ?? [])
+      .filter(isEditToolCall)
+    expect(edits).toHaveLength(4)
+    for (const edit of edits) {
+      assert(edit.toolUseResult)
+      expect(edit.toolUseResult.originalFile).toContain('def split_transcript(')
+    }
+  })
+
+  it('expands pages independently, loading the store once', async () => {
+    const lines = encoded.split(/(?<=\n)/)
+    const middle = Math.floor(lines.length / 2)
+    const loadStore = countingLoader(store)
+    const expand = createSnapshotExpander(loadStore)
+
+    const pages = await Promise.all([
+      expand(lines.slice(0, middle).join('')),
+      expand(lines.slice(middle).join('')),
+    ])
+
+    expect(pages.join('')).toBe(original)
+    expect(loadStore.calls).toBe(1)
+  })
+
+  it('does not load the store for text without refs', async () => {
+    const loadStore = countingLoader(store)
+
+    const text = await createSnapshotExpander(loadStore)(original)
+
+    expect(text).toBe(original)
+    expect(loadStore.calls).toBe(0)
+  })
+
+  it('rejects a snapshot that does not match its hash', async () => {
+    const tampered = store.replace('DEFAULT_CHUNK_BYTES = 1_000_000', 'DEFAULT_CHUNK_BYTES = 1_000_001')
+    expect(tampered).not.toBe(store)
+
+    await expect(createSnapshotExpander(async () => tampered)(encoded)).rejects.toThrow(/hash/)
+  })
+})
@@ -0,0 +1,51 @@
+import { describe, it, expect } from 'vitest'
+import { readFileSync } from 'fs'
+import { join } from 'path'
+import { parseEntries, parseOutlinedEntries } from '../../src/lib/gistGateway'
+import { extractSessionMetadata } from '../../src/domain/transcriptEntry'
+
+// Outlines were produced by the publish script's normalization stage (normalization.py)
+const SAMPLES_DIR = join(__dirname, '../../../samples/claude-code-projects')
+const FIXTURES_DIR = join(__dirname, 'fixtures')
+
+const corpus = [
+  join(SAMPLES_DIR, '0ccf1a04-1b4c-43b6-8aa5-79e41db43a68.jsonl'),
+  join(SAMPLES_DIR, '4b2030ed-5563-49ea-b703-6a002f2d3cc8.jsonl'),
+  join(FIXTURES_DIR, 'edit-tool-variants.jsonl'),
+  join(FIXTURES_DIR, 'general-tool-calls.jsonl'),
+  join(FIXTURES_DIR, 'images-in-tool-results.jsonl'),
+  join(FIXTURES_DIR, 'images-in-user-messages.jsonl'),
+  join(FIXTURES_DIR, 'read-tool-variants.jsonl'),
+]
+
+function outlineFor(transcriptPath: string): string {
+  const name = transcriptPath.split('/').pop()!.replace(/\.jsonl$/, '.normalized.jsonl')
+  return readFileSync(join(FIXTURES_DIR, 'normalized', name), 'utf-8')
+}
+
+describe('normalized outlines', () => {
+  for (const path of corpus) {
+    it(`builds the same entries as parseEntries for ${path.split('/').pop()}`, () => {
+      const transcript = readFileSync(path, 'utf-8')
+      const expected = parseEntries(transcript)
+
+      const data = parseOutlinedEntries(transcript, outlineFor(path))
+
+      expect(data.entries).toEqual(expected)
+      expect(data.metadata).toEqual(extractSessionMetadata(expected))
+    })
+  }
+
+  it('rejects an outline published for a different transcript', () => {
+    const transcript = readFileSync(corpus[2], 'utf-8')
+
+    expect(() => parseOutlinedEntries(transcript, outlineFor(corpus[6]))).toThrow()
+  })
+
+  it('rejects outlines from other format versions', () => {
+    const transcript = readFileSync(corpus[2], 'utf-8')
+    const outline = outlineFor(corpus[2]).replace('"version":3', '"version":999')
+
+    expect(() => parseOutlinedEntries(transcript, outline)).toThrow()
+  })
+})
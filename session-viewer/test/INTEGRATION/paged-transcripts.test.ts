@@ -0,0 +1,150 @@
+import { describe, it, expect } from 'vitest'
+import { readFileSync } from 'fs'
+import { join } from 'path'
+import {
+  createTranscriptPager,
+  parseEntries,
+  type TranscriptIndex,
+  type TranscriptRangeFetcher,
+} from '../../src/lib/gistGateway'
+
+// Indexes were produced by the publish script's transcript_index.py, with pages
+// of at most 10 entries so these short sample sessions span several pages, and
+// outline ranges into the normalized outlines in fixtures/normalized
+const SAMPLES_DIR = join(__dirname, '../../../samples/claude-code-projects')
+const TRANSCRIPT = '0ccf1a04-1b4c-43b6-8aa5-79e41db43a68'
+
+function rangeFetcher(bytes: Buffer, requests: [number, number][]): TranscriptRangeFetcher {
+  return async (offset, length) => {
+    requests.push([offset, length])
+    return new TextDecoder().decode(bytes.subarray(offset, offset + length))
+  }
+}
+
+function load(name: string) {
+  const bytes = readFileSync(join(SAMPLES_DIR, `${name}.jsonl`))
+  const outlineBytes = readFileSync(
+    join(__dirname, 'fixtures/normalized', `${name}.normalized.jsonl`)
+  )
+  const index: TranscriptIndex = JSON.parse(
+    readFileSync(join(__dirname, 'fixtures/paged', `${name}.index.json`), 'utf-8')
+  )
+  const requests: [number, number][] = []
+  const outlineRequests: [number, number][] = []
+  return {
+    text: bytes.toString('utf-8'),
+    index,
+    fetchRange: rangeFetcher(bytes, requests),
+    fetchOutlineRange: rangeFetcher(outlineBytes, outlineRequests),
+    requests,
+    outlineRequests,
+  }
+}
+
+describe('paged transcripts', () => {
+  for (const name of [TRANSCRIPT, '4b2030ed-5563-49ea-b703-6a002f2d3cc8']) {
+    it(`loads ${name} page by page into the same entries as parseEntries`, async () => {
+      const { text, index, fetchRange } = load(name)
+      const pager = createTranscriptPager(index, fetchRange)
+
+      let entries = await pager.loadNext()
+      expect(entries).toHaveLength(index.pages[0].entries)
+      while (pager.hasNext()) {
+        entries = await pager.loadNext()
+      }
+
+      expect(pager.hasPrevious()).toBe(false)
+      expect(entries).toEqual(parseEntries(text))
+    })
+  }
+
+  it('opens at the page holding an indexed user turn, then loads around it', async () => {
+    const { text, index, fetchRange, requests } = load(TRANSCRIPT)
+    const anchor = index.anchors[index.anchors.length - 1]
+    const page = index.pages.filter((p) => p.entry <= anchor.entry).length - 1
+    expect(page).toBeGreaterThan(1)
+
+    const pager = createTranscriptPager(index, fetchRange)
+    let entries = await pager.reveal(`msg-${anchor.uuid}`)
+
+    expect(requests).toEqual([[index.pages[page].offset, index.pages[page].length]])
+    expect(entries.some((entry) => 'uuid' in entry && entry.uuid === anchor.uuid)).toBe(true)
+
+    while (pager.hasPrevious()) {
+      entries = await pager.loadPrevious()
+    }
+    while (pager.hasNext()) {
+      entries = await pager.loadNext()
+    }
+    expect(entries).toEqual(parseEntries(text))
+  })
+
+  it('loads the whole transcript for anchors the index does not record', async () => {
+    const { text, index, fetchRange, requests } = load(TRANSCRIPT)
+    const expected = parseEntries(text)
+    const toolCallId = expected.flatMap((entry) =>
+      'structuredEntry' in entry && entry.structuredEntry.kind === 'assistant'
+        ? (entry.structuredEntry.toolCalls ?? [])
+        : []
+    )[0].id
+
+    const pager = createTranscriptPager(index, fetchRange)
+    const entries = await pager.reveal(`msg-${toolCallId}`)
+
+    expect(requests).toHaveLength(1)
+    expect(pager.hasNext()).toBe(false)
+    expect(entries).toEqual(expected)
+  })
+
+  for (const name of [TRANSCRIPT, '4b2030ed-5563-49ea-b703-6a002f2d3cc8']) {
+    it(`builds ${name} page by page from its outline`, async () => {
+      const { text, index, fetchRange, fetchOutlineRange, outlineRequests } = load(name)
+      const pager = createTranscriptPager(index, fetchRange, undefined, fetchOutlineRange)
+
+      let entries = await pager.loadNext()
+      while (pager.hasNext()) {
+        entries = await pager.loadNext()
+      }
+
+      expect(entries).toEqual(parseEntries(text))
+      // The header, then each page's outline lines
+      expect(outlineRequests).toHaveLength(index.pages.length + 1)
+    })
+  }
+
+  it('joins outlined tool calls to results on pages loaded after or before them', async () => {
+    const { text, index, fetchRange, fetchOutlineRange } = load(TRANSCRIPT)
+    const pager = createTranscriptPager(index, fetchRange, undefined, fetchOutlineRange)
+
+    let entries = await pager.reveal(`msg-${index.anchors[index.anchors.length - 1].uuid}`)
+    while (pager.hasPrevious()) {
+      entries = await pager.loadPrevious()
+    }
+    while (pager.hasNext()) {
+      entries = await pager.loadNext()
+    }
+
+    expect(entries).toEqual(parseEntries(text))
+  })
+
+  it('parses pages itself when the outline is for another transcript', async () => {
+    const { text, index, fetchRange } = load(TRANSCRIPT)
+    const other = load('4b2030ed-5563-49ea-b703-6a002f2d3cc8')
+    const pager = createTranscriptPager(index, fetchRange, undefined, other.fetchOutlineRange)
+
+    let entries = await pager.loadNext()
+    while (pager.hasNext()) {
+      entries = await pager.loadNext()
+    }
+
+    expect(entries).toEqual(parseEntries(text))
+    expect(other.outlineRequests).toHaveLength(1)
+  })
+
+  it('rejects pages that do not match the index', async () => {
+    const { index, fetchRange } = load(TRANSCRIPT)
+    const stale = { ...index, pages: [{ ...index.pages[0], entries: index.pages[0].entries + 1 }] }
+
+    await expect(createTranscriptPager(stale, fetchRange).loadNext()).rejects.toThrow()
+  })
+})
@@ -0,0 +1,119 @@
+import { describe, it, expect } from 'vitest'
+import { readFileSync } from 'fs'
+import { join } from 'path'
+import { createSubagentLoader, parseEntries, type GistResponse } from '../../src/lib/gistGateway'
+
+// The manifest was produced by the publish script's subagent_bundles.py from the
+// subagent transcripts of one sample session, bundled as if there were too many
+const SUBAGENTS_DIR = join(
+  __dirname,
+  '../../../samples/claude-code-projects/0ccf1a04-1b4c-43b6-8aa5-79e41db43a68/subagents'
+)
+const MANIFEST = readFileSync(join(__dirname, 'fixtures/bundled/agent-bundles.json'), 'utf-8')
+
+interface AgentRange {
+  filename: string
+  offset: number
+  length: number
+}
+
+const agents: Record<string, AgentRange> = JSON.parse(MANIFEST).agents
+const agentIds = Object.keys(agents)
+
+function agentText(agentId: string): string {
+  return readFileSync(join(SUBAGENTS_DIR, agents[agentId].filename), 'utf-8')
+}
+
+// The bundle is the agents' transcripts back to back, in manifest order
+const BUNDLE = Buffer.concat(
+  Object.values(agents)
+    .sort((a, b) => a.offset - b.offset)
+    .map((agent) => readFileSync(join(SUBAGENTS_DIR, agent.filename)))
+)
+
+/** Serve files from memory as fetch does, honouring Range headers unless told not to */
+function serve(files: Record<string, string | Buffer>, { ranges = true } = {}) {
+  const requests: { url: string; range: string | null }[] = []
+  globalThis.fetch = async (input: RequestInfo | URL, init?: RequestInit) => {
+    const url = String(input)
+    const range = new Headers(init?.headers).get('Range')
+    requests.push({ url, range })
+    const body = files[url]
+    if (body === undefined) {
+      return new Response('Not Found', { status: 404 })
+    }
+    const bytes = Buffer.from(body)
+    const match = range && ranges ? /^bytes=(\d+)-(\d+)$/.exec(range) : null
+    if (match) {
+      const [start, end] = [Number(match[1]), Number(match[2])]
+      return new Response(bytes.subarray(start, end + 1), {
+        status: 206,
+        headers: { 'Content-Range': `bytes ${start}-${end}/${bytes.length}` },
+      })
+    }
+    return new Response(bytes)
+  }
+  return requests
+}
+
+function gistOf(filenames: string[]): GistResponse {
+  return {
+    files: Object.fromEntries(
+      filenames.map((filename) => [filename, { filename, raw_url: `https://gist/${filename}` }])
+    ),
+  }
+}
+
+const bundledGist = gistOf(['session.jsonl', 'agent-bundles.json', 'agent-bundle-0001.jsonl'])
+const bundledFiles = {
+  'https://gist/agent-bundles.json': MANIFEST,
+  'https://gist/agent-bundle-0001.jsonl': BUNDLE,
+}
+
+describe('subagent bundles', () => {
+  it('loads each bundled agent with a range request for just its transcript', async () => {
+    const requests = serve(bundledFiles)
+    const loadSubagent = createSubagentLoader(bundledGist)!
+
+    for (const agentId of agentIds) {
+      expect(await loadSubagent(agentId)).toEqual(parseEntries(agentText(agentId)))
+    }
+
+    const bundleRequests = requests.filter((r) => r.url.endsWith('agent-bundle-0001.jsonl'))
+    expect(bundleRequests).toHaveLength(agentIds.length)
+    const { offset, length } = agents[agentIds[0]]
+    expect(bundleRequests[0].range).toBe(`bytes=${offset}-${offset + length - 1}`)
+    expect(requests.filter((r) => r.url.endsWith('agent-bundles.json'))).toHaveLength(1)
+  })
+
+  it('slices agents out of the whole bundle when ranges are not supported', async () => {
+    const requests = serve(bundledFiles, { ranges: false })
+    const loadSubagent = createSubagentLoader(bundledGist)!
+
+    for (const agentId of agentIds) {
+      expect(await loadSubagent(agentId)).toEqual(parseEntries(agentText(agentId)))
+    }
+    expect(requests).toHaveLength(2)
+  })
+
+  it('fetches agents published as their own file directly, and each only once', async () => {
+    const [agentId] = agentIds
+    const requests = serve({ [`https://gist/agent-${agentId}.jsonl`]: agentText(agentId) })
+    const loadSubagent = createSubagentLoader(gistOf(['session.jsonl', `agent-${agentId}.jsonl`]))!
+
+    const entries = await loadSubagent(agentId)
+    expect(entries).toEqual(parseEntries(agentText(agentId)))
+    expect(await loadSubagent(agentId)).toBe(entries)
+    expect(requests).toHaveLength(1)
+    await expect(loadSubagent('unknown')).rejects.toThrow()
+  })
+
+  it('rejects agents missing from the manifest', async () => {
+    serve(bundledFiles)
+    await expect(createSubagentLoader(bundledGist)!('unknown')).rejects.toThrow()
+  })
+
+  it('is undefined for gists without subagent transcripts', () => {
+    expect(createSubagentLoader(gistOf(['session.jsonl']))).toBeUndefined()
+  })
+})